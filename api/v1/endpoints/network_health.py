@@ -2,7 +2,8 @@
 Network Health Dashboard Endpoint
 
 Provides real-time monitoring of blockchain network connectivity,
-circuit breaker states, and RPC provider health.
+circuit breaker states, and RPC provider health, including the per-provider
+latency and error statistics of the RPC routers.
 """
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from typing import Dict, List, Any
@@ -11,6 +12,7 @@ import logging
 from datetime import datetime, timezone
 
 from core.circuit_breaker import rpc_manager
+from core.rpc_router import get_router_stats, probe_routers
 from services.multi_chain_service import MultiChainService
 
 logger = logging.getLogger(__name__)
@@ -23,6 +25,14 @@ SUPPORTED_NETWORKS = [
     'base', 'avalanche', 'fantom', 'solana'
 ]
 
+def _working_providers(router_stats: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """Primary provider per network, replaced by the router's best provider where one is routing."""
+    providers = rpc_manager.get_working_providers()
+    for network, stats in router_stats.items():
+        providers[network] = stats["best_provider"]
+    return providers
+
+
 @router.get("/", summary="Get Network Health Overview")
 async def get_network_health_overview():
     """
@@ -45,6 +55,9 @@ async def get_network_health_overview():
                 logger.error(f"Error testing {network} connection: {e}")
                 network_tests[network] = False
         
+        # Router statistics, gathered after the tests so they include them
+        router_stats = get_router_stats()
+        
         # Calculate overall health metrics
         total_networks = len(SUPPORTED_NETWORKS)
         healthy_networks = sum(1 for status in network_tests.values() if status)
@@ -72,11 +85,12 @@ async def get_network_health_overview():
                 network: {
                     "connection_test": network_tests.get(network, False),
                     "circuit_breaker": circuit_statuses.get(f"rpc_{network}", {}),
+                    "providers": router_stats.get(network, {}),
                     "last_updated": datetime.now(timezone.utc).isoformat()
                 }
                 for network in SUPPORTED_NETWORKS
             },
-            "working_providers": rpc_manager.get_working_providers()
+            "working_providers": _working_providers(router_stats)
         }
         
     except Exception as e:
@@ -111,6 +125,7 @@ async def get_network_health(network: str):
             "connection_test": connection_test,
             "circuit_breaker": circuit_status,
             "alternative_providers": providers,
+            "providers": get_router_stats().get(network, {}),
             "status": "healthy" if connection_test and circuit_status["is_healthy"] else "unhealthy"
         }
         
@@ -223,6 +238,9 @@ async def _test_all_networks_background():
             except Exception as e:
                 logger.error(f"Error testing {network}: {e}")
         
+        # Refresh latency statistics of every provider, not just the routed ones
+        await probe_routers()
+        
         logger.info("Background network testing completed")
         
     except Exception as e:
@@ -235,12 +253,12 @@ async def get_working_providers():
     Get list of currently working RPC providers for each network.
     """
     try:
-        providers = rpc_manager.get_working_providers()
+        providers = _working_providers(get_router_stats())
         
         return {
             "working_providers": providers,
             "timestamp": datetime.now(timezone.utc).isoformat(),
-            "note": "This shows the primary provider for each network. Use /network-health/{network} for detailed status."
+            "note": "This shows the fastest healthy provider of each routed network and the primary provider of the others. Use /network-health/{network} for detailed status."
         }
         
     except Exception as e:
@@ -16,6 +16,7 @@ from web3 import Web3
 from services.security_analyzer import security_analyzer, SecurityScore
 from core.security.wash_trading import WashTradingDetector
 from core.security.mint_anomaly import MintAnomalyDetector
+from utils.evm_opcodes import get_opcode_profile
 
 # Import Web3 connection
 from live.blockchain import get_web3
@@ -327,16 +328,24 @@ async def analyze_wallet(
 @router.post("/compare/contracts")
 async def compare_multiple_contracts(
     contracts: List[str],
+    top_k: int = Query(0, ge=0, le=50, description="Also list this many most similar indexed contracts per contract"),
     w3: Web3 = Depends(get_web3_dependency)
 ):
     """
-    Compare multiple contracts for similarity using simhash and pattern analysis.
+    Compare multiple contracts for similarity using simhash and opcode profiles.
     
     This endpoint compares the bytecode of multiple contracts to identify
-    similarities that might indicate code reuse or forking.
+    similarities that might indicate code reuse or forking. The similarity
+    score is the cosine similarity of the contracts' opcode n-gram vectors,
+    and the function overlap lists the dispatcher selectors they share.
+    
+    With ``top_k`` set, each contract is also looked up in the index of known
+    contracts (see ``POST /security/index/contracts``) and its most similar
+    entries are listed, re-ranked by the hybrid similarity score.
     
     Args:
         contracts: List of contract addresses to compare (2-10 contracts)
+        top_k: Most similar indexed contracts to list per contract (0 to skip)
         
     Returns:
         dict: Pairwise similarity analysis between contracts
@@ -348,14 +357,20 @@ async def compare_multiple_contracts(
             {
                 "contract_a": "0x1234...",
                 "contract_b": "0x5678...",
-                "similarity_score": 0.85,
+                "similarity_score": 0.92,
                 "analysis": {
                     "bytecode_similarity": 0.85,
-                    "function_overlap": ["transfer", "approve", "balanceOf"],
+                    "opcode_similarity": 0.92,
+                    "function_overlap": ["0x095ea7b3", "0x70a08231", "0xa9059cbb"],
                     "is_fork_likely": true
                 }
             }
         ],
+        "similar_known_contracts": {
+            "0x1234...": [
+                {"contract_id": "0x9abc...", "jaccard": 0.91, "hybrid_score": 0.87}
+            ]
+        },
         "timestamp": "2023-07-24T22:15:30.123456"
     }
     ```
@@ -376,17 +391,19 @@ async def compare_multiple_contracts(
         # Set the Web3 instance for the analyzer
         security_analyzer.w3 = w3
         
-        # Get bytecode for all contracts
+        # Get bytecode and opcode profiles for all contracts
         contracts_bytecode = {}
+        profiles = {}
         for addr in contracts:
             if not Web3.is_address(addr):
                 raise HTTPException(status_code=400, detail=f"Invalid address: {addr}")
                 
             code = w3.eth.get_code(Web3.to_checksum_address(addr)).hex()
-            if code == '0x':
+            if not code or code in ('0x', '0X'):
                 raise HTTPException(status_code=400, detail=f"No code at address: {addr}")
                 
             contracts_bytecode[addr] = code
+            profiles[addr] = get_opcode_profile(code)
         
         # Compare all pairs
         comparisons = []
@@ -402,31 +419,40 @@ async def compare_multiple_contracts(
                 hash_b = security_analyzer.simhasher.simhash(contracts_bytecode[addr_b])
                 similarity = 1 - (bin(hash_a ^ hash_b).count('1') / 64.0)
                 
-                # Simple function signature extraction (simplified)
-                # In production, you'd use proper ABI analysis
-                functions_a = set(f for f in contracts_bytecode[addr_a].split('60806040') 
-                               if len(f) > 8 and f[:8].isalnum())
-                functions_b = set(f for f in contracts_bytecode[addr_b].split('60806040') 
-                               if len(f) > 8 and f[:8].isalnum())
-                
-                common_functions = list(functions_a.intersection(functions_b))
+                # Instruction-level similarity and shared function selectors
+                opcode_similarity = profiles[addr_a].similarity(profiles[addr_b])
+                common_functions = sorted(profiles[addr_a].selectors & profiles[addr_b].selectors)
                 
                 comparisons.append({
                     "contract_a": addr_a,
                     "contract_b": addr_b,
-                    "similarity_score": round(similarity, 4),
+                    "similarity_score": round(opcode_similarity, 4),
                     "analysis": {
                         "bytecode_similarity": round(similarity, 4),
+                        "opcode_similarity": round(opcode_similarity, 4),
                         "function_overlap": common_functions[:10],  # Limit to first 10
-                        "is_fork_likely": similarity > 0.8 and len(common_functions) > 3
+                        "is_fork_likely": opcode_similarity > 0.8 and len(common_functions) > 3
                     }
                 })
                 
-        return {
+        result = {
             "comparisons": comparisons,
             "timestamp": datetime.utcnow().isoformat()
         }
         
+        if top_k:
+            index = security_analyzer.contract_index
+            result["similar_known_contracts"] = {
+                addr: [
+                    {key: value for key, value in match.to_dict().items() if key != "similarity"}
+                    for match in index.query(bytecode=code, k=top_k,
+                                             exclude={Web3.to_checksum_address(addr)})
+                ]
+                for addr, code in contracts_bytecode.items()
+            }
+            
+        return result
+        
     except HTTPException:
         raise
     except ValueError as ve:
@@ -434,6 +460,58 @@ async def compare_multiple_contracts(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparing contracts: {str(e)}")
 
+@router.post("/index/contracts")
+async def index_contracts(
+    contracts: List[str],
+    w3: Web3 = Depends(get_web3_dependency)
+):
+    """
+    Add contracts to the index of known contracts used for similarity search.
+    
+    Each contract's bytecode is summarised as a MinHash signature of its opcode
+    n-grams; indexed contracts are returned by ``POST /security/compare/contracts``
+    when ``top_k`` is set.
+    
+    Args:
+        contracts: List of contract addresses to index (up to 100)
+        
+    Returns:
+        dict: Indexed addresses and index statistics
+    """
+    try:
+        if len(contracts) > 100:
+            raise HTTPException(
+                status_code=400,
+                detail="Maximum 100 contracts can be indexed at once"
+            )
+            
+        index = security_analyzer.contract_index
+        indexed = []
+        for addr in contracts:
+            if not Web3.is_address(addr):
+                raise HTTPException(status_code=400, detail=f"Invalid address: {addr}")
+                
+            addr = Web3.to_checksum_address(addr)
+            code = w3.eth.get_code(addr).hex()
+            if not code or code in ('0x', '0X'):
+                raise HTTPException(status_code=400, detail=f"No code at address: {addr}")
+                
+            index.add(addr, bytecode=code)
+            indexed.append(addr)
+            
+        return {
+            "indexed": indexed,
+            "index": index.get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error indexing contracts: {str(e)}")
+
 @router.get("/phishing/check")
 async def check_phishing_indicators(
     url: str = Query(..., description="URL to check for phishing indicators"),
@@ -41,6 +41,8 @@ from core.security.wallet_clustering import WalletClustering, Wallet
 from core.security.provenance import ProvenanceTracker
 from core.utils.rate_limiter import BATCH_PROCESSING_LIMITER, rate_limit_check
 from core.storage.batch_job_store import job_store as batch_job_store
+from core.progress import ProgressPublisher
+from core.config import settings
 
 # Define job statuses
 class JobStatus(str, Enum):
@@ -253,6 +255,8 @@ async def process_wallet_batch(job_id: str, wallet_addresses: List[str], depth:
     and handles errors gracefully.
     """
     job = None
+    job_data = None
+    publisher = None
     try:
         # Get job from persistent storage
         job_data = await batch_job_store.get_job(job_id)
@@ -266,7 +270,24 @@ async def process_wallet_batch(job_id: str, wallet_addresses: List[str], depth:
         await batch_job_store.save_job(job_id, job_data)
         
         # Also update in-memory job
-        job = update_job_status(job_id, JobStatus.PROCESSING, started_at=time.time())
+        if not update_job_status(job_id, JobStatus.PROCESSING, started_at=time.time()):
+            # The job was only in persistent storage (e.g. after a restart)
+            batch_jobs[job_id] = BatchJob(
+                job_id=job_id,
+                status=JobStatus.PROCESSING,
+                created_at=job_data.get("created_at", time.time()),
+                started_at=job_data["started_at"],
+                total=len(wallet_addresses)
+            )
+        job = batch_jobs[job_id]
+        
+        # Progress is coalesced into small records; results are saved once at the end
+        publisher = ProgressPublisher(
+            job_id,
+            store=batch_job_store,
+            notify=lambda record: ws_manager.broadcast_job_update(job_id, job),
+            max_rate=settings.JOB_PROGRESS_MAX_RATE
+        )
         
         # Initialize wallet clustering
         clustering = WalletClustering(
@@ -288,17 +309,10 @@ async def process_wallet_batch(job_id: str, wallet_addresses: List[str], depth:
                     cluster = await get_wallet_cluster(wallet_address, depth=depth, include_risk=include_risk)
                     results.append(cluster)
                     
-                    # Update progress in both memory and persistent storage
+                    # Update progress in memory; the publisher persists and broadcasts it
                     job.progress += 1
                     job_data["progress"] = job.progress
-                    job_data["results"] = {"clusters": results}
-                    
-                    # Save progress every 10 wallets or at the end
-                    if job.progress % 10 == 0 or job.progress == job.total:
-                        await batch_job_store.save_job(job_id, job_data)
-                    
-                    # Broadcast update to WebSocket clients
-                    await ws_manager.broadcast_job_update(job_id, job)
+                    await publisher.update(job.progress, job.total, job.status)
                     
                 except Exception as e:
                     error_msg = f"Error processing wallet {wallet_address}: {str(e)}"
@@ -306,6 +320,8 @@ async def process_wallet_batch(job_id: str, wallet_addresses: List[str], depth:
                     job_data.setdefault("errors", []).append(error_msg)
                     continue
         
+        await publisher.close()
+        
         # Update job status to completed
         job_data.update({
             "status": JobStatus.COMPLETED.value,
@@ -327,6 +343,9 @@ async def process_wallet_batch(job_id: str, wallet_addresses: List[str], depth:
         error_msg = f"Error in batch processing job {job_id}: {str(e)}"
         logging.error(error_msg)
         
+        if publisher:
+            await publisher.close()
+        
         # Update both storage and memory
         if job_data:
             job_data.update({
@@ -0,0 +1,471 @@
+"""
+Batch Ranking Executor
+
+Scores large ranking jobs outside the API event loop. Incoming DataFrame
+chunks are cut into shards, each shard runs feature extraction and
+vectorized hybrid scoring in a worker process, and the parent merges the
+scored shards into one ranking while reporting progress as shards finish.
+
+Features that depend on the whole drop (``POPULATION_FEATURES``) are
+computed in a pre-pass and handed to each shard, so scores do not depend on
+the chunk or shard size. Large jobs spill scored rows to a ``RankingSpool``
+that sorts on disk instead of holding the ranking in memory.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from core.features import (
+    FEATURE_REGISTRY,
+    POPULATION_FEATURES,
+    PopulationFeatureBuilder,
+    PopulationFeatures,
+    extract_features,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {"symbolic": 0.5, "ml": 0.5}
+
+# Columns of a scored shard, in result order (rank is added after merging)
+RESULT_COLUMNS = ["wallet", "token_id", "hybrid_score", "model_score", "symbolic_score"]
+
+
+@dataclass(frozen=True)
+class RankingOptions:
+    """
+    Picklable scoring configuration shipped to worker processes.
+
+    ``predict`` must be a module-level function (``predict(model, X)``) so
+    it can be pickled by reference. The executor installs the model in each
+    worker process once and ships shards with ``model_in_worker`` set instead
+    of the model itself.
+    """
+    include_symbolic: bool = True
+    include_ml: bool = True
+    weights: Optional[Dict[str, float]] = None
+    symbolic_columns: Tuple[str, ...] = ("token_entropy", "wallet_entropy")
+    model: Any = None
+    predict: Optional[Callable[[Any, pd.DataFrame], Any]] = None
+    model_in_worker: bool = False
+
+    @property
+    def uses_model(self) -> bool:
+        return self.include_ml and (self.model_in_worker or (self.model is not None and self.predict is not None))
+
+    @property
+    def needs_population(self) -> bool:
+        """Whether scoring reads any drop-wide feature."""
+        required = self.required_features()
+        return required is None or any(name in POPULATION_FEATURES for name in required)
+
+    def required_features(self) -> Optional[List[str]]:
+        """Features a shard needs; None (all of them) when a model consumes the full frame."""
+        if self.uses_model:
+            return None
+        if not self.include_symbolic:
+            return []
+        return [col for col in self.symbolic_columns if col in FEATURE_REGISTRY]
+
+
+def score_frame(df: pd.DataFrame, options: RankingOptions,
+                model_scores: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Vectorized hybrid scoring of a feature DataFrame.
+
+    Column for column this is the per-row scoring the batch endpoint used to
+    run in ``iterrows``: the symbolic score sums ``options.symbolic_columns``
+    (missing columns count as 0), and the hybrid score blends it with the
+    model score using ``options.weights``.
+    """
+    symbolic = np.zeros(len(df))
+    if options.include_symbolic:
+        for col in options.symbolic_columns:
+            if col in df.columns:
+                symbolic = symbolic + df[col].to_numpy(dtype=np.float64)
+
+    model = np.zeros(len(df)) if model_scores is None else np.asarray(model_scores, dtype=np.float64)
+
+    if options.include_symbolic and options.include_ml:
+        weights = options.weights or DEFAULT_WEIGHTS
+        hybrid = weights.get("symbolic", 0.5) * symbolic + weights.get("ml", 0.5) * model
+    elif options.include_symbolic:
+        hybrid = symbolic
+    else:
+        hybrid = model
+
+    return pd.DataFrame({
+        "wallet": df["wallet"].to_numpy(),
+        "token_id": df["token_id"].to_numpy(),
+        "hybrid_score": hybrid,
+        "model_score": model if model_scores is not None else None,
+        "symbolic_score": symbolic if options.include_symbolic else None,
+    }, index=df.index)
+
+
+# (model, predict) installed in a worker process by the pool initializer
+_worker_model: Tuple[Any, Optional[Callable[[Any, pd.DataFrame], Any]]] = (None, None)
+
+
+def _init_worker(model: Any, predict: Optional[Callable[[Any, pd.DataFrame], Any]]):
+    """Pool initializer: unpickle the job's model once per worker process."""
+    global _worker_model
+    _worker_model = (model, predict)
+
+
+def score_shard(shard: pd.DataFrame, options: RankingOptions,
+                population: Optional[PopulationFeatures] = None) -> pd.DataFrame:
+    """
+    Extract features for a shard and score it. Runs in a worker process.
+
+    Args:
+        shard: Mint records
+        options: Scoring configuration
+        population: Drop-wide feature values for the shard's rows
+    """
+    features = extract_features(shard, features=options.required_features(), population=population)
+
+    model_scores = None
+    if options.uses_model:
+        model, predict = _worker_model if options.model_in_worker else (options.model, options.predict)
+        X = features.drop(columns=["wallet", "token_id", "timestamp"])
+        model_scores = predict(model, X)
+
+    return score_frame(features, options, model_scores)
+
+
+async def build_population_features(
+    chunks: Union[Iterable[pd.DataFrame], AsyncIterator[pd.DataFrame]]
+) -> PopulationFeatures:
+    """
+    Pre-pass over a drop computing the ``POPULATION_FEATURES``.
+
+    Chunks are read off the event loop and discarded after hashing, so the
+    pass keeps two hashes and one timestamp per row rather than the drop.
+    """
+    builder = PopulationFeatureBuilder()
+    async for chunk in _aiter(chunks):
+        await asyncio.to_thread(builder.add, chunk)
+    return await asyncio.to_thread(builder.build)
+
+
+def rank_results(scored: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merge scored shards and rank by hybrid score (descending).
+
+    Ties keep their original row order, as the list sort used to.
+    """
+    if not scored:
+        return pd.DataFrame(columns=RESULT_COLUMNS + ["rank"])
+    merged = pd.concat(scored).sort_index(kind="stable")
+    order = np.argsort(-merged["hybrid_score"].to_numpy(dtype=np.float64), kind="stable")
+    ranked = merged.iloc[order].reset_index(drop=True)
+    ranked["rank"] = np.arange(1, len(ranked) + 1)
+    return ranked
+
+
+def ranking_records(ranked: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a ranked frame to the JSON-friendly result records of the API.
+    """
+    records = ranked.astype(object).where(ranked.notna(), None).to_dict("records")
+    for record in records:
+        for key in ("hybrid_score", "model_score", "symbolic_score"):
+            if record[key] is not None:
+                record[key] = float(record[key])
+        record["rank"] = int(record["rank"])
+    return records
+
+
+class _ModelPool:
+    """A worker pool with one model installed by its initializer, and the jobs using it."""
+
+    def __init__(self, model: Any, predict: Any, max_workers: int):
+        self.model = model
+        self.predict = predict
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(model, predict)
+        )
+        self.jobs = 0
+
+    def serves(self, model: Any, predict: Any) -> bool:
+        return self.model is model and self.predict is predict
+
+
+class BatchRankingExecutor:
+    """
+    Shards ranking jobs across a process pool.
+
+    Each model (with its predict function) gets its own pool, so concurrent
+    jobs with different models never tear down each other's workers. The
+    pool of the most recently started model is kept for later jobs; pools of
+    other models are shut down once no running job uses them.
+
+    Args:
+        max_workers: Worker processes (default: CPU count). 0 scores shards
+            in a thread of the current process instead, e.g. for tests or
+            single-core deployments.
+        shard_rows: Maximum rows per shard sent to a worker
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, shard_rows: int = 50_000):
+        if shard_rows <= 0:
+            raise ValueError("shard_rows must be positive")
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.shard_rows = shard_rows
+        self._pools: List[_ModelPool] = []
+        self._current: Optional[_ModelPool] = None
+
+    def _acquire_pool(self, options: RankingOptions) -> Optional[_ModelPool]:
+        """The pool with the job's model installed (started if needed), held until ``_release_pool``."""
+        if self.max_workers <= 0:
+            return None
+        model, predict = (options.model, options.predict) if options.uses_model else (None, None)
+        pool = next((p for p in self._pools if p.serves(model, predict)), None)
+        if pool is None:
+            pool = _ModelPool(model, predict, self.max_workers)
+            self._pools.append(pool)
+        pool.jobs += 1
+        self._current = pool
+        for other in list(self._pools):
+            if other.jobs == 0 and other is not pool:
+                self._retire(other)
+        return pool
+
+    def _release_pool(self, pool: Optional[_ModelPool]):
+        if pool is None:
+            return
+        pool.jobs -= 1
+        if pool.jobs == 0 and pool is not self._current:
+            self._retire(pool)
+
+    def _retire(self, pool: _ModelPool):
+        # Idle, so nothing is left to wait for; never block the event loop
+        pool.executor.shutdown(wait=False)
+        self._pools.remove(pool)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes of every pool; a later job starts a fresh pool."""
+        for pool in self._pools:
+            pool.executor.shutdown(wait=wait)
+        self._pools.clear()
+        self._current = None
+
+    def _shards(self, chunk: pd.DataFrame) -> Iterable[pd.DataFrame]:
+        for start in range(0, len(chunk), self.shard_rows):
+            yield chunk.iloc[start:start + self.shard_rows]
+
+    async def rank(
+        self,
+        chunks: Union[Iterable[pd.DataFrame], AsyncIterator[pd.DataFrame]],
+        options: RankingOptions,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+        population: Optional[PopulationFeatures] = None,
+    ) -> pd.DataFrame:
+        """
+        Score and rank every row of ``chunks`` in memory.
+
+        Input chunks are consumed lazily, but the scored rows (the
+        ``RESULT_COLUMNS`` of every row) are kept until the final sort; use
+        ``rank_spooled`` for jobs whose ranking should not be held in memory.
+
+        Args:
+            chunks: DataFrames (sync or async iterable) with unique row indexes
+            options: Scoring configuration
+            on_progress: Awaited with the number of rows scored so far after
+                each shard completes
+            population: Drop-wide feature values (``build_population_features``);
+                without them the ``POPULATION_FEATURES`` describe single shards
+                and depend on ``shard_rows``
+
+        Returns:
+            pd.DataFrame: ``RESULT_COLUMNS`` plus ``rank``, best first
+        """
+        scored: List[pd.DataFrame] = []
+
+        async def collect(result: pd.DataFrame):
+            scored.append(result)
+
+        await self._score(chunks, options, collect, on_progress, population)
+        return await asyncio.to_thread(rank_results, scored)
+
+    async def rank_spooled(
+        self,
+        chunks: Union[Iterable[pd.DataFrame], AsyncIterator[pd.DataFrame]],
+        options: RankingOptions,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+        population: Optional[PopulationFeatures] = None,
+        directory: Optional[str] = None,
+    ) -> "RankingSpool":
+        """
+        Score every row of ``chunks`` into a ``RankingSpool`` on disk.
+
+        Memory stays bounded by the shards in flight (at most two per worker)
+        regardless of job size. The caller reads the ranking back page by
+        page and must close the spool. Arguments are as for ``rank``.
+        """
+        spool = RankingSpool(directory)
+        try:
+            async def spill(result: pd.DataFrame):
+                await asyncio.to_thread(spool.add, result)
+
+            await self._score(chunks, options, spill, on_progress, population)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    async def _score(
+        self,
+        chunks: Union[Iterable[pd.DataFrame], AsyncIterator[pd.DataFrame]],
+        options: RankingOptions,
+        consume: Callable[[pd.DataFrame], Awaitable[None]],
+        on_progress: Optional[Callable[[int], Awaitable[None]]],
+        population: Optional[PopulationFeatures],
+    ) -> None:
+        """Score shards with at most two per worker in flight, passing results to ``consume``."""
+        loop = asyncio.get_running_loop()
+        pool = self._acquire_pool(options)
+        # Workers already hold the model; shards carry only the scoring settings
+        shard_options = replace(options, model=None, predict=None, model_in_worker=True) \
+            if pool is not None and options.uses_model else options
+        max_in_flight = max(1, 2 * self.max_workers)
+        pending: Set[asyncio.Future] = set()
+        done_rows = 0
+
+        async def drain(limit: int):
+            nonlocal done_rows, pending
+            while len(pending) > limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    await consume(result)
+                    done_rows += len(result)
+                if on_progress is not None:
+                    await on_progress(done_rows)
+
+        try:
+            async for chunk in _aiter(chunks):
+                for shard in self._shards(chunk):
+                    shard_population = population.take(shard.index) if population is not None else None
+                    if pool is None:
+                        future = asyncio.ensure_future(
+                            asyncio.to_thread(score_shard, shard, shard_options, shard_population)
+                        )
+                    else:
+                        future = loop.run_in_executor(
+                            pool.executor, score_shard, shard, shard_options, shard_population
+                        )
+                    pending.add(future)
+                    await drain(max_in_flight - 1)
+            await drain(0)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            self._release_pool(pool)
+
+
+class RankingSpool:
+    """
+    Scored rows spilled to a temporary SQLite file and read back in rank order.
+
+    SQLite sorts on disk, so reading the ranking holds one page in memory.
+    Ties keep their original row order, as in ``rank_results``.
+
+    Args:
+        directory: Where to create the temporary file (default: system temp dir)
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        fd, self.path = tempfile.mkstemp(prefix="ranking-", suffix=".db", dir=directory)
+        os.close(fd)
+        self.rows = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Scratch data: no journal, no fsync
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("""
+            CREATE TABLE scored (
+                row INTEGER NOT NULL,
+                wallet,
+                token_id,
+                hybrid_score REAL,
+                model_score REAL,
+                symbolic_score REAL
+            )
+        """)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def add(self, scored: pd.DataFrame) -> None:
+        """Spill one scored shard (``score_frame`` output)."""
+        frame = scored[RESULT_COLUMNS].astype(object).where(scored[RESULT_COLUMNS].notna(), None)
+        rows = zip(scored.index.tolist(), *(frame[col].tolist() for col in RESULT_COLUMNS))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO scored (row, wallet, token_id, hybrid_score, model_score, symbolic_score) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self.rows += len(scored)
+
+    def iter_pages(self, page_rows: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield the ranking as API result records, ``page_rows`` at a time.
+
+        Rank 1 is the highest hybrid score; rows without a score come last.
+        """
+        cursor = self._conn.execute(
+            "SELECT wallet, token_id, hybrid_score, model_score, symbolic_score FROM scored "
+            "ORDER BY hybrid_score IS NULL, hybrid_score DESC, row"
+        )
+        rank = 0
+        while True:
+            rows = cursor.fetchmany(page_rows)
+            if not rows:
+                return
+            page = []
+            for row in rows:
+                rank += 1
+                page.append({**dict(zip(RESULT_COLUMNS, row)), "rank": rank})
+            yield page
+
+    async def aiter_pages(self, page_rows: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """``iter_pages`` with each page read off the event loop."""
+        pages = self.iter_pages(page_rows)
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield page
+
+    def close(self) -> None:
+        """Close and delete the spool file."""
+        self._conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def _aiter(chunks):
+    """Iterate sync or async chunk sources; sync sources are advanced off the loop."""
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+        return
+    iterator = iter(chunks)
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -85,6 +85,8 @@ class Settings(BaseSettings):
     AVALANCHE_RPC_URL: Optional[str] = Field(default=None, description="Avalanche RPC URL")
     FANTOM_RPC_URL: Optional[str] = Field(default=None, description="Fantom RPC URL")
     SOLANA_RPC_URL: Optional[str] = Field(default=None, description="Solana RPC URL")
+    RPC_HEDGE_AFTER_MS: Optional[float] = Field(default=None, description="Send a hedged duplicate of an unanswered RPC call to the next provider after this many milliseconds (unset: no hedging)")
+    RPC_ROUTER_WINDOW: int = Field(default=200, description="Recent calls per RPC provider used for latency percentiles and error rate")
     
     # ML Model settings
     MODEL_PATH: str = Field(default="models", description="Path to ML models")
@@ -92,6 +94,25 @@ class Settings(BaseSettings):
     MODEL_RETRAINING_ENABLED: bool = Field(default=True, description="Enable automatic model retraining")
     MODEL_RETRAINING_SCHEDULE: str = Field(default="weekly", description="Model retraining schedule")
     
+    # Batch processing
+    BATCH_SPOOL_DIR: Optional[str] = Field(default=None, description="Directory for spooled batch uploads (default: system temp)")
+    BATCH_CHUNK_ROWS: int = Field(default=100_000, description="Rows per chunk when streaming batch uploads")
+    BATCH_RANKING_WORKERS: Optional[int] = Field(default=None, description="Worker processes for batch ranking (default: CPU count, 0: in-process)")
+    BATCH_RANKING_SHARD_ROWS: int = Field(default=50_000, description="Rows per shard sent to a batch ranking worker")
+    BATCH_JOB_STORE_BACKEND: str = Field(default="file", description="Batch job store backend: file or sqlite")
+    BATCH_JOB_STORE_PATH: str = Field(default="data/batch_jobs.db", description="SQLite database for the sqlite batch job store")
+    JOB_PROGRESS_MAX_RATE: float = Field(default=2.0, description="Maximum job progress publishes per second (0: every update)")
+
+    # WebSocket broadcasting
+    WS_BACKPLANE: str = Field(default="local", description="Cross-worker WebSocket backplane: local (single worker) or redis")
+    WS_BACKPLANE_CHANNEL: str = Field(default="ws:broadcast", description="Redis pub/sub channel carrying WebSocket broadcasts")
+    EVENT_LISTENER_IN_APP: bool = Field(default=True, description="Run the blockchain event listener in every app worker (disable when live.run_listener publishes through the backplane)")
+    WS_EVENT_LOG_DIR: Optional[str] = Field(default=None, description="Directory of per-channel replay logs for resuming WebSocket clients, one subdirectory per worker (unset: no replay)")
+    WS_EVENT_LOG_CHANNEL_BYTES: int = Field(default=1 << 20, description="Ring log capacity per channel in bytes")
+    WS_EVENT_LOG_MAX_AGE: float = Field(default=3600.0, description="Seconds broadcast events stay replayable")
+    WS_EVENT_LOG_MAX_CHANNELS: int = Field(default=1024, description="Channel logs kept before the least recently written is deleted")
+    OWNERSHIP_SNAPSHOT_EVERY: int = Field(default=10_000, description="Transfers applied between snapshots of the listener's incremental ownership graph")
+
     # Feature flags
     ENABLE_WEBHOOKS: bool = Field(default=False, description="Enable webhook notifications")
     ENABLE_ANALYTICS: bool = Field(default=True, description="Enable analytics collection")
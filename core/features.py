@@ -1,75 +1,343 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 import pandas as pd
 import numpy as np
-from utils.entropy import entropy, digit_root, prime_factor_count
+from utils.entropy import entropy_many, prime_factor_count_many
 from utils.graph_entropy import compute_wallet_graph_entropy
+from utils.bitwise import bit_entropy_many
+from utils.simhash import simhash_many
+from utils.temporal import fibonacci_interval_matches, golden_ratio_proximity_many
 
-from utils.graph_entropy import compute_wallet_graph_entropy
-from utils.address_symmetry import address_symmetry_features
-from utils.bitwise import bitwise_features
-from utils.simhash import simhash, simhash_distance
-from utils.temporal import fibonacci_intervals, golden_ratio_proximity
+
+MINT_PHASE_BOUNDARIES = (pd.Timestamp("2023-01-02"), pd.Timestamp("2023-01-04"))
+GAS_TIER_BOUNDARIES = (40, 70)
 
 
 def classify_mint_phase(timestamp):
     ts = pd.to_datetime(timestamp)
     if ts.tzinfo:
         ts = ts.tz_convert(None)
-    if ts < pd.Timestamp("2023-01-02"):
+    if ts < MINT_PHASE_BOUNDARIES[0]:
         return "early"
-    elif ts < pd.Timestamp("2023-01-04"):
+    elif ts < MINT_PHASE_BOUNDARIES[1]:
         return "mid"
     else:
         return "late"
 
 def classify_gas_tier(gas_price):
-    if gas_price < 40:
+    if gas_price < GAS_TIER_BOUNDARIES[0]:
         return "low"
-    elif gas_price < 70:
+    elif gas_price < GAS_TIER_BOUNDARIES[1]:
         return "medium"
     else:
         return "high"
 
-def extract_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["token_id"] = df["token_id"].astype(str)
 
-    # Token-level symbolic features
-    df["token_mod9"] = df["token_id"].apply(lambda x: int(x) % 9 if x.isdigit() else np.nan)
-    df["token_root"] = df["token_id"].apply(lambda x: digit_root(int(x)) if x.isdigit() else np.nan)
-    df["token_entropy"] = df["token_id"].apply(lambda x: entropy(str(x)) if pd.notnull(x) else np.nan)
-    df["token_prime_factors"] = df["token_id"].apply(lambda x: prime_factor_count(int(x)) if x.isdigit() else np.nan)
+@dataclass(frozen=True)
+class FeatureSpec:
+    """A named feature column and the input columns it is computed from."""
+    name: str
+    requires: Tuple[str, ...]
+    compute: Callable[["_FeatureContext"], Any]
+    # Fill the column with NaN instead of failing when inputs are missing
+    optional: bool = False
 
-    # Wallet-level symbolic features
-    df["wallet_entropy"] = df["wallet"].apply(lambda x: entropy(str(x)) if pd.notnull(x) else np.nan)
-    df["wallet_root"] = df["wallet"].apply(lambda x: digit_root(int(x, 16)) if pd.notnull(x) else np.nan)
-    
-    # wallet graph entropy ## another gem
-    df["wallet_graph_entropy"] = compute_wallet_graph_entropy(df)
 
-    df["wallet_graph_entropy"] = compute_wallet_graph_entropy(df)
+# Feature name -> spec, in output column order
+FEATURE_REGISTRY: Dict[str, FeatureSpec] = {}
 
-    df["wallet_palindrome"] = df["wallet"].apply(lambda w: address_symmetry_features(w)["is_palindrome"])
-    df["token_bit_entropy"] = df["token_id"].apply(lambda t: bitwise_features(int(t))["bit_entropy"])
-    df["wallet_simhash"] = df["wallet"].apply(lambda w: simhash(w))
+def register_feature(name: str, requires: Iterable[str] = (), optional: bool = False):
+    """Decorator registering a vectorized feature computation under ``name``."""
+    def decorator(func):
+        FEATURE_REGISTRY[name] = FeatureSpec(name, tuple(requires), func, optional)
+        return func
+    return decorator
 
-    df["fibonacci_mint_ratio"] = fibonacci_intervals(df["timestamp"])
-    df["golden_ratio_alignment"] = golden_ratio_proximity(df["timestamp"])
 
-    
+def _take(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Broadcast per-unique values back to rows; code -1 (missing) becomes NaN."""
+    missing = codes < 0
+    if not missing.any():
+        return values[codes]
+    result = values.astype(np.float64)[codes]
+    result[missing] = np.nan
+    return result
 
-    # Contextual features
-    if "timestamp" in df.columns:
-        df["mint_phase"] = df["timestamp"].apply(classify_mint_phase)
-    else:
-        df["mint_phase"] = np.nan
+def _parse_hex(value: str) -> Optional[int]:
+    try:
+        return int(value, 16)
+    except ValueError:
+        return None
 
-    if "gas_price" in df.columns:
-        df["gas_tier"] = df["gas_price"].apply(classify_gas_tier)
-    else:
-        df["gas_tier"] = np.nan
 
-    return df
+class _FeatureContext:
+    """
+    Intermediates shared between features of one ``extract_features`` call.
+
+    Symbolic features are computed once per distinct token or wallet and
+    broadcast back to rows, since drops repeat both heavily.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    @cached_property
+    def token_codes(self) -> Tuple[np.ndarray, List[str]]:
+        codes, uniques = pd.factorize(self.df["token_id"])
+        return codes, list(uniques)
+
+    @cached_property
+    def token_ints(self) -> Tuple[np.ndarray, List[int]]:
+        """Mask of numeric token IDs (per unique) and their integer values."""
+        _, uniques = self.token_codes
+        is_digit = np.array([u.isdigit() for u in uniques], dtype=bool)
+        return is_digit, [int(u) for u, d in zip(uniques, is_digit) if d]
+
+    def token_numeric(self, compute: Callable[[List[int]], Iterable]) -> np.ndarray:
+        """Apply ``compute`` to numeric token IDs; other tokens get NaN."""
+        codes, uniques = self.token_codes
+        is_digit, ints = self.token_ints
+        values = np.full(len(uniques), np.nan)
+        if ints:
+            values[is_digit] = np.asarray(compute(ints), dtype=np.float64)
+        return _take(values, codes)
+
+    @cached_property
+    def wallet_codes(self) -> Tuple[np.ndarray, List[str]]:
+        codes, uniques = pd.factorize(self.df["wallet"])
+        return codes, [str(u) for u in uniques]
+
+    @cached_property
+    def mint_intervals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Row order of mints by timestamp and the seconds between consecutive mints."""
+        return _mint_intervals(_mint_seconds(self.df["timestamp"]))
+
+
+def _mint_seconds(timestamps: pd.Series) -> np.ndarray:
+    ts = pd.to_datetime(timestamps, utc=True).dt.tz_localize(None)
+    return ts.to_numpy().astype("datetime64[s]").astype(np.int64)
+
+def _mint_intervals(seconds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(seconds, kind="stable")
+    return order, np.diff(seconds[order]).astype(np.float64)
+
+def _wallet_degree_entropy(degrees: np.ndarray) -> float:
+    """Shannon entropy of wallet degrees, as ``compute_wallet_graph_entropy`` computes it."""
+    total = degrees.sum()
+    if total == 0:
+        return 0.0
+    probs = degrees / total
+    return float(-np.sum(probs * np.log2(probs + 1e-10)))
+
+
+def _digit_root_many(ints: List[int]) -> List[int]:
+    # Closed form of the repeated digit sum
+    return [0 if n == 0 else 1 + (n - 1) % 9 for n in ints]
+
+
+@register_feature("token_mod9", requires=("token_id",))
+def _token_mod9(ctx: _FeatureContext) -> np.ndarray:
+    return ctx.token_numeric(lambda ints: [n % 9 for n in ints])
+
+@register_feature("token_root", requires=("token_id",))
+def _token_root(ctx: _FeatureContext) -> np.ndarray:
+    return ctx.token_numeric(_digit_root_many)
+
+@register_feature("token_entropy", requires=("token_id",))
+def _token_entropy(ctx: _FeatureContext) -> np.ndarray:
+    codes, uniques = ctx.token_codes
+    return _take(entropy_many(uniques), codes)
+
+@register_feature("token_prime_factors", requires=("token_id",))
+def _token_prime_factors(ctx: _FeatureContext) -> np.ndarray:
+    return ctx.token_numeric(prime_factor_count_many)
+
+@register_feature("wallet_entropy", requires=("wallet",))
+def _wallet_entropy(ctx: _FeatureContext) -> np.ndarray:
+    codes, uniques = ctx.wallet_codes
+    return _take(entropy_many(uniques), codes)
+
+@register_feature("wallet_root", requires=("wallet",))
+def _wallet_root(ctx: _FeatureContext) -> np.ndarray:
+    codes, uniques = ctx.wallet_codes
+    parsed = [_parse_hex(u) for u in uniques]
+    values = np.full(len(uniques), np.nan)
+    valid = np.array([n is not None for n in parsed], dtype=bool)
+    if valid.any():
+        values[valid] = _digit_root_many([n for n in parsed if n is not None])
+    return _take(values, codes)
+
+@register_feature("wallet_graph_entropy", requires=("wallet", "token_id"))
+def _wallet_graph_entropy(ctx: _FeatureContext) -> float:
+    # Repeated (wallet, token) rows collapse into one edge of the simple graph anyway
+    return compute_wallet_graph_entropy(ctx.df[["wallet", "token_id"]].drop_duplicates())
+
+@register_feature("wallet_palindrome", requires=("wallet",))
+def _wallet_palindrome(ctx: _FeatureContext) -> np.ndarray:
+    codes, uniques = ctx.wallet_codes
+    normalized = [u.lower().replace("0x", "") for u in uniques]
+    values = np.array([int(a == a[::-1]) for a in normalized], dtype=np.int64)
+    return _take(values, codes)
+
+@register_feature("token_bit_entropy", requires=("token_id",))
+def _token_bit_entropy(ctx: _FeatureContext) -> np.ndarray:
+    return ctx.token_numeric(bit_entropy_many)
 
+@register_feature("wallet_simhash", requires=("wallet",))
+def _wallet_simhash(ctx: _FeatureContext) -> np.ndarray:
+    return simhash_many(ctx.df["wallet"])
 
-    
-   
\ No newline at end of file
+def _fibonacci_values(order: np.ndarray, gaps: np.ndarray) -> np.ndarray:
+    # 1.0 when the gap since the previous mint is close to a Fibonacci number
+    values = np.zeros(len(order))
+    values[order[1:]] = fibonacci_interval_matches(gaps)
+    return values
+
+def _golden_ratio_values(order: np.ndarray, gaps: np.ndarray) -> np.ndarray:
+    # Proximity to phi of each mint gap divided by the gap before it
+    values = np.zeros(len(order))
+    if len(gaps) > 1:
+        previous = gaps[:-1]
+        ratios = np.divide(gaps[1:], previous, out=np.zeros_like(previous), where=previous > 0)
+        values[order[2:]] = golden_ratio_proximity_many(ratios)
+    return values
+
+@register_feature("fibonacci_mint_ratio", requires=("timestamp",))
+def _fibonacci_mint_ratio(ctx: _FeatureContext) -> np.ndarray:
+    return _fibonacci_values(*ctx.mint_intervals)
+
+@register_feature("golden_ratio_alignment", requires=("timestamp",))
+def _golden_ratio_alignment(ctx: _FeatureContext) -> np.ndarray:
+    return _golden_ratio_values(*ctx.mint_intervals)
+
+@register_feature("mint_phase", requires=("timestamp",), optional=True)
+def _mint_phase(ctx: _FeatureContext) -> np.ndarray:
+    ts = pd.to_datetime(ctx.df["timestamp"], utc=True)
+    early, mid = (b.tz_localize("UTC") for b in MINT_PHASE_BOUNDARIES)
+    return np.select([ts < early, ts < mid], ["early", "mid"], default="late").astype(object)
+
+@register_feature("gas_tier", requires=("gas_price",), optional=True)
+def _gas_tier(ctx: _FeatureContext) -> np.ndarray:
+    gas = ctx.df["gas_price"].to_numpy(dtype=np.float64)
+    low, medium = GAS_TIER_BOUNDARIES
+    # NaN compares false everywhere and lands in "high", as in classify_gas_tier
+    return np.select([gas < low, gas < medium], ["low", "medium"], default="high").astype(object)
+
+
+# Features computed across rows of the whole drop rather than row by row
+POPULATION_FEATURES = ("wallet_graph_entropy", "fibonacci_mint_ratio", "golden_ratio_alignment")
+
+
+@dataclass
+class PopulationFeatures:
+    """
+    Drop-wide values of the ``POPULATION_FEATURES`` for rows processed in chunks.
+
+    ``mint_features`` is indexed by the drop's global row index, so the
+    values for a chunk are looked up with ``take(chunk.index)``.
+    """
+    wallet_graph_entropy: float
+    mint_features: pd.DataFrame
+
+    def take(self, index: pd.Index) -> "PopulationFeatures":
+        """The values for the rows in ``index`` (e.g. one shard)."""
+        return PopulationFeatures(self.wallet_graph_entropy, self.mint_features.loc[index])
+
+
+class PopulationFeatureBuilder:
+    """
+    Accumulates the inputs of the ``POPULATION_FEATURES`` chunk by chunk.
+
+    Only 64-bit hashes of (wallet, token) pairs and one timestamp per row are
+    kept, not the chunks themselves.
+    """
+
+    def __init__(self):
+        self._pair_hashes: List[np.ndarray] = []
+        self._wallet_hashes: List[np.ndarray] = []
+        self._index: List[np.ndarray] = []
+        self._seconds: List[np.ndarray] = []
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Add a chunk of mint records; chunks must arrive in row order."""
+        wallets = chunk["wallet"].astype(str)
+        tokens = chunk["token_id"].astype(str)
+        self._pair_hashes.append(pd.util.hash_pandas_object(
+            pd.DataFrame({"wallet": wallets, "token_id": tokens}), index=False
+        ).to_numpy())
+        self._wallet_hashes.append(pd.util.hash_pandas_object(wallets, index=False).to_numpy())
+        if "timestamp" in chunk.columns:
+            self._index.append(chunk.index.to_numpy())
+            self._seconds.append(_mint_seconds(chunk["timestamp"]))
+
+    def build(self) -> PopulationFeatures:
+        """Compute the drop-wide feature values from everything added."""
+        if self._pair_hashes:
+            pairs = np.concatenate(self._pair_hashes)
+            wallets = np.concatenate(self._wallet_hashes)
+            # Repeated (wallet, token) rows collapse into one edge of the simple graph
+            _, first = np.unique(pairs, return_index=True)
+            _, degrees = np.unique(wallets[first], return_counts=True)
+            graph_entropy = _wallet_degree_entropy(degrees.astype(np.float64))
+        else:
+            graph_entropy = 0.0
+
+        index = np.concatenate(self._index) if self._index else np.array([], dtype=np.int64)
+        seconds = np.concatenate(self._seconds) if self._seconds else np.array([], dtype=np.int64)
+        order, gaps = _mint_intervals(seconds)
+        mint_features = pd.DataFrame({
+            "fibonacci_mint_ratio": _fibonacci_values(order, gaps),
+            "golden_ratio_alignment": _golden_ratio_values(order, gaps),
+        }, index=index)
+        return PopulationFeatures(graph_entropy, mint_features)
+
+
+def extract_features(df: pd.DataFrame, features: Optional[Iterable[str]] = None,
+                     population: Optional[PopulationFeatures] = None) -> pd.DataFrame:
+    """
+    Add symbolic and contextual feature columns to a mint DataFrame.
+
+    Without ``population`` the ``POPULATION_FEATURES`` are computed from the
+    rows of ``df`` alone, so for a chunk of a larger drop they describe the
+    chunk rather than the drop.
+
+    Args:
+        df: Mint records (``wallet``, ``token_id``, ``timestamp``, ``gas_price``)
+        features: Names from ``FEATURE_REGISTRY`` to compute (default: all of them)
+        population: Drop-wide values of the ``POPULATION_FEATURES`` (from
+            ``PopulationFeatureBuilder``), used instead of computing them from ``df``
+
+    Returns:
+        pd.DataFrame: Copy of ``df`` with one column per requested feature
+
+    Raises:
+        ValueError: If a feature is unknown or its input columns are missing
+    """
+    names = list(FEATURE_REGISTRY) if features is None else list(features)
+    unknown = [name for name in names if name not in FEATURE_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown features: {unknown}")
+
+    df = df.copy()
+    if "token_id" in df.columns:
+        df["token_id"] = df["token_id"].astype(str)
+
+    ctx = _FeatureContext(df)
+    for name in names:
+        spec = FEATURE_REGISTRY[name]
+        missing = [col for col in spec.requires if col not in df.columns]
+        if not missing and population is not None and name in POPULATION_FEATURES:
+            if name == "wallet_graph_entropy":
+                df[name] = population.wallet_graph_entropy
+            else:
+                df[name] = population.mint_features[name].reindex(df.index).to_numpy()
+        elif not missing:
+            df[name] = spec.compute(ctx)
+        elif spec.optional:
+            df[name] = np.nan
+        else:
+            raise ValueError(f"Feature '{name}' requires missing columns: {missing}")
+
+    return df
@@ -1,7 +1,31 @@
+import asyncio
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence
+
 import pandas as pd
 
+# Parquet support is optional
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
 REQUIRED_COLUMNS = ["wallet", "token_id", "timestamp", "gas_price"]
 
+# Explicit dtypes for the drop columns; everything else is left to pandas.
+# Token IDs stay strings because ERC-721 IDs routinely overflow int64, and
+# timestamps are parsed into UTC datetimes per chunk (see _normalize_chunk).
+DROP_DTYPES: Dict[str, str] = {
+    "wallet": "str",
+    "token_id": "str",
+    "timestamp": "str",
+    "gas_price": "float64",
+}
+
+DEFAULT_CHUNK_ROWS = 100_000
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
 def load_drop_csv(path: str) -> pd.DataFrame:
     """
     Load a drop CSV and ensure required columns are present.
@@ -28,4 +52,180 @@ def preview_drop(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
     """
     Return a preview of the drop data.
     """
-    return df.head(n)
\ No newline at end of file
+    return df.head(n)
+
+def is_parquet(path: str) -> bool:
+    """
+    Whether a drop file should be read as Parquet (by extension).
+    """
+    return path.lower().endswith(PARQUET_SUFFIXES)
+
+def read_drop_columns(path: str) -> List[str]:
+    """
+    Return the column names of a drop file without reading its rows.
+    """
+    try:
+        if is_parquet(path):
+            return list(_parquet_file(path).schema_arrow.names)
+        return list(pd.read_csv(path, nrows=0).columns)
+    except (ImportError, ValueError):
+        # pandas parser errors (empty file, bad CSV) are ValueErrors already
+        raise
+    except Exception as e:
+        raise ValueError(f"❌ Failed to read drop header: {e}")
+
+def count_drop_rows(path: str, block_bytes: int = 1 << 20) -> int:
+    """
+    Count data rows in a drop file in constant memory.
+
+    Parquet row counts come from the file footer; CSV rows are counted as
+    line breaks after the header (quoted multi-line fields are not expected
+    in drop dumps).
+    """
+    if is_parquet(path):
+        return _parquet_file(path).metadata.num_rows
+
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1  # final line without trailing newline
+    return max(lines - 1, 0)
+
+def iter_drop_chunks(
+    path: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    required: Sequence[str] = REQUIRED_COLUMNS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a drop CSV or Parquet file as validated DataFrame chunks.
+
+    Memory stays bounded by ``chunk_rows`` regardless of file size. Each chunk
+    keeps the file's global row index, has the ``DROP_DTYPES`` applied and
+    its timestamps parsed to UTC, and is validated before it is yielded.
+
+    Args:
+        path: Path to a ``.csv`` or ``.parquet`` drop file
+        chunk_rows: Maximum number of rows per chunk
+        required: Columns that must be present
+
+    Yields:
+        pd.DataFrame: Normalized chunk of the drop
+
+    Raises:
+        ValueError: If columns are missing or a chunk fails validation
+    """
+    columns = read_drop_columns(path)
+    missing = [col for col in required if col not in columns]
+    if missing:
+        raise ValueError(f"❌ Missing required columns: {missing}")
+
+    dtypes = {col: dtype for col, dtype in DROP_DTYPES.items() if col in columns}
+    offset = 0
+    for chunk in _read_chunks(path, chunk_rows, dtypes):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        yield _normalize_chunk(chunk, dtypes)
+        offset += len(chunk)
+
+def _parquet_file(path: str):
+    if pq is None:
+        raise ImportError("Parquet ingest requires pyarrow (pip install pyarrow)")
+    return pq.ParquetFile(path)
+
+def _read_chunks(path: str, chunk_rows: int, dtypes: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    if is_parquet(path):
+        for batch in _parquet_file(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+
+    try:
+        reader = pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes)
+        with reader:
+            yield from reader
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"❌ Failed to load CSV: {e}")
+
+def _normalize_chunk(chunk: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    Apply drop dtypes to a chunk and reject rows that cannot be processed.
+    """
+    for col in ("wallet", "token_id"):
+        if col in dtypes:
+            nulls = chunk[col].isna()
+            if nulls.any():
+                raise ValueError(f"❌ Empty {col} at rows {_row_list(chunk, nulls)}")
+            chunk[col] = chunk[col].astype(dtypes[col])
+
+    if "gas_price" in dtypes:
+        try:
+            chunk["gas_price"] = chunk["gas_price"].astype(dtypes["gas_price"])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"❌ Invalid gas_price values: {e}")
+
+    if "timestamp" in dtypes:
+        timestamps = _parse_timestamps(chunk["timestamp"])
+        invalid = timestamps.isna() & chunk["timestamp"].notna()
+        if invalid.any():
+            raise ValueError(f"❌ Unparseable timestamp at rows {_row_list(chunk, invalid)}")
+        chunk["timestamp"] = timestamps
+
+    return chunk
+
+def _parse_timestamps(values: pd.Series) -> pd.Series:
+    """
+    Parse Unix seconds and ISO-8601 strings (possibly mixed) into UTC datetimes.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values, utc=True)
+
+    numeric = pd.to_numeric(values, errors="coerce")
+    is_numeric = numeric.notna()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns, UTC]")
+    if is_numeric.any():
+        parsed[is_numeric] = pd.to_datetime(numeric[is_numeric], unit="s", utc=True)
+    if not is_numeric.all():
+        text = values[~is_numeric]
+        parsed[~is_numeric] = pd.to_datetime(text, utc=True, errors="coerce", format="ISO8601")
+    return parsed
+
+def _row_list(chunk: pd.DataFrame, mask: pd.Series, limit: int = 5) -> List[int]:
+    return [int(i) for i in chunk.index[mask.to_numpy()][:limit]]
+
+async def spool_upload(upload, directory: Optional[str] = None, block_bytes: int = 1 << 20) -> str:
+    """
+    Copy an uploaded file to a temporary file on disk, one block at a time.
+
+    Blocks are written in a worker thread so a large upload does not stall
+    the event loop.
+
+    Args:
+        upload: Object with an async ``read(size)`` method and optional
+            ``filename`` (e.g. ``fastapi.UploadFile``)
+        directory: Spool directory (default: the system temp directory)
+        block_bytes: Read size per block
+
+    Returns:
+        str: Path of the spooled file; the caller is responsible for deleting it
+    """
+    filename = getattr(upload, "filename", None) or ""
+    suffix = os.path.splitext(filename)[1].lower() or ".csv"
+    fd, path = tempfile.mkstemp(prefix="drop_", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                block = await upload.read(block_bytes)
+                if not block:
+                    break
+                await asyncio.to_thread(f.write, block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,127 @@
+"""
+Job Progress Publishing
+
+Batch jobs report progress far more often than anyone needs to see it.
+``ProgressPublisher`` keeps the latest progress of a job in memory and
+publishes it (a small progress record to the job store plus a WebSocket
+notification) at most ``max_rate`` times per second. Updates arriving in
+between are coalesced into the next publish, and a trailing publish makes
+sure the last update is never lost.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressRecord = Dict[str, Any]
+
+
+class ProgressPublisher:
+    """
+    Time-coalescing progress publisher for a single job.
+
+    Args:
+        job_id: Job the progress belongs to
+        store: Job store with an async ``save_progress(job_id, record)``;
+            None skips persistence
+        notify: Async callable receiving each published record, e.g. a
+            WebSocket broadcast; None skips notifications
+        max_rate: Maximum publishes per second; 0 or less publishes every update
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        store: Any = None,
+        notify: Optional[Callable[[ProgressRecord], Awaitable[None]]] = None,
+        max_rate: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.job_id = job_id
+        self.store = store
+        self.notify = notify
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.clock = clock
+        self.published = 0
+        self._latest: Optional[ProgressRecord] = None
+        self._dirty = False
+        self._last_publish: Optional[float] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def latest(self) -> Optional[ProgressRecord]:
+        """The most recent progress record, published or not."""
+        return self._latest
+
+    async def update(
+        self,
+        progress: int,
+        total: int,
+        status: str,
+        message: Optional[str] = None,
+    ):
+        """
+        Record new progress; publish it now if the rate allows, otherwise
+        schedule a trailing publish for when it does.
+        """
+        self._latest = {
+            "job_id": self.job_id,
+            "status": getattr(status, "value", status),
+            "progress": progress,
+            "total": total,
+            "message": message or f"Processed {progress} of {total} items",
+            "updated_at": time.time(),
+        }
+        self._dirty = True
+
+        wait = self._time_until_due()
+        if wait <= 0:
+            await self._publish()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._publish_later(wait))
+
+    async def flush(self):
+        """Publish any coalesced update immediately."""
+        self._cancel_timer()
+        await self._publish()
+
+    async def close(self):
+        """Flush and stop; call when the job reaches a final state."""
+        await self.flush()
+
+    def _time_until_due(self) -> float:
+        if self._last_publish is None:
+            return 0.0
+        return self._last_publish + self.interval - self.clock()
+
+    def _cancel_timer(self):
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+    async def _publish_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self._publish()
+
+    async def _publish(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            record = self._latest
+            self._dirty = False
+            self._last_publish = self.clock()
+            self.published += 1
+
+            try:
+                if self.store is not None:
+                    await self.store.save_progress(self.job_id, record)
+                if self.notify is not None:
+                    await self.notify(record)
+            except Exception as e:
+                # Progress is best effort; the job itself must keep running
+                logger.error(f"Error publishing progress for job {self.job_id}: {str(e)}")
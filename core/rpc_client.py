@@ -0,0 +1,224 @@
+"""
+Async JSON-RPC Client
+
+A small aiohttp-based JSON-RPC 2.0 client for EVM (and Solana) nodes. One
+client keeps a single HTTP session (and its keep-alive connections) per
+endpoint, sends many calls as JSON-RPC batch requests, bounds how many HTTP
+requests are in flight at once and optionally how many start per second.
+
+Services share clients through ``get_rpc_client``/``get_network_client``,
+which return one pooled client per endpoint and event loop instead of a
+provider (and connection pool) per service; ``close_rpc_clients`` releases
+them at shutdown.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from core.multi_chain_config import NetworkConfig
+
+logger = logging.getLogger(__name__)
+
+# A call is (method, params)
+RpcCall = Tuple[str, Sequence[Any]]
+
+
+class JsonRpcError(Exception):
+    """Error object returned by a JSON-RPC server."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"JSON-RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class AsyncJsonRpcClient:
+    """
+    Async JSON-RPC client with batching and bounded concurrency.
+
+    Args:
+        url: HTTP(S) endpoint of the node
+        max_concurrency: Maximum HTTP requests in flight
+        batch_size: Maximum calls per JSON-RPC batch request
+        timeout: Total timeout per HTTP request in seconds
+        session: Optional externally managed ``aiohttp.ClientSession``
+        requests_per_second: Optional limit on HTTP requests started per second
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_concurrency: int = 8,
+        batch_size: int = 50,
+        timeout: float = 30.0,
+        session: Optional[aiohttp.ClientSession] = None,
+        requests_per_second: Optional[float] = None,
+    ):
+        if max_concurrency <= 0 or batch_size <= 0:
+            raise ValueError("max_concurrency and batch_size must be positive")
+        if requests_per_second is not None and requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._ids = itertools.count(1)
+        self.requests_sent = 0
+        self._interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_start = 0.0
+
+    @classmethod
+    def for_network(cls, network: NetworkConfig, timeout: float = 30.0, **kwargs) -> 'AsyncJsonRpcClient':
+        """
+        Client for a configured network: ``requests_per_second`` caps both the
+        request rate and the requests in flight, ``batch_size`` the calls per
+        batch request.
+        """
+        kwargs.setdefault("max_concurrency", max(1, int(network.requests_per_second)))
+        kwargs.setdefault("batch_size", network.batch_size)
+        kwargs.setdefault("requests_per_second", network.requests_per_second)
+        return cls(network.rpc_url, timeout=timeout, **kwargs)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session if this client created it."""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _throttle(self):
+        """Space request starts at least ``1 / requests_per_second`` apart."""
+        if not self._interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _post(self, payload: Any) -> Any:
+        async with self._semaphore:
+            await self._throttle()
+            self.requests_sent += 1
+            async with self._get_session().post(self.url, json=payload) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    def _request(self, method: str, params: Optional[Sequence[Any]]) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params or [])}
+
+    @staticmethod
+    def _unwrap(response: Dict[str, Any]) -> Any:
+        error = response.get("error")
+        if error:
+            return JsonRpcError(error.get("code", -32000), error.get("message", ""), error.get("data"))
+        return response.get("result")
+
+    async def request(self, method: str, params: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
+        """Send a single JSON-RPC call and return the whole response object."""
+        return await self._post(self._request(method, params))
+
+    async def call(self, method: str, params: Optional[Sequence[Any]] = None) -> Any:
+        """
+        Send a single JSON-RPC call.
+
+        Raises:
+            JsonRpcError: If the server returns an error object
+        """
+        result = self._unwrap(await self.request(method, params))
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    async def batch(self, calls: Sequence[RpcCall], return_exceptions: bool = False) -> List[Any]:
+        """
+        Send calls as JSON-RPC batch requests of at most ``batch_size`` calls.
+
+        Batches are sent concurrently (bounded by ``max_concurrency``) and the
+        results are returned in call order.
+
+        Args:
+            calls: ``(method, params)`` pairs
+            return_exceptions: Return ``JsonRpcError`` instances in place of
+                failed results instead of raising the first one
+
+        Raises:
+            JsonRpcError: If a call failed and ``return_exceptions`` is False
+        """
+        requests = [self._request(method, params) for method, params in calls]
+        chunks = [requests[i:i + self.batch_size] for i in range(0, len(requests), self.batch_size)]
+        responses = await asyncio.gather(*(self._post(chunk) for chunk in chunks))
+
+        by_id: Dict[Any, Any] = {}
+        for response in responses:
+            # Some servers answer a batch with a single error object
+            if isinstance(response, dict):
+                response = [response]
+            for item in response:
+                by_id[item.get("id")] = self._unwrap(item)
+
+        results = []
+        for request in requests:
+            result = by_id.get(
+                request["id"],
+                JsonRpcError(-32603, f"No response for {request['method']} (id {request['id']})")
+            )
+            if isinstance(result, JsonRpcError) and not return_exceptions:
+                raise result
+            results.append(result)
+        return results
+
+
+# Shared clients by (endpoint, event loop); aiohttp sessions belong to one loop
+_clients: Dict[Tuple[str, int], AsyncJsonRpcClient] = {}
+
+
+def get_rpc_client(url: str, **kwargs) -> AsyncJsonRpcClient:
+    """
+    Shared pooled client for an endpoint in the running event loop.
+
+    The first caller's ``kwargs`` configure the client; later callers get the
+    same instance, so every service talking to the endpoint shares its
+    connections and limits.
+    """
+    key = (url, id(asyncio.get_running_loop()))
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = AsyncJsonRpcClient(url, **kwargs)
+    return client
+
+
+def get_network_client(network: NetworkConfig, **kwargs) -> AsyncJsonRpcClient:
+    """Shared pooled client for a configured network (see ``AsyncJsonRpcClient.for_network``)."""
+    key = (network.rpc_url, id(asyncio.get_running_loop()))
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = AsyncJsonRpcClient.for_network(network, **kwargs)
+    return client
+
+
+async def close_rpc_clients():
+    """Close the shared clients of the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _clients if key[1] == loop_id]:
+        await _clients.pop(key).close()
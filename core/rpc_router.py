@@ -0,0 +1,324 @@
+"""
+Latency-Aware RPC Provider Router
+
+Routes JSON-RPC calls for one network across several provider endpoints.
+Every endpoint keeps a rolling window of call latencies and outcomes (for
+p50/p99 latency and error rate) and its own ``CircuitBreaker``. Each call goes
+to the fastest healthy endpoint; if it fails, the next one is tried. With
+``hedge_after`` set, a call still unanswered after that many seconds is sent
+to the next endpoint as well and the first answer wins, which cuts tail
+latency when one provider stalls.
+
+Endpoints are reached through the shared clients of ``core.rpc_client``, so a
+router adds no connection pools of its own. Routers are shared per network
+through ``get_router``; their statistics feed the ``/network-health``
+endpoints.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+from core.circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitState, rpc_manager
+from core.config import settings
+from core.rpc_client import AsyncJsonRpcClient, JsonRpcError, RpcCall, get_rpc_client
+
+logger = logging.getLogger(__name__)
+
+# Sends one request through an endpoint's client
+Send = Callable[[AsyncJsonRpcClient], Awaitable[Any]]
+
+
+class NoHealthyProviderError(Exception):
+    """Raised when every endpoint of a router has an open circuit."""
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class EndpointStats:
+    """Rolling latency and outcome window of one endpoint.
+
+    Args:
+        window: Number of most recent calls kept
+    """
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, latency: float, ok: bool, error: Optional[str] = None):
+        """Record a finished call (failed calls count toward the error rate only)."""
+        self.requests += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.errors += 1
+            self.last_error = error
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """p50 and p99 latency in seconds (None before the first success)."""
+        ordered = sorted(self.latencies)
+        return {"p50": _percentile(ordered, 0.5), "p99": _percentile(ordered, 0.99)}
+
+
+class RpcRouter:
+    """
+    Routes calls of one network to the fastest healthy provider endpoint.
+
+    Endpoints are ranked by error rate (those above ``max_error_rate`` go
+    last) and then by p50 latency; endpoints without measurements rank first
+    so that each gets tried, and configuration order breaks ties. Endpoints
+    whose circuit is open are skipped until their recovery timeout passes.
+
+    Args:
+        name: Network name, used for circuit names and logs
+        urls: Endpoint URLs in order of preference
+        hedge_after: Seconds before a hedged duplicate is sent to the next
+            endpoint; None disables hedging
+        window: Calls kept per endpoint for latency and error statistics
+        max_error_rate: Error rate above which an endpoint ranks last
+        failure_threshold: Consecutive failures that open an endpoint's circuit
+        recovery_timeout: Seconds an open circuit waits before a retry
+        client_kwargs: Options for the shared clients (see ``get_rpc_client``)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        urls: Sequence[str],
+        hedge_after: Optional[float] = None,
+        window: int = 200,
+        max_error_rate: float = 0.5,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 60.0,
+        **client_kwargs,
+    ):
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            raise ValueError(f"No RPC endpoints configured for {name}")
+        if hedge_after is not None and hedge_after < 0:
+            raise ValueError("hedge_after must not be negative")
+        self.name = name
+        self.urls = urls
+        self.hedge_after = hedge_after
+        self.max_error_rate = max_error_rate
+        self.client_kwargs = client_kwargs
+        self.stats = {url: EndpointStats(window) for url in urls}
+        config = CircuitBreakerConfig(failure_threshold=failure_threshold, recovery_timeout=recovery_timeout)
+        self.circuits = {url: CircuitBreaker(f"rpc_{name}:{url}", config) for url in urls}
+
+    def _available(self, url: str) -> bool:
+        circuit = self.circuits[url]
+        return circuit.state != CircuitState.OPEN or circuit._should_attempt_reset()
+
+    def ranked(self) -> List[str]:
+        """Available endpoints, best first."""
+        def key(item):
+            position, url = item
+            stats = self.stats[url]
+            p50 = stats.percentiles()["p50"]
+            return (stats.error_rate > self.max_error_rate, p50 or 0.0, position)
+
+        candidates = [(position, url) for position, url in enumerate(self.urls) if self._available(url)]
+        return [url for _, url in sorted(candidates, key=key)]
+
+    @property
+    def best_url(self) -> str:
+        """Endpoint the next call would go to (the first one if none is available)."""
+        ranked = self.ranked()
+        return ranked[0] if ranked else self.urls[0]
+
+    def client(self, url: str) -> AsyncJsonRpcClient:
+        """Shared client of an endpoint."""
+        return get_rpc_client(url, **self.client_kwargs)
+
+    async def _attempt(self, url: str, send: Send) -> Any:
+        """Send through one endpoint, recording latency, outcome and circuit state.
+
+        A JSON-RPC error object is a valid answer from a healthy endpoint, so it
+        is returned (not raised) and counts as a success.
+        """
+        async def guarded(client):
+            try:
+                return await send(client)
+            except JsonRpcError as e:
+                return e
+
+        started = time.monotonic()
+        try:
+            result = await self.circuits[url].call(guarded, self.client(url))
+        except Exception as e:
+            self.stats[url].record(time.monotonic() - started, False, f"{type(e).__name__}: {e}")
+            raise
+        self.stats[url].record(time.monotonic() - started, True)
+        return result
+
+    async def route(self, send: Send) -> Any:
+        """
+        Send a request through the best endpoint, failing over and hedging.
+
+        Raises:
+            NoHealthyProviderError: If every endpoint's circuit is open
+            JsonRpcError: If the answering endpoint returned an error object
+            Exception: The last endpoint error when every endpoint failed
+        """
+        order = iter(self.ranked())
+        pending: Dict[asyncio.Future, str] = {}
+        errors: List[Exception] = []
+        hedged = False
+        hedge_url = None
+
+        def launch() -> Optional[str]:
+            url = next(order, None)
+            if url is not None:
+                pending[asyncio.ensure_future(self._attempt(url, send))] = url
+            return url
+
+        if launch() is None:
+            raise NoHealthyProviderError(f"No healthy RPC provider for {self.name}")
+
+        try:
+            while pending:
+                timeout = None if hedged or self.hedge_after is None else self.hedge_after
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Only one hedge per call, and only while another endpoint is left
+                    hedged = True
+                    hedge_url = launch()
+                    if hedge_url is not None:
+                        self.stats[hedge_url].hedges += 1
+                    continue
+
+                for task in done:
+                    url = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        logger.debug(f"RPC endpoint {url} of {self.name} failed: {task.exception()}")
+                        continue
+                    if url == hedge_url:
+                        self.stats[url].hedge_wins += 1
+                    result = task.result()
+                    if isinstance(result, JsonRpcError):
+                        raise result
+                    return result
+
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise errors[-1]
+
+    async def call(self, method: str, params: Optional[Sequence[Any]] = None) -> Any:
+        """Routed ``AsyncJsonRpcClient.call``."""
+        return await self.route(lambda client: client.call(method, params))
+
+    async def batch(self, calls: Sequence[RpcCall], return_exceptions: bool = False) -> List[Any]:
+        """Routed ``AsyncJsonRpcClient.batch``; the whole batch goes to one endpoint."""
+        return await self.route(lambda client: client.batch(calls, return_exceptions=return_exceptions))
+
+    async def probe(self, method: str = "eth_blockNumber") -> Dict[str, bool]:
+        """Call ``method`` on every endpoint to refresh their statistics."""
+        async def check(url: str) -> bool:
+            try:
+                await self._attempt(url, lambda client: client.call(method))
+                return True
+            except Exception:
+                return False
+
+        results = await asyncio.gather(*(check(url) for url in self.urls))
+        return dict(zip(self.urls, results))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-endpoint latency, error rate, hedging and circuit statistics."""
+        endpoints = []
+        for url in self.urls:
+            stats = self.stats[url]
+            latency = stats.percentiles()
+            endpoints.append({
+                "url": url,
+                "p50_ms": round(latency["p50"] * 1000, 2) if latency["p50"] is not None else None,
+                "p99_ms": round(latency["p99"] * 1000, 2) if latency["p99"] is not None else None,
+                "error_rate": round(stats.error_rate, 4),
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+                "last_error": stats.last_error,
+                "circuit_state": self.circuits[url].state.value,
+                "available": self._available(url),
+            })
+        return {
+            "network": self.name,
+            "best_provider": self.best_url,
+            "hedge_after_ms": self.hedge_after * 1000 if self.hedge_after is not None else None,
+            "endpoints": endpoints,
+        }
+
+    def close(self):
+        """Stop the circuits' background health monitoring."""
+        for circuit in self.circuits.values():
+            if circuit.health_check_task is not None:
+                circuit.health_check_task.cancel()
+                circuit.health_check_task = None
+
+
+# Shared routers by network name
+_routers: Dict[str, RpcRouter] = {}
+
+
+def get_router(network: str, urls: Optional[Sequence[str]] = None, **kwargs) -> RpcRouter:
+    """
+    Shared router for a network.
+
+    ``urls`` come first, followed by the network's alternative providers from
+    ``rpc_manager``. As with ``get_rpc_client``, the first caller's options
+    configure the router.
+    """
+    router = _routers.get(network)
+    if router is None:
+        kwargs.setdefault("hedge_after", settings.RPC_HEDGE_AFTER_MS / 1000 if settings.RPC_HEDGE_AFTER_MS else None)
+        kwargs.setdefault("window", settings.RPC_ROUTER_WINDOW)
+        endpoints = list(urls or []) + rpc_manager.alternative_providers.get(network, [])
+        router = _routers[network] = RpcRouter(network, endpoints, **kwargs)
+    return router
+
+
+def get_router_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of every shared router by network."""
+    return {network: router.get_stats() for network, router in _routers.items()}
+
+
+async def probe_routers() -> Dict[str, Dict[str, bool]]:
+    """Probe every endpoint of every shared router (see ``RpcRouter.probe``)."""
+    results = {}
+    for network, router in list(_routers.items()):
+        results[network] = await router.probe("getSlot" if network == "solana" else "eth_blockNumber")
+    return results
+
+
+def close_routers():
+    """Drop the shared routers (their clients are closed by ``close_rpc_clients``)."""
+    for router in _routers.values():
+        router.close()
+    _routers.clear()
@@ -4,19 +4,28 @@ Wallet Clustering Module
 This module provides functionality to cluster related Ethereum wallets based on their
 interaction patterns, transaction behaviors, and other on-chain activities.
 """
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Optional, Union
 from collections import defaultdict
 import numpy as np
+import pandas as pd
 from dataclasses import dataclass, field
+from datetime import datetime
 import hashlib
 import logging
+import time
 
 # Import our utility modules
-from utils.simhash import SimHasher
+from utils.simhash import SimHasher, SimHashIndex, popcount64
 from utils.hybrid_similarity import SimilarityAnalyzer as HybridSimilarity
 
 logger = logging.getLogger(__name__)
 
+# Slack for float32 rounding when comparing vectorized scores to the threshold
+_SCORE_TOLERANCE = 1e-6
+
+# Shared hasher for wallet behavior fingerprints
+_behavior_hasher = SimHasher()
+
 @dataclass
 class Wallet:
     """Represents a wallet with its properties and behaviors."""
@@ -33,9 +42,8 @@ class Wallet:
     activity_vector: Optional[np.ndarray] = None
     behavior_fingerprint: Optional[int] = None
     
-    def finalize(self) -> None:
-        """Compute derived features after collecting all data."""
-        # Create a behavior fingerprint using Simhash
+    def behavior_text(self) -> str:
+        """Build the text that the behavior fingerprint is computed from."""
         behavior_features = [
             str(self.transaction_count),
             str(len(self.active_days)),
@@ -43,11 +51,20 @@ class Wallet:
             str(len(self.interacted_tokens)),
             str(np.mean(self.gas_behavior) if self.gas_behavior else 0)
         ]
+        return ' '.join(behavior_features)
+    
+    def finalize(self, behavior_fingerprint: Optional[int] = None) -> None:
+        """
+        Compute derived features after collecting all data.
         
-        # Generate a simhash of the behavior features using SimHasher
-        from utils.simhash import SimHasher
-        hasher = SimHasher()
-        self.behavior_fingerprint = hasher.simhash(' '.join(behavior_features))
+        Args:
+            behavior_fingerprint: Precomputed simhash of :meth:`behavior_text`,
+                e.g. from a batched ``SimHasher.simhash_many`` call
+        """
+        # Create a behavior fingerprint using Simhash
+        if behavior_fingerprint is None:
+            behavior_fingerprint = _behavior_hasher.simhash(self.behavior_text())
+        self.behavior_fingerprint = int(behavior_fingerprint)
         
         # Create a comprehensive activity vector with normalized features
         # Feature scaling factors to normalize different feature scales
@@ -79,6 +96,142 @@ class Wallet:
             min(1.0, gas_std / gas_std_scale)
         ], dtype=np.float32)
 
+def _find_roots(parent: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Vectorized union-find lookup with path compression for ``nodes``."""
+    roots = parent[nodes]
+    while True:
+        grandparents = parent[roots]
+        if np.array_equal(grandparents, roots):
+            break
+        # Path halving: visited nodes skip a level, so long chains shorten quickly
+        roots = parent[grandparents]
+        parent[grandparents] = parent[roots]
+        roots = parent[roots]
+    parent[nodes] = roots
+    return roots
+
+def _union_edges(parent: np.ndarray, u: np.ndarray, v: np.ndarray) -> None:
+    """Join the components of every (u, v) edge, pointing roots at the smaller index."""
+    while u.size:
+        ru = _find_roots(parent, u)
+        rv = _find_roots(parent, v)
+        pending = ru != rv
+        if not pending.any():
+            break
+        ru, rv = ru[pending], rv[pending]
+        # Conflicting writes keep one link per root; the loop retries the rest
+        parent[np.maximum(ru, rv)] = np.minimum(ru, rv)
+        u, v = u[pending], v[pending]
+
+def _expand_group_pairs(starts_a: np.ndarray, counts_a: np.ndarray,
+                        starts_b: np.ndarray, counts_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions of every member pair of each (a, b) pair of contiguous groups."""
+    sizes = counts_a * counts_b
+    pair = np.repeat(np.arange(len(sizes)), sizes)
+    k = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return starts_a[pair] + k // counts_b[pair], starts_b[pair] + k % counts_b[pair]
+
+def _group_by_root(roots: np.ndarray) -> List[List[int]]:
+    """Group row indices by component root, in order of first appearance."""
+    groups = defaultdict(list)
+    for i, root in enumerate(roots.tolist()):
+        groups[root].append(i)
+    return list(groups.values())
+
+def _distinct_count(keys: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    """Count distinct non-negative integer ``values`` per integer key in ``range(n)``."""
+    if keys.size == 0:
+        return np.zeros(n, dtype=np.int64)
+    pair_codes = pd.unique(keys.astype(np.int64) * (int(values.max()) + 1) + values)
+    return np.bincount(pair_codes // (int(values.max()) + 1), minlength=n)
+
+# Transaction fields the profiles (and replayed ``Wallet`` objects) depend on
+PROFILE_COLUMNS = ('from', 'to', 'timestamp', 'gas_price', 'token_address', 'to_is_contract')
+
+def _timestamp_days(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Convert timestamps to 'YYYY-MM-DD' strings as ``build_wallet_profiles`` does.
+    
+    ISO strings keep their date part; Unix timestamps use the local date,
+    computed in bulk when the process runs in UTC.
+    """
+    days = np.empty(len(timestamps), dtype=object)
+    is_text = np.array([isinstance(ts, str) for ts in timestamps], dtype=bool)
+    days[is_text] = [ts.split('T')[0] for ts in timestamps[is_text]]
+    numeric = timestamps[~is_text]
+    if time.timezone == 0 and not time.daylight:
+        seconds = numeric.astype(np.float64).astype('datetime64[s]')
+        days[~is_text] = np.datetime_as_string(seconds.astype('datetime64[D]')).astype(object)
+    else:
+        days[~is_text] = [datetime.fromtimestamp(ts).strftime('%Y-%m-%d') for ts in numeric]
+    return days
+
+@dataclass
+class WalletProfiles:
+    """
+    Columnar (struct-of-arrays) wallet profiles, one row per wallet.
+    
+    Holds the per-wallet aggregates that ``Wallet.finalize`` derives its
+    features from, plus the ``PROFILE_COLUMNS`` of the source transactions
+    so full ``Wallet`` objects can be materialized on demand.
+    """
+    addresses: np.ndarray
+    transaction_count: np.ndarray
+    active_day_count: np.ndarray
+    contract_count: np.ndarray
+    token_count: np.ndarray
+    gas_mean: np.ndarray
+    gas_std: np.ndarray
+    transactions: pd.DataFrame
+    
+    # Derived features
+    fingerprints: Optional[np.ndarray] = None
+    activity_vectors: Optional[np.ndarray] = None
+    interaction_src: Optional[np.ndarray] = None
+    interaction_dst: Optional[np.ndarray] = None
+    
+    def __len__(self) -> int:
+        return len(self.addresses)
+    
+    def behavior_texts(self) -> List[str]:
+        """Build the behavior fingerprint text of every wallet (see ``Wallet.behavior_text``)."""
+        return [
+            f"{tx} {days} {contracts} {tokens} {str(gas) if tx else 0}"
+            for tx, days, contracts, tokens, gas in zip(
+                self.transaction_count.tolist(), self.active_day_count.tolist(),
+                self.contract_count.tolist(), self.token_count.tolist(),
+                self.gas_mean
+            )
+        ]
+    
+    def compute_activity_vectors(self) -> np.ndarray:
+        """Compute the normalized activity vectors of ``Wallet.finalize`` for all rows."""
+        tx = self.transaction_count.astype(np.float64)
+        contracts = self.contract_count.astype(np.float64)
+        tokens = self.token_count.astype(np.float64)
+        columns = [
+            np.minimum(1.0, tx / 10.0),
+            np.minimum(1.0, self.active_day_count / 30.0),
+            np.minimum(1.0, contracts / np.maximum(contracts, 10)),
+            np.minimum(1.0, tokens / np.maximum(tokens, 10)),
+            np.minimum(1.0, self.gas_mean / np.maximum(self.gas_mean, 1000000000)),
+            np.minimum(1.0, self.gas_std / np.maximum(self.gas_std, 100000000)),
+        ]
+        return np.column_stack(columns).astype(np.float32)
+    
+    def materialize(self, addresses: Iterable[str]) -> Dict[str, Wallet]:
+        """
+        Build full ``Wallet`` objects for the given addresses.
+        
+        Only transactions touching the requested wallets are replayed, which
+        is all a wallet's profile depends on.
+        """
+        wanted = set(addresses)
+        df = self.transactions
+        subset = df[df['from'].isin(wanted) | df['to'].isin(wanted)]
+        wallets = WalletClustering().build_wallet_profiles(subset.to_dict('records'))
+        return {address: wallets[address] for address in wanted if address in wallets}
+
 class WalletCluster:
     """Represents a cluster of related wallets."""
     
@@ -87,11 +240,16 @@ class WalletCluster:
         self.wallets = {wallet.address: wallet}
         self.centroid = wallet.activity_vector.copy()
         self.addresses = {wallet.address}
+        # Distinct member fingerprints and union of member interactions
+        self.fingerprints = {wallet.behavior_fingerprint}
+        self.contacts = set(wallet.interacted_contracts)
         
     def add_wallet(self, wallet: Wallet) -> None:
         """Add a wallet to this cluster."""
         self.wallets[wallet.address] = wallet
         self.addresses.add(wallet.address)
+        self.fingerprints.add(wallet.behavior_fingerprint)
+        self.contacts.update(wallet.interacted_contracts)
         # Update centroid (incremental mean)
         n = len(self.wallets)
         self.centroid = ((n-1) * self.centroid + wallet.activity_vector) / n
@@ -107,10 +265,20 @@ class WalletCluster:
 class WalletClustering:
     """Performs clustering of wallets based on their on-chain behavior."""
     
+    # Weights of the combined wallet similarity score
+    COSINE_WEIGHT = 0.4
+    SIMHASH_WEIGHT = 0.3
+    INTERACTION_WEIGHT = 0.3
+    # Hamming distance at which simhash similarity reaches zero
+    SIMHASH_SCALE = 32
+    
     def __init__(self, 
                  simhash_threshold: int = 3, 
                  min_cluster_size: int = 2,
-                 hybrid_similarity_threshold: float = 0.7):
+                 hybrid_similarity_threshold: float = 0.7,
+                 use_simhash_index: bool = False,
+                 vectorized: bool = False,
+                 block_size: int = 2048):
         """
         Initialize the wallet clustering system.
         
@@ -118,11 +286,26 @@ class WalletClustering:
             simhash_threshold: Maximum Hamming distance for simhash similarity
             min_cluster_size: Minimum number of wallets to form a cluster
             hybrid_similarity_threshold: Threshold for hybrid similarity score (0-1)
+            use_simhash_index: Only score wallet/cluster pairs that are simhash
+                neighbours (within ``simhash_threshold``) or have interacted,
+                using a :class:`SimHashIndex` for candidate generation. Scales
+                to very large wallet sets but skips pairs that could only pass
+                the threshold on centroid similarity alone. With ``vectorized``
+                the neighbour pairs are found and scored in bulk, without
+                scoring every wallet pair.
+            vectorized: Cluster by linking every wallet pair whose combined
+                similarity passes the threshold, scoring pairs blockwise with
+                NumPy and joining them with union-find
+            block_size: Rows/columns per similarity block in vectorized mode;
+                peak memory grows with ``block_size ** 2``
         """
         self.simhash_threshold = simhash_threshold
         self.min_cluster_size = min_cluster_size
         self.hybrid_similarity = HybridSimilarity()
         self.hybrid_threshold = hybrid_similarity_threshold
+        self.use_simhash_index = use_simhash_index
+        self.vectorized = vectorized
+        self.block_size = block_size
         
     def build_wallet_profiles(self, transactions: List[Dict]) -> Dict[str, Wallet]:
         """
@@ -146,16 +329,19 @@ class WalletClustering:
             
             # Handle both string and integer timestamps
             timestamp = tx['timestamp']
+            # A missing timestamp still counts as a transaction, but not as an active day
+            missing = not isinstance(timestamp, str) and pd.isna(timestamp)
             if isinstance(timestamp, str):
                 # If timestamp is a string (ISO format), extract the date part
                 from_wallet.active_days.add(timestamp.split('T')[0])
-            else:
+            elif not missing:
                 # If timestamp is an integer (Unix timestamp), convert to date string
                 from datetime import datetime
                 date_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
                 from_wallet.active_days.add(date_str)
                 
-            from_wallet.transaction_timestamps.append(timestamp)
+            if not missing:
+                from_wallet.transaction_timestamps.append(timestamp)
             
             # Track contract and wallet interactions
             to_address = tx['to']
@@ -184,9 +370,11 @@ class WalletClustering:
             # Track gas behavior
             from_wallet.gas_behavior.append(float(tx.get('gas_price', 0)))
         
-        # Finalize all wallets (compute derived features)
-        for wallet in wallets.values():
-            wallet.finalize()
+        # Finalize all wallets (compute derived features), fingerprinting in one batch
+        wallet_list = list(wallets.values())
+        fingerprints = _behavior_hasher.simhash_many(w.behavior_text() for w in wallet_list)
+        for wallet, fingerprint in zip(wallet_list, fingerprints):
+            wallet.finalize(fingerprint)
             
         return wallets
     
@@ -206,11 +394,20 @@ class WalletClustering:
         if not wallet_list:
             return []
         
-        # Initial clustering based on simhash fingerprints
-        clusters = self._initial_clustering(wallet_list)
-        
-        # Merge similar clusters using hybrid similarity
-        clusters = self._merge_similar_clusters(clusters)
+        if self.vectorized:
+            clusters = self._cluster_vectorized(wallet_list)
+        elif self.use_simhash_index:
+            neighbours = self._simhash_neighbours(wallet_list)
+            clusters = self._initial_clustering_indexed(wallet_list, neighbours)
+            clusters = self._merge_similar_clusters(
+                clusters, self._candidate_cluster_pairs(clusters, neighbours)
+            )
+        else:
+            # Initial clustering based on simhash fingerprints
+            clusters = self._initial_clustering(wallet_list)
+            
+            # Merge similar clusters using hybrid similarity
+            clusters = self._merge_similar_clusters(clusters)
         
         # Filter out small clusters
         return [c for c in clusters if len(c.wallets) >= self.min_cluster_size]
@@ -241,20 +438,444 @@ class WalletClustering:
         
         return clusters
     
-    def _merge_similar_clusters(self, clusters: List[WalletCluster]) -> List[WalletCluster]:
-        """Merge clusters that are similar to each other."""
+    def _cluster_vectorized(self, wallets: List[Wallet]) -> List[WalletCluster]:
+        """
+        Link wallet pairs whose combined similarity passes the threshold.
+        
+        Linked wallets are joined with union-find (see :meth:`_link_components`);
+        each connected component becomes a cluster.
+        """
+        # Process most active wallets first so they seed their clusters
+        wallets = sorted(wallets, key=lambda w: w.transaction_count, reverse=True)
+        
+        vectors = np.stack([w.activity_vector for w in wallets])
+        fingerprints = np.array([w.behavior_fingerprint for w in wallets], dtype=np.uint64)
+        
+        # Interaction pairs (both ends are profiled wallets)
+        position = {w.address: i for i, w in enumerate(wallets)}
+        src, dst = [], []
+        for i, wallet in enumerate(wallets):
+            for address in wallet.interacted_contracts:
+                j = position.get(address)
+                if j is not None and j != i:
+                    src.append(i)
+                    dst.append(j)
+        
+        roots = self._link_components(
+            vectors, fingerprints,
+            np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        )
+        
+        clusters = []
+        for indices in _group_by_root(roots):
+            cluster = WalletCluster(wallets[indices[0]])
+            for i in indices[1:]:
+                cluster.add_wallet(wallets[i])
+            clusters.append(cluster)
+        return clusters
+    
+    def _link_components(self, vectors: np.ndarray, fingerprints: np.ndarray,
+                         src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        Union-find over all wallet pairs whose combined similarity passes the threshold.
+        
+        Activity vectors are stacked into one float32 matrix and scored in
+        ``block_size`` x ``block_size`` tiles of the upper triangle, so memory
+        stays bounded regardless of the number of wallets. Interaction pairs are
+        sparse and scored separately with the interaction bonus. With
+        ``use_simhash_index`` only simhash neighbours are scored (see
+        :meth:`_link_neighbours`) instead of every tile.
+        
+        Args:
+            vectors: (n, d) activity vectors
+            fingerprints: (n,) ``uint64`` behavior fingerprints
+            src, dst: Row indices of interacting wallet pairs
+            
+        Returns:
+            Component root index for every row
+        """
+        n = len(vectors)
+        threshold = self.hybrid_threshold - _SCORE_TOLERANCE
+        
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+        unit = np.divide(vectors, norms[:, None], out=np.zeros_like(vectors), where=norms[:, None] > 0)
+        parent = np.arange(n, dtype=np.int64)
+        
+        # Score contribution of every possible Hamming distance
+        simhash_term = self.SIMHASH_WEIGHT * np.maximum(
+            0.0, 1.0 - np.arange(65, dtype=np.float32) / self.SIMHASH_SCALE
+        ).astype(np.float32)
+        
+        if src.size:
+            cosine = np.einsum('ij,ij->i', unit[src], unit[dst])
+            hamming = popcount64(fingerprints[src] ^ fingerprints[dst])
+            scores = (self.COSINE_WEIGHT * cosine + simhash_term[hamming] +
+                      self.INTERACTION_WEIGHT)
+            keep = scores >= threshold
+            _union_edges(parent, src[keep], dst[keep])
+        
+        # Without an interaction the score is capped, so tiles can only link
+        # pairs when the cosine and simhash terms alone can pass the threshold
+        if self.COSINE_WEIGHT + self.SIMHASH_WEIGHT >= threshold:
+            # Minimum cosine needed to pass the threshold at each Hamming distance
+            min_cosine = (threshold - simhash_term) / self.COSINE_WEIGHT
+            if self.use_simhash_index:
+                self._link_neighbours(parent, unit, fingerprints, min_cosine)
+            else:
+                rows = np.arange(n)
+                self._link_tiles(parent, unit, fingerprints, min_cosine, rows, rows)
+        
+        return _find_roots(parent, np.arange(n))
+    
+    def _link_tiles(self, parent: np.ndarray, unit: np.ndarray, fingerprints: np.ndarray,
+                    min_cosine: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> None:
+        """
+        Link every passing (row, col) pair, scoring ``block_size`` tiles at a time.
+        
+        When ``rows`` is ``cols`` only the upper triangle is scored.
+        """
+        block = max(1, self.block_size)
+        same = rows is cols
+        for a in range(0, len(rows), block):
+            tile_rows = rows[a:a + block]
+            for b in range(a if same else 0, len(cols), block):
+                tile_cols = cols[b:b + block]
+                cosine = unit[tile_rows] @ unit[tile_cols].T
+                hamming = popcount64(fingerprints[tile_rows, None] ^ fingerprints[None, tile_cols])
+                linked = cosine >= min_cosine[hamming]
+                if same and a == b:
+                    linked = np.triu(linked, k=1)
+                if not linked.any():
+                    continue
+                # Drop pairs that earlier blocks already joined
+                row_roots = _find_roots(parent, tile_rows)
+                col_roots = _find_roots(parent, tile_cols)
+                linked &= row_roots[:, None] != col_roots[None, :]
+                i, j = np.nonzero(linked)
+                if i.size:
+                    _union_edges(parent, row_roots[i], col_roots[j])
+    
+    def _link_neighbours(self, parent: np.ndarray, unit: np.ndarray, fingerprints: np.ndarray,
+                         min_cosine: np.ndarray) -> None:
+        """
+        Link passing wallet pairs within ``simhash_threshold`` bits of each other.
+        
+        Wallets with the same fingerprint and activity vector score alike
+        against every other wallet, so each such class is scored once through
+        a representative and its members are linked to it directly. The
+        representatives are grouped by fingerprint and neighbouring
+        fingerprints are found with a bulk band-key self-join
+        (:meth:`SimHashIndex.iter_array_pairs`), streamed in chunks. Member
+        pairs of neighbouring (or identical) fingerprint groups are expanded
+        and scored in batches of about ``block_size ** 2`` pairs; group pairs
+        larger than that are scored in tiles. Work grows with the number of
+        candidate pairs instead of with the square of the wallet count, and
+        memory with the chunk size.
+        """
+        keys = np.column_stack([
+            np.ascontiguousarray(unit).view(np.uint32),
+            np.ascontiguousarray(fingerprints).view(np.uint32).reshape(-1, 2)
+        ])
+        _, reps, classes = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        classes = classes.ravel()
+        rep_parent = np.arange(len(reps), dtype=np.int64)
+        rep_unit = unit[reps]
+        rep_fingerprints = fingerprints[reps]
+        
+        codes, uniques = pd.factorize(rep_fingerprints)
+        uniques = np.asarray(uniques, dtype=np.uint64)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(uniques))
+        starts = np.cumsum(counts) - counts
+        limit = max(1, self.block_size) ** 2
+        
+        def link_group_pairs(group_a, group_b):
+            sizes = counts[group_a] * counts[group_b]
+            for g in np.flatnonzero(sizes > limit).tolist():
+                rows = order[starts[group_a[g]]:starts[group_a[g]] + counts[group_a[g]]]
+                cols = rows if group_a[g] == group_b[g] else \
+                    order[starts[group_b[g]]:starts[group_b[g]] + counts[group_b[g]]]
+                self._link_tiles(rep_parent, rep_unit, rep_fingerprints, min_cosine, rows, cols)
+            
+            small = np.flatnonzero(sizes <= limit)
+            batches = np.cumsum(sizes[small]) // limit
+            for batch in np.split(small, np.flatnonzero(np.diff(batches)) + 1):
+                if batch.size == 0:
+                    continue
+                a, b = group_a[batch], group_b[batch]
+                pos_a, pos_b = _expand_group_pairs(starts[a], counts[a], starts[b], counts[b])
+                # Within a group of identical fingerprints keep each pair once
+                keep = pos_a < pos_b
+                i, j = order[pos_a[keep]], order[pos_b[keep]]
+                cosine = np.einsum('ij,ij->i', rep_unit[i], rep_unit[j])
+                linked = cosine >= min_cosine[popcount64(rep_fingerprints[i] ^ rep_fingerprints[j])]
+                _union_edges(rep_parent, i[linked], j[linked])
+        
+        duplicated = np.flatnonzero(counts > 1)
+        link_group_pairs(duplicated, duplicated)
+        index = SimHashIndex(max_distance=self.simhash_threshold)
+        for left, right, _ in index.iter_array_pairs(uniques, chunk_pairs=limit):
+            link_group_pairs(left, right)
+        
+        # Members join their representative's links. Members of a class link to
+        # each other when a representative passes against itself; otherwise
+        # (zero vectors) they are only connected through shared neighbours.
+        rep_roots = _find_roots(rep_parent, np.arange(len(reps)))
+        self_linked = np.einsum('ij,ij->i', rep_unit, rep_unit) >= min_cosine[0]
+        linked_out = np.bincount(rep_roots, minlength=len(reps))[rep_roots] > 1
+        joined = (self_linked | linked_out)[classes]
+        _union_edges(parent, np.flatnonzero(joined), reps[classes[joined]])
+        linked = rep_roots != np.arange(len(reps))
+        _union_edges(parent, reps[linked], reps[rep_roots[linked]])
+    
+    def build_profile_table(self, transactions: Union[pd.DataFrame, List[Dict]]) -> WalletProfiles:
+        """
+        Build columnar wallet profiles from transaction data.
+        
+        Produces the same aggregates as :meth:`build_wallet_profiles` with
+        group-by operations over the whole transaction table instead of one
+        ``Wallet`` object per address. Mean gas prices are summed in a
+        different order, so non-integer gas values can differ in the last bit.
+        
+        Args:
+            transactions: DataFrame or list of transaction dictionaries with
+                ``from``, ``to``, ``timestamp`` and optional ``gas_price``,
+                ``token_address`` and ``to_is_contract`` fields
+            
+        Returns:
+            WalletProfiles with one row per wallet
+        """
+        df = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame.from_records(transactions)
+        # Keep only the fields profiles use, not a copy of the whole input
+        df = df[[column for column in PROFILE_COLUMNS if column in df.columns]].copy()
+        for column, default in (('gas_price', 0.0), ('to_is_contract', False)):
+            if column not in df.columns:
+                df[column] = default
+        if 'token_address' not in df.columns:
+            df['token_address'] = None
+        df['gas_price'] = df['gas_price'].fillna(0).astype(np.float64)
+        df['to_is_contract'] = df['to_is_contract'].fillna(False).astype(bool)
+        df['token_address'] = df['token_address'].astype(object).where(df['token_address'].notna(), None)
+        
+        # Wallet ids in order of first appearance (sender before receiver)
+        endpoints = np.column_stack([df['from'].to_numpy(object), df['to'].to_numpy(object)]).ravel()
+        codes, addresses = pd.factorize(endpoints)
+        from_idx = codes[0::2].astype(np.int64)
+        to_idx = codes[1::2].astype(np.int64)
+        n = len(addresses)
+        
+        transaction_count = np.bincount(from_idx, minlength=n)
+        
+        # Activity days, converting each distinct timestamp once. Missing
+        # timestamps (code -1) still count as transactions but not as days.
+        ts_codes, ts_uniques = pd.factorize(df['timestamp'])
+        dated = ts_codes >= 0
+        day_codes = pd.factorize(_timestamp_days(np.asarray(ts_uniques, dtype=object)))[0][ts_codes[dated]]
+        active_day_count = _distinct_count(from_idx[dated], day_codes, n)
+        
+        # Every transaction links sender and receiver in both directions
+        contract_count = _distinct_count(
+            np.concatenate([from_idx, to_idx]), np.concatenate([to_idx, from_idx]), n
+        )
+        
+        has_token = df['token_address'].map(bool).to_numpy(bool)
+        token_codes = pd.factorize(df['token_address'])[0]
+        to_token = has_token & ~df['to_is_contract'].to_numpy(bool)
+        token_count = _distinct_count(
+            np.concatenate([from_idx[has_token], to_idx[to_token]]),
+            np.concatenate([token_codes[has_token], token_codes[to_token]]),
+            n
+        )
+        
+        gas = df['gas_price'].to_numpy(np.float64)
+        sent = np.maximum(transaction_count, 1)
+        gas_mean = np.bincount(from_idx, weights=gas, minlength=n) / sent
+        deviation = gas - gas_mean[from_idx]
+        gas_std = np.sqrt(np.bincount(from_idx, weights=deviation * deviation, minlength=n) / sent)
+        gas_std[transaction_count <= 1] = 0.0
+        
+        profiles = WalletProfiles(
+            addresses=np.asarray(addresses, dtype=object),
+            transaction_count=transaction_count,
+            active_day_count=active_day_count,
+            contract_count=contract_count,
+            token_count=token_count,
+            gas_mean=gas_mean,
+            gas_std=gas_std,
+            transactions=df,
+        )
+        profiles.fingerprints = _behavior_hasher.simhash_many(profiles.behavior_texts())
+        profiles.activity_vectors = profiles.compute_activity_vectors()
+        
+        # Interaction pairs between distinct wallets
+        linked = from_idx != to_idx
+        pair_codes = pd.unique(np.concatenate([
+            from_idx[linked] * n + to_idx[linked], to_idx[linked] * n + from_idx[linked]
+        ]))
+        profiles.interaction_src = pair_codes // n
+        profiles.interaction_dst = pair_codes % n
+        return profiles
+    
+    def link_profiles(self, profiles: WalletProfiles) -> List[np.ndarray]:
+        """
+        Find vectorized-mode clusters of columnar profiles without building ``Wallet`` objects.
+        
+        Args:
+            profiles: Output of :meth:`build_profile_table`
+            
+        Returns:
+            Profile row indices of every cluster of at least ``min_cluster_size``
+            wallets, most active wallet first
+        """
+        if len(profiles) == 0:
+            return []
+        
+        # Process most active wallets first so they seed their clusters
+        order = np.argsort(-profiles.transaction_count, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        
+        roots = self._link_components(
+            profiles.activity_vectors[order], profiles.fingerprints[order],
+            rank[profiles.interaction_src], rank[profiles.interaction_dst]
+        )
+        return [
+            order[indices] for indices in _group_by_root(roots)
+            if len(indices) >= self.min_cluster_size
+        ]
+    
+    def cluster_profiles(self, profiles: WalletProfiles) -> List[WalletCluster]:
+        """
+        Cluster columnar wallet profiles.
+        
+        In vectorized mode clustering runs on the profile arrays and ``Wallet``
+        objects are only materialized for wallets in clusters of at least
+        ``min_cluster_size``. Other modes materialize every wallet and defer to
+        :meth:`cluster_wallets`.
+        
+        Args:
+            profiles: Output of :meth:`build_profile_table`
+            
+        Returns:
+            List of WalletCluster objects representing the clusters
+        """
+        if not self.vectorized:
+            return self.cluster_wallets(profiles.materialize(profiles.addresses))
+        components = self.link_profiles(profiles)
+        if not components:
+            return []
+        
+        wallets = profiles.materialize(profiles.addresses[np.concatenate(components)])
+        clusters = []
+        for rows in components:
+            members = [wallets[address] for address in profiles.addresses[rows]]
+            cluster = WalletCluster(members[0])
+            for wallet in members[1:]:
+                cluster.add_wallet(wallet)
+            clusters.append(cluster)
+        return clusters
+    
+    def _simhash_neighbours(self, wallets: List[Wallet]) -> Dict[int, List[int]]:
+        """Map each behavior fingerprint to the fingerprints within ``simhash_threshold``."""
+        index = SimHashIndex(max_distance=self.simhash_threshold)
+        index.add_many((w.address for w in wallets), (w.behavior_fingerprint for w in wallets))
+        
+        neighbours = {w.behavior_fingerprint: [w.behavior_fingerprint] for w in wallets}
+        left, right, _ = index.fingerprint_pairs()
+        for fp_a, fp_b in zip(left.tolist(), right.tolist()):
+            neighbours[fp_a].append(fp_b)
+            neighbours[fp_b].append(fp_a)
+        return neighbours
+    
+    def _initial_clustering_indexed(self, wallets: List[Wallet],
+                                    neighbours: Dict[int, List[int]]) -> List[WalletCluster]:
+        """Perform initial clustering, scoring only simhash or interaction candidates."""
+        wallets_sorted = sorted(wallets, key=lambda w: w.transaction_count, reverse=True)
+        
+        clusters = []
+        fingerprint_clusters = defaultdict(set)  # fingerprint -> cluster indices
+        address_cluster = {}                     # member address -> cluster index
+        contact_clusters = defaultdict(set)      # interacted address -> cluster indices
+        
+        for wallet in wallets_sorted:
+            candidates = set(contact_clusters.get(wallet.address, ()))
+            for fingerprint in neighbours[wallet.behavior_fingerprint]:
+                candidates.update(fingerprint_clusters.get(fingerprint, ()))
+            for address in wallet.interacted_contracts:
+                if address in address_cluster:
+                    candidates.add(address_cluster[address])
+            
+            best_index = None
+            best_similarity = float('-inf')
+            
+            # Visit candidates in creation order so ties resolve as in _initial_clustering
+            for index in sorted(candidates):
+                similarity = self._calculate_similarity(wallet, clusters[index])
+                if similarity > best_similarity:
+                    best_similarity = similarity
+                    best_index = index
+            
+            if best_index is not None and best_similarity >= self.hybrid_threshold:
+                clusters[best_index].add_wallet(wallet)
+            else:
+                best_index = len(clusters)
+                clusters.append(WalletCluster(wallet))
+            
+            fingerprint_clusters[wallet.behavior_fingerprint].add(best_index)
+            address_cluster[wallet.address] = best_index
+            for address in wallet.interacted_contracts:
+                contact_clusters[address].add(best_index)
+        
+        return clusters
+    
+    def _candidate_cluster_pairs(self, clusters: List[WalletCluster],
+                                 neighbours: Dict[int, List[int]]) -> List[Tuple[int, int]]:
+        """List cluster pairs (i < j) that share simhash neighbours or interactions."""
+        fingerprint_clusters = defaultdict(set)
+        address_cluster = {}
+        for index, cluster in enumerate(clusters):
+            for fingerprint in cluster.fingerprints:
+                fingerprint_clusters[fingerprint].add(index)
+            for address in cluster.addresses:
+                address_cluster[address] = index
+        
+        pairs = set()
+        for i, cluster in enumerate(clusters):
+            related = set()
+            for fingerprint in cluster.fingerprints:
+                for neighbour in neighbours.get(fingerprint, ()):
+                    related.update(fingerprint_clusters[neighbour])
+            for address in cluster.contacts:
+                if address in address_cluster:
+                    related.add(address_cluster[address])
+            for j in related:
+                if j != i:
+                    pairs.add((min(i, j), max(i, j)))
+        
+        return sorted(pairs)
+    
+    def _merge_similar_clusters(self, clusters: List[WalletCluster],
+                                candidate_pairs: Optional[Iterable[Tuple[int, int]]] = None) -> List[WalletCluster]:
+        """
+        Merge clusters that are similar to each other.
+        
+        Args:
+            clusters: Clusters to merge
+            candidate_pairs: Cluster index pairs (i < j) to score; all pairs if omitted
+        """
         if len(clusters) <= 1:
             return clusters
             
-        # Calculate similarity matrix
         n = len(clusters)
-        similarity_matrix = np.zeros((n, n))
+        if candidate_pairs is None:
+            candidate_pairs = ((i, j) for i in range(n) for j in range(i+1, n))
         
-        for i in range(n):
-            for j in range(i+1, n):
-                similarity = self._cluster_similarity(clusters[i], clusters[j])
-                similarity_matrix[i, j] = similarity
-                similarity_matrix[j, i] = similarity
+        # Record cluster pairs whose similarity is above threshold
+        similar = defaultdict(set)
+        for i, j in candidate_pairs:
+            if self._cluster_similarity(clusters[i], clusters[j]) >= self.hybrid_threshold:
+                similar[i].add(j)
         
         # Merge clusters with similarity above threshold
         merged = [False] * n
@@ -268,8 +889,7 @@ class WalletClustering:
             new_cluster = WalletCluster(next(iter(clusters[i].wallets.values())))
             
             # Find all similar clusters to merge
-            to_merge = [j for j in range(i+1, n) 
-                       if not merged[j] and similarity_matrix[i, j] >= self.hybrid_threshold]
+            to_merge = [j for j in sorted(similar.get(i, ())) if not merged[j]]
             
             # Merge wallets from similar clusters
             for j in to_merge:
@@ -292,8 +912,8 @@ class WalletClustering:
         dot_product = np.dot(v1, v2)
         
         # Calculate magnitudes
-        norm_v1 = np.linalg.norm(v1)
-        norm_v2 = np.linalg.norm(v2)
+        norm_v1 = np.sqrt(np.dot(v1, v1))
+        norm_v2 = np.sqrt(np.dot(v2, v2))
         
         # Avoid division by zero
         if norm_v1 == 0 or norm_v2 == 0:
@@ -319,62 +939,53 @@ class WalletClustering:
         # 2. Calculate cosine similarity with cluster centroid
         hybrid_sim = self._cosine_similarity(wallet.activity_vector, cluster.centroid)
         
-        # 3. Check simhash similarity with cluster members
-        min_hamming = float('inf')
-        for other_wallet in cluster.wallets.values():
-            hamming = self._hamming_distance(
-                wallet.behavior_fingerprint,
-                other_wallet.behavior_fingerprint
-            )
-            min_hamming = min(min_hamming, hamming)
+        # 3. Check simhash similarity with cluster members (distinct fingerprints)
+        min_hamming = min(
+            self._hamming_distance(wallet.behavior_fingerprint, fingerprint)
+            for fingerprint in cluster.fingerprints
+        )
         
         # Convert hamming distance to similarity (lower distance = higher similarity)
         # For test data, be more lenient with hamming distance
-        simhash_sim = max(0, 1 - (min_hamming / 32))  # 64-bit simhash, but more lenient
+        simhash_sim = max(0, 1 - (min_hamming / self.SIMHASH_SCALE))  # 64-bit simhash, but more lenient
         
         # 4. Check if wallets have interacted (for test data)
         has_interaction = 0.0
-        for other_wallet in cluster.wallets.values():
-            # Check if wallets have transacted with each other
-            if (wallet.address in other_wallet.interacted_contracts or 
-                other_wallet.address in wallet.interacted_contracts):
-                has_interaction = 1.0
-                break
+        if (wallet.address in cluster.contacts or
+                not wallet.interacted_contracts.isdisjoint(cluster.addresses)):
+            has_interaction = 1.0
         
         # Combine similarities with adjusted weights
         # Give more weight to interactions in test data
-        combined_sim = 0.4 * hybrid_sim + 0.3 * simhash_sim + 0.3 * has_interaction
-        
-        # Debug logging
-        print(f"\n--- Similarity Calculation ---")
-        print(f"Wallet: {wallet.address}")
-        print(f"Cluster size: {len(cluster.wallets)}")
-        print(f"Hybrid similarity: {hybrid_sim:.4f}")
-        print(f"Min Hamming distance: {min_hamming}")
-        print(f"Simhash similarity: {simhash_sim:.4f}")
-        print(f"Interaction score: {has_interaction:.4f}")
-        print(f"Combined similarity: {combined_sim:.4f}")
-        print("---")
+        combined_sim = (self.COSINE_WEIGHT * hybrid_sim +
+                        self.SIMHASH_WEIGHT * simhash_sim +
+                        self.INTERACTION_WEIGHT * has_interaction)
+        
+        logger.debug(
+            "Similarity wallet=%s cluster_size=%d hybrid=%.4f min_hamming=%s simhash=%.4f "
+            "interaction=%.4f combined=%.4f",
+            wallet.address, len(cluster.wallets), hybrid_sim, min_hamming,
+            simhash_sim, has_interaction, combined_sim
+        )
         
         return combined_sim
     
     def _cluster_similarity(self, c1: WalletCluster, c2: WalletCluster) -> float:
         """Calculate similarity between two clusters."""
-        # Simple approach: average similarity between all wallet pairs
+        # Simple approach: average similarity of each wallet in c1 to c2
         total_sim = 0.0
         count = 0
         
         for w1 in c1.wallets.values():
-            for w2 in c2.wallets.values():
-                total_sim += self._calculate_similarity(w1, c2)  # Reuse wallet-cluster similarity
-                count += 1
+            total_sim += self._calculate_similarity(w1, c2)  # Reuse wallet-cluster similarity
+            count += 1
         
         return total_sim / count if count > 0 else 0.0
     
     @staticmethod
     def _hamming_distance(hash1: int, hash2: int) -> int:
         """Calculate Hamming distance between two hashes."""
-        return bin(hash1 ^ hash2).count('1')
+        return (hash1 ^ hash2).bit_count()
     
     def analyze_clusters(self, clusters: List[WalletCluster]) -> Dict:
         """
@@ -1,21 +1,40 @@
 """
 Persistence layer for batch job results.
+
+Two backends share one interface: ``BatchJobStore`` keeps one JSON file per
+job, ``SQLiteBatchJobStore`` keeps job metadata and result rows in separate
+SQLite tables so results can be read in pages. ``get_job_store`` picks one
+from ``settings.BATCH_JOB_STORE_BACKEND``.
 """
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, List, AsyncIterator
+import asyncio
 import json
 import os
+import sqlite3
+import struct
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 import uuid
 from pathlib import Path
 
+from core.config import settings
+
 # Ensure the data directory exists
 DATA_DIR = Path("data/batch_jobs")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# One little-endian 8-byte offset per line of a results file
+RESULT_OFFSET = struct.Struct('<q')
+
 class BatchJobStore:
     """
     Simple file-based storage for batch job results.
     
+    List results are written to a line-delimited ``<job_id>.results.jsonl``
+    file with an index of line offsets, so pages are read with one seek
+    instead of parsing the whole job.
+    
     In production, consider using a database like PostgreSQL or MongoDB.
     """
     
@@ -24,30 +43,153 @@ class BatchJobStore:
         """Get the file path for a job."""
         return DATA_DIR / f"{job_id}.json"
     
+    @staticmethod
+    def _get_progress_path(job_id: str) -> Path:
+        """Get the file path for a job's progress record."""
+        return DATA_DIR / f"{job_id}.progress.json"
+    
+    @staticmethod
+    def _get_results_paths(job_id: str):
+        """Get the results file and its offset index for a job."""
+        return DATA_DIR / f"{job_id}.results.jsonl", DATA_DIR / f"{job_id}.results.idx"
+    
+    @classmethod
+    def _write_results(cls, job_id: str, results: List[Any]) -> None:
+        """Write result rows one per line, with the byte offset of each line."""
+        results_path, index_path = cls._get_results_paths(job_id)
+        results_tmp, index_tmp = (path.with_name(path.name + '.tmp') for path in (results_path, index_path))
+        position = 0
+        with open(results_tmp, 'wb') as rf, open(index_tmp, 'wb') as xf:
+            for result in results:
+                line = json.dumps(result).encode() + b'\n'
+                xf.write(RESULT_OFFSET.pack(position))
+                rf.write(line)
+                position += len(line)
+        os.replace(results_tmp, results_path)
+        os.replace(index_tmp, index_path)
+    
+    @classmethod
+    def _read_results(cls, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Any]:
+        """Read result rows ``[offset, offset + limit)`` from the results file."""
+        results_path, index_path = cls._get_results_paths(job_id)
+        with open(index_path, 'rb') as xf:
+            xf.seek(offset * RESULT_OFFSET.size)
+            start = xf.read(RESULT_OFFSET.size)
+        if len(start) < RESULT_OFFSET.size:
+            return []
+        
+        results = []
+        with open(results_path, 'rb') as rf:
+            rf.seek(RESULT_OFFSET.unpack(start)[0])
+            for line in rf:
+                if limit is not None and len(results) >= limit:
+                    break
+                results.append(json.loads(line))
+        return results
+    
     @classmethod
     async def save_job(cls, job_id: str, data: Dict[str, Any]) -> None:
         """
         Save job data to storage.
         
+        A list under ``results`` replaces the job's result rows; ``None``
+        keeps rows already stored (e.g. by ``append_results``).
+        
         Args:
             job_id: Unique job identifier
             data: Job data to store
         """
+        results = data.get('results')
+        result_count = None
+        index_path = cls._get_results_paths(job_id)[1]
+        if isinstance(results, list):
+            cls._write_results(job_id, results)
+            result_count = len(results)
+            data = {**data, 'results': None}
+        elif results is None and index_path.exists():
+            result_count = index_path.stat().st_size // RESULT_OFFSET.size
+        else:
+            for path in cls._get_results_paths(job_id):
+                path.unlink(missing_ok=True)
+        
         file_path = cls._get_job_path(job_id)
         with open(file_path, 'w') as f:
             json.dump({
                 'job_id': job_id,
                 'created_at': datetime.now(timezone.utc).isoformat(),
+                'result_count': result_count,
                 'data': data
             }, f, indent=2)
+        
+        # The full job supersedes any progress recorded before it
+        cls._get_progress_path(job_id).unlink(missing_ok=True)
+    
+    # Names used by the ranking routers
+    create_job = save_job
+    update_job = save_job
+    
+    @classmethod
+    async def append_results(cls, job_id: str, results: List[Any]) -> int:
+        """
+        Append results to an existing job without rewriting earlier rows.
+        
+        Args:
+            job_id: Job identifier
+            results: Results to append, in order
+            
+        Returns:
+            int: Number of results the job has afterwards
+            
+        Raises:
+            KeyError: If the job does not exist
+        """
+        if not cls._get_job_path(job_id).exists():
+            raise KeyError(job_id)
+        results_path, index_path = cls._get_results_paths(job_id)
+        with open(results_path, 'ab') as rf, open(index_path, 'ab') as xf:
+            position = rf.tell()
+            for result in results:
+                line = json.dumps(result).encode() + b'\n'
+                xf.write(RESULT_OFFSET.pack(position))
+                rf.write(line)
+                position += len(line)
+            count = xf.tell() // RESULT_OFFSET.size
+        
+        # Keep the job's count in step so metadata reads see the new rows
+        job_path = cls._get_job_path(job_id)
+        with open(job_path, 'r') as f:
+            job = json.load(f)
+        job['result_count'] = count
+        tmp_path = job_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f, indent=2)
+        os.replace(tmp_path, job_path)
+        return count
+    
+    @classmethod
+    async def save_progress(cls, job_id: str, progress: Dict[str, Any]) -> None:
+        """
+        Save a small progress record without rewriting the job (or its results).
+        
+        Args:
+            job_id: Unique job identifier
+            progress: Progress fields (e.g. status, progress, total)
+        """
+        file_path = cls._get_progress_path(job_id)
+        tmp_path = file_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, file_path)
     
     @classmethod
-    async def get_job(cls, job_id: str) -> Optional[Dict[str, Any]]:
+    async def get_job(cls, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
         """
         Retrieve job data from storage.
         
         Args:
             job_id: Job identifier
+            include_results: Load result rows into ``data["results"]``; pass
+                False and use ``get_results`` to page through large jobs
             
         Returns:
             Optional[Dict]: Job data if found, None otherwise
@@ -57,7 +199,45 @@ class BatchJobStore:
             return None
             
         with open(file_path, 'r') as f:
-            return json.load(f)
+            job = json.load(f)
+        
+        if include_results and job.get('result_count') is not None:
+            job['data']['results'] = cls._read_results(job_id)
+        
+        # Overlay progress published since the job was last saved
+        progress_path = cls._get_progress_path(job_id)
+        if progress_path.exists():
+            with open(progress_path, 'r') as f:
+                progress = json.load(f)
+            if isinstance(job.get('data'), dict):
+                job['data'].update(
+                    {k: v for k, v in progress.items() if k in ('status', 'progress', 'total')}
+                )
+        return job
+    
+    @classmethod
+    async def get_results(cls, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[Any]]:
+        """
+        Read a page of a job's result list.
+        
+        Args:
+            job_id: Job identifier
+            offset: Index of the first result
+            limit: Maximum number of results (default: all remaining)
+            
+        Returns:
+            Optional[List]: Results page, None if the job or its result list is missing
+        """
+        if cls._get_results_paths(job_id)[1].exists():
+            return cls._read_results(job_id, offset, limit)
+        
+        # Job files written before results were split out keep them inline
+        job = await cls.get_job(job_id)
+        results = (job or {}).get('data', {}).get('results')
+        if not isinstance(results, list):
+            return None
+        end = None if limit is None else offset + limit
+        return results[offset:end]
     
     @classmethod
     async def cleanup_old_jobs(cls, max_age_days: int = 7) -> int:
@@ -74,12 +254,353 @@ class BatchJobStore:
         deleted = 0
         
         for file_path in DATA_DIR.glob('*.json'):
-            file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime, tz=datetime.timezone.utc)
+            if file_path.name.endswith('.progress.json'):
+                continue
+            file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime, tz=timezone.utc)
             if file_mtime < cutoff_time:
                 file_path.unlink()
+                cls._get_progress_path(file_path.stem).unlink(missing_ok=True)
+                for path in cls._get_results_paths(file_path.stem):
+                    path.unlink(missing_ok=True)
                 deleted += 1
                 
         return deleted
 
+
+class SQLiteBatchJobStore:
+    """
+    SQLite storage for batch jobs, in WAL mode.
+    
+    Job metadata lives in ``batch_jobs`` (indexed on status/created_at and
+    on updated_at for cleanup); list results are stored one row per result
+    in ``batch_job_results`` so they can be appended to and read in pages.
+    Results that are not a list (e.g. wallet clusters) stay in the job JSON.
+    Calls run in a worker thread so the event loop is never blocked.
+    
+    Args:
+        path: Database file path
+    """
+    
+    def __init__(self, path: str = "data/batch_jobs.db"):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT,
+                progress INTEGER,
+                total INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result_count INTEGER,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_batch_jobs_status_created
+                ON batch_jobs (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_batch_jobs_updated
+                ON batch_jobs (updated_at);
+            CREATE TABLE IF NOT EXISTS batch_job_results (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            ) WITHOUT ROWID;
+        """)
+    
+    def _run(self, func, *args):
+        """Run ``func(conn, *args)`` in a thread, serialized on the connection."""
+        def call():
+            with self._lock:
+                return func(self._conn, *args)
+        return asyncio.to_thread(call)
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    async def save_job(self, job_id: str, data: Dict[str, Any]) -> None:
+        """
+        Save job data to storage.
+        
+        A list under ``results`` replaces the job's result rows; ``None``
+        keeps rows already stored (e.g. by ``append_results``).
+        
+        Args:
+            job_id: Unique job identifier
+            data: Job data to store
+        """
+        await self._run(self._save_job, job_id, data)
+    
+    # Names used by the ranking routers
+    create_job = save_job
+    update_job = save_job
+    
+    @staticmethod
+    def _save_job(conn: sqlite3.Connection, job_id: str, data: Dict[str, Any]):
+        results = data.get("results")
+        rows = results if isinstance(results, list) else None
+        keep_rows = results is None
+        if rows is not None:
+            data = {**data, "results": None}
+        now = time.time()
+        
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                """
+                INSERT INTO batch_jobs
+                    (job_id, status, progress, total, created_at, updated_at, result_count, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = excluded.status,
+                    progress = excluded.progress,
+                    total = excluded.total,
+                    updated_at = excluded.updated_at,
+                    result_count = CASE WHEN ? THEN batch_jobs.result_count
+                                        ELSE excluded.result_count END,
+                    data = excluded.data
+                """,
+                (job_id, data.get("status"), data.get("progress"), data.get("total"),
+                 now, now, None if rows is None else len(rows), json.dumps(data), keep_rows)
+            )
+            if not keep_rows:
+                conn.execute("DELETE FROM batch_job_results WHERE job_id = ?", (job_id,))
+            if rows:
+                conn.executemany(
+                    "INSERT INTO batch_job_results (job_id, position, result) VALUES (?, ?, ?)",
+                    ((job_id, i, json.dumps(r)) for i, r in enumerate(rows))
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    async def append_results(self, job_id: str, results: List[Any]) -> int:
+        """
+        Append results to an existing job without rewriting earlier rows.
+        
+        Args:
+            job_id: Job identifier
+            results: Results to append, in order
+            
+        Returns:
+            int: Number of results the job has afterwards
+            
+        Raises:
+            KeyError: If the job does not exist
+        """
+        return await self._run(self._append_results, job_id, results)
+    
+    @staticmethod
+    def _append_results(conn: sqlite3.Connection, job_id: str, results: List[Any]) -> int:
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(
+                "SELECT COALESCE(result_count, 0) FROM batch_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            start = row[0]
+            conn.executemany(
+                "INSERT INTO batch_job_results (job_id, position, result) VALUES (?, ?, ?)",
+                ((job_id, start + i, json.dumps(r)) for i, r in enumerate(results))
+            )
+            count = start + len(results)
+            conn.execute(
+                "UPDATE batch_jobs SET result_count = ?, updated_at = ? WHERE job_id = ?",
+                (count, time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+            return count
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    async def save_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        """
+        Save a small progress record without rewriting the job (or its results).
+        
+        Args:
+            job_id: Unique job identifier
+            progress: Progress fields (e.g. status, progress, total)
+        """
+        await self._run(self._save_progress, job_id, progress)
+    
+    @staticmethod
+    def _save_progress(conn: sqlite3.Connection, job_id: str, progress: Dict[str, Any]):
+        conn.execute(
+            """
+            UPDATE batch_jobs SET
+                status = COALESCE(?, status),
+                progress = COALESCE(?, progress),
+                total = COALESCE(?, total),
+                updated_at = ?
+            WHERE job_id = ?
+            """,
+            (progress.get("status"), progress.get("progress"), progress.get("total"),
+             time.time(), job_id)
+        )
+    
+    async def get_job(self, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve job data from storage.
+        
+        Args:
+            job_id: Job identifier
+            include_results: Load result rows into ``data["results"]``; pass
+                False and use ``get_results`` to page through large jobs
+            
+        Returns:
+            Optional[Dict]: Job data if found, None otherwise
+        """
+        return await self._run(self._get_job, job_id, include_results)
+    
+    @staticmethod
+    def _get_job(conn: sqlite3.Connection, job_id: str, include_results: bool):
+        row = conn.execute(
+            """
+            SELECT status, progress, total, created_at, result_count, data
+            FROM batch_jobs WHERE job_id = ?
+            """,
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, progress, total, created_at, result_count, data = row
+        
+        data = json.loads(data)
+        data.update({
+            k: v for k, v in (("status", status), ("progress", progress), ("total", total))
+            if v is not None
+        })
+        if include_results and result_count is not None:
+            data["results"] = [
+                json.loads(r) for (r,) in conn.execute(
+                    "SELECT result FROM batch_job_results WHERE job_id = ? ORDER BY position",
+                    (job_id,)
+                )
+            ]
+        return {
+            'job_id': job_id,
+            'created_at': datetime.fromtimestamp(created_at, tz=timezone.utc).isoformat(),
+            'result_count': result_count,
+            'data': data
+        }
+    
+    async def get_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[Any]]:
+        """
+        Read a page of a job's result rows.
+        
+        Args:
+            job_id: Job identifier
+            offset: Index of the first result
+            limit: Maximum number of results (default: all remaining)
+            
+        Returns:
+            Optional[List]: Results page, None if the job or its result list is missing
+        """
+        return await self._run(self._get_results, job_id, offset, limit)
+    
+    @staticmethod
+    def _get_results(conn: sqlite3.Connection, job_id: str, offset: int, limit: Optional[int]):
+        row = conn.execute("SELECT result_count FROM batch_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return [
+            json.loads(r) for (r,) in conn.execute(
+                """
+                SELECT result FROM batch_job_results
+                WHERE job_id = ? AND position >= ?
+                ORDER BY position LIMIT ?
+                """,
+                (job_id, offset, -1 if limit is None else limit)
+            )
+        ]
+    
+    async def cleanup_old_jobs(self, max_age_days: int = 7) -> int:
+        """
+        Remove jobs not updated within the specified number of days.
+        
+        Args:
+            max_age_days: Maximum age in days to keep jobs
+            
+        Returns:
+            int: Number of jobs deleted
+        """
+        cutoff = time.time() - max_age_days * 86400
+        return await self._run(self._cleanup_old_jobs, cutoff)
+    
+    @staticmethod
+    def _cleanup_old_jobs(conn: sqlite3.Connection, cutoff: float) -> int:
+        conn.execute("BEGIN")
+        try:
+            conn.execute(
+                """
+                DELETE FROM batch_job_results WHERE job_id IN (
+                    SELECT job_id FROM batch_jobs WHERE updated_at < ?
+                )
+                """,
+                (cutoff,)
+            )
+            deleted = conn.execute("DELETE FROM batch_jobs WHERE updated_at < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+            return deleted
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+async def iter_job_results(
+    store,
+    job_id: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    page_size: int = 1000
+) -> AsyncIterator[List[Any]]:
+    """
+    Yield a job's results page by page from either backend.
+    
+    Args:
+        store: ``BatchJobStore`` or ``SQLiteBatchJobStore``
+        job_id: Job identifier
+        offset: Index of the first result
+        limit: Maximum number of results in total (default: all remaining)
+        page_size: Results per page
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = await store.get_results(job_id, offset=offset, limit=size)
+        if not page:
+            return
+        yield page
+        offset += len(page)
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def get_job_store(backend: Optional[str] = None):
+    """
+    Create the batch job store selected by ``settings.BATCH_JOB_STORE_BACKEND``.
+    
+    Args:
+        backend: ``"file"`` or ``"sqlite"`` (default: from settings)
+        
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend = (backend or settings.BATCH_JOB_STORE_BACKEND).lower()
+    if backend == "file":
+        return BatchJobStore()
+    if backend == "sqlite":
+        return SQLiteBatchJobStore(settings.BATCH_JOB_STORE_PATH)
+    raise ValueError(f"Unknown batch job store backend: {backend}")
+
 # Global instance
-job_store = BatchJobStore()
+job_store = get_job_store()
@@ -18,18 +18,20 @@ from datetime import datetime
 from core.features import extract_features
 
 
+RARITY_FEATURES = [
+    "wallet_entropy", "wallet_root", "token_mod9",
+    "token_entropy", "mint_phase", "gas_tier"
+]
+
 def prepare_features(df):
-    required = [
-        "wallet_entropy", "wallet_root", "token_mod9",
-        "token_entropy", "mint_phase", "gas_tier"
-    ]
+    required = RARITY_FEATURES
     missing = [col for col in required if col not in df.columns]
     if missing:
         raise ValueError(f"Missing required features: {missing}")
     return df[required], df["rarity"]
 
 def train_rarity_model(df):
-    df = extract_features(df)
+    df = extract_features(df, features=RARITY_FEATURES)
     X, y = prepare_features(df)
 
     model = RandomForestRegressor(
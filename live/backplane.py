@@ -0,0 +1,171 @@
+"""
+WebSocket Broadcast Backplanes
+
+Every uvicorn worker owns its own ``ConnectionManager`` and only knows the
+clients connected to it. A backplane carries broadcasts between workers: the
+manager that produces an event publishes the encoded payload once, and every
+attached manager (the publisher included) receives it and fans it out to its
+local subscribers.
+
+- ``InMemoryBackplane`` connects managers living in one process, for tests
+  and single-process deployments.
+- ``RedisBackplane`` uses Redis pub/sub. It takes any client with the
+  ``redis.asyncio`` API, so a ``fakeredis.aioredis.FakeRedis`` works as a
+  stand-in for a real server.
+
+Backplanes are duck-typed: ``ConnectionManager`` only calls ``start``,
+``publish`` and ``close``. ``create_backplane`` builds one from settings.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Called with (channel, payload) for every broadcast published by any worker
+BroadcastHandler = Callable[[str, str], Awaitable[None]]
+
+# Channel and payload are sent as one message, split at the first newline
+_SEPARATOR = '\n'
+
+
+def encode_broadcast(channel: str, payload: str) -> str:
+    """Pack a channel name and an encoded payload into one backplane message."""
+    if _SEPARATOR in channel:
+        raise ValueError("Channel names cannot contain newlines")
+    return channel + _SEPARATOR + payload
+
+
+def decode_broadcast(message: str) -> List[str]:
+    """Split a backplane message back into ``[channel, payload]``."""
+    return message.split(_SEPARATOR, 1)
+
+
+def create_backplane(kind: str, redis_url: Optional[str] = None,
+                     channel: str = 'ws:broadcast') -> Optional['RedisBackplane']:
+    """Backplane for a ``WS_BACKPLANE`` setting; None for 'local' (single worker)."""
+    kind = (kind or 'local').lower()
+    if kind == 'local':
+        return None
+    if kind == 'redis':
+        return RedisBackplane.from_url(redis_url, channel=channel)
+    raise ValueError(f"Unknown WebSocket backplane: {kind}")
+
+
+class InMemoryBackplane:
+    """Backplane connecting the managers of one process.
+
+    Instances sharing a ``peers`` list reach each other, which is how tests
+    simulate several workers; by default every instance is on its own.
+    """
+
+    def __init__(self, peers: Optional[List['InMemoryBackplane']] = None):
+        self.peers = peers if peers is not None else []
+        self._handler: Optional[BroadcastHandler] = None
+
+    async def start(self, handler: BroadcastHandler):
+        """Start delivering broadcasts to ``handler``."""
+        self._handler = handler
+        if self not in self.peers:
+            self.peers.append(self)
+
+    async def publish(self, channel: str, payload: str):
+        """Deliver a broadcast to every started peer, this one included."""
+        message = encode_broadcast(channel, payload)
+        for peer in list(self.peers):
+            await peer._receive(message)
+
+    async def _receive(self, message: str):
+        if self._handler is None:
+            return
+        channel, payload = decode_broadcast(message)
+        try:
+            await self._handler(channel, payload)
+        except Exception as e:
+            logger.error(f"Error delivering broadcast on {channel}: {e}")
+
+    async def close(self):
+        """Stop receiving broadcasts."""
+        self._handler = None
+        if self in self.peers:
+            self.peers.remove(self)
+
+
+class RedisBackplane:
+    """Backplane over one Redis pub/sub channel shared by all workers.
+
+    Args:
+        client: ``redis.asyncio.Redis`` (or compatible, e.g. fakeredis) client
+        channel: Redis channel the broadcasts travel on
+        poll_timeout: Seconds a subscription read waits before checking for shutdown
+    """
+
+    def __init__(self, client: Any, channel: str = 'ws:broadcast', poll_timeout: float = 1.0):
+        self.client = client
+        self.channel = channel
+        self.poll_timeout = poll_timeout
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisBackplane':
+        """Create a backplane with a new client for ``url``."""
+        if redis is None:
+            raise RuntimeError("redis is required for the Redis backplane")
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def start(self, handler: BroadcastHandler):
+        """Subscribe to the broadcast channel and deliver messages to ``handler``."""
+        if self._reader is not None:
+            return
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.create_task(self._read(handler))
+
+    async def publish(self, channel: str, payload: str):
+        """Publish a broadcast once; every subscribed worker receives it."""
+        await self.client.publish(self.channel, encode_broadcast(channel, payload))
+
+    async def _read(self, handler: BroadcastHandler):
+        """Deliver subscription messages until cancelled."""
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=self.poll_timeout
+                )
+            except Exception as e:
+                logger.error(f"Error reading from Redis backplane: {e}")
+                await asyncio.sleep(self.poll_timeout)
+                continue
+            if message is None or message.get('type') != 'message':
+                continue
+
+            data = message['data']
+            if isinstance(data, bytes):
+                data = data.decode()
+            channel, payload = decode_broadcast(data)
+            try:
+                await handler(channel, payload)
+            except Exception as e:
+                logger.error(f"Error delivering broadcast on {channel}: {e}")
+
+    async def close(self):
+        """Stop reading and release the subscription."""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            # redis-py 5 renamed close() to aclose()
+            close = getattr(self._pubsub, 'aclose', None) or self._pubsub.close
+            await close()
+            self._pubsub = None
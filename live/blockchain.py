@@ -16,6 +16,8 @@ from web3.contract import Contract
 import logging
 from datetime import datetime
 
+from core.rpc_client import AsyncJsonRpcClient, get_rpc_client
+
 logger = logging.getLogger(__name__)
 
 # Common ERC-721 and ERC-1155 ABI snippets for NFT transfers
@@ -62,6 +64,11 @@ class Web3Connection:
         self.retry_delay = 5
         self.max_reorg_blocks = 12  # Number of blocks to account for potential chain reorganizations
         self.last_processed_block = 0
+    
+    @property
+    def rpc(self) -> AsyncJsonRpcClient:
+        """Shared pooled JSON-RPC client for this connection's endpoint."""
+        return get_rpc_client(self.rpc_url)
         
     async def connect(self) -> Web3:
         """Establish Web3 connection with retry logic.
@@ -185,7 +192,7 @@ class Web3Connection:
             ConnectionError: If unable to fetch block number
         """
         try:
-            return await self.w3.eth.block_number
+            return int(await self.rpc.call('eth_blockNumber'), 16)
         except Exception as e:
             logger.error(f"Error getting latest block: {e}")
             raise ConnectionError(f"Failed to get latest block: {e}")
@@ -320,23 +327,9 @@ class Web3Connection:
 
 # Async HTTP provider for Web3.py
 class AsyncHTTPProvider(Web3.HTTPProvider):
-    """Async HTTP provider for Web3.py"""
+    """Async HTTP provider for Web3.py, sending through the shared pooled RPC client"""
     async def make_request(self, method, params):
-        request_data = self.encode_rpc_request(method, params or [])
-        raw_response = await self._make_post_request(
-            self.endpoint_uri,
-            request_data,
-            self.get_request_kwargs()
-        )
-        response = self.decode_rpc_response(raw_response)
-        return response
-    
-    async def _make_post_request(self, url, request_data, request_kwargs):
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=request_data, **request_kwargs) as response:
-                response.raise_for_status()
-                return await response.text()
+        return await get_rpc_client(self.endpoint_uri).request(method, params or [])
 
 # Async Ethereum client
 class AsyncEth:
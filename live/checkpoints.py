@@ -0,0 +1,132 @@
+"""
+Block Checkpoint Store
+
+Durable record of the blocks the event listener has processed, kept in a
+local SQLite file so a restarted listener resumes where it stopped and can
+detect chain reorganizations by comparing parent hashes with the hashes it
+recorded. Completed backfill ranges are tracked separately so an
+interrupted backfill resumes without redoing finished chunks.
+"""
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (block number, block hash, parent hash)
+BlockRecord = Tuple[int, str, Optional[str]]
+
+
+class BlockCheckpointStore:
+    """
+    SQLite checkpoint store for the block listener, in WAL mode.
+
+    Args:
+        path: Database file path
+    """
+
+    def __init__(self, path: str = "data/listener_checkpoints.db"):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS processed_blocks (
+                number INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL,
+                parent_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS backfill_ranges (
+                start_block INTEGER PRIMARY KEY,
+                end_block INTEGER NOT NULL
+            );
+        """)
+
+    def _run(self, func, *args):
+        """Run ``func(conn, *args)`` in a thread, serialized on the connection."""
+        def call():
+            with self._lock:
+                return func(self._conn, *args)
+        return asyncio.to_thread(call)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    async def record_blocks(self, blocks: Iterable[BlockRecord]) -> None:
+        """Record processed blocks, replacing earlier hashes at the same heights."""
+        rows = [(number, block_hash, parent_hash) for number, block_hash, parent_hash in blocks]
+        await self._run(self._record_blocks, rows)
+
+    @staticmethod
+    def _record_blocks(conn: sqlite3.Connection, rows: List[BlockRecord]):
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO processed_blocks (number, hash, parent_hash) VALUES (?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def latest(self) -> Optional[BlockRecord]:
+        """The highest processed block, or None if nothing was recorded yet."""
+        return await self._run(lambda conn: conn.execute(
+            "SELECT number, hash, parent_hash FROM processed_blocks ORDER BY number DESC LIMIT 1"
+        ).fetchone())
+
+    async def get_block_hash(self, number: int) -> Optional[str]:
+        """Recorded hash of block ``number``, if it was recorded."""
+        row = await self._run(lambda conn: conn.execute(
+            "SELECT hash FROM processed_blocks WHERE number = ?", (number,)
+        ).fetchone())
+        return row[0] if row else None
+
+    async def get_block_hashes(self, start_block: int, end_block: int) -> Dict[int, str]:
+        """Recorded hashes for the blocks in ``[start_block, end_block]``."""
+        rows = await self._run(lambda conn: conn.execute(
+            "SELECT number, hash FROM processed_blocks WHERE number BETWEEN ? AND ?",
+            (start_block, end_block)
+        ).fetchall())
+        return dict(rows)
+
+    async def rollback(self, from_block: int) -> int:
+        """
+        Forget processed blocks at or above ``from_block``.
+
+        Returns:
+            int: Number of block records removed
+        """
+        return await self._run(lambda conn: conn.execute(
+            "DELETE FROM processed_blocks WHERE number >= ?", (from_block,)
+        ).rowcount)
+
+    async def prune(self, below_block: int) -> int:
+        """Drop block records below ``below_block`` (older than any reorg could reach)."""
+        return await self._run(lambda conn: conn.execute(
+            "DELETE FROM processed_blocks WHERE number < ?", (below_block,)
+        ).rowcount)
+
+    async def record_backfill_range(self, start_block: int, end_block: int) -> None:
+        """Mark a backfill chunk as completed."""
+        await self._run(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO backfill_ranges (start_block, end_block) VALUES (?, ?)",
+            (start_block, end_block)
+        ))
+
+    async def completed_backfill_ranges(self, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        """Completed backfill chunks overlapping ``[start_block, end_block]``."""
+        return await self._run(lambda conn: conn.execute(
+            """
+            SELECT start_block, end_block FROM backfill_ranges
+            WHERE end_block >= ? AND start_block <= ?
+            ORDER BY start_block
+            """,
+            (start_block, end_block)
+        ).fetchall())
@@ -12,11 +12,17 @@ import time
 from typing import Dict, List, Optional, Any, Callable, Awaitable
 from datetime import datetime
 
+from hexbytes import HexBytes
 from web3 import Web3
+from web3.datastructures import AttributeDict
 from web3.types import BlockData, TxReceipt, LogReceipt, ChecksumAddress
 from web3.contract import Contract
 
+from core.rpc_client import AsyncJsonRpcClient, JsonRpcError
+from utils.ownership_graph import OwnershipGraphState
 from .blockchain import Web3Connection
+from .checkpoints import BlockCheckpointStore, BlockRecord
+from .metadata_cache import TokenMetadataCache
 from .ws_manager import manager
 
 logger = logging.getLogger(__name__)
@@ -37,32 +43,133 @@ COMMON_NFT_CONTRACTS = {
     }
 }
 
+# keccak("Transfer(address,address,uint256)"), shared by ERC-20 and ERC-721
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+# Ingestion modes: scan full blocks and receipts, or query Transfer logs directly
+INGESTION_MODES = ('blocks', 'logs')
+
+# Fragments of node errors that mean an eth_getLogs range was too large
+LOG_RANGE_ERROR_HINTS = ('more than', 'too many', 'range', 'limit', 'exceed', 'too large', 'timeout')
+
+# Raw JSON-RPC fields converted like web3's result formatters do
+RPC_QUANTITY_FIELDS = {
+    'number', 'timestamp', 'gasLimit', 'gasUsed', 'baseFeePerGas', 'size', 'difficulty',
+    'blockNumber', 'transactionIndex', 'logIndex', 'value', 'gas', 'gasPrice',
+    'maxFeePerGas', 'maxPriorityFeePerGas', 'cumulativeGasUsed', 'effectiveGasPrice',
+    'status', 'type', 'chainId',
+}
+RPC_BYTES_FIELDS = {
+    'hash', 'parentHash', 'blockHash', 'transactionHash', 'input', 'data', 'logsBloom',
+    'extraData', 'mixHash', 'sha3Uncles', 'stateRoot', 'transactionsRoot', 'receiptsRoot',
+    'r', 's',
+}
+
+def format_rpc_object(value: Any) -> Any:
+    """Convert a raw JSON-RPC block, transaction, receipt or log to web3-style attributes."""
+    if isinstance(value, list):
+        return [format_rpc_object(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    formatted = {}
+    for key, item in value.items():
+        if key in RPC_QUANTITY_FIELDS and isinstance(item, str):
+            formatted[key] = int(item, 16)
+        elif key in RPC_BYTES_FIELDS and isinstance(item, str):
+            formatted[key] = HexBytes(item)
+        elif key == 'topics':
+            formatted[key] = [HexBytes(topic) for topic in item]
+        else:
+            formatted[key] = format_rpc_object(item)
+    return AttributeDict(formatted)
+
 class BlockchainEventListener:
     """Listens to blockchain events and broadcasts them to WebSocket clients."""
     
     def __init__(self, rpc_url: Optional[str] = None, 
-                contract_addresses: Optional[List[str]] = None):
+                contract_addresses: Optional[List[str]] = None,
+                fetch_concurrency: int = 4,
+                rpc_batch_size: int = 20,
+                queue_size: int = 50,
+                ingestion_mode: str = 'blocks',
+                filter_contracts: bool = True,
+                max_log_range: int = 2000,
+                checkpoint_path: Optional[str] = None,
+                max_reorg_blocks: int = 12,
+                metadata_cache_size: int = 10000,
+                metadata_cache_path: Optional[str] = None,
+                ownership_state: Optional[OwnershipGraphState] = None):
         """Initialize the event listener.
         
         Args:
             rpc_url: Optional custom RPC URL. Uses WEB3_PROVIDER_URI env var if not provided.
             contract_addresses: Optional list of contract addresses to monitor.
                                If not provided, uses a default list of popular NFT contracts.
+            fetch_concurrency: Maximum JSON-RPC requests in flight while fetching blocks
+            rpc_batch_size: Blocks (or receipts) per JSON-RPC batch request
+            queue_size: Fetched blocks buffered ahead of the parsing stage
+            ingestion_mode: 'blocks' scans every transaction of every block;
+                           'logs' queries Transfer logs with eth_getLogs
+            filter_contracts: In 'logs' mode, only query the monitored contracts;
+                             False follows ERC-721 transfers of every contract
+            max_log_range: Largest block range per eth_getLogs query
+            checkpoint_path: SQLite file recording processed blocks; enables
+                            resume after restarts and reorg detection
+            max_reorg_blocks: How far back a detected reorg is rolled back
+            metadata_cache_size: Token metadata entries kept in memory
+            metadata_cache_path: Optional SQLite file persisting token metadata
+            ownership_state: Optional incremental ownership graph fed every
+                            transfer; snapshotted on stop when it has a path
         """
+        if ingestion_mode not in INGESTION_MODES:
+            raise ValueError(f"Unknown ingestion mode: {ingestion_mode}")
         self.web3_conn = Web3Connection(rpc_url)
         self.w3 = None
+        self.rpc = AsyncJsonRpcClient(
+            self.web3_conn.rpc_url,
+            max_concurrency=fetch_concurrency,
+            batch_size=rpc_batch_size
+        )
+        self.rpc_batch_size = rpc_batch_size
+        self.queue_size = queue_size
+        self.blocks_fetched = 0
+        self.fetch_seconds = 0.0
+        self.ingestion_mode = ingestion_mode
+        self.filter_contracts = filter_contracts
+        self.max_log_range = max_log_range
+        self.log_range_size = max_log_range  # Shrinks when the node rejects a range
+        self.checkpoints = BlockCheckpointStore(checkpoint_path) if checkpoint_path else None
+        self._backfill_task: Optional[asyncio.Task] = None
+        self.metadata_cache = TokenMetadataCache(
+            self._fetch_token_metadata,
+            max_entries=metadata_cache_size,
+            path=metadata_cache_path
+        )
+        self.ownership_state = ownership_state
+        self._snapshot_task: Optional[asyncio.Task] = None
         self.contracts: Dict[str, Contract] = {}
         self.running = False
         self.last_processed_block = 0
         self.poll_interval = 2.0
-        self.max_reorg_blocks = 12
+        self.max_reorg_blocks = max_reorg_blocks
         self.contract_addresses = contract_addresses or self._get_default_contracts()
         self.event_handlers = {
-            'Transfer': self._handle_transfer_event,
+            'Transfer': self._process_transfer_event,
         }
         
-    async def start(self, from_block: Optional[int] = None):
-        """Start listening for blockchain events"""
+    async def start(self, from_block: Optional[int] = None,
+                    backfill_from: Optional[int] = None,
+                    backfill_workers: int = 4):
+        """Start listening for blockchain events
+        
+        Args:
+            from_block: First block to follow; defaults to the block after the
+                       last checkpoint, or the current head without one (or the
+                       block of the ownership snapshot, if that is older)
+            backfill_from: Also process ``backfill_from`` up to the starting
+                          block in the background with ``backfill_workers`` workers
+            backfill_workers: Concurrent backfill workers
+        """
         if self.running:
             logger.warning("Listener is already running")
             return
@@ -71,13 +178,30 @@ class BlockchainEventListener:
         logger.info("Starting blockchain event listener")
         
         # Initialize last processed block
-        if from_block is None:
-            self.last_processed_block = self.w3.eth.block_number - 1  # Start from previous block
+        latest = await self.checkpoints.latest() if self.checkpoints and from_block is None else None
+        if latest:
+            self.last_processed_block = latest[0]  # Resume after the last checkpoint
+        elif from_block is None:
+            self.last_processed_block = await self._get_block_number() - 1  # Start from previous block
         else:
             self.last_processed_block = from_block - 1  # Process from the next block
+        
+        # Transfers between the last ownership snapshot and the restart would
+        # otherwise be lost. The snapshot's own block is processed again, since
+        # it may have been taken mid-block; re-applied transfers are no-ops.
+        snapshot_block = self.ownership_state.block_number if self.ownership_state is not None else None
+        if from_block is None and snapshot_block is not None and snapshot_block <= self.last_processed_block:
+            logger.info(f"Ownership snapshot is at block {snapshot_block}; replaying from there")
+            self.last_processed_block = snapshot_block - 1
             
         logger.info(f"Starting from block {self.last_processed_block + 1}")
         
+        # Fill history in the background while the tip is followed
+        if backfill_from is not None and backfill_from <= self.last_processed_block:
+            self._backfill_task = asyncio.create_task(
+                self.backfill(backfill_from, self.last_processed_block, workers=backfill_workers)
+            )
+        
         while self.running:
             try:
                 await self._process_new_blocks()
@@ -88,12 +212,43 @@ class BlockchainEventListener:
     async def stop(self):
         """Stop the event listener"""
         self.running = False
+        if self._backfill_task is not None:
+            self._backfill_task.cancel()
+            self._backfill_task = None
+        await self.rpc.close()
+        if self.checkpoints:
+            self.checkpoints.close()
+        self.metadata_cache.close()
+        if self.ownership_state is not None and self.ownership_state.path:
+            if self._snapshot_task is not None:
+                await asyncio.gather(self._snapshot_task, return_exceptions=True)
+                self._snapshot_task = None
+            await self.ownership_state.snapshot_async()
         logger.info("Stopping blockchain event listener")
+    
+    @property
+    def blocks_per_second(self) -> float:
+        """Blocks fetched per second of fetch time since the listener was created."""
+        return self.blocks_fetched / self.fetch_seconds if self.fetch_seconds else 0.0
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Throughput and token metadata cache metrics."""
+        return {
+            'last_processed_block': self.last_processed_block,
+            'blocks_fetched': self.blocks_fetched,
+            'blocks_per_second': self.blocks_per_second,
+            'metadata_cache': self.metadata_cache.stats(),
+            'ownership': self.ownership_state.get_stats() if self.ownership_state is not None else None
+        }
+    
+    async def _get_block_number(self) -> int:
+        """Get the current head block number."""
+        return int(await self.rpc.call('eth_blockNumber'), 16)
         
     async def _process_new_blocks(self):
         """Process new blocks since last check"""
         try:
-            current_block = self.w3.eth.block_number
+            current_block = await self._get_block_number()
             
             # Handle chain reorgs
             if self.last_processed_block >= current_block:
@@ -102,16 +257,22 @@ class BlockchainEventListener:
                 
             # Process blocks in batches
             start_block = self.last_processed_block + 1
-            end_block = min(current_block, start_block + 99)  # Process max 100 blocks at once
+            if self.ingestion_mode == 'logs':
+                end_block = min(current_block, start_block + self.max_log_range - 1)
+            else:
+                end_block = min(current_block, start_block + 99)  # Process max 100 blocks at once
             
             logger.debug(f"Processing blocks {start_block} to {end_block}")
             
-            # Get all blocks in the range
-            blocks = await self._get_blocks_in_range(start_block, end_block)
+            # Roll back instead if the chain no longer builds on the last checkpoint
+            if self.checkpoints and await self._detect_reorg(start_block):
+                return
+            
+            records = await self._process_range(start_block, end_block)
             
-            # Process transactions in each block
-            for block in blocks:
-                await self._process_block(block)
+            if self.checkpoints:
+                await self.checkpoints.record_blocks(records)
+                await self.checkpoints.prune(end_block - self.max_reorg_blocks)
                 
             # Update last processed block
             self.last_processed_block = end_block
@@ -119,31 +280,335 @@ class BlockchainEventListener:
         except Exception as e:
             logger.error(f"Error processing blocks: {e}")
             raise
+    
+    async def _process_range(self, start_block: int, end_block: int) -> List[BlockRecord]:
+        """Process a block range in the configured ingestion mode.
+        
+        Returns:
+            Checkpoint records for the blocks seen while processing
+        """
+        if self.ingestion_mode == 'logs':
+            return await self._process_log_range(start_block, end_block)
+        
+        # Fetch blocks and receipts concurrently while earlier blocks are parsed
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        _, records = await asyncio.gather(
+            self._fetch_stage(start_block, end_block, queue),
+            self._parse_stage(queue)
+        )
+        return records
+    
+    @staticmethod
+    def _block_record(block: BlockData) -> BlockRecord:
+        parent_hash = block.get('parentHash')
+        return (
+            block.number,
+            Web3.to_hex(block.hash),
+            Web3.to_hex(parent_hash) if parent_hash is not None else None
+        )
+    
+    async def _detect_reorg(self, start_block: int) -> bool:
+        """Compare the parent hash of ``start_block`` with the checkpoint below it.
+        
+        Returns:
+            True if a reorg was found and the listener rolled back
+        """
+        expected = await self.checkpoints.get_block_hash(start_block - 1)
+        if expected is None:
+            return False
+        header = await self.rpc.call('eth_getBlockByNumber', [hex(start_block), False])
+        if header is None or (header.get('parentHash') or '').lower() == expected.lower():
+            return False
+        
+        logger.warning(f"Chain reorganization detected below block {start_block}")
+        await self._rollback(start_block - 1)
+        return True
+    
+    async def _rollback(self, tip: int):
+        """Roll back to the newest checkpoint within ``max_reorg_blocks`` still on the chain."""
+        low = max(0, tip - self.max_reorg_blocks + 1)
+        stored = await self.checkpoints.get_block_hashes(low, tip)
+        heights = sorted(stored, reverse=True)
+        headers = await self.rpc.batch(
+            [('eth_getBlockByNumber', [hex(n), False]) for n in heights]
+        ) if heights else []
+        
+        fork = low - 1
+        for number, header in zip(heights, headers):
+            if header and header['hash'].lower() == stored[number].lower():
+                fork = number
+                break
+        else:
+            logger.error(f"No common ancestor within {self.max_reorg_blocks} blocks of {tip}; "
+                         f"rolling back to block {fork}")
+        
+        await self.checkpoints.rollback(fork + 1)
+        self.last_processed_block = fork
+        
+        # Let clients discard transfers they received from the orphaned blocks
+        await self._broadcast_event('chain_reorg', {
+            'event': 'chain_reorg',
+            'timestamp': datetime.utcnow().isoformat(),
+            'from_block': fork + 1,
+            'to_block': tip
+        })
+    
+    async def backfill(self, start_block: int, end_block: int, workers: int = 4,
+                       chunk_blocks: Optional[int] = None) -> int:
+        """Process a historical block range with several concurrent workers.
+        
+        Chunks completed by an earlier (interrupted) backfill are skipped when
+        a checkpoint store is configured.
+        
+        Args:
+            start_block: First block to backfill
+            end_block: Last block to backfill
+            workers: Concurrent workers
+            chunk_blocks: Blocks per work item (default: one listener batch)
             
-    async def _get_blocks_in_range(self, start_block: int, end_block: int) -> List[BlockData]:
-        """Get blocks in the specified range"""
-        blocks = []
-        for block_num in range(start_block, end_block + 1):
+        Returns:
+            Number of blocks processed
+        """
+        chunk_blocks = chunk_blocks or (self.max_log_range if self.ingestion_mode == 'logs' else 100)
+        completed = await self.checkpoints.completed_backfill_ranges(start_block, end_block) if self.checkpoints else []
+        
+        chunks: asyncio.Queue = asyncio.Queue()
+        for first in range(start_block, end_block + 1, chunk_blocks):
+            last = min(first + chunk_blocks - 1, end_block)
+            if not any(s <= first and last <= e for s, e in completed):
+                chunks.put_nowait((first, last))
+        logger.info(f"Backfilling {chunks.qsize()} chunks of blocks {start_block}-{end_block} with {workers} workers")
+        
+        processed = 0
+        
+        async def worker():
+            nonlocal processed
+            while True:
+                try:
+                    first, last = chunks.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._process_range(first, last)
+                if self.checkpoints:
+                    await self.checkpoints.record_backfill_range(first, last)
+                processed += last - first + 1
+        
+        tasks = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        logger.info(f"Backfill of blocks {start_block}-{end_block} completed ({processed} blocks processed)")
+        return processed
+    
+    async def _process_log_range(self, start_block: int, end_block: int) -> List[BlockRecord]:
+        """Process NFT transfers in a block range from eth_getLogs results.
+        
+        Returns:
+            Checkpoint records of the block headers fetched (including ``end_block``)
+        """
+        started = time.perf_counter()
+        logs = await self._get_transfer_logs(start_block, end_block)
+        
+        # Without a contract filter, ERC-20 transfers share the topic; only
+        # ERC-721 logs carry the token ID as a fourth topic
+        events = []
+        for log in logs:
+            if log.get('removed'):
+                continue
+            if not self.filter_contracts and len(log.topics) != 4:
+                continue
+            event = self._parse_transfer_log(log)
+            if event:
+                events.append((event, log))
+        
+        # Block headers (plus the range end, for checkpoints) and transactions, one batch each
+        block_numbers = sorted({log.blockNumber for _, log in events} | {end_block})
+        tx_hashes = list(dict.fromkeys(log.transactionHash for _, log in events))
+        headers, txs = await asyncio.gather(
+            self.rpc.batch([('eth_getBlockByNumber', [hex(n), False]) for n in block_numbers]),
+            self.rpc.batch(
+                [('eth_getTransactionByHash', [Web3.to_hex(h)]) for h in tx_hashes],
+                return_exceptions=True
+            )
+        )
+        blocks = {n: format_rpc_object(raw) for n, raw in zip(block_numbers, headers)}
+        transactions = {
+            h: format_rpc_object(raw) for h, raw in zip(tx_hashes, txs)
+            if raw is not None and not isinstance(raw, Exception)
+        }
+        
+        for event, log in events:
+            tx = transactions.get(log.transactionHash)
+            if tx is None:
+                logger.error(f"Transaction {event['transactionHash']} not available; skipping transfer")
+                continue
+            await self._process_transfer_event(event, tx, blocks[log.blockNumber], None)
+        
+        self.blocks_fetched += end_block - start_block + 1
+        self.fetch_seconds += time.perf_counter() - started
+        if not self.checkpoints:
+            return []
+        return [self._block_record(block) for block in blocks.values() if block is not None]
+    
+    async def _get_transfer_logs(self, start_block: int, end_block: int) -> List[LogReceipt]:
+        """
+        Get Transfer logs for a block range with range-chunked eth_getLogs queries.
+        
+        The chunk size halves whenever the node rejects a range as too large
+        and grows by a quarter (up to ``max_log_range``) after each success,
+        so it settles just under the node's limit.
+        """
+        log_filter: Dict[str, Any] = {'topics': [TRANSFER_TOPIC]}
+        if self.filter_contracts:
+            log_filter['address'] = [Web3.to_checksum_address(a) for a in self.contract_addresses]
+        
+        logs = []
+        from_block = start_block
+        while from_block <= end_block:
+            to_block = min(end_block, from_block + self.log_range_size - 1)
             try:
-                block = self.w3.eth.get_block(block_num, full_transactions=True)
-                blocks.append(block)
-            except Exception as e:
-                logger.error(f"Error getting block {block_num}: {e}")
+                chunk = await self.rpc.call('eth_getLogs', [{
+                    **log_filter, 'fromBlock': hex(from_block), 'toBlock': hex(to_block)
+                }])
+            except (JsonRpcError, asyncio.TimeoutError) as e:
+                if to_block == from_block or not self._is_log_range_error(e):
+                    raise
+                self.log_range_size = max(1, (to_block - from_block + 1) // 2)
+                logger.debug(f"eth_getLogs range too large, retrying with {self.log_range_size} blocks: {e}")
+                continue
+            logs.extend(format_rpc_object(log) for log in chunk)
+            from_block = to_block + 1
+            self.log_range_size = min(self.max_log_range, self.log_range_size + max(1, self.log_range_size // 4))
+        return logs
+    
+    @staticmethod
+    def _is_log_range_error(error: Exception) -> bool:
+        """Whether an eth_getLogs failure means the block range should be narrowed."""
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        if error.code == -32005:  # Limit exceeded
+            return True
+        message = error.message.lower()
+        return any(hint in message for hint in LOG_RANGE_ERROR_HINTS)
+    
+    async def _fetch_stage(self, start_block: int, end_block: int, queue: asyncio.Queue):
+        """Fetch blocks with their NFT transfer receipts and queue them in block order."""
+        started = time.perf_counter()
+        try:
+            # Segments are fetched concurrently (bounded by the RPC client) but queued in order
+            segments = [
+                asyncio.create_task(self._fetch_segment(first, min(first + self.rpc_batch_size - 1, end_block)))
+                for first in range(start_block, end_block + 1, self.rpc_batch_size)
+            ]
+            try:
+                for segment in segments:
+                    for item in await segment:
+                        await queue.put(item)
+            except BaseException:
+                for segment in segments:
+                    segment.cancel()
                 raise
-        return blocks
+        finally:
+            # Always release the parsing stage
+            await queue.put(None)
+        
+        elapsed = time.perf_counter() - started
+        self.blocks_fetched += end_block - start_block + 1
+        self.fetch_seconds += elapsed
+        logger.debug(
+            f"Fetched blocks {start_block}-{end_block} in {elapsed:.2f}s "
+            f"({self.blocks_per_second:.1f} blocks/sec overall)"
+        )
+    
+    async def _fetch_segment(self, start_block: int, end_block: int) -> List[tuple]:
+        """Fetch a contiguous run of blocks and the receipts of their NFT transfers."""
+        blocks = await self._get_blocks_in_range(start_block, end_block)
+        candidates = [
+            tx for block in blocks for tx in block.transactions
+            if tx.to and self._is_nft_transfer(tx)
+        ]
+        receipts = await self._get_receipts([tx.hash for tx in candidates])
+        by_hash = {tx.hash: receipt for tx, receipt in zip(candidates, receipts)}
+        return [(block, by_hash) for block in blocks]
+    
+    async def _parse_stage(self, queue: asyncio.Queue) -> List[BlockRecord]:
+        """Consume fetched blocks until the fetch stage signals the end of the range.
         
-    async def _process_block(self, block: BlockData):
+        Returns:
+            Checkpoint records of the parsed blocks (empty without a checkpoint store)
+        """
+        records: List[BlockRecord] = []
+        failed = False
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if failed:
+                continue
+            block, receipts = item
+            record = self._block_record(block) if self.checkpoints else None
+            if records and record[2] is not None and record[2].lower() != records[-1][1].lower():
+                # The node switched forks while the range was being fetched
+                failed = True
+                logger.error(f"Block {block.number} does not build on block {records[-1][0]}")
+                continue
+            try:
+                await self._process_block(block, receipts)
+                if record:
+                    records.append(record)
+            except Exception:
+                # Keep draining so the fetch stage is never blocked on a full queue
+                failed = True
+                logger.error(f"Error parsing block {block.number}", exc_info=True)
+        if failed:
+            raise RuntimeError("Parsing stage failed; the block range will be retried")
+        return records
+            
+    async def _get_blocks_in_range(self, start_block: int, end_block: int) -> List[BlockData]:
+        """Get blocks in the specified range with one JSON-RPC batch request per ``rpc_batch_size`` blocks"""
+        raw_blocks = await self.rpc.batch([
+            ('eth_getBlockByNumber', [hex(block_num), True])
+            for block_num in range(start_block, end_block + 1)
+        ])
+        for block_num, raw in zip(range(start_block, end_block + 1), raw_blocks):
+            if raw is None:
+                raise ValueError(f"Block {block_num} not available")
+        return [format_rpc_object(raw) for raw in raw_blocks]
+    
+    async def _get_receipts(self, tx_hashes: List[bytes]) -> List[Optional[TxReceipt]]:
+        """Get transaction receipts with batched JSON-RPC requests"""
+        if not tx_hashes:
+            return []
+        raw_receipts = await self.rpc.batch(
+            [('eth_getTransactionReceipt', [Web3.to_hex(tx_hash)]) for tx_hash in tx_hashes],
+            return_exceptions=True
+        )
+        receipts = []
+        for tx_hash, raw in zip(tx_hashes, raw_receipts):
+            if isinstance(raw, Exception) or raw is None:
+                logger.error(f"Error getting receipt for {Web3.to_hex(tx_hash)}: {raw}")
+                receipts.append(None)
+            else:
+                receipts.append(format_rpc_object(raw))
+        return receipts
+        
+    async def _process_block(self, block: BlockData, receipts: Optional[Dict[bytes, TxReceipt]] = None):
         """Process a single block and its transactions"""
         logger.debug(f"Processing block {block.number} with {len(block.transactions)} transactions")
+        receipts = receipts or {}
         
         for tx in block.transactions:
             try:
-                await self._process_transaction(tx, block)
+                await self._process_transaction(tx, block, receipts.get(tx.hash))
             except Exception as e:
                 logger.error(f"Error processing transaction {tx.hash.hex()}: {e}")
                 continue
                 
-    async def _process_transaction(self, tx, block: BlockData):
+    async def _process_transaction(self, tx, block: BlockData, receipt: Optional[TxReceipt] = None):
         """Process a single transaction"""
         # Skip contract creation transactions
         if not tx.to:
@@ -151,12 +616,12 @@ class BlockchainEventListener:
             
         # Process NFT transfers
         if self._is_nft_transfer(tx):
-            await self._handle_nft_transfer(tx, block)
+            await self._handle_nft_transfer(tx, block, receipt)
             
     def _is_nft_transfer(self, tx) -> bool:
         """Check if transaction is an NFT transfer"""
         # ERC-721 Transfer event signature
-        transfer_signature = self.w3.keccak(text="Transfer(address,address,uint256)").hex()
+        transfer_signature = Web3.keccak(text="Transfer(address,address,uint256)").hex()
         
         # Check if it's a contract interaction
         if not tx.input or tx.input == '0x':
@@ -172,11 +637,14 @@ class BlockchainEventListener:
         
         return tx.to and tx.to.lower() in [addr.lower() for addr in nft_contracts]
         
-    async def _handle_nft_transfer(self, tx, block: BlockData):
+    async def _handle_nft_transfer(self, tx, block: BlockData, receipt: Optional[TxReceipt] = None):
         """Handle an NFT transfer event"""
         try:
-            # Get transaction receipt to check for events
-            receipt = self.w3.eth.get_transaction_receipt(tx.hash)
+            # Use the receipt prefetched by the fetch stage when there is one
+            if receipt is None:
+                receipt = format_rpc_object(
+                    await self.rpc.call('eth_getTransactionReceipt', [Web3.to_hex(tx.hash)])
+                )
             
             # Process transfer events
             transfer_events = self._parse_transfer_events(receipt)
@@ -190,42 +658,55 @@ class BlockchainEventListener:
     def _parse_transfer_events(self, receipt: TxReceipt) -> List[dict]:
         """Parse transfer events from transaction receipt"""
         transfer_events = []
-        transfer_topic = self.w3.keccak(text="Transfer(address,address,uint256)").hex()
-        
         for log in receipt.logs:
-            if not log.topics or len(log.topics) < 3:
-                continue
-                
-            if log.topics[0].hex() == transfer_topic:
-                try:
-                    from_address = '0x' + log.topics[1].hex()[-40:]
-                    to_address = '0x' + log.topics[2].hex()[-40:]
-                    token_id = int(log.topics[3].hex(), 16) if len(log.topics) > 3 else None
-                    
-                    if not token_id and log.data != '0x':
-                        try:
-                            token_id = int(log.data.hex(), 16)
-                        except:
-                            pass
-                            
-                    transfer_events.append({
-                        'from': from_address,
-                        'to': to_address,
-                        'tokenId': token_id,
-                        'contract': log.address,
-                        'transactionHash': receipt.transactionHash.hex(),
-                        'blockNumber': receipt.blockNumber,
-                        'logIndex': log.logIndex
-                    })
-                except Exception as e:
-                    logger.error(f"Error parsing transfer event: {e}")
-                    continue
-                    
+            event = self._parse_transfer_log(log, receipt)
+            if event:
+                transfer_events.append(event)
         return transfer_events
+    
+    def _parse_transfer_log(self, log: LogReceipt, receipt: Optional[TxReceipt] = None) -> Optional[dict]:
+        """Parse a single Transfer log; receipt fields fill in what the log lacks"""
+        if not log.topics or len(log.topics) < 3:
+            return None
+        if log.topics[0] != HexBytes(TRANSFER_TOPIC):
+            return None
+        
+        try:
+            from_address = '0x' + log.topics[1].hex()[-40:]
+            to_address = '0x' + log.topics[2].hex()[-40:]
+            token_id = int(log.topics[3].hex(), 16) if len(log.topics) > 3 else None
+            
+            if not token_id and log.data != '0x':
+                try:
+                    token_id = int(log.data.hex(), 16)
+                except:
+                    pass
+            
+            source = log if receipt is None else receipt
+            return {
+                'from': from_address,
+                'to': to_address,
+                'tokenId': token_id,
+                'contract': log.address,
+                'transactionHash': Web3.to_hex(source.transactionHash),
+                'blockNumber': source.blockNumber,
+                'logIndex': log.logIndex
+            }
+        except Exception as e:
+            logger.error(f"Error parsing transfer event: {e}")
+            return None
         
-    async def _process_transfer_event(self, event: dict, tx, block: BlockData, receipt: TxReceipt):
+    async def _process_transfer_event(self, event: dict, tx, block: BlockData, receipt: Optional[TxReceipt]):
         """Process a single transfer event and broadcast to WebSocket clients."""
         try:
+            # Keep the ownership graph current even if enrichment below fails
+            if self.ownership_state is not None:
+                self.ownership_state.apply_transfer(
+                    event['contract'], event['tokenId'], event['from'], event['to'],
+                    block.number, event.get('logIndex')
+                )
+                self._snapshot_ownership_if_due()
+            
             # Get token metadata
             token_metadata = await self._get_token_metadata(event['contract'], event['tokenId'])
             
@@ -248,21 +729,36 @@ class BlockchainEventListener:
         except Exception as e:
             logger.error(f"Error processing transfer event: {e}", exc_info=True)
     
+    def _snapshot_ownership_if_due(self):
+        """Snapshot the ownership graph in the background, one snapshot at a time."""
+        if not self.ownership_state.snapshot_due:
+            return
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            return
+        self._snapshot_task = asyncio.create_task(self.ownership_state.snapshot_async())
+        self._snapshot_task.add_done_callback(self._log_snapshot_failure)
+    
+    @staticmethod
+    def _log_snapshot_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ownership snapshot failed: {task.exception()}")
+    
     def _format_transfer_event(self, event: dict, tx, block: BlockData, 
-                             receipt: TxReceipt, token_metadata: dict, price: Optional[str]) -> dict:
+                             receipt: Optional[TxReceipt], token_metadata: dict, price: Optional[str]) -> dict:
         """Format a transfer event into a standardized format."""
         return {
             'event': 'nft_transfer',
             'timestamp': datetime.utcfromtimestamp(block.timestamp).isoformat(),
             'block_number': block.number,
-            'transaction_hash': tx.hash.hex(),
+            'log_index': event.get('logIndex'),
+            'transaction_hash': Web3.to_hex(tx.hash),
             'from_address': event['from'],
             'to_address': event['to'],
             'contract_address': event['contract'],
             'token_id': str(event['tokenId']),
             'price_eth': price,
             'value_eth': str(self.w3.from_wei(tx.value, 'ether')) if tx.value else '0',
-            'gas_used': receipt.gasUsed,
+            'gas_used': receipt.gasUsed if receipt is not None else None,
             'gas_price_gwei': str(self.w3.from_wei(tx.gasPrice, 'gwei')) if hasattr(tx, 'gasPrice') else None,
             'metadata': token_metadata or {},
             'network_id': self.w3.eth.chain_id,
@@ -312,37 +808,32 @@ class BlockchainEventListener:
                     logger.warning(f"Failed to initialize contract {addr}: {e}")
 
     async def _get_token_metadata(self, contract_address: str, token_id: int) -> dict:
+        """Get token metadata, served from the metadata cache when possible."""
+        return await self.metadata_cache.get(contract_address, token_id)
+    
+    async def _fetch_token_metadata(self, contract_address: str, token_id: int) -> dict:
         """Get token metadata from contract or external API."""
-        try:
-            contract = self.contracts.get(contract_address.lower())
-            if not contract:
-                return {}
-                
-            # Try ERC-721 metadata
-            try:
-                token_uri = await asyncio.get_event_loop().run_in_executor(
-                    None, contract.functions.tokenURI(token_id).call
-                )
-                if token_uri:
-                    return {'token_uri': token_uri, 'standard': 'erc721'}
-            except Exception:
-                pass
-                
-            # Try ERC-1155 metadata
-            try:
-                token_uri = await asyncio.get_event_loop().run_in_executor(
-                    None, contract.functions.uri(token_id).call
-                )
-                if token_uri:
-                    return {'token_uri': token_uri, 'standard': 'erc1155'}
-            except Exception:
-                pass
-                
+        contract = self.contracts.get(contract_address.lower())
+        if not contract:
             return {}
             
-        except Exception as e:
-            logger.error(f"Error getting token metadata: {e}")
-            return {}
+        # Try ERC-721 metadata
+        try:
+            token_uri = await asyncio.get_event_loop().run_in_executor(
+                None, contract.functions.tokenURI(token_id).call
+            )
+            if token_uri:
+                return {'token_uri': token_uri, 'standard': 'erc721'}
+        except Exception:
+            pass
+            
+        # Try ERC-1155 metadata
+        token_uri = await asyncio.get_event_loop().run_in_executor(
+            None, contract.functions.uri(token_id).call
+        )
+        if token_uri:
+            return {'token_uri': token_uri, 'standard': 'erc1155'}
+        return {}
     
     async def _get_transfer_price(self, tx, receipt: TxReceipt) -> Optional[str]:
         """Extract price from transaction if it's a sale."""
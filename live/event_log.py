@@ -0,0 +1,312 @@
+"""
+Replayable Event Log
+
+Broadcast events are appended to one memory-mapped ring file per channel and
+numbered with monotonically increasing offsets, so a client that reconnects
+can subscribe with ``since_offset`` and receive what it missed before live
+events resume.
+
+Each file starts with a small header (write position, next offset and the
+position/offset of the oldest record) followed by a ring of records::
+
+    magic (u32) | offset (u64) | timestamp (f64) | length (u32) | payload
+
+A record never straddles the end of the file: when it does not fit, a wrap
+marker is written (if there is room for one) and the record goes to the start
+of the ring, overwriting the oldest records. Records older than ``max_age``
+are dropped as well, so retention is bounded by both size and age. The header
+is updated after every append, so the log and its offsets survive restarts.
+
+A log has a single writer: each worker process keeps its own in-memory write
+position and offset counter. Workers sharing a root directory therefore each
+open their own subdirectory (``worker_directory``), and offsets are only
+meaningful to the worker that assigned them.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import socket
+import struct
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FILE_MAGIC = b'XEVL'
+_VERSION = 1
+# magic, version, capacity, write_pos, next_offset, tail_pos, tail_offset
+_HEADER = struct.Struct('<4sIQQQQQ')
+_RECORD = struct.Struct('<IQdI')
+_RECORD_MAGIC = 0x5245434F
+_WRAP_MAGIC = 0x57524150
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def worker_directory(root: str) -> str:
+    """Directory of this worker process's logs under a shared root.
+
+    Directories left under the root by workers of this host that are no
+    longer running are removed.
+
+    Args:
+        root: Directory shared by the workers (created if missing)
+
+    Returns:
+        Path of the ``<hostname>-<pid>`` subdirectory for this process
+    """
+    os.makedirs(root, exist_ok=True)
+    prefix = socket.gethostname() + '-'
+    for name in os.listdir(root):
+        pid = name[len(prefix):]
+        if name.startswith(prefix) and pid.isdigit() and int(pid) != os.getpid() \
+                and not _pid_running(int(pid)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return os.path.join(root, f"{prefix}{os.getpid()}")
+
+
+class _Entry(NamedTuple):
+    offset: int
+    position: int
+    size: int
+    timestamp: float
+
+
+class ChannelLog:
+    """Ring log of one channel's events in a memory-mapped file.
+
+    Args:
+        path: File backing the log; an existing log is reopened
+        capacity: Bytes reserved for records (the file is slightly larger)
+        max_age: Seconds a record is kept; None keeps records until overwritten
+    """
+
+    def __init__(self, path: str, capacity: int = 1 << 20, max_age: Optional[float] = 3600.0):
+        if capacity < 4 * _RECORD.size:
+            raise ValueError("capacity is too small for the log")
+        self.path = path
+        self.max_age = max_age
+        self._index: Deque[_Entry] = deque()
+
+        size = _HEADER.size + capacity
+        exists = os.path.exists(path)
+        reopen = exists and os.path.getsize(path) == size
+        # A log resized by a capacity change starts empty, but its offsets
+        # continue where they were so resuming clients see the gap
+        next_offset = self._read_next_offset(path) if exists and not reopen else 0
+        self._file = open(path, 'r+b' if reopen else 'w+b')
+        if not reopen:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._start = _HEADER.size
+        self._end = size
+
+        header = _HEADER.unpack_from(self._map, 0)
+        if reopen and header[0] == _FILE_MAGIC and header[1] == _VERSION and header[2] == capacity:
+            self._write_pos, self._next_offset = header[3], header[4]
+            self._recover(header[5], header[6])
+        else:
+            self._write_pos, self._next_offset = self._start, next_offset
+            self._write_header()
+
+    @staticmethod
+    def _read_next_offset(path: str) -> int:
+        """Next offset recorded in the header of an existing log file (0 if unreadable)."""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(_HEADER.size)
+        except OSError:
+            return 0
+        if len(header) < _HEADER.size:
+            return 0
+        magic, version, _, _, next_offset, _, _ = _HEADER.unpack(header)
+        return next_offset if magic == _FILE_MAGIC and version == _VERSION else 0
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next appended event will get."""
+        return self._next_offset
+
+    @property
+    def first_offset(self) -> int:
+        """Offset of the oldest retained event (``next_offset`` when empty)."""
+        return self._index[0].offset if self._index else self._next_offset
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def append(self, payload: bytes, timestamp: Optional[float] = None) -> int:
+        """Append an event and return its offset.
+
+        Raises:
+            ValueError: If the payload cannot fit in the ring
+        """
+        size = _RECORD.size + len(payload)
+        if size > (self._end - self._start) // 2:
+            raise ValueError(f"Event of {len(payload)} bytes exceeds the log capacity")
+        timestamp = time.time() if timestamp is None else timestamp
+
+        position = self._write_pos
+        if self._end - position < size:
+            # Mark the unused tail so readers wrap, then continue at the start
+            self._evict(position, self._end)
+            if self._end - position >= _RECORD.size:
+                _RECORD.pack_into(self._map, position, _WRAP_MAGIC, 0, 0.0, 0)
+            position = self._start
+        self._evict(position, position + size)
+
+        offset = self._next_offset
+        _RECORD.pack_into(self._map, position, _RECORD_MAGIC, offset, timestamp, len(payload))
+        self._map[position + _RECORD.size:position + size] = payload
+        self._index.append(_Entry(offset, position, size, timestamp))
+        self._write_pos = position + size
+        self._next_offset = offset + 1
+        self._expire(timestamp)
+        self._write_header()
+        return offset
+
+    def read(self, since_offset: int, now: Optional[float] = None) -> Tuple[List[Tuple[int, bytes]], bool]:
+        """Events with an offset greater than ``since_offset``.
+
+        Args:
+            since_offset: Last offset the reader has seen (-1 for everything retained)
+            now: Current time for age-based retention, injectable for tests
+
+        Returns:
+            Tuple of ([(offset, payload), ...], truncated), where ``truncated`` is
+            True when events after ``since_offset`` were already dropped, or
+            when ``since_offset`` was never assigned by this log
+        """
+        self._expire(time.time() if now is None else now)
+        first = self.first_offset
+        truncated = since_offset + 1 < first or since_offset >= self._next_offset
+        start = max(since_offset + 1 - first, 0)
+        events = []
+        for i in range(start, len(self._index)):
+            entry = self._index[i]
+            body = entry.position + _RECORD.size
+            events.append((entry.offset, self._map[body:entry.position + entry.size]))
+        return events, truncated
+
+    def close(self):
+        """Flush and release the mapping."""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def _evict(self, begin: int, end: int):
+        """Drop the oldest records overlapping ``[begin, end)``."""
+        while self._index and self._index[0].position < end and \
+                self._index[0].position + self._index[0].size > begin:
+            self._index.popleft()
+
+    def _expire(self, now: float):
+        if self.max_age is None:
+            return
+        cutoff = now - self.max_age
+        expired = False
+        while self._index and self._index[0].timestamp < cutoff:
+            self._index.popleft()
+            expired = True
+        if expired:
+            self._write_header()
+
+    def _write_header(self):
+        tail_pos = self._index[0].position if self._index else self._write_pos
+        _HEADER.pack_into(self._map, 0, _FILE_MAGIC, _VERSION, self._end - self._start,
+                          self._write_pos, self._next_offset, tail_pos, self.first_offset)
+
+    def _recover(self, position: int, offset: int):
+        """Rebuild the in-memory index by walking the ring from its oldest record."""
+        while offset < self._next_offset:
+            if self._end - position < _RECORD.size:
+                position = self._start
+                continue
+            magic, record_offset, timestamp, length = _RECORD.unpack_from(self._map, position)
+            if magic == _WRAP_MAGIC:
+                position = self._start
+                continue
+            size = _RECORD.size + length
+            if magic != _RECORD_MAGIC or record_offset != offset or position + size > self._end:
+                logger.warning(f"Event log {self.path} is damaged after offset {offset - 1}")
+                break
+            self._index.append(_Entry(offset, position, size, timestamp))
+            position += size
+            offset += 1
+
+
+class EventLog:
+    """Per-channel ring logs under one directory.
+
+    Args:
+        directory: Directory holding one file per channel
+        channel_bytes: Ring capacity of each channel's log
+        max_age: Seconds events are kept; None keeps them until overwritten
+        max_channels: Channel logs kept; the least recently written one is
+            deleted when a new channel exceeds the limit
+    """
+
+    def __init__(self, directory: str, channel_bytes: int = 1 << 20,
+                 max_age: Optional[float] = 3600.0, max_channels: int = 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.channel_bytes = channel_bytes
+        self.max_age = max_age
+        self.max_channels = max_channels
+        self._logs: 'OrderedDict[str, ChannelLog]' = OrderedDict()
+
+    def _path(self, channel: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(channel.encode()).hexdigest() + '.log')
+
+    def _open(self, channel: str, create: bool) -> Optional[ChannelLog]:
+        log = self._logs.get(channel)
+        if log is not None:
+            self._logs.move_to_end(channel)
+            return log
+        path = self._path(channel)
+        if not create and not os.path.exists(path):
+            return None
+        log = ChannelLog(path, self.channel_bytes, self.max_age)
+        self._logs[channel] = log
+        while len(self._logs) > self.max_channels:
+            _, evicted = self._logs.popitem(last=False)
+            evicted.close()
+            os.remove(evicted.path)
+        return log
+
+    def append(self, channel: str, payload: str) -> int:
+        """Append an encoded event to a channel's log and return its offset."""
+        return self._open(channel, create=True).append(payload.encode())
+
+    def read(self, channel: str, since_offset: int) -> Tuple[List[Tuple[int, str]], bool]:
+        """Events of a channel after ``since_offset`` (see ``ChannelLog.read``)."""
+        log = self._open(channel, create=False)
+        if log is None:
+            return [], since_offset >= 0
+        events, truncated = log.read(since_offset)
+        return [(offset, payload.decode()) for offset, payload in events], truncated
+
+    def close(self, remove: bool = False):
+        """Close every open channel log.
+
+        Args:
+            remove: Also delete the log directory (a worker's logs on shutdown)
+        """
+        for log in self._logs.values():
+            log.close()
+        self._logs.clear()
+        if remove:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,209 @@
+"""
+Token Metadata Cache
+
+Caches token metadata looked up by the event listener, keyed by
+``(contract, token_id)``. Entries live in a bounded in-memory LRU and,
+optionally, in a SQLite file that survives restarts. Concurrent lookups of
+the same key share one fetch (single-flight), and failed or empty lookups are
+cached for a shorter time so a broken ``tokenURI`` is not retried for every
+transfer.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MetadataKey = Tuple[str, int]
+MetadataFetcher = Callable[[str, int], Awaitable[Dict[str, Any]]]
+
+
+class TokenMetadataCache:
+    """
+    LRU + optional disk cache for token metadata with request coalescing.
+
+    Args:
+        fetch: Coroutine function ``fetch(contract, token_id)`` returning the
+               metadata dict; an empty dict or an exception is a miss
+        max_entries: Entries kept in memory
+        ttl: Seconds a found entry stays valid
+        negative_ttl: Seconds an empty or failed lookup stays cached
+        path: Optional SQLite file persisting found entries
+        clock: Time source, replaceable in tests
+    """
+
+    def __init__(self, fetch: MetadataFetcher, max_entries: int = 10000,
+                 ttl: float = 3600.0, negative_ttl: float = 300.0,
+                 path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries: "OrderedDict[MetadataKey, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._inflight: Dict[MetadataKey, asyncio.Future] = {}
+
+        # Metrics
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+        self.fetches = 0
+        self.failures = 0
+        self.fetch_seconds = 0.0
+        self.max_fetch_seconds = 0.0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if path:
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS token_metadata (
+                    contract TEXT NOT NULL,
+                    token_id TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (contract, token_id)
+                ) WITHOUT ROWID
+            """)
+
+    @staticmethod
+    def _key(contract: str, token_id: int) -> MetadataKey:
+        return contract.lower(), int(token_id)
+
+    async def get(self, contract: str, token_id: int) -> Dict[str, Any]:
+        """
+        Metadata for a token, fetched at most once per key at a time.
+
+        Returns:
+            Dict[str, Any]: The metadata, or an empty dict if none was found
+        """
+        key = self._key(contract, token_id)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self.clock():
+                self._entries.move_to_end(key)
+                if value:
+                    self.hits += 1
+                else:
+                    self.negative_hits += 1
+                return value
+            del self._entries[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            # Cancellation or a disk error; waiters see it instead of hanging
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, key: MetadataKey) -> Dict[str, Any]:
+        """Read a key from disk or the fetcher and store it in memory."""
+        if self._conn is not None:
+            stored = await asyncio.to_thread(self._read_disk, key)
+            if stored is not None:
+                self.disk_hits += 1
+                self._remember(key, *stored)
+                return stored[0]
+
+        self.fetches += 1
+        started = time.perf_counter()
+        try:
+            value = await self.fetch(*key) or {}
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Metadata lookup failed for {key[0]} #{key[1]}: {e}")
+            value = {}
+        elapsed = time.perf_counter() - started
+        self.fetch_seconds += elapsed
+        self.max_fetch_seconds = max(self.max_fetch_seconds, elapsed)
+
+        expires_at = self.clock() + (self.ttl if value else self.negative_ttl)
+        self._remember(key, value, expires_at)
+        if value and self._conn is not None:
+            await asyncio.to_thread(self._write_disk, key, value, expires_at)
+        return value
+
+    def _remember(self, key: MetadataKey, value: Dict[str, Any], expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: MetadataKey) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata, expires_at FROM token_metadata WHERE contract = ? AND token_id = ?",
+                (key[0], str(key[1]))
+            ).fetchone()
+        if row is None or row[1] <= self.clock():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _write_disk(self, key: MetadataKey, value: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO token_metadata (contract, token_id, metadata, expires_at) VALUES (?, ?, ?, ?)",
+                (key[0], str(key[1]), json.dumps(value), expires_at)
+            )
+
+    def invalidate(self, contract: str, token_id: int) -> None:
+        """Forget a cached entry, e.g. after a metadata update event."""
+        key = self._key(contract, token_id)
+        self._entries.pop(key, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM token_metadata WHERE contract = ? AND token_id = ?", (key[0], str(key[1]))
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and fetch latency metrics."""
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'lookups': lookups,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'fetches': self.fetches,
+            'failures': self.failures,
+            'hit_rate': (lookups - self.fetches) / lookups if lookups else 0.0,
+            'avg_fetch_ms': 1000 * self.fetch_seconds / self.fetches if self.fetches else 0.0,
+            'max_fetch_ms': 1000 * self.max_fetch_seconds,
+        }
+
+    def close(self):
+        """Close the disk store, if any."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
@@ -1,7 +1,11 @@
 # live/routes.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from .ws_manager import manager
+from core.config import settings
+from .backplane import create_backplane
+from .event_log import EventLog, worker_directory
+from .ws_manager import manager, parse_batch_options
 from .event_listener import BlockchainEventListener
+import asyncio
 import json
 import uuid
 import logging
@@ -45,11 +49,17 @@ async def _handle_client_message(client_id: str, message: str):
             channels = data.get('channels', [])
             if not isinstance(channels, list):
                 raise ValueError("Channels must be a list")
-            await manager.subscribe(client_id, channels)
+            if 'batch' in data:
+                batch = parse_batch_options(data['batch'])
+                connection = manager.connections.get(client_id)
+                if connection is not None:
+                    connection.set_batching(batch, manager.slow_client_policy)
+            await manager.subscribe(client_id, channels, since_offset=data.get('since_offset'))
             await manager.send_personal_message(client_id, {
                 'type': 'subscription_update',
                 'status': 'subscribed',
-                'channels': channels
+                'channels': channels,
+                'batch': data.get('batch') or None
             })
             
         elif message_type == 'unsubscribe':
@@ -75,11 +85,31 @@ async def _handle_client_message(client_id: str, message: str):
         logger.error(f"Error processing client message: {e}")
         raise
 
+@router.get("/listener/metrics")
+async def listener_metrics():
+    """Block throughput and token metadata cache metrics of the event listener"""
+    if 'event_listener' not in globals():
+        return {'running': False}
+    return {'running': event_listener.running, **event_listener.get_metrics()}
+
 # Add startup/shutdown event handlers
 @router.on_event("startup")
 async def startup_event():
-    """Start the blockchain event listener when the app starts"""
+    """Attach the WebSocket backplane and start the blockchain event listener"""
     global event_listener
+    if settings.WS_EVENT_LOG_DIR:
+        # One log per worker: each process numbers the events it delivers
+        manager.event_log = EventLog(
+            worker_directory(settings.WS_EVENT_LOG_DIR),
+            channel_bytes=settings.WS_EVENT_LOG_CHANNEL_BYTES,
+            max_age=settings.WS_EVENT_LOG_MAX_AGE,
+            max_channels=settings.WS_EVENT_LOG_MAX_CHANNELS
+        )
+    await manager.start_backplane(create_backplane(
+        settings.WS_BACKPLANE, settings.REDIS_URL, settings.WS_BACKPLANE_CHANNEL
+    ))
+    if not settings.EVENT_LISTENER_IN_APP:
+        return
     event_listener = BlockchainEventListener()
     asyncio.create_task(event_listener.start())
 
@@ -87,4 +117,7 @@ async def startup_event():
 async def shutdown_event():
     """Stop the blockchain event listener when the app shuts down"""
     if 'event_listener' in globals():
-        await event_listener.stop()
\ No newline at end of file
+        await event_listener.stop()
+    await manager.stop_backplane()
+    if manager.event_log is not None:
+        manager.event_log.close(remove=True)
\ No newline at end of file
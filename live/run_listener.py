@@ -3,7 +3,8 @@
 NFT Event Listener
 
 This script initializes and runs the blockchain event listener to monitor NFT transfers
-and broadcast them to connected WebSocket clients.
+and broadcast them to connected WebSocket clients. With WS_BACKPLANE=redis the events
+are published to the API workers (run with EVENT_LISTENER_IN_APP=false) instead.
 """
 import asyncio
 import logging
@@ -13,6 +14,9 @@ from typing import List, Optional
 
 from dotenv import load_dotenv
 
+from core.config import settings
+from utils.ownership_graph import OwnershipGraphState
+from .backplane import create_backplane
 from .event_listener import BlockchainEventListener
 from .ws_manager import manager
 
@@ -34,20 +38,37 @@ class NFTEventListener:
     """Main class to manage the NFT event listener lifecycle."""
     
     def __init__(self, rpc_url: Optional[str] = None, 
-                contract_addresses: Optional[List[str]] = None):
+                contract_addresses: Optional[List[str]] = None,
+                ingestion_mode: str = 'blocks',
+                filter_contracts: bool = True,
+                checkpoint_path: Optional[str] = None,
+                ownership_snapshot: Optional[str] = None):
         """Initialize the NFT event listener.
         
         Args:
             rpc_url: Optional custom RPC URL. Uses WEB3_PROVIDER_URI env var if not provided.
             contract_addresses: Optional list of contract addresses to monitor.
+            ingestion_mode: 'blocks' (scan transactions) or 'logs' (eth_getLogs)
+            filter_contracts: In 'logs' mode, restrict queries to the monitored contracts
+            checkpoint_path: Optional SQLite file for resume and reorg checkpoints
+            ownership_snapshot: Optional file the incremental ownership graph is
+                               restored from and snapshotted to
         """
         self.listener = BlockchainEventListener(
             rpc_url=rpc_url,
-            contract_addresses=contract_addresses
+            contract_addresses=contract_addresses,
+            ingestion_mode=ingestion_mode,
+            filter_contracts=filter_contracts,
+            checkpoint_path=checkpoint_path,
+            ownership_state=OwnershipGraphState.open(
+                ownership_snapshot, snapshot_every=settings.OWNERSHIP_SNAPSHOT_EVERY
+            ) if ownership_snapshot else None
         )
         self.running = False
         
-    async def start(self, from_block: Optional[int] = None):
+    async def start(self, from_block: Optional[int] = None,
+                    backfill_from: Optional[int] = None,
+                    backfill_workers: int = 4):
         """Start the event listener."""
         if self.running:
             logger.warning("Listener is already running")
@@ -65,11 +86,20 @@ class NFTEventListener:
             )
         
         try:
+            # Publish to the API workers when a backplane is configured
+            await manager.start_backplane(create_backplane(
+                settings.WS_BACKPLANE, settings.REDIS_URL, settings.WS_BACKPLANE_CHANNEL
+            ))
+            
             # Initialize Web3 connection
             await self.listener._initialize_web3()
             
             # Start the event listener
-            await self.listener.start(from_block=from_block)
+            await self.listener.start(
+                from_block=from_block,
+                backfill_from=backfill_from,
+                backfill_workers=backfill_workers
+            )
             
         except Exception as e:
             logger.error(f"Error in event listener: {e}", exc_info=True)
@@ -88,6 +118,7 @@ class NFTEventListener:
         
         # Close WebSocket connections
         await manager.disconnect_all()
+        await manager.stop_backplane()
         
         logger.info("NFT event listener stopped")
         
@@ -102,6 +133,18 @@ def parse_args():
     parser.add_argument('--rpc', type=str, help='Ethereum RPC URL')
     parser.add_argument('--from-block', type=int, help='Block number to start from')
     parser.add_argument('--contracts', nargs='+', help='Contract addresses to monitor')
+    parser.add_argument('--mode', choices=['blocks', 'logs'], default='blocks',
+                        help='Scan full blocks or query Transfer logs with eth_getLogs')
+    parser.add_argument('--all-contracts', action='store_true',
+                        help='In logs mode, follow ERC-721 transfers of every contract')
+    parser.add_argument('--checkpoint', type=str,
+                        help='SQLite file for processed-block checkpoints (resume and reorg handling)')
+    parser.add_argument('--backfill-from', type=int,
+                        help='Also backfill history from this block in the background')
+    parser.add_argument('--backfill-workers', type=int, default=4,
+                        help='Concurrent workers for the backfill')
+    parser.add_argument('--ownership-snapshot', type=str,
+                        help='File the incremental ownership graph is restored from and saved to')
     
     return parser.parse_args()
 
@@ -112,12 +155,20 @@ async def main():
     # Initialize the event listener
     listener = NFTEventListener(
         rpc_url=args.rpc,
-        contract_addresses=args.contracts
+        contract_addresses=args.contracts,
+        ingestion_mode=args.mode,
+        filter_contracts=not args.all_contracts,
+        checkpoint_path=args.checkpoint,
+        ownership_snapshot=args.ownership_snapshot
     )
     
     try:
         # Start the event listener
-        await listener.start(from_block=args.from_block)
+        await listener.start(
+            from_block=args.from_block,
+            backfill_from=args.backfill_from,
+            backfill_workers=args.backfill_workers
+        )
         
         # Keep the event loop running
         while True:
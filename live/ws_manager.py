@@ -18,30 +18,369 @@ Example usage:
         type: 'subscribe',
         channels: ['nft_events', 'collection:bayc']
     }));
+
+Channel names are ':'-separated segments (e.g. 'collection:0xabc:trait:eyes').
+A '*' segment in a subscription matches any one segment; a trailing '*'
+matches one or more segments, so 'collection:*' covers every collection
+channel and '*' alone covers every channel.
+
+High-rate clients can opt into micro-batching when they subscribe:
+
+    ws.send(JSON.stringify({
+        type: 'subscribe',
+        channels: ['nft_transfer'],
+        batch: {window_ms: 50, max_events: 100}
+    }));
+
+Events are then buffered per channel and delivered as one JSON array frame
+when the window elapses or ``max_events`` are pending. Sending
+``batch: false`` switches back to one event per frame, which is also what
+clients that never ask for batching get. Compression (permessage-deflate)
+is negotiated during the WebSocket handshake by the server, not here;
+array frames of similar events compress far better than single events.
+
+With several worker processes, give each manager a backplane (see
+``live.backplane``): broadcasts are then published once and every worker,
+the publishing one included, fans them out to its own clients.
+
+With an event log (see ``live.event_log``) every broadcast is numbered per
+channel and carries an ``offset`` field. A reconnecting client subscribes
+with ``since_offset`` (the last offset it saw, or a {channel: offset} map)
+and first receives what it missed as 'replay' frames:
+
+    {"type": "replay", "channel": "nft_transfer", "truncated": false,
+     "events": [{"offset": 42, "type": "nft_transfer", ...}, ...]}
+
+``truncated`` tells the client that part of the backlog was already dropped.
+Replay covers exact channel names, not wildcard patterns.
 """
 import json
 import asyncio
 import logging
 import uuid
-from typing import Dict, List, Set, Optional, Any, Callable, Awaitable
+from typing import Dict, List, Set, Optional, Any, Callable, Awaitable, NamedTuple
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Type aliases
 MessageHandler = Callable[[Dict[str, Any], 'Connection'], Awaitable[None]]
 
+# What to do when a client's send queue is full
+SLOW_CLIENT_POLICIES = ('drop_oldest', 'drop_newest', 'disconnect')
+
+# Channel segment separator and wildcard
+CHANNEL_SEPARATOR = ':'
+WILDCARD = '*'
+
+# Micro-batching defaults and limits for clients that opt in
+DEFAULT_BATCH_WINDOW_MS = 50
+DEFAULT_BATCH_MAX_EVENTS = 100
+MAX_BATCH_WINDOW_MS = 1000
+MAX_BATCH_EVENTS = 1000
+
+# Events per replay frame sent to a resuming client
+REPLAY_FRAME_EVENTS = 500
+
+class BatchOptions(NamedTuple):
+    """Per-connection micro-batching settings negotiated at subscribe time."""
+    window: float       # Seconds to hold the first buffered event of a channel
+    max_events: int     # Flush as soon as this many events are pending
+
+def parse_batch_options(spec: Any) -> Optional[BatchOptions]:
+    """Parse the ``batch`` field of a subscribe message.
+    
+    Args:
+        spec: ``True`` for the defaults, a dict with optional ``window_ms`` and
+              ``max_events``, or a falsy value to disable batching
+              
+    Returns:
+        BatchOptions, or None when batching is disabled
+        
+    Raises:
+        ValueError: If the settings are not positive numbers within the limits
+    """
+    if not spec:
+        return None
+    if spec is True:
+        spec = {}
+    if not isinstance(spec, dict):
+        raise ValueError("batch must be a boolean or an object")
+    window_ms = spec.get('window_ms', DEFAULT_BATCH_WINDOW_MS)
+    max_events = spec.get('max_events', DEFAULT_BATCH_MAX_EVENTS)
+    if (isinstance(window_ms, bool) or not isinstance(window_ms, (int, float))
+            or not 0 < window_ms <= MAX_BATCH_WINDOW_MS):
+        raise ValueError(f"batch.window_ms must be in (0, {MAX_BATCH_WINDOW_MS}]")
+    if (isinstance(max_events, bool) or not isinstance(max_events, int)
+            or not 0 < max_events <= MAX_BATCH_EVENTS):
+        raise ValueError(f"batch.max_events must be in [1, {MAX_BATCH_EVENTS}]")
+    return BatchOptions(window_ms / 1000.0, max_events)
+
+def topic_matches(pattern: str, channel: str) -> bool:
+    """Whether a subscription pattern covers a channel (see module docstring)."""
+    pattern_parts = pattern.split(CHANNEL_SEPARATOR)
+    channel_parts = channel.split(CHANNEL_SEPARATOR)
+    for i, part in enumerate(pattern_parts):
+        if part == WILDCARD and i == len(pattern_parts) - 1:
+            return len(channel_parts) > i
+        if i >= len(channel_parts) or (part != WILDCARD and part != channel_parts[i]):
+            return False
+    return len(pattern_parts) == len(channel_parts)
+
+class _TrieNode:
+    __slots__ = ('children', 'subscribers', 'tail_subscribers')
+    
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        # Patterns ending at this node, and patterns ending in a trailing '*' here
+        self.subscribers: Set[str] = set()
+        self.tail_subscribers: Set[str] = set()
+
+class SubscriptionTrie:
+    """Subscription index keyed by channel segments.
+    
+    Resolving the subscribers of a channel walks one trie level per segment,
+    following the exact segment and the '*' branch, so the cost depends on
+    the channel depth rather than on the number of subscribed channels.
+    """
+    
+    def __init__(self):
+        self._root = _TrieNode()
+        self._count = 0
+    
+    def __len__(self) -> int:
+        """Number of (pattern, client) subscriptions."""
+        return self._count
+    
+    def add(self, pattern: str, client_id: str) -> None:
+        """Subscribe a client to a channel or wildcard pattern."""
+        parts = pattern.split(CHANNEL_SEPARATOR)
+        node = self._root
+        for part in parts[:-1]:
+            node = node.children.setdefault(part, _TrieNode())
+        if parts[-1] == WILDCARD:
+            target = node.tail_subscribers
+        else:
+            target = node.children.setdefault(parts[-1], _TrieNode()).subscribers
+        if client_id not in target:
+            target.add(client_id)
+            self._count += 1
+    
+    def discard(self, pattern: str, client_id: str) -> None:
+        """Remove a subscription, pruning nodes left empty."""
+        parts = pattern.split(CHANNEL_SEPARATOR)
+        path = [self._root]
+        for part in parts[:-1]:
+            node = path[-1].children.get(part)
+            if node is None:
+                return
+            path.append(node)
+        if parts[-1] == WILDCARD:
+            target = path[-1].tail_subscribers
+        else:
+            leaf = path[-1].children.get(parts[-1])
+            if leaf is None:
+                return
+            path.append(leaf)
+            target = leaf.subscribers
+        if client_id not in target:
+            return
+        target.discard(client_id)
+        self._count -= 1
+        
+        keys = parts if parts[-1] != WILDCARD else parts[:-1]
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.children or node.subscribers or node.tail_subscribers:
+                break
+            del path[depth - 1].children[keys[depth - 1]]
+    
+    def match(self, channel: str) -> Set[str]:
+        """Return every client subscribed to the channel, directly or by wildcard."""
+        parts = channel.split(CHANNEL_SEPARATOR)
+        matched: Set[str] = set()
+        frontier = [self._root]
+        for part in parts:
+            next_frontier = []
+            for node in frontier:
+                # A trailing '*' covers this segment and everything after it
+                matched.update(node.tail_subscribers)
+                child = node.children.get(part)
+                if child is not None:
+                    next_frontier.append(child)
+                if part != WILDCARD:
+                    child = node.children.get(WILDCARD)
+                    if child is not None:
+                        next_frontier.append(child)
+            frontier = next_frontier
+            if not frontier:
+                return matched
+        for node in frontier:
+            matched.update(node.subscribers)
+        return matched
+
+def with_offset(payload: str, offset: int) -> str:
+    """Add an ``offset`` field to an encoded JSON object without re-encoding it."""
+    if len(payload) > 2 and payload[0] == '{':
+        return '{"offset":%d,%s' % (offset, payload[1:])
+    return payload
+
+def parse_since_offsets(since_offset: Any, channels: List[str]) -> Dict[str, int]:
+    """Resolve the ``since_offset`` of a subscribe message to per-channel offsets.
+    
+    Args:
+        since_offset: One offset for every channel or a {channel: offset} dict
+        channels: Channels being subscribed
+        
+    Raises:
+        ValueError: If offsets are not integers
+    """
+    if isinstance(since_offset, dict):
+        offsets = {c: since_offset[c] for c in channels if c in since_offset}
+    else:
+        offsets = {c: since_offset for c in channels}
+    for offset in offsets.values():
+        if isinstance(offset, bool) or not isinstance(offset, int):
+            raise ValueError("since_offset must be an integer or a map of channel to integer")
+    return offsets
+
+def serialize_message(message: Any) -> str:
+    """Encode a message once for every subscriber (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(message, default=str).decode()
+    return json.dumps(message, separators=(',', ':'), default=str)
+
 class Connection:
     """Represents a WebSocket connection with subscription management."""
     
-    def __init__(self, websocket: WebSocket, client_id: str):
+    def __init__(self, websocket: WebSocket, client_id: str, send_queue_size: int = 256):
         self.websocket = websocket
         self.client_id = client_id
         self.subscriptions: Set[str] = set()
         self.connected_at = datetime.utcnow()
         self.last_activity = datetime.utcnow()
         self.metadata: Dict[str, Any] = {}
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self.dropped_messages = 0
+        self.failed = False
+        self.batch: Optional[BatchOptions] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Serialized events waiting for their channel's batch to be flushed
+        self._pending: Dict[str, List[str]] = {}
+        self._flush_timers: Dict[str, asyncio.TimerHandle] = {}
+    
+    def enqueue(self, payload: str, policy: str = 'drop_oldest') -> bool:
+        """Queue a pre-serialized payload for the connection's writer task.
+        
+        Args:
+            payload: Encoded message, shared between all recipients
+            policy: What to do when the queue is full (see SLOW_CLIENT_POLICIES)
+            
+        Returns:
+            False if the client failed or lags behind under the 'disconnect' policy
+        """
+        if self.failed:
+            return False
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._drain())
+        try:
+            self.send_queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            if policy == 'disconnect':
+                return False
+            self.dropped_messages += 1
+            if policy == 'drop_oldest':
+                self.send_queue.get_nowait()
+                self.send_queue.put_nowait(payload)
+        return True
+    
+    def deliver(self, channel: str, payload: str, policy: str = 'drop_oldest') -> bool:
+        """Queue a broadcast payload, batching it per channel if the client opted in.
+        
+        Args:
+            channel: Channel the payload was broadcast on
+            payload: Encoded message, shared between all recipients
+            policy: What to do when the queue is full (see SLOW_CLIENT_POLICIES)
+            
+        Returns:
+            False if the client failed or lags behind under the 'disconnect' policy
+        """
+        if self.batch is None:
+            return self.enqueue(payload, policy)
+        if self.failed:
+            return False
+        
+        pending = self._pending.setdefault(channel, [])
+        pending.append(payload)
+        if len(pending) >= self.batch.max_events:
+            return self.flush(channel, policy)
+        if channel not in self._flush_timers:
+            self._flush_timers[channel] = asyncio.get_running_loop().call_later(
+                self.batch.window, self._flush_due, channel, policy
+            )
+        return True
+    
+    def flush(self, channel: Optional[str] = None, policy: str = 'drop_oldest') -> bool:
+        """Queue pending batches as JSON array frames.
+        
+        Args:
+            channel: Channel to flush, or None for every channel
+            policy: What to do when the queue is full (see SLOW_CLIENT_POLICIES)
+            
+        Returns:
+            False if a frame could not be queued under the 'disconnect' policy
+        """
+        channels = [channel] if channel is not None else list(self._pending)
+        queued = True
+        for name in channels:
+            timer = self._flush_timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            events = self._pending.pop(name, None)
+            if events:
+                # Payloads are already JSON, so the array is built by joining them
+                queued = self.enqueue('[' + ','.join(events) + ']', policy) and queued
+        return queued
+    
+    def _flush_due(self, channel: str, policy: str):
+        """Timer callback: flush a channel whose batch window elapsed."""
+        self._flush_timers.pop(channel, None)
+        if not self.flush(channel, policy):
+            # Lagging under 'disconnect'; the next broadcast disconnects it
+            self.failed = True
+    
+    def set_batching(self, options: Optional[BatchOptions], policy: str = 'drop_oldest'):
+        """Change the batching settings, flushing what is pending under the old ones."""
+        self.flush(policy=policy)
+        self.batch = options
+    
+    async def _drain(self):
+        """Send queued payloads in order until the socket fails."""
+        while True:
+            payload = await self.send_queue.get()
+            try:
+                await self.websocket.send_text(payload)
+                self.last_activity = datetime.utcnow()
+            except Exception as e:
+                logger.error(f"Error sending to {self.client_id}: {e}")
+                self.failed = True
+                return
+    
+    def close(self):
+        """Stop the writer task; queued payloads and pending batches are discarded."""
+        for timer in self._flush_timers.values():
+            timer.cancel()
+        self._flush_timers.clear()
+        self._pending.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
     
     async def send_json(self, data: Any) -> bool:
         """Send JSON data to the client."""
@@ -56,22 +395,105 @@ class Connection:
     def is_subscribed(self, channel: str) -> bool:
         """Check if the connection is subscribed to a channel."""
         # Check for exact match or wildcard subscription
-        return (channel in self.subscriptions or 
-                any(channel.startswith(sub.split(':')[0] + ':') 
-                    for sub in self.subscriptions if ':' in sub))
+        return (channel in self.subscriptions or
+                any(topic_matches(sub, channel) for sub in self.subscriptions if WILDCARD in sub))
 
 class ConnectionManager:
     """Manages WebSocket connections and message routing."""
     
-    def __init__(self):
+    def __init__(self, send_queue_size: int = 256, slow_client_policy: str = 'drop_oldest',
+                 backplane: Any = None, event_log: Any = None):
+        """Initialize the manager.
+        
+        Args:
+            send_queue_size: Broadcast payloads buffered per connection
+            slow_client_policy: 'drop_oldest' or 'drop_newest' to shed messages
+                               for a client whose queue is full, or 'disconnect'
+            backplane: Optional cross-worker backplane (``start``/``publish``/``close``);
+                      attached by ``start_backplane``
+            event_log: Optional replay log (``append``/``read``, e.g. ``live.event_log.EventLog``)
+        """
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
+        self.send_queue_size = send_queue_size
+        self.slow_client_policy = slow_client_policy
         self.connections: Dict[str, Connection] = {}
-        self.channel_subscribers: Dict[str, Set[str]] = {}
+        self.channel_subscribers = SubscriptionTrie()
         self.handlers: Dict[str, MessageHandler] = {
             'subscribe': self._handle_subscribe,
             'unsubscribe': self._handle_unsubscribe,
             'ping': self._handle_ping,
         }
         self.lock = asyncio.Lock()
+        self.backplane = backplane
+        self._backplane_started = False
+        self.event_log = event_log
+    
+    async def start_backplane(self, backplane: Any = None):
+        """Start receiving broadcasts from other workers through the backplane.
+        
+        Args:
+            backplane: Backplane to use instead of the one given at construction
+        """
+        if backplane is not None and backplane is not self.backplane:
+            await self.stop_backplane()
+            self.backplane = backplane
+        if self.backplane is not None and not self._backplane_started:
+            await self.backplane.start(self.deliver_local)
+            self._backplane_started = True
+    
+    async def stop_backplane(self):
+        """Detach from the backplane; later broadcasts only reach local clients."""
+        if self.backplane is not None and self._backplane_started:
+            await self.backplane.close()
+        self._backplane_started = False
+    
+    async def deliver_local(self, channel: str, payload: str) -> int:
+        """Fan an encoded broadcast out to this worker's subscribers of a channel.
+        
+        Returns:
+            Number of connections the payload was queued for
+        """
+        async with self.lock:
+            # Logged under the lock so a resuming subscriber gets each event
+            # exactly once, either replayed or live
+            if self.event_log is not None:
+                payload = self._log_event(channel, payload)
+            subscribers = self.channel_subscribers.match(channel)
+        return await self._fan_out(subscribers, payload, channel=channel)
+    
+    def _log_event(self, channel: str, payload: str) -> str:
+        """Append a broadcast to the replay log and stamp it with its offset."""
+        try:
+            return with_offset(payload, self.event_log.append(channel, payload))
+        except Exception as e:
+            logger.error(f"Error logging event on {channel}: {e}")
+            return payload
+    
+    def _replay(self, connection: Connection, offsets: Dict[str, int]):
+        """Queue logged events after each channel's offset; call with the lock held."""
+        for channel, since_offset in offsets.items():
+            if WILDCARD in channel.split(CHANNEL_SEPARATOR):
+                continue
+            events, truncated = self.event_log.read(channel, since_offset)
+            for start in range(0, max(len(events), 1), REPLAY_FRAME_EVENTS):
+                chunk = events[start:start + REPLAY_FRAME_EVENTS]
+                connection.enqueue('{"type":"replay","channel":%s,"truncated":%s,"events":[%s]}' % (
+                    json.dumps(channel),
+                    'true' if truncated and start == 0 else 'false',
+                    ','.join(with_offset(payload, offset) for offset, payload in chunk),
+                ), self.slow_client_policy)
+    
+    async def _publish(self, channel: str, payload: str):
+        """Publish through the backplane, or deliver locally without one."""
+        if self._backplane_started:
+            try:
+                await self.backplane.publish(channel, payload)
+                return
+            except Exception as e:
+                # Other workers miss this one, but local clients still get it
+                logger.error(f"Backplane publish failed on {channel}: {e}")
+        await self.deliver_local(channel, payload)
     
     async def connect(self, websocket: WebSocket, client_id: Optional[str] = None) -> str:
         """Register a new WebSocket connection.
@@ -84,7 +506,7 @@ class ConnectionManager:
             The client ID for this connection
         """
         client_id = client_id or f"client_{uuid.uuid4().hex[:8]}"
-        connection = Connection(websocket, client_id)
+        connection = Connection(websocket, client_id, self.send_queue_size)
         
         async with self.lock:
             self.connections[client_id] = connection
@@ -103,16 +525,20 @@ class ConnectionManager:
         """Remove a WebSocket connection and all its subscriptions."""
         async with self.lock:
             if client_id in self.connections:
-                connection = self.connections[client_id]
+                connection = self.connections.pop(client_id)
+                connection.close()
                 
                 # Remove from all channel subscriptions
-                for channel in list(connection.subscriptions):
-                    await self._unsubscribe_channel(client_id, channel)
+                for channel in connection.subscriptions:
+                    self.channel_subscribers.discard(channel, client_id)
                 
-                # Remove the connection
-                del self.connections[client_id]
                 logger.info(f"Client disconnected: {client_id}")
     
+    async def disconnect_all(self):
+        """Remove every connection, stopping their writer tasks."""
+        for client_id in list(self.connections):
+            await self.disconnect(client_id)
+    
     async def handle_message(self, client_id: str, message: str):
         """Handle an incoming message from a client."""
         if client_id not in self.connections:
@@ -143,7 +569,9 @@ class ConnectionManager:
         Args:
             channel: The channel to broadcast to
             message: The message to send (will be JSON-serialized)
-            condition: Optional function to filter which connections receive the message
+            condition: Optional function to filter which connections receive the message;
+                      such broadcasts stay on this worker, as the filter cannot
+                      be sent through the backplane
         """
         if not isinstance(message, dict) or 'type' not in message:
             raise ValueError("Message must be a dict with a 'type' field")
@@ -152,29 +580,46 @@ class ConnectionManager:
         if 'timestamp' not in message:
             message['timestamp'] = datetime.utcnow().isoformat() + 'Z'
         
-        # Get all subscribers for this channel
-        subscribers = set()
+        payload = serialize_message(message)
+        if condition is None:
+            await self._publish(channel, payload)
+            return
+        
+        # Exact and wildcard subscribers (e.g. 'collection:*', 'collection:*:trait:eyes')
         async with self.lock:
-            # Exact match subscribers
-            subscribers.update(self.channel_subscribers.get(channel, set()))
-            
-            # Wildcard subscribers (e.g., 'collection:*')
-            channel_parts = channel.split(':', 1)
-            if len(channel_parts) > 1:
-                wildcard = f"{channel_parts[0]}:*"
-                subscribers.update(self.channel_subscribers.get(wildcard, set()))
+            subscribers = self.channel_subscribers.match(channel)
         
-        # Send to each subscriber
-        tasks = []
-        for client_id in subscribers:
-            if client_id in self.connections:
-                connection = self.connections[client_id]
-                if condition is None or condition(connection):
-                    tasks.append(connection.send_json(message))
+        await self._fan_out(subscribers, payload, condition, channel)
+    
+    async def _fan_out(self, client_ids: Set[str], payload: str,
+                       condition: Optional[Callable[[Connection], bool]] = None,
+                       channel: Optional[str] = None) -> int:
+        """Queue one shared payload for each client; slow or failed clients never block.
+        
+        Payloads broadcast on a ``channel`` are batched for clients that opted in.
+        
+        Returns:
+            Number of connections the payload was queued for
+        """
+        queued = 0
+        laggards = []
+        for client_id in client_ids:
+            connection = self.connections.get(client_id)
+            if connection is None or (condition is not None and not condition(connection)):
+                continue
+            if channel is not None:
+                accepted = connection.deliver(channel, payload, self.slow_client_policy)
+            else:
+                accepted = connection.enqueue(payload, self.slow_client_policy)
+            if accepted:
+                queued += 1
+            else:
+                laggards.append(client_id)
         
-        # Run sends in parallel
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        for client_id in laggards:
+            logger.warning(f"Disconnecting slow or failed client {client_id}")
+            await self.disconnect(client_id)
+        return queued
     
     async def _handle_subscribe(self, data: Dict[str, Any], connection: Connection):
         """Handle subscription requests."""
@@ -182,17 +627,26 @@ class ConnectionManager:
         if not isinstance(channels, list):
             await self._send_error(connection, 'invalid_request', 'channels must be a list')
             return
+        if 'batch' in data:
+            try:
+                batch = parse_batch_options(data['batch'])
+            except ValueError as e:
+                await self._send_error(connection, 'invalid_request', str(e))
+                return
+            connection.set_batching(batch, self.slow_client_policy)
             
-        for channel in channels:
-            if not isinstance(channel, str):
-                continue
-                
-            if channel not in connection.subscriptions:
-                await self._subscribe_channel(connection.client_id, channel)
+        new_channels = [channel for channel in channels
+                        if isinstance(channel, str) and channel not in connection.subscriptions]
+        try:
+            await self.subscribe(connection.client_id, new_channels, since_offset=data.get('since_offset'))
+        except ValueError as e:
+            await self._send_error(connection, 'invalid_request', str(e))
+            return
                 
         await connection.send_json({
             'type': 'subscription_update',
             'subscribed': list(connection.subscriptions),
+            'batch': self._batch_info(connection),
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         })
     
@@ -213,6 +667,13 @@ class ConnectionManager:
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         })
     
+    @staticmethod
+    def _batch_info(connection: Connection) -> Optional[Dict[str, Any]]:
+        """Batching settings as reported back to the client."""
+        if connection.batch is None:
+            return None
+        return {'window_ms': connection.batch.window * 1000, 'max_events': connection.batch.max_events}
+    
     async def _handle_ping(self, data: Dict[str, Any], connection: Connection):
         """Handle ping/pong for connection keep-alive."""
         await connection.send_json({
@@ -220,34 +681,13 @@ class ConnectionManager:
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         })
     
-    async def _subscribe_channel(self, client_id: str, channel: str):
-        """Subscribe a client to a channel."""
-        async with self.lock:
-            if client_id not in self.connections:
-                return
-                
-            connection = self.connections[client_id]
-            
-            # Add to connection's subscriptions
-            connection.subscriptions.add(channel)
-            
-            # Add to channel's subscribers
-            if channel not in self.channel_subscribers:
-                self.channel_subscribers[channel] = set()
-            self.channel_subscribers[channel].add(client_id)
-            
-            logger.debug(f"Client {client_id} subscribed to {channel}")
-    
     async def _unsubscribe_channel(self, client_id: str, channel: str):
         """Unsubscribe a client from a channel."""
         async with self.lock:
             if client_id in self.connections:
                 self.connections[client_id].subscriptions.discard(channel)
                 
-            if channel in self.channel_subscribers:
-                self.channel_subscribers[channel].discard(client_id)
-                if not self.channel_subscribers[channel]:
-                    del self.channel_subscribers[channel]
+            self.channel_subscribers.discard(channel, client_id)
             
             logger.debug(f"Client {client_id} unsubscribed from {channel}")
     
@@ -266,22 +706,44 @@ class ConnectionManager:
     
     def get_subscription_count(self) -> int:
         """Get the total number of subscriptions across all channels."""
-        return sum(len(subscribers) for subscribers in self.channel_subscribers.values())
+        return len(self.channel_subscribers)
 
-    async def subscribe(self, client_id: str, channels: List[str]) -> bool:
-        """Subscribe client to channels"""
+    async def subscribe(self, client_id: str, channels: List[str],
+                        batch: Optional[BatchOptions] = None, since_offset: Any = None) -> bool:
+        """Subscribe client to channels
+        
+        Args:
+            client_id: Connected client
+            channels: Channels or wildcard patterns
+            batch: Switch the client to micro-batched delivery
+            since_offset: Replay logged events after this offset (or {channel: offset})
+                          before live ones; ignored without an event log
+            
+        Raises:
+            ValueError: If since_offset is malformed
+        """
         if not channels or client_id not in self.connections:
             return False
+        offsets = None
+        if since_offset is not None and self.event_log is not None:
+            offsets = parse_since_offsets(since_offset, channels)
             
         async with self.lock:
+            connection = self.connections.get(client_id)
+            if connection is None:
+                return False
+            if batch is not None:
+                connection.set_batching(batch, self.slow_client_policy)
             for channel in channels:
                 # Add to client's subscriptions
-                self.connections[client_id].subscriptions.add(channel)
+                connection.subscriptions.add(channel)
                 
                 # Add to channel's subscribers
-                if channel not in self.channel_subscribers:
-                    self.channel_subscribers[channel] = set()
-                self.channel_subscribers[channel].add(client_id)
+                self.channel_subscribers.add(channel, client_id)
+            
+            # Backlog is queued before any live event can match the new subscriptions
+            if offsets:
+                self._replay(connection, offsets)
                 
             logger.debug(f"Client {client_id} subscribed to {channels}")
             return True
@@ -302,10 +764,7 @@ class ConnectionManager:
                     connection.subscriptions.remove(channel)
                 
                 # Remove from channel's subscribers
-                if channel in self.channel_subscribers:
-                    self.channel_subscribers[channel].discard(client_id)
-                    if not self.channel_subscribers[channel]:
-                        del self.channel_subscribers[channel]
+                self.channel_subscribers.discard(channel, client_id)
                         
             logger.debug(f"Client {client_id} unsubscribed from {channels}")
             
@@ -319,30 +778,9 @@ class ConnectionManager:
         
         # If no channel specified, use event_type as channel
         target_channel = channel or event_type
-        message_json = json.dumps(message)
         
-        # Get subscribers for this channel
-        async with self.lock:
-            subscribers = set()
-            if target_channel in self.channel_subscribers:
-                subscribers.update(self.channel_subscribers[target_channel])
-            if '*' in self.channel_subscribers:  # Global subscribers
-                subscribers.update(self.channel_subscribers['*'])
-                
-        # Send message to all subscribers
-        disconnected = []
-        for client_id in subscribers:
-            connection = self.connections.get(client_id)
-            if connection:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to client {client_id}: {e}")
-                    disconnected.append(client_id)
-                
-        # Clean up disconnected clients
-        for client_id in disconnected:
-            await self.disconnect(client_id)
+        # Encode once; every worker queues the same payload for its subscribers
+        await self._publish(target_channel, serialize_message(message))
             
     async def send_personal_message(self, client_id: str, message: dict) -> bool:
         """Send a message to a specific client"""
@@ -351,13 +789,10 @@ class ConnectionManager:
             if not connection:
                 return False
                 
-        try:
-            await self.active_connections[client_id].send_text(json.dumps(message))
+        if await connection.send_json(message):
             return True
-        except Exception as e:
-            logger.error(f"Error sending to client {client_id}: {e}")
-            await self.disconnect(client_id)
-            return False
+        await self.disconnect(client_id)
+        return False
 
 # Global instance
 manager = ConnectionManager()
\ No newline at end of file
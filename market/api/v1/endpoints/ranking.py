@@ -4,7 +4,7 @@ Batch Ranking Endpoints
 Provides endpoints for ranking NFTs in batch using hybrid scoring.
 """
 from fastapi import APIRouter, HTTPException, UploadFile, File, Query, BackgroundTasks, Request, WebSocket, WebSocketDisconnect, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
@@ -15,21 +15,29 @@ import logging
 import asyncio
 from datetime import datetime, timedelta
 import io
+import os
 import time
 import json
 
-from core.features import extract_features
+from core.config import settings
+from core.batch_ranking import BatchRankingExecutor, RankingOptions, build_population_features
+from core.ingest import count_drop_rows, iter_drop_chunks, read_drop_columns, spool_upload
+from core.progress import ProgressPublisher
 from core.scoring import hybrid_score
 from services.model_service import train_model, predict_batch, predict_batch_stub
 from services.model_registry import ModelRegistry
-from core.storage.batch_job_store import BatchJobStore
+from core.storage.batch_job_store import iter_job_results, job_store
 from api.live.ws_manager import manager as ws_manager
 
 router = APIRouter(prefix="/ranking", tags=["ranking"])
 
 # Initialize services
 model_registry = ModelRegistry()
-batch_job_store = BatchJobStore()
+batch_job_store = job_store
+ranking_executor = BatchRankingExecutor(
+    max_workers=settings.BATCH_RANKING_WORKERS,
+    shard_rows=settings.BATCH_RANKING_SHARD_ROWS
+)
 
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -79,12 +87,22 @@ class RankingRequest(BaseModel):
         description="Weights for hybrid scoring. Keys: 'symbolic', 'ml'"
     )
 
+def _predict_stub(model, X: pd.DataFrame):
+    """Module-level adapter so the stub predictor can be shipped to worker processes."""
+    return predict_batch_stub(X)
+
+# Columns a batch ranking upload must provide
+BATCH_REQUIRED_COLUMNS = ["wallet", "token_id", "timestamp"]
+
 # In-memory storage for batch jobs (complemented by persistent storage)
 batch_jobs: Dict[str, BatchRankingJob] = {}
 
 # WebSocket connection timeout (seconds)
 WEBSOCKET_TIMEOUT = 300  # 5 minutes
 
+# Results read from the job store per page when streaming
+RESULTS_PAGE_SIZE = 1000
+
 # Background task to clean up old jobs
 async def cleanup_old_jobs():
     """Background task to clean up old completed/failed jobs"""
@@ -121,9 +139,14 @@ async def startup_event():
     """Start background tasks on application startup"""
     asyncio.create_task(cleanup_old_jobs())
 
+@router.on_event("shutdown")
+async def shutdown_event():
+    """Stop batch ranking worker processes"""
+    ranking_executor.shutdown(wait=False)
+
 async def process_ranking_batch(
     job_id: str,
-    df: pd.DataFrame,
+    source_path: str,
     ranking_request: RankingRequest,
     client_id: Optional[str] = None
 ):
@@ -131,13 +154,32 @@ async def process_ranking_batch(
     Process a batch of tokens for ranking.
     
     This runs in a background task and updates the job status as it progresses.
+    The spooled upload at ``source_path`` is streamed in chunks of
+    ``settings.BATCH_CHUNK_ROWS`` rows, scored in shards by
+    ``ranking_executor`` and deleted when the job ends. Drop-wide features
+    are computed in a first pass over the upload; the ranking is sorted on
+    disk and written to the job store page by page, so neither pass holds
+    the drop or its results in memory.
     """
+    # Progress is coalesced into small records; the full job is saved on state changes only
+    publisher = ProgressPublisher(
+        job_id,
+        store=batch_job_store,
+        notify=lambda record: ws_manager.update_job_progress(
+            job_id=job_id,
+            progress=record["progress"],
+            total=record["total"],
+            status=record["status"],
+            message=record["message"]
+        ),
+        max_rate=settings.JOB_PROGRESS_MAX_RATE
+    )
+    
     try:
         # Update job status to processing
         job = batch_jobs[job_id]
         job.status = JobStatus.PROCESSING
         job.started_at = datetime.utcnow().timestamp()
-        job.total = len(df)
         
         # Save to persistent storage
         await batch_job_store.update_job(job_id, job.to_dict())
@@ -171,75 +213,51 @@ async def process_ranking_batch(
                 model_path = model_info.get("path")
                 # model = load_model(model_path)
         
-        # Extract features
-        df = extract_features(df)
-        
-        # Get predictions if using ML
-        model_scores = None
-        if model and ranking_request.include_ml:
-            X = df.drop(columns=["wallet", "token_id", "timestamp"])
-            model_scores = predict_batch_stub(X)
-        
-        # Calculate scores
-        results = []
-        for idx, row in df.iterrows():
-            # Update progress
-            job.progress = idx + 1
-            if idx % 10 == 0:  # Update more frequently for better UX
-                # Save to persistent storage
-                await batch_job_store.update_job(job_id, job.to_dict())
-                
-                # Notify WebSocket subscribers
-                await ws_manager.update_job_progress(
-                    job_id=job_id,
-                    progress=job.progress,
-                    total=job.total,
-                    status=job.status,
-                    message=f"Processed {job.progress} of {job.total} items"
-                )
-            
-            # Calculate symbolic score (combining rarity and uniqueness)
-            symbolic_score = row.get("token_complexity", 0) + row.get("wallet_diversity", 0)  # Business-friendly terms
-            
-            # Calculate market momentum score
-            momentum_score = row.get("price_change_24h", 0) * 0.4 + row.get("volume_change_24h", 0) * 0.6
-            
-            model_score = model_scores[idx] if model_scores is not None else 0
-            
-            # Calculate hybrid score
-            hybrid_score_value = 0
-            if ranking_request.include_symbolic and ranking_request.include_ml:
-                weights = ranking_request.weights or {"symbolic": 0.5, "ml": 0.5}
-                hybrid_score_value = (
-                    weights.get("symbolic", 0.5) * symbolic_score +
-                    weights.get("ml", 0.5) * model_score
-                )
-            elif ranking_request.include_symbolic:
-                hybrid_score_value = symbolic_score
-            else:
-                hybrid_score_value = model_score
-            
-            results.append({
-                "wallet": row["wallet"],
-                "token_id": row["token_id"],
-                "hybrid_score": float(hybrid_score_value),
-                "model_score": float(model_score) if model_scores is not None else None,
-                "symbolic_score": float(symbolic_score) if ranking_request.include_symbolic else None
-            })
+        options = RankingOptions(
+            include_symbolic=ranking_request.include_symbolic,
+            include_ml=ranking_request.include_ml,
+            weights=ranking_request.weights,
+            symbolic_columns=("token_complexity", "wallet_diversity"),
+            model=model,
+            predict=_predict_stub
+        )
+        
+        async def report_progress(rows_done: int):
+            job.progress = rows_done
+            await publisher.update(job.progress, job.total, job.status)
         
-        # Sort results by hybrid score
-        results.sort(key=lambda x: x["hybrid_score"], reverse=True)
+        def read_chunks():
+            return iter_drop_chunks(
+                source_path,
+                chunk_rows=settings.BATCH_CHUNK_ROWS,
+                required=BATCH_REQUIRED_COLUMNS
+            )
         
-        # Add ranks
-        for i, result in enumerate(results, 1):
-            result["rank"] = i
+        # Features over the whole drop, so scores do not depend on chunk size
+        population = None
+        if options.needs_population:
+            population = await build_population_features(read_chunks())
         
-        # Update job with results
-        job.results = results
+        # Stream the spooled upload and score shards in worker processes
+        spool = await ranking_executor.rank_spooled(
+            read_chunks(), options, on_progress=report_progress,
+            population=population, directory=settings.BATCH_SPOOL_DIR
+        )
+        try:
+            await publisher.close()
+            
+            # Write the ranking to the job store as it is read back in order
+            await batch_job_store.update_job(job_id, {**job.to_dict(), "results": []})
+            async for page in spool.aiter_pages(RESULTS_PAGE_SIZE):
+                await batch_job_store.append_results(job_id, page)
+            job.total = len(spool)
+        finally:
+            spool.close()
+        
+        # Results stay in the job store; results=None keeps the stored rows
+        job.results = None
         job.status = JobStatus.COMPLETED
         job.completed_at = datetime.utcnow().timestamp()
-        
-        # Save final results
         await batch_job_store.update_job(job_id, job.to_dict())
         
         # Notify WebSocket subscribers of completion
@@ -255,6 +273,7 @@ async def process_ranking_batch(
         logging.error(f"Error processing batch ranking job {job_id}: {str(e)}", exc_info=True)
         if job_id in batch_jobs:
             job = batch_jobs[job_id]
+        await publisher.close()
         job.status = JobStatus.FAILED
         error_msg = str(e)
         job.error = error_msg
@@ -269,6 +288,11 @@ async def process_ranking_batch(
             status=job.status,
             message=f"Batch processing failed: {error_msg}"
         )
+    
+    finally:
+        # The spooled upload is only needed while the job runs
+        if os.path.exists(source_path):
+            os.remove(source_path)
 
 @router.post("/batch", status_code=202)
 async def create_batch_ranking(
@@ -287,18 +311,22 @@ async def create_batch_ranking(
         ranking_request = RankingRequest()
     
     try:
-        # Read and validate the CSV file
-        contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Validate required columns
-        required_columns = ["wallet", "token_id", "timestamp"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
-            )
+        # Spool the upload to disk; the job streams rows from there in chunks
+        source_path = await spool_upload(file, directory=settings.BATCH_SPOOL_DIR)
+        
+        try:
+            # Validate required columns
+            columns = await asyncio.to_thread(read_drop_columns, source_path)
+            missing_columns = [col for col in BATCH_REQUIRED_COLUMNS if col not in columns]
+            if missing_columns:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Missing required columns: {', '.join(missing_columns)}"
+                )
+            total = await asyncio.to_thread(count_drop_rows, source_path)
+        except BaseException:
+            os.remove(source_path)
+            raise
         
         # Create a new job
         job_id = str(uuid.uuid4())
@@ -306,7 +334,7 @@ async def create_batch_ranking(
             job_id=job_id,
             status=JobStatus.PENDING,
             created_at=datetime.utcnow().timestamp(),
-            total=len(df)
+            total=total
         )
         
         # Store job in memory and persistent storage
@@ -320,7 +348,7 @@ async def create_batch_ranking(
         background_tasks.add_task(
             process_ranking_batch, 
             job_id, 
-            df, 
+            source_path, 
             ranking_request,
             client_id
         )
@@ -338,6 +366,8 @@ async def create_batch_ranking(
         
         return response
         
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="The uploaded file is empty")
     except pd.errors.ParserError:
@@ -370,37 +400,66 @@ async def get_batch_ranking_status(job_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/batch/{job_id}/results")
-async def get_batch_ranking_results(job_id: str):
+async def get_batch_ranking_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Index of the first result to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of results to return (default: all)")
+):
     """
     Get the results of a completed batch ranking job.
+    
+    Results not held in memory (batch jobs write them to the job store as
+    they are ranked) are streamed from the store page by page instead of
+    being loaded all at once.
     """
     try:
         # Try to get from memory first
         job = batch_jobs.get(job_id)
-        
-        # If not in memory, try to load from persistent storage
-        if not job:
-            job_data = await batch_job_store.get_job(job_id)
+        if job:
+            status = job.status
+        else:
+            # Otherwise read only the job metadata from persistent storage
+            job_data = await batch_job_store.get_job(job_id, include_results=False)
             if not job_data:
                 raise HTTPException(status_code=404, detail="Job not found")
-            job = BatchRankingJob(**job_data)
-            batch_jobs[job_id] = job
+            status = JobStatus(job_data["data"]["status"])
         
         # Check if job is completed
-        if job.status != JobStatus.COMPLETED:
+        if status != JobStatus.COMPLETED:
             raise HTTPException(
                 status_code=400,
-                detail=f"Job is not completed. Current status: {job.status}"
+                detail=f"Job is not completed. Current status: {status}"
             )
         
-        if not job.results:
+        if job and job.results is not None:
+            end = None if limit is None else offset + limit
+            results = (job.results or [])[offset:end]
+            if not results:
+                raise HTTPException(status_code=404, detail="No results found for this job")
+            
+            return {
+                "job_id": job.job_id,
+                "status": job.status,
+                "results": results
+            }
+        
+        pages = iter_job_results(
+            batch_job_store, job_id, offset=offset, limit=limit, page_size=RESULTS_PAGE_SIZE
+        )
+        try:
+            first_page = await pages.__anext__()
+        except StopAsyncIteration:
             raise HTTPException(status_code=404, detail="No results found for this job")
         
-        return {
-            "job_id": job.job_id,
-            "status": job.status,
-            "results": job.results
-        }
+        async def stream_results():
+            # Same JSON document as the in-memory response, one page at a time
+            yield json.dumps({"job_id": job_id, "status": status.value})[:-1] + ', "results": ['
+            yield ", ".join(json.dumps(result) for result in first_page)
+            async for page in pages:
+                yield ", " + ", ".join(json.dumps(result) for result in page)
+            yield "]}"
+        
+        return StreamingResponse(stream_results(), media_type="application/json")
         
     except HTTPException:
         raise
@@ -2,16 +2,19 @@
 Balance Service
 
 Responsible for fetching and managing token balances across multiple blockchains.
-Supports caching and rate limiting for optimal performance.
+Supports caching and rate limiting for optimal performance. Node calls go through
+the shared pooled JSON-RPC clients of ``core.rpc_client``; the four ERC-20 reads
+of a token balance are sent as one batch request.
 """
 import asyncio
 from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 import aiohttp
 import json
+from eth_abi import decode as abi_decode
 from web3 import Web3
-from web3.middleware import ExtraDataToPOAMiddleware
 
+from core.rpc_client import AsyncJsonRpcClient, get_rpc_client
 from portfolio.models.portfolio import Asset, Wallet
 from portfolio.core.config import settings
 from portfolio.core.cache import cache
@@ -24,6 +27,12 @@ RPC_ENDPOINTS = {
     'bsc': settings.BSC_RPC_URL,
 }
 
+# ERC20 function selectors: balanceOf(address), decimals(), symbol(), name()
+BALANCE_OF_SELECTOR = '0x70a08231'
+DECIMALS_SELECTOR = '0x313ce567'
+SYMBOL_SELECTOR = '0x95d89b41'
+NAME_SELECTOR = '0x06fdde03'
+
 # Common ERC20 ABI for balance checking
 ERC20_ABI = [
     {
@@ -61,23 +70,18 @@ class BalanceService:
     
     def __init__(self):
         self.sessions = {}
-        self.web3_instances = {}
-        self._init_web3_instances()
-    
-    def _init_web3_instances(self):
-        """Initialize Web3 instances for different blockchains"""
+        self.rpc_urls = {}
         for chain, rpc_url in RPC_ENDPOINTS.items():
             if not rpc_url:
                 logger.warning(f"No RPC URL configured for {chain}")
                 continue
-                
-            w3 = Web3(Web3.HTTPProvider(rpc_url))
-            
-            # Inject POA middleware for chains that need it
-            if chain in ['polygon', 'bsc']:
-                w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
-            
-            self.web3_instances[chain] = w3
+            self.rpc_urls[chain] = rpc_url
+    
+    def _rpc(self, chain: str) -> AsyncJsonRpcClient:
+        """Shared pooled JSON-RPC client for a chain"""
+        if chain not in self.rpc_urls:
+            raise ValueError(f"Unsupported chain: {chain}")
+        return get_rpc_client(self.rpc_urls[chain], timeout=30.0)
     
     async def get_session(self) -> aiohttp.ClientSession:
         """Get or create an aiohttp session"""
@@ -94,23 +98,16 @@ class BalanceService:
         chain: str = 'ethereum'
     ) -> Dict[str, Union[str, float]]:
         """Get native token balance (ETH, MATIC, BNB, etc.)"""
-        if chain not in self.web3_instances:
-            raise ValueError(f"Unsupported chain: {chain}")
-        
-        w3 = self.web3_instances[chain]
+        rpc = self._rpc(chain)
         
         try:
             # Convert address to checksum address
             address = Web3.to_checksum_address(address)
             
             # Get balance in wei and convert to ether
-            balance_wei = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                w3.eth.get_balance,
-                address
-            )
+            balance_wei = int(await rpc.call('eth_getBalance', [address, 'latest']), 16)
             
-            balance_eth = w3.from_wei(balance_wei, 'ether')
+            balance_eth = Web3.from_wei(balance_wei, 'ether')
             
             return {
                 'address': address,
@@ -137,40 +134,24 @@ class BalanceService:
         chain: str = 'ethereum'
     ) -> Dict[str, Union[str, float, int]]:
         """Get ERC20 token balance for a wallet"""
-        if chain not in self.web3_instances:
-            raise ValueError(f"Unsupported chain: {chain}")
-            
-        w3 = self.web3_instances[chain]
+        rpc = self._rpc(chain)
         
         try:
             # Convert addresses to checksum addresses
             wallet_address = Web3.to_checksum_address(wallet_address)
             token_address = Web3.to_checksum_address(token_address)
             
-            # Create contract instance
-            contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
-            
-            # Get token metadata
-            symbol = await asyncio.get_event_loop().run_in_executor(
-                None,
-                contract.functions.symbol().call
-            )
-            
-            name = await asyncio.get_event_loop().run_in_executor(
-                None,
-                contract.functions.name().call
-            )
-            
-            decimals = await asyncio.get_event_loop().run_in_executor(
-                None,
-                contract.functions.decimals().call
-            )
-            
-            # Get token balance
-            balance = await asyncio.get_event_loop().run_in_executor(
-                None,
-                contract.functions.balanceOf(wallet_address).call
-            )
+            # Token metadata and balance in one batch request
+            owner = wallet_address[2:].lower().rjust(64, '0')
+            calls = [
+                ('eth_call', [{'to': token_address, 'data': data}, 'latest'])
+                for data in (SYMBOL_SELECTOR, NAME_SELECTOR, DECIMALS_SELECTOR, BALANCE_OF_SELECTOR + owner)
+            ]
+            results = [bytes.fromhex(result[2:]) for result in await rpc.batch(calls)]
+            symbol, = abi_decode(['string'], results[0])
+            name, = abi_decode(['string'], results[1])
+            decimals, = abi_decode(['uint8'], results[2])
+            balance, = abi_decode(['uint256'], results[3])
             
             # Calculate human-readable balance
             balance_human = balance / (10 ** decimals)
@@ -2,7 +2,10 @@
 Multi-Chain Blockchain Service
 
 Unified service for interacting with multiple blockchain networks including
-Ethereum, Polygon, BSC, Arbitrum, Optimism, and Solana.
+Ethereum, Polygon, BSC, Arbitrum, Optimism, and Solana. Reads go through the
+latency-aware provider routers of ``core.rpc_router`` over the shared pooled
+JSON-RPC clients of ``core.rpc_client``, with rate and concurrency limits taken
+from each network's configuration.
 """
 import asyncio
 import aiohttp
@@ -21,16 +24,26 @@ from core.multi_chain_config import (
     multi_chain_config,
     get_network_config
 )
+from core.rpc_client import AsyncJsonRpcClient, close_rpc_clients
+from core.rpc_router import RpcRouter, close_routers, get_router
 
 logger = logging.getLogger(__name__)
 
 
+def _hex_int(value: Any) -> Optional[int]:
+    """Decode a JSON-RPC hex quantity ('0x1a') to an int."""
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
 class MultiChainService:
     """Service for interacting with multiple blockchain networks."""
     
     def __init__(self):
         self.web3_instances: Dict[ChainType, Web3] = {}
         self.sessions: Dict[ChainType, aiohttp.ClientSession] = {}
+        self.rpc_clients: Dict[ChainType, Union[AsyncJsonRpcClient, RpcRouter]] = {}
         self.connection_status: Dict[ChainType, bool] = {}
         # Don't initialize connections in constructor - will be done lazily
     
@@ -133,8 +146,8 @@ class MultiChainService:
         self.connection_status[chain_type] = False
     
     async def _init_web3_connection_async(self, chain_type: ChainType, network_config: NetworkConfig):
-        """Initialize Web3 connection for an EVM chain asynchronously."""
-        # Try primary RPC URL first, then fallback if available
+        """Initialize the routed RPC connection for an EVM chain asynchronously."""
+        # Primary RPC URL first, then the fallback if available; the router adds alternative providers
         rpc_urls = [network_config.rpc_url]
         
         # Add fallback URLs if they exist in environment
@@ -143,53 +156,51 @@ class MultiChainService:
         if fallback_url:
             rpc_urls.append(fallback_url)
         
-        # Try each RPC URL
-        for rpc_url in rpc_urls:
+        router = self._rpc_router_for(chain_type, network_config, rpc_urls)
+        
+        # Test connection with retry logic; the router fails over between providers
+        max_retries = 3
+        retry_delay = 2  # seconds
+        
+        for attempt in range(max_retries):
             try:
-                w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
+                chain_id, block_number = await router.batch([("eth_chainId", []), ("eth_blockNumber", [])])
                 
+                rpc_url = router.best_url
+                w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
                 # Inject POA middleware for chains that need it
                 if chain_type in [ChainType.POLYGON, ChainType.BSC, ChainType.AVALANCHE, ChainType.FANTOM]:
                     w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
                 
-                # Test connection with retry logic
-                max_retries = 3
-                retry_delay = 2  # seconds
-                
-                for attempt in range(max_retries):
-                    try:
-                        # Test connection
-                        if w3.is_connected():
-                            # Double-check with a simple RPC call
-                            chain_id = w3.eth.chain_id
-                            block_number = w3.eth.block_number
-                            
-                            self.web3_instances[chain_type] = w3
-                            self.connection_status[chain_type] = True
-                            logger.info(f"Connected to {chain_type} via {rpc_url} (Chain ID: {chain_id}, Block: {block_number})")
-                            return
-                        else:
-                            if attempt < max_retries - 1:
-                                logger.debug(f"Connection attempt {attempt + 1} failed for {chain_type} via {rpc_url}, retrying in {retry_delay}s...")
-                                await asyncio.sleep(retry_delay)
-                            else:
-                                logger.debug(f"Failed to connect to {chain_type} via {rpc_url} after {max_retries} attempts")
-                                
-                    except Exception as e:
-                        if attempt < max_retries - 1:
-                            logger.debug(f"Connection attempt {attempt + 1} failed for {chain_type} via {rpc_url}: {e}, retrying...")
-                            await asyncio.sleep(retry_delay)
-                        else:
-                            logger.debug(f"All connection attempts failed for {chain_type} via {rpc_url}: {e}")
+                self.web3_instances[chain_type] = w3
+                self.rpc_clients[chain_type] = router
+                self.connection_status[chain_type] = True
+                logger.info(f"Connected to {chain_type} via {rpc_url} (Chain ID: {_hex_int(chain_id)}, Block: {_hex_int(block_number)})")
+                return
                 
             except Exception as e:
-                logger.debug(f"Error initializing {chain_type} via {rpc_url}: {e}")
-                continue
+                if attempt < max_retries - 1:
+                    logger.debug(f"Connection attempt {attempt + 1} failed for {chain_type}: {e}, retrying...")
+                    await asyncio.sleep(retry_delay)
+                else:
+                    logger.debug(f"All connection attempts failed for {chain_type}: {e}")
         
         # If we get here, all RPC URLs failed
         logger.warning(f"Failed to connect to {chain_type} via all available RPC URLs")
         self.connection_status[chain_type] = False
     
+    @staticmethod
+    def _rpc_router_for(chain_type: ChainType, network_config: NetworkConfig,
+                        rpc_urls: Optional[List[str]] = None) -> RpcRouter:
+        """Shared latency-aware router over a network's RPC URLs and alternative providers."""
+        return get_router(
+            chain_type.value,
+            rpc_urls or [network_config.rpc_url],
+            max_concurrency=max(1, int(network_config.requests_per_second)),
+            batch_size=network_config.batch_size,
+            requests_per_second=network_config.requests_per_second
+        )
+    
     async def get_connection_status(self) -> Dict[ChainType, bool]:
         """Get connection status for all networks."""
         return self.connection_status.copy()
@@ -234,14 +245,14 @@ class MultiChainService:
     
     async def _test_evm_connection(self, chain_type: ChainType) -> bool:
         """Test connection to an EVM network."""
-        if chain_type not in self.web3_instances:
+        if chain_type not in self.rpc_clients:
             return False
         
         try:
-            w3 = self.web3_instances[chain_type]
             # Test with a simple call
-            block_number = w3.eth.block_number
-            chain_id = w3.eth.chain_id
+            chain_id, block_number = map(_hex_int, await self.rpc_clients[chain_type].batch(
+                [("eth_chainId", []), ("eth_blockNumber", [])]
+            ))
             logger.info(f"{chain_type} connection test: Block {block_number}, Chain ID {chain_id}")
             return True
         except Exception as e:
@@ -255,18 +266,10 @@ class MultiChainService:
             if not network_config:
                 return False
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    network_config.rpc_url,
-                    json={"jsonrpc": "2.0", "id": 1, "method": "getHealth"},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if "result" in data and data["result"] == "ok":
-                            logger.info("Solana connection test successful")
-                            self.connection_status[ChainType.SOLANA] = True
-                            return True
+            if await self._rpc_router_for(ChainType.SOLANA, network_config).call("getHealth") == "ok":
+                logger.info("Solana connection test successful")
+                self.connection_status[ChainType.SOLANA] = True
+                return True
             
             return False
         except Exception as e:
@@ -286,12 +289,11 @@ class MultiChainService:
     
     async def _get_evm_block_number(self, chain_type: ChainType) -> Optional[int]:
         """Get block number for an EVM network."""
-        if chain_type not in self.web3_instances:
+        if chain_type not in self.rpc_clients:
             return None
         
         try:
-            w3 = self.web3_instances[chain_type]
-            return w3.eth.block_number
+            return _hex_int(await self.rpc_clients[chain_type].call("eth_blockNumber"))
         except Exception as e:
             logger.error(f"Failed to get EVM block number for {chain_type}: {e}")
             return None
@@ -303,17 +305,7 @@ class MultiChainService:
             if not network_config:
                 return None
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    network_config.rpc_url,
-                    json={"jsonrpc": "2.0", "id": 1, "method": "getSlot"},
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if "result" in data:
-                            return data["result"]
-            return None
+            return await self._rpc_router_for(ChainType.SOLANA, network_config).call("getSlot")
         except Exception as e:
             logger.error(f"Failed to get Solana block number: {e}")
             return None
@@ -331,20 +323,19 @@ class MultiChainService:
     
     async def _get_evm_balance(self, chain_type: ChainType, address: str) -> Optional[Dict[str, Any]]:
         """Get native token balance for an EVM address."""
-        if chain_type not in self.web3_instances:
+        if chain_type not in self.rpc_clients:
             return None
         
         try:
-            w3 = self.web3_instances[chain_type]
             network_config = get_network_config(chain_type)
             
             # Validate address
-            if not w3.is_address(address):
+            if not Web3.is_address(address):
                 logger.error(f"Invalid address: {address}")
                 return None
             
-            balance_wei = w3.eth.get_balance(address)
-            balance_decimal = w3.from_wei(balance_wei, 'ether')
+            balance_wei = _hex_int(await self.rpc_clients[chain_type].call("eth_getBalance", [address, "latest"]))
+            balance_decimal = Web3.from_wei(balance_wei, 'ether')
             
             return {
                 "address": address,
@@ -365,31 +356,19 @@ class MultiChainService:
             if not network_config:
                 return None
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    network_config.rpc_url,
-                    json={
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "method": "getBalance",
-                        "params": [address]
-                    },
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if "result" in data and "value" in data["result"]:
-                            balance_lamports = data["result"]["value"]
-                            balance_sol = balance_lamports / (10 ** network_config.decimals)
-                            
-                            return {
-                                "address": address,
-                                "chain": "solana",
-                                "balance_lamports": balance_lamports,
-                                "balance_decimal": balance_sol,
-                                "symbol": "SOL",
-                                "decimals": 9
-                            }
+            result = await self._rpc_router_for(ChainType.SOLANA, network_config).call("getBalance", [address])
+            if result and "value" in result:
+                balance_lamports = result["value"]
+                balance_sol = balance_lamports / (10 ** network_config.decimals)
+                
+                return {
+                    "address": address,
+                    "chain": "solana",
+                    "balance_lamports": balance_lamports,
+                    "balance_decimal": balance_sol,
+                    "symbol": "SOL",
+                    "decimals": 9
+                }
             return None
         except Exception as e:
             logger.error(f"Failed to get Solana balance: {e}")
@@ -408,12 +387,11 @@ class MultiChainService:
     
     async def _get_evm_transaction(self, chain_type: ChainType, tx_hash: str) -> Optional[Dict[str, Any]]:
         """Get transaction details for an EVM network."""
-        if chain_type not in self.web3_instances:
+        if chain_type not in self.rpc_clients:
             return None
         
         try:
-            w3 = self.web3_instances[chain_type]
-            tx = w3.eth.get_transaction(tx_hash)
+            tx = await self.rpc_clients[chain_type].call("eth_getTransactionByHash", [tx_hash])
             
             if tx:
                 return {
@@ -421,11 +399,11 @@ class MultiChainService:
                     "hash": tx_hash,
                     "from": tx.get('from'),
                     "to": tx.get('to'),
-                    "value": tx.get('value'),
-                    "gas": tx.get('gas'),
-                    "gas_price": tx.get('gasPrice'),
-                    "nonce": tx.get('nonce'),
-                    "block_number": tx.get('blockNumber'),
+                    "value": _hex_int(tx.get('value')),
+                    "gas": _hex_int(tx.get('gas')),
+                    "gas_price": _hex_int(tx.get('gasPrice')),
+                    "nonce": _hex_int(tx.get('nonce')),
+                    "block_number": _hex_int(tx.get('blockNumber')),
                     "input": tx.get('input')
                 }
             return None
@@ -440,33 +418,20 @@ class MultiChainService:
             if not network_config:
                 return None
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    network_config.rpc_url,
-                    json={
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "method": "getTransaction",
-                        "params": [
-                            tx_hash,
-                            {"encoding": "json", "maxSupportedTransactionVersion": 0}
-                        ]
-                    },
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if "result" in data and data["result"]:
-                            tx = data["result"]
-                            return {
-                                "chain": "solana",
-                                "hash": tx_hash,
-                                "slot": tx.get("slot"),
-                                "block_time": tx.get("blockTime"),
-                                "fee": tx.get("meta", {}).get("fee"),
-                                "status": tx.get("meta", {}).get("err"),
-                                "instructions": tx.get("transaction", {}).get("message", {}).get("instructions", [])
-                            }
+            tx = await self._rpc_router_for(ChainType.SOLANA, network_config).call("getTransaction", [
+                tx_hash,
+                {"encoding": "json", "maxSupportedTransactionVersion": 0}
+            ])
+            if tx:
+                return {
+                    "chain": "solana",
+                    "hash": tx_hash,
+                    "slot": tx.get("slot"),
+                    "block_time": tx.get("blockTime"),
+                    "fee": tx.get("meta", {}).get("fee"),
+                    "status": tx.get("meta", {}).get("err"),
+                    "instructions": tx.get("transaction", {}).get("message", {}).get("instructions", [])
+                }
             return None
         except Exception as e:
             logger.error(f"Failed to get Solana transaction: {e}")
@@ -531,6 +496,9 @@ class MultiChainService:
                     await session.close()
             except Exception as e:
                 logger.error(f"Error closing session: {e}")
+        
+        # Shared clients reopen their pool on the next request
+        self.rpc_clients.clear()
 
 
 # Global instance - lazy initialization
@@ -556,3 +524,5 @@ async def close_multi_chain_service():
     if _multi_chain_service:
         await _multi_chain_service.close_connections()
         _multi_chain_service = None
+    close_routers()
+    await close_rpc_clients()
@@ -16,6 +16,8 @@ from web3 import Web3
 # Import our simhash implementation
 from utils.simhash import SimHasher, simhash, simhash_distance, similarity
 from utils.bitwise import analyze_bytecode_patterns
+from utils.evm_opcodes import get_opcode_profile
+from utils.contract_index import ContractSimilarityIndex
 from utils.address_symmetry import check_address_symmetry
 
 # Import our new security features
@@ -48,6 +50,7 @@ class SecurityAnalyzer:
         self.w3 = w3
         self.simhasher = SimHasher()
         self.known_malicious_hashes = set()  # In production, load from a database
+        self.contract_index = ContractSimilarityIndex()  # Known contracts for similarity search
         self.behavioral_profiles = {}  # Cache for behavioral profiles
         
         # Initialize security detectors
@@ -77,14 +80,15 @@ class SecurityAnalyzer:
         # Get contract code and metadata
         try:
             code = self.w3.eth.get_code(contract_address).hex()
-            if code == '0x':
+            if not code or code in ('0x', '0X'):
                 return {
                     "address": contract_address,
                     "error": "No code at this address",
                     "is_contract": False
                 }
                 
-            # 1. Bytecode analysis
+            # 1. Bytecode analysis (disassembled once, cached by code hash)
+            opcode_profile = get_opcode_profile(code)
             bytecode_analysis = analyze_bytecode_patterns(code)
             
             # 2. Generate simhash of the bytecode
@@ -121,6 +125,7 @@ class SecurityAnalyzer:
                 "code_fingerprint": hex(code_simhash),  # Business-friendly term
                 "is_similar_to_malicious": is_similar_to_malicious,
                 "bytecode_analysis": bytecode_analysis,
+                "opcode_profile": opcode_profile.summary(),
                 "vulnerabilities": vulnerabilities,
                 "suspicious_functions": suspicious_functions,
                 "security_score": risk_score,
@@ -229,10 +234,11 @@ class SecurityAnalyzer:
         vulnerabilities = []
         
         # This is simplified - in production, use tools like Slither or Mythril
-        if "DELEGATECALL" in code.upper():
+        profile = get_opcode_profile(code)
+        if profile.count("DELEGATECALL"):
             vulnerabilities.append("delegatecall_usage")
             
-        if "SELFDESTRUCT" in code.upper():
+        if profile.count("SELFDESTRUCT"):
             vulnerabilities.append("selfdestruct_usage")
             
         return vulnerabilities
@@ -0,0 +1,178 @@
+"""
+Event Listener Fetch Benchmark
+
+Runs the live event listener against a local stand-in JSON-RPC node that
+adds a fixed latency to every HTTP request, and compares block throughput
+of one-call-per-block/receipt fetching (the original listener) with the
+batched, concurrent fetch stage.
+
+Usage:
+    python -m tests.performance.benchmark_event_listener --blocks 500 --latency-ms 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from core.rpc_client import AsyncJsonRpcClient
+from live.event_listener import BlockchainEventListener
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BAYC = "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+class StandInNode:
+    """Synthetic chain served over JSON-RPC with a per-request latency."""
+
+    def __init__(self, head: int, txs_per_block: int, nft_every: int, latency: float):
+        self.head = head
+        self.txs_per_block = txs_per_block
+        self.nft_every = nft_every
+        self.latency = latency
+        self.http_requests = 0
+
+    def _block(self, number: int) -> dict:
+        txs = []
+        for i in range(self.txs_per_block):
+            nft = i % self.nft_every == 0
+            txs.append({
+                "hash": "0x%064x" % (number * 10_000 + i),
+                "to": BAYC if nft else "0x" + "11" * 20,
+                "input": "0x23b872dd" if nft else "0x",
+                "value": "0x0",
+                "gasPrice": "0x1",
+            })
+        return {"number": hex(number), "timestamp": hex(1672531200 + number), "transactions": txs}
+
+    @staticmethod
+    def _receipt(tx_hash: str) -> dict:
+        value = int(tx_hash, 16)
+        return {
+            "transactionHash": tx_hash,
+            "blockNumber": hex(value // 10_000),
+            "gasUsed": "0x5208",
+            "logs": [{
+                "address": BAYC,
+                "topics": [TRANSFER_TOPIC, "0x%064x" % 1, "0x%064x" % 2, "0x%064x" % value],
+                "data": "0x",
+                "logIndex": "0x0",
+            }],
+        }
+
+    def answer(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        if method == "eth_blockNumber":
+            result = hex(self.head)
+        elif method == "eth_getBlockByNumber":
+            result = self._block(int(params[0], 16))
+        else:
+            result = self._receipt(params[0])
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.http_requests += 1
+        await asyncio.sleep(self.latency)
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self.answer(item) for item in payload])
+        return web.json_response(self.answer(payload))
+
+
+async def sequential_fetch(url: str, blocks: int) -> int:
+    """The original pattern: one request per block, then one per NFT receipt."""
+    transfers = 0
+    async with AsyncJsonRpcClient(url, max_concurrency=1) as client:
+        for number in range(1, blocks + 1):
+            block = await client.call("eth_getBlockByNumber", [hex(number), True])
+            for tx in block["transactions"]:
+                if tx["to"] == BAYC and tx["input"] != "0x":
+                    receipt = await client.call("eth_getTransactionReceipt", [tx["hash"]])
+                    transfers += len(receipt["logs"])
+    return transfers
+
+
+async def pipelined_fetch(url: str, blocks: int, concurrency: int, batch_size: int) -> int:
+    """The listener's fetch stage feeding the parse stage through a queue."""
+    listener = BlockchainEventListener(rpc_url=url, fetch_concurrency=concurrency, rpc_batch_size=batch_size)
+    transfers = 0
+
+    async def count(event, tx, block, receipt):
+        nonlocal transfers
+        transfers += 1
+
+    listener._process_transfer_event = count
+    try:
+        while listener.last_processed_block < blocks:
+            await listener._process_new_blocks()
+    finally:
+        await listener.stop()
+    return transfers
+
+
+async def run_benchmark(blocks: int, txs_per_block: int, nft_every: int, latency_ms: float,
+                        concurrency: int, batch_size: int) -> dict:
+    """Serve the stand-in node locally and time both fetch strategies."""
+    node = StandInNode(blocks, txs_per_block, nft_every, latency_ms / 1000)
+    app = web.Application()
+    app.router.add_post("/", node.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/"
+
+    try:
+        start = time.perf_counter()
+        sequential_transfers = await sequential_fetch(url, blocks)
+        sequential_time = time.perf_counter() - start
+        sequential_requests, node.http_requests = node.http_requests, 0
+
+        start = time.perf_counter()
+        pipelined_transfers = await pipelined_fetch(url, blocks, concurrency, batch_size)
+        pipelined_time = time.perf_counter() - start
+        pipelined_requests = node.http_requests
+    finally:
+        await runner.cleanup()
+
+    return {
+        "blocks": blocks,
+        "sequential_blocks_per_second": blocks / sequential_time,
+        "sequential_requests": sequential_requests,
+        "pipelined_blocks_per_second": blocks / pipelined_time,
+        "pipelined_requests": pipelined_requests,
+        "speedup": sequential_time / pipelined_time,
+        "same_transfers": sequential_transfers == pipelined_transfers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs batched, concurrent block fetching")
+    parser.add_argument("--blocks", type=int, default=500, help="Number of blocks to fetch")
+    parser.add_argument("--txs-per-block", type=int, default=150, help="Transactions per block")
+    parser.add_argument("--nft-every", type=int, default=30, help="Every n-th transaction is an NFT transfer")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latency added to each HTTP request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Fetch concurrency of the listener")
+    parser.add_argument("--batch-size", type=int, default=20, help="Calls per JSON-RPC batch request")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(
+        args.blocks, args.txs_per_block, args.nft_every, args.latency_ms, args.concurrency, args.batch_size
+    ))
+    logger.info("Blocks:             %d", results["blocks"])
+    logger.info("Sequential:         %.1f blocks/sec (%d requests)",
+                results["sequential_blocks_per_second"], results["sequential_requests"])
+    logger.info("Batched pipeline:   %.1f blocks/sec (%d requests)",
+                results["pipelined_blocks_per_second"], results["pipelined_requests"])
+    logger.info("Speed-up:           %.1fx", results["speedup"])
+    logger.info("Same transfers:     %s", results["same_transfers"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Graph Entropy Benchmark
+
+Times the sparse-matrix ``compute_wallet_graph_entropy`` full analysis on a
+random wallet-token ownership graph, and compares it with the networkx
+implementation it replaced on a smaller graph (networkx is far too slow for
+the full size), checking that both produce the same metrics.
+
+Usage:
+    python -m tests.performance.benchmark_graph_entropy --edges 1000000
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.graph_entropy import compute_wallet_graph_entropy
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_ownership(edges: int, seed: int = 7) -> pd.DataFrame:
+    """Random ownership rows: about 5 tokens per wallet and 10 owners per token."""
+    rng = np.random.default_rng(seed)
+    # Wallets are strings so they cannot collide with token ids in the networkx graph
+    wallet_ids = rng.integers(0, max(1, edges // 5), size=edges)
+    return pd.DataFrame({
+        "wallet": pd.Series(wallet_ids).map("0x{:040x}".format),
+        "token_id": rng.integers(0, max(1, edges // 10), size=edges),
+    })
+
+
+def networkx_analysis(df: pd.DataFrame) -> dict:
+    """The previous networkx implementation of the full analysis."""
+    import networkx as nx
+
+    graph = nx.Graph()
+    wallets = set(df["wallet"])
+    graph.add_nodes_from(wallets, bipartite=0)
+    graph.add_nodes_from(set(df["token_id"]), bipartite=1)
+    graph.add_edges_from(zip(df["wallet"], df["token_id"]))
+    wallet_graph = nx.bipartite.projected_graph(graph, wallets)
+    components = list(nx.connected_components(wallet_graph))
+    return {
+        "degree_assortativity": nx.degree_assortativity_coefficient(wallet_graph),
+        "density": nx.density(wallet_graph),
+        "components": len(components),
+        "largest_component_size": len(max(components, key=len)),
+        "clustering": nx.average_clustering(wallet_graph),
+        "betweenness": nx.betweenness_centrality(wallet_graph, k=min(100, len(wallet_graph))),
+        "pagerank": nx.pagerank(wallet_graph, max_iter=100),
+    }
+
+
+def time_sparse(df: pd.DataFrame):
+    start = time.perf_counter()
+    analysis = compute_wallet_graph_entropy(df, return_full_analysis=True)
+    return analysis, time.perf_counter() - start
+
+
+def run_benchmark(edges: int, baseline_edges: int) -> dict:
+    """Time the sparse analysis at full size and both implementations on the baseline graph."""
+    results = {"edges": edges, "baseline_edges": baseline_edges}
+
+    baseline = generate_ownership(baseline_edges)
+    sparse_analysis, results["baseline_sparse_seconds"] = time_sparse(baseline)
+    start = time.perf_counter()
+    reference = networkx_analysis(baseline)
+    results["baseline_networkx_seconds"] = time.perf_counter() - start
+    # Betweenness is sampled from random sources, so only the exact metrics are compared
+    results["identical"] = bool(
+        all(np.isclose(getattr(sparse_analysis, name), reference[name])
+            for name in ("degree_assortativity", "density", "components",
+                         "largest_component_size", "clustering"))
+        and max(abs(sparse_analysis.pagerank[w] - p) for w, p in reference["pagerank"].items()) < 1e-6
+    )
+
+    df = generate_ownership(edges)
+    analysis, results["sparse_seconds"] = time_sparse(df)
+    results["wallets"] = len(analysis.pagerank)
+    results["components"] = analysis.components
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sparse vs networkx wallet graph analysis")
+    parser.add_argument("--edges", type=int, default=1_000_000, help="Ownership rows in the full-size graph")
+    parser.add_argument("--baseline-edges", type=int, default=20_000,
+                        help="Ownership rows in the graph both implementations analyse")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.edges, args.baseline_edges)
+    logger.info("Baseline graph:   %d edges", results["baseline_edges"])
+    logger.info("  networkx:       %.2fs", results["baseline_networkx_seconds"])
+    logger.info("  sparse:         %.2fs", results["baseline_sparse_seconds"])
+    logger.info("  Identical:      %s", results["identical"])
+    logger.info("Full graph:       %d edges, %d wallets, %d components",
+                results["edges"], results["wallets"], results["components"])
+    logger.info("  sparse:         %.2fs", results["sparse_seconds"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Job Progress Publishing Benchmark
+
+Simulates a batch job that reports progress for every row and compares the
+original pattern (saving the whole job, including the growing results list,
+every 10 rows) against ``core.progress.ProgressPublisher`` (small progress
+records at most ``--rate`` times per second, results saved once at the end).
+
+The legacy pattern is quadratic in the number of rows, so keep ``--rows``
+modest; at 1M rows it would write a million-row JSON file 100k times.
+
+Usage:
+    python -m tests.performance.benchmark_progress_publishing --rows 10000
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import core.storage.batch_job_store as batch_job_store_module
+from core.progress import ProgressPublisher
+from core.storage.batch_job_store import BatchJobStore
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _result(i: int) -> dict:
+    return {"wallet": f"0x{i:040x}", "token_id": str(i), "hybrid_score": i / 7, "rank": i + 1}
+
+
+async def legacy_job(store: BatchJobStore, job_id: str, rows: int) -> int:
+    """The pre-publisher pattern: full job save every 10 rows."""
+    job = {"job_id": job_id, "status": "processing", "progress": 0, "total": rows, "results": []}
+    writes = 0
+    for i in range(rows):
+        job["results"].append(_result(i))
+        job["progress"] = i + 1
+        if i % 10 == 0:
+            await store.save_job(job_id, job)
+            writes += 1
+    job["status"] = "completed"
+    await store.save_job(job_id, job)
+    return writes + 1
+
+
+async def published_job(store: BatchJobStore, job_id: str, rows: int, rate: float) -> int:
+    """Per-row updates coalesced by ``ProgressPublisher``; results saved once."""
+    job = {"job_id": job_id, "status": "processing", "progress": 0, "total": rows, "results": []}
+    publisher = ProgressPublisher(job_id, store=store, max_rate=rate)
+    for i in range(rows):
+        job["results"].append(_result(i))
+        job["progress"] = i + 1
+        await publisher.update(job["progress"], rows, job["status"])
+    await publisher.close()
+    job["status"] = "completed"
+    await store.save_job(job_id, job)
+    return publisher.published + 1
+
+
+def run_benchmark(rows: int, rate: float) -> dict:
+    """Time both patterns against a file store in a temporary directory."""
+    store = BatchJobStore()
+    original_dir = batch_job_store_module.DATA_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_job_store_module.DATA_DIR = Path(tmp)
+        try:
+            start = time.perf_counter()
+            legacy_writes = asyncio.run(legacy_job(store, "legacy", rows))
+            legacy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            published_writes = asyncio.run(published_job(store, "published", rows, rate))
+            published_time = time.perf_counter() - start
+        finally:
+            batch_job_store_module.DATA_DIR = original_dir
+
+    return {
+        "rows": rows,
+        "legacy_seconds": legacy_time,
+        "legacy_writes": legacy_writes,
+        "published_seconds": published_time,
+        "published_writes": published_writes,
+        "speedup": legacy_time / published_time if published_time else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark job progress persistence with and without coalescing")
+    parser.add_argument("--rows", type=int, default=10_000, help="Number of rows processed by the job")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum progress publishes per second")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.rate)
+    logger.info("Rows:               %d", results["rows"])
+    logger.info("Save every 10 rows: %.2fs (%d writes)", results["legacy_seconds"], results["legacy_writes"])
+    logger.info("ProgressPublisher:  %.2fs (%d writes)", results["published_seconds"], results["published_writes"])
+    logger.info("Speed-up:           %.1fx", results["speedup"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+SimHash Batch Benchmark
+
+Compares the scalar ``SimHasher.simhash`` loop against the batched
+``SimHasher.simhash_many`` engine on randomly generated wallet addresses.
+
+Usage:
+    python -m tests.performance.benchmark_simhash --count 1000000
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from utils.simhash import SimHasher
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_addresses(count: int, seed: int = 7) -> list:
+    """Generate ``count`` random checksum-free Ethereum addresses."""
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 256, size=(count, 20), dtype=np.uint8)
+    return ["0x" + row.tobytes().hex() for row in raw]
+
+
+def run_benchmark(count: int) -> dict:
+    """Time both code paths and verify that they agree."""
+    hasher = SimHasher()
+    addresses = generate_addresses(count)
+
+    start = time.perf_counter()
+    scalar = [hasher.simhash(a) for a in addresses]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = hasher.simhash_many(addresses)
+    batch_time = time.perf_counter() - start
+
+    identical = bool(np.array_equal(batch, np.asarray(scalar, dtype=np.uint64)))
+
+    return {
+        "count": count,
+        "scalar_seconds": scalar_time,
+        "batch_seconds": batch_time,
+        "speedup": scalar_time / batch_time if batch_time else float("inf"),
+        "identical": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs batched SimHash")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of addresses to hash")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.count)
+    logger.info("Addresses:      %d", results["count"])
+    logger.info("Scalar simhash: %.2fs", results["scalar_seconds"])
+    logger.info("simhash_many:   %.2fs", results["batch_seconds"])
+    logger.info("Speed-up:       %.1fx", results["speedup"])
+    logger.info("Identical:      %s", results["identical"])
+
+
+if __name__ == "__main__":
+    main()
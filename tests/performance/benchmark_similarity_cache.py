@@ -0,0 +1,108 @@
+"""
+Similarity Cache Benchmark
+
+Streams distinct contract sources through ``SimilarityAnalyzer.compare`` the
+way a long-lived worker does, and compares the memory retained by the
+previous caches (an unbounded simhash dict keyed by whole sources plus an
+``lru_cache`` keyed by whole source pairs) with the byte-bounded,
+digest-keyed content cache. Also times repeated comparisons of the same pair
+(the cache-hit path).
+
+Usage:
+    python -m tests.performance.benchmark_similarity_cache --contracts 200 --lines 1000
+"""
+import argparse
+import difflib
+import logging
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+
+from utils.content_cache import ContentCache
+from utils.hybrid_similarity import SimilarityAnalyzer
+from utils.simhash import simhash
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_source(rng, lines: int) -> str:
+    return "\n".join(f"    uint256 public value{n} = {n * 7};" for n in rng.integers(0, 1_000_000, lines))
+
+
+class PreviousCaches:
+    """The memoization SimilarityAnalyzer used before (simhash + AST caches only)."""
+
+    def __init__(self, cache_size: int = 1000):
+        self._simhash_cache = {}
+        self._cached_ast_similarity = lru_cache(maxsize=cache_size)(self._ast_similarity_impl)
+
+    def _ast_similarity_impl(self, code1: str, code2: str) -> float:
+        lines1 = [l.strip() for l in code1.splitlines() if l.strip()]
+        lines2 = [l.strip() for l in code2.splitlines() if l.strip()]
+        return difflib.SequenceMatcher(None, lines1, lines2).ratio()
+
+    def compare(self, code1: str, code2: str) -> float:
+        for code in (code1, code2):
+            if code not in self._simhash_cache:
+                self._simhash_cache[code] = simhash(code, 64)
+        return self._cached_ast_similarity(code1, code2)
+
+
+def generate_pair(seed: int, lines: int):
+    source = generate_source(np.random.default_rng(seed), lines)
+    return source, source.replace("value1", "value_1")
+
+
+def measure(compare, contracts: int, lines: int) -> dict:
+    """
+    Memory still held after streaming ``contracts`` fresh source pairs through
+    ``compare`` (each pair is dropped after use, as in a worker), and the
+    latency of comparing one pair again.
+    """
+    tracemalloc.start()
+    for seed in range(contracts):
+        compare(*generate_pair(seed, lines))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    code1, code2 = generate_pair(contracts - 1, lines)
+    compare(code1, code2)
+    start = time.perf_counter()
+    for _ in range(200):
+        compare(code1, code2)
+    return {"retained_mb": retained / 2 ** 20, "hit_ms": (time.perf_counter() - start) / 200 * 1000}
+
+
+def run_benchmark(contracts: int, lines: int, budget_mb: float) -> dict:
+    results = {"contracts": contracts, "source_kb": len(generate_pair(0, lines)[0]) / 1024}
+    results["previous"] = measure(PreviousCaches().compare, contracts, lines)
+    cache = ContentCache(max_bytes=int(budget_mb * 2 ** 20))
+    analyzer = SimilarityAnalyzer(cache=cache)
+    results["content_cache"] = measure(lambda a, b: analyzer.compare(a, b), contracts, lines)
+    results["cache_stats"] = cache.get_stats()["namespaces"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SimilarityAnalyzer memoization")
+    parser.add_argument("--contracts", type=int, default=200, help="Distinct source pairs compared")
+    parser.add_argument("--lines", type=int, default=1_000, help="Lines per source")
+    parser.add_argument("--budget-mb", type=float, default=4.0, help="Content cache budget per namespace")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.contracts, args.lines, args.budget_mb)
+    logger.info("%d pairs of %.0f KB sources", results["contracts"], results["source_kb"])
+    for name in ("previous", "content_cache"):
+        logger.info("  %-14s retained %7.1f MB, repeated compare %.3f ms",
+                    name, results[name]["retained_mb"], results[name]["hit_ms"])
+    for namespace, stats in results["cache_stats"].items():
+        logger.info("  %-20s %5d entries %6.1f MB %5d evictions", namespace,
+                    stats["entries"], stats["bytes"] / 2 ** 20, stats["evictions"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Wallet Clustering Benchmark
+
+Clusters synthetic wallets with the columnar pipeline
+(``build_profile_table`` + ``link_profiles``) in vectorized mode, linking
+pairs either by scoring every tile of the wallet x wallet matrix or through
+the simhash index (``use_simhash_index``), which only scores neighbours
+found by a bulk band-key self-join. The tile scan is quadratic, so it runs
+on a smaller sample and is extrapolated. Materializing ``Wallet`` objects
+for the clusters (``cluster_profiles``) replays their transactions one by
+one and is timed separately, on the sample only.
+
+Usage:
+    python -m tests.performance.benchmark_wallet_clustering --wallets 1000000
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.security.wallet_clustering import WalletClustering
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_transactions(wallets: int, farm_share: float = 0.01, farm_size: int = 50,
+                          seed: int = 11) -> pd.DataFrame:
+    """
+    Synthetic transactions: most wallets behave independently and spread over
+    many contracts; ``farm_share`` of them form farms of ``farm_size`` wallets
+    that each send four identical transactions to their farm's contracts.
+    """
+    rng = np.random.default_rng(seed)
+    addresses = np.array(["0x%040x" % i for i in range(wallets)], dtype=object)
+    contract_count = max(50, wallets // 10)
+    contracts = np.array(["0x%040x" % (2 ** 159 + i) for i in range(contract_count)], dtype=object)
+
+    farms = int(wallets * farm_share) // farm_size
+    farm = np.full(wallets, -1)
+    farm[rng.choice(wallets, size=farms * farm_size, replace=False)] = np.repeat(np.arange(farms), farm_size)
+    tx_per_wallet = np.where(farm >= 0, 4, rng.integers(1, 12, size=wallets))
+    sender = np.repeat(np.arange(wallets), tx_per_wallet)
+    sender_farm = farm[sender]
+    is_farm = sender_farm >= 0
+    n = len(sender)
+
+    return pd.DataFrame({
+        "from": addresses[sender],
+        "to": contracts[np.where(is_farm, (sender_farm * 4 + np.arange(n) % 4) % contract_count,
+                                 rng.integers(0, contract_count, size=n))],
+        "timestamp": np.where(is_farm, 1700000000 + sender_farm, 1700000000 + rng.integers(0, 86400 * 30, size=n)),
+        "gas_price": np.where(is_farm, (20 + sender_farm % 100) * 1e9, rng.integers(10 * 10**9, 200 * 10**9, size=n)),
+        "token_address": contracts[np.where(is_farm, sender_farm % contract_count, rng.integers(0, 10, size=n))],
+        "to_is_contract": True,
+    })
+
+
+def time_clustering(transactions: pd.DataFrame, use_index: bool, min_cluster_size: int,
+                    materialize: bool = True) -> dict:
+    clustering = WalletClustering(
+        vectorized=True, use_simhash_index=use_index, min_cluster_size=min_cluster_size
+    )
+
+    start = time.perf_counter()
+    profiles = clustering.build_profile_table(transactions)
+    profile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    components = clustering.link_profiles(profiles)
+    link_time = time.perf_counter() - start
+
+    cluster_time = None
+    if materialize:
+        start = time.perf_counter()
+        clustering.cluster_profiles(profiles)
+        cluster_time = time.perf_counter() - start
+
+    return {
+        "wallets": len(profiles),
+        "profile_seconds": profile_time,
+        "link_seconds": link_time,
+        "cluster_seconds": cluster_time,
+        "clustered_wallets": sum(len(rows) for rows in components),
+        "clusters": sorted(sorted(profiles.addresses[rows]) for rows in components),
+    }
+
+
+def run_benchmark(wallets: int, sample: int, min_cluster_size: int) -> dict:
+    sample_tx = generate_transactions(sample)
+    tiles = time_clustering(sample_tx, False, min_cluster_size)
+    indexed_sample = time_clustering(sample_tx, True, min_cluster_size)
+
+    indexed = time_clustering(generate_transactions(wallets), True, min_cluster_size, materialize=False)
+
+    scale = (indexed["wallets"] / tiles["wallets"]) ** 2
+    return {
+        "wallets": indexed["wallets"],
+        "sample": tiles["wallets"],
+        "tile_sample_seconds": tiles["link_seconds"],
+        "tile_extrapolated_seconds": tiles["link_seconds"] * scale,
+        "index_sample_seconds": indexed_sample["link_seconds"],
+        "profile_seconds": indexed["profile_seconds"],
+        "index_seconds": indexed["link_seconds"],
+        "materialize_sample_seconds": indexed_sample["cluster_seconds"] - indexed_sample["link_seconds"],
+        "sample_identical": tiles["clusters"] == indexed_sample["clusters"],
+        "clusters": len(indexed["clusters"]),
+        "clustered_wallets": indexed["clustered_wallets"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tile vs index-backed wallet clustering")
+    parser.add_argument("--wallets", type=int, default=1_000_000, help="Wallets to cluster with the index")
+    parser.add_argument("--sample", type=int, default=20_000, help="Wallets for the quadratic tile scan")
+    parser.add_argument("--min-cluster-size", type=int, default=20, help="Smallest cluster to materialize")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.wallets, args.sample, args.min_cluster_size)
+    logger.info("Wallets:                     %d", results["wallets"])
+    logger.info("Link, tile scan, %d wallets: %.2fs", results["sample"], results["tile_sample_seconds"])
+    logger.info("Link, index, %d wallets:     %.2fs", results["sample"], results["index_sample_seconds"])
+    logger.info("Same clusters on sample:     %s", results["sample_identical"])
+    logger.info("Profile table:               %.2fs", results["profile_seconds"])
+    logger.info("Link, index, all wallets:    %.2fs", results["index_seconds"])
+    logger.info("Link, tile scan (extrap.):   %.0fs", results["tile_extrapolated_seconds"])
+    logger.info("Materialize, %d wallets:  %.2fs", results["sample"], results["materialize_sample_seconds"])
+    logger.info("Clusters:                    %d (%d wallets)", results["clusters"], results["clustered_wallets"])
+
+
+if __name__ == "__main__":
+    main()
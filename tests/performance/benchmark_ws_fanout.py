@@ -0,0 +1,125 @@
+"""
+WebSocket Fan-out Benchmark
+
+Broadcasts events to simulated WebSocket subscribers and compares the
+original fan-out (``json.dumps`` per client, ``asyncio.gather`` over every
+send) with the ConnectionManager's pre-serialized payload and per-connection
+send queues. A few subscribers are slow; with ``gather`` every broadcast
+waits for the slowest of them.
+
+Usage:
+    python -m tests.performance.benchmark_ws_fanout --subscribers 10000 --events 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from live.ws_manager import ConnectionManager
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("live.ws_manager").setLevel(logging.WARNING)
+
+EVENT = {
+    "event": "nft_transfer",
+    "block_number": 19000000,
+    "transaction_hash": "0x" + "ab" * 32,
+    "from_address": "0x" + "11" * 20,
+    "to_address": "0x" + "22" * 20,
+    "contract_address": "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d",
+    "token_id": "7804",
+    "price_eth": "42.5",
+    "metadata": {"token_uri": "ipfs://QmeSjSinHpPnmXmspMjwiXyN6zS4E9zccariGR3jxcaWtq/7804"},
+}
+
+
+class SimulatedWebSocket:
+    """Counts frames; slow sockets take ``delay`` seconds per send."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames = 0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.frames += 1
+
+
+def make_sockets(subscribers: int, slow: int, slow_delay: float):
+    return [SimulatedWebSocket(slow_delay if i < slow else 0.0) for i in range(subscribers)]
+
+
+async def legacy_fanout(sockets, events: int) -> float:
+    """The original broadcast: encode per client and wait for every send."""
+    start = time.perf_counter()
+    for n in range(events):
+        message = {"type": "nft_transfer", "data": {**EVENT, "n": n}}
+        await asyncio.gather(*(ws.send_text(json.dumps(message)) for ws in sockets), return_exceptions=True)
+    return time.perf_counter() - start
+
+
+async def queued_fanout(sockets, events: int, queue_size: int, slow: int):
+    """ConnectionManager.broadcast_event: encode once, queue per connection.
+    
+    Returns:
+        Seconds spent in broadcast_event, and seconds until every fast client
+        received every event
+    """
+    manager = ConnectionManager(send_queue_size=queue_size)
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, f"client_{i}")
+        await manager.subscribe(f"client_{i}", ["nft_transfer"])
+        ws.frames = 0
+
+    fast = sockets[slow:]
+    start = time.perf_counter()
+    for n in range(events):
+        await manager.broadcast_event("nft_transfer", {**EVENT, "n": n})
+    broadcast_time = time.perf_counter() - start
+    while not all(ws.frames == events for ws in fast):
+        await asyncio.sleep(0.001)
+    delivery_time = time.perf_counter() - start
+
+    await manager.disconnect_all()
+    return broadcast_time, delivery_time
+
+
+async def run_benchmark(subscribers: int, events: int, slow: int, slow_delay: float, queue_size: int) -> dict:
+    legacy_sockets = make_sockets(subscribers, slow, slow_delay)
+    legacy_time = await legacy_fanout(legacy_sockets, events)
+
+    queued_sockets = make_sockets(subscribers, slow, slow_delay)
+    broadcast_time, delivery_time = await queued_fanout(queued_sockets, events, queue_size, slow)
+
+    return {
+        "subscribers": subscribers,
+        "events": events,
+        "legacy_seconds": legacy_time,
+        "broadcast_seconds": broadcast_time,
+        "delivery_seconds": delivery_time,
+        "speedup": legacy_time / delivery_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket broadcast fan-out")
+    parser.add_argument("--subscribers", type=int, default=10000, help="Simulated subscribers")
+    parser.add_argument("--events", type=int, default=20, help="Events broadcast")
+    parser.add_argument("--slow", type=int, default=10, help="Subscribers with a slow socket")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds per send on a slow socket")
+    parser.add_argument("--queue-size", type=int, default=256, help="Send queue size per connection")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.subscribers, args.events, args.slow, args.slow_delay, args.queue_size))
+    logger.info("Subscribers:        %d", results["subscribers"])
+    logger.info("Events:             %d", results["events"])
+    logger.info("Per-client encode + gather:   %.2fs", results["legacy_seconds"])
+    logger.info("Shared payload, broadcast:    %.2fs", results["broadcast_seconds"])
+    logger.info("Shared payload, delivered:    %.2fs", results["delivery_seconds"])
+    logger.info("Speed-up (delivery):          %.1fx", results["speedup"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Tests for the batch job store backends in core.storage.batch_job_store.
+"""
+import asyncio
+import os
+
+import pytest
+
+import core.storage.batch_job_store as batch_job_store_module
+from core.storage.batch_job_store import BatchJobStore, SQLiteBatchJobStore, get_job_store, iter_job_results
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "file":
+        monkeypatch.setattr(batch_job_store_module, "DATA_DIR", tmp_path)
+        yield BatchJobStore()
+    else:
+        store = SQLiteBatchJobStore(str(tmp_path / "jobs.db"))
+        yield store
+        store.close()
+
+
+def _job(status="processing", results=None):
+    return {"job_id": "job-1", "status": status, "progress": 0, "total": 5, "results": results}
+
+
+def test_roundtrip_progress_and_pages(store):
+    """Both backends overlay progress and page through list results alike."""
+    async def run():
+        await store.create_job("job-1", _job(status="pending"))
+        await store.save_progress("job-1", {"status": "processing", "progress": 3, "total": 5})
+        in_progress = await store.get_job("job-1")
+
+        results = [{"wallet": f"0x{i}", "rank": i + 1} for i in range(5)]
+        await store.update_job("job-1", {**_job(status="completed", results=results), "progress": 5})
+        done = await store.get_job("job-1")
+        page = await store.get_results("job-1", offset=1, limit=2)
+        pages = [p async for p in iter_job_results(store, "job-1", offset=1, page_size=2)]
+        return in_progress, done, page, pages, await store.get_job("missing")
+
+    in_progress, done, page, pages, missing = asyncio.run(run())
+
+    assert in_progress["data"]["status"] == "processing" and in_progress["data"]["progress"] == 3
+    assert done["data"]["status"] == "completed"
+    assert [r["rank"] for r in done["data"]["results"]] == [1, 2, 3, 4, 5]
+    assert [r["rank"] for r in page] == [2, 3]
+    assert [[r["rank"] for r in p] for p in pages] == [[2, 3], [4, 5]]
+    assert missing is None
+
+
+def test_append_then_save_without_results_keeps_rows(store):
+    """Rows appended page by page survive a final save that carries no results."""
+    async def run():
+        await store.create_job("job-1", _job(results=[]))
+        await store.append_results("job-1", [{"rank": 1}, {"rank": 2}])
+        count = await store.append_results("job-1", [{"rank": 3}])
+        await store.update_job("job-1", _job(status="completed"))
+        meta = await store.get_job("job-1", include_results=False)
+        done = await store.get_job("job-1")
+        await store.update_job("job-1", _job(results={"clusters": []}))
+        return count, meta, done, await store.get_results("job-1")
+
+    count, meta, done, cleared = asyncio.run(run())
+    assert count == 3 and meta["result_count"] == 3
+    assert meta["data"]["status"] == "completed"
+    assert [r["rank"] for r in done["data"]["results"]] == [1, 2, 3]
+    assert cleared is None
+    with pytest.raises(KeyError):
+        asyncio.run(store.append_results("missing", [{}]))
+
+
+def test_sqlite_metadata_without_results_and_append(tmp_path):
+    """SQLite reads metadata without result rows and appends without rewriting them."""
+    store = SQLiteBatchJobStore(str(tmp_path / "jobs.db"))
+    try:
+        async def run():
+            await store.save_job("job-1", _job(results=[{"rank": 1}]))
+            count = await store.append_results("job-1", [{"rank": 2}, {"rank": 3}])
+            meta = await store.get_job("job-1", include_results=False)
+            return count, meta, await store.get_results("job-1")
+
+        count, meta, results = asyncio.run(run())
+        assert count == 3 and meta["result_count"] == 3
+        assert meta["data"]["results"] is None
+        assert [r["rank"] for r in results] == [1, 2, 3]
+
+        with pytest.raises(KeyError):
+            asyncio.run(store.append_results("missing", [{}]))
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+    finally:
+        store.close()
+
+
+def test_file_store_pages_without_loading_the_job(tmp_path, monkeypatch):
+    """File pages come from the line-offset index; metadata reads skip the results."""
+    monkeypatch.setattr(batch_job_store_module, "DATA_DIR", tmp_path)
+    store = BatchJobStore()
+
+    async def no_full_load(*args, **kwargs):
+        raise AssertionError("get_results must not load the whole job")
+
+    async def run():
+        await store.save_job("job-1", _job(status="completed", results=[{"rank": i} for i in range(2500)]))
+        meta = await store.get_job("job-1", include_results=False)
+        monkeypatch.setattr(BatchJobStore, "get_job", no_full_load)
+        page = await store.get_results("job-1", offset=1998, limit=4)
+        tail = await store.get_results("job-1", offset=2499)
+        past_end = await store.get_results("job-1", offset=5000, limit=10)
+        pages = [len(p) async for p in iter_job_results(store, "job-1", page_size=1000)]
+        return meta, page, tail, past_end, pages
+
+    meta, page, tail, past_end, pages = asyncio.run(run())
+    assert meta["result_count"] == 2500 and meta["data"]["results"] is None
+    assert [r["rank"] for r in page] == [1998, 1999, 2000, 2001]
+    assert tail == [{"rank": 2499}] and past_end == []
+    assert pages == [1000, 1000, 500]
+
+
+def test_sqlite_cleanup_and_non_list_results(tmp_path):
+    """Dict results stay in the job JSON; cleanup removes stale jobs and their rows."""
+    store = SQLiteBatchJobStore(str(tmp_path / "jobs.db"))
+    try:
+        async def run():
+            await store.save_job("wallets", _job(results={"clusters": [[1, 2]]}))
+            await store.save_job("ranking", _job(results=[{"rank": 1}]))
+            kept = await store.get_job("wallets")
+            no_pages = await store.get_results("wallets")
+            store._conn.execute("UPDATE batch_jobs SET updated_at = 0 WHERE job_id = 'ranking'")
+            deleted = await store.cleanup_old_jobs(max_age_days=7)
+            return kept, no_pages, deleted, await store.get_job("ranking")
+
+        kept, no_pages, deleted, gone = asyncio.run(run())
+        assert kept["data"]["results"] == {"clusters": [[1, 2]]} and no_pages is None
+        assert deleted == 1 and gone is None
+        assert store._conn.execute("SELECT COUNT(*) FROM batch_job_results").fetchone()[0] == 0
+    finally:
+        store.close()
+
+
+def test_get_job_store_backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_job_store_module.settings, "BATCH_JOB_STORE_PATH", str(tmp_path / "x.db"))
+    assert isinstance(get_job_store("file"), BatchJobStore)
+    sqlite_store = get_job_store("SQLite")
+    assert isinstance(sqlite_store, SQLiteBatchJobStore) and os.path.exists(tmp_path / "x.db")
+    sqlite_store.close()
+    with pytest.raises(ValueError):
+        get_job_store("redis")
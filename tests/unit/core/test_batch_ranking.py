@@ -0,0 +1,192 @@
+"""
+Tests for sharded batch ranking in core.batch_ranking.
+"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.batch_ranking import (
+    BatchRankingExecutor,
+    RankingOptions,
+    build_population_features,
+    ranking_records,
+    score_frame,
+)
+
+
+def _predict_length(model, X):
+    """Module-level predictor so it pickles into worker processes."""
+    return np.full(len(X), float(model))
+
+
+def _generate_chunks(rows=230, chunk_rows=100):
+    df = pd.DataFrame({
+        "wallet": [f"0x{i % 17:040x}" for i in range(rows)],
+        "token_id": [str(i * 7919) for i in range(rows)],
+        "timestamp": pd.Timestamp("2023-01-01", tz="UTC") + pd.to_timedelta(range(rows), unit="s"),
+        "gas_price": np.linspace(10, 120, rows),
+    })
+    return [df.iloc[start:start + chunk_rows] for start in range(0, rows, chunk_rows)]
+
+
+def _row_by_row(chunks, options):
+    """Reference: the per-row scoring loop the batch endpoint used to run."""
+    from core.features import extract_features
+    results = []
+    for chunk in chunks:
+        df = extract_features(chunk)
+        for _, row in df.iterrows():
+            symbolic = row.get("token_entropy", 0) + row.get("wallet_entropy", 0)
+            model_score = options.model if options.uses_model else 0
+            weights = options.weights or {"symbolic": 0.5, "ml": 0.5}
+            hybrid = weights["symbolic"] * symbolic + weights["ml"] * model_score
+            results.append((row["wallet"], row["token_id"], float(hybrid)))
+    results.sort(key=lambda x: x[2], reverse=True)
+    return results
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_sharded_ranking_matches_row_loop(max_workers):
+    """Shards scored in parallel rank exactly like the old row-by-row loop."""
+    chunks = _generate_chunks()
+    options = RankingOptions(weights={"symbolic": 0.3, "ml": 0.7}, model=2.0, predict=_predict_length)
+    executor = BatchRankingExecutor(max_workers=max_workers, shard_rows=40)
+    progress = []
+
+    async def on_progress(rows_done):
+        progress.append(rows_done)
+
+    try:
+        ranked = asyncio.run(executor.rank(chunks, options, on_progress=on_progress))
+    finally:
+        executor.shutdown()
+
+    expected = _row_by_row(chunks, options)
+    assert list(zip(ranked["wallet"], ranked["token_id"])) == [(w, t) for w, t, _ in expected]
+    assert np.allclose(ranked["hybrid_score"], [s for _, _, s in expected])
+    assert list(ranked["rank"]) == list(range(1, 231))
+    assert progress == sorted(progress) and progress[-1] == 230
+
+
+class _CountingModel:
+    """Model constant that counts how often it is pickled in this process."""
+    pickles = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __float__(self):
+        return self.value
+
+    def __getstate__(self):
+        type(self).pickles += 1
+        return self.__dict__
+
+
+def test_model_is_sent_once_per_worker_not_per_shard():
+    """The pool initializer installs the model; shards are shipped without it."""
+    chunks = _generate_chunks()
+    options = RankingOptions(model=_CountingModel(2.0), predict=_predict_length)
+    executor = BatchRankingExecutor(max_workers=2, shard_rows=20)
+    try:
+        ranked = asyncio.run(executor.rank(chunks, options))
+    finally:
+        executor.shutdown()
+
+    assert np.allclose(ranked["model_score"], 2.0)
+    # 12 shards, at most one copy per worker process
+    assert _CountingModel.pickles <= 2
+
+
+def test_concurrent_jobs_with_different_models_keep_their_pools():
+    """A job with another model neither tears down nor waits for a running job's pool."""
+    chunks = _generate_chunks()
+    first = RankingOptions(model=2.0, predict=_predict_length)
+    second = RankingOptions(model=5.0, predict=_predict_length)
+    executor = BatchRankingExecutor(max_workers=2, shard_rows=20)
+
+    async def run():
+        return await asyncio.gather(executor.rank(chunks, first), executor.rank(chunks, second))
+
+    try:
+        ranked_first, ranked_second = asyncio.run(run())
+        # Only the pool of the most recent model is kept once both jobs are done
+        assert len(executor._pools) == 1 and executor._pools[0].model == 5.0
+    finally:
+        executor.shutdown()
+
+    assert np.allclose(ranked_first["model_score"], 2.0)
+    assert np.allclose(ranked_second["model_score"], 5.0)
+
+
+def test_population_features_do_not_depend_on_chunking():
+    """Drop-wide features from the pre-pass give the same ranking for any chunk or shard size."""
+    options = RankingOptions(
+        include_ml=False,
+        symbolic_columns=("wallet_graph_entropy", "fibonacci_mint_ratio", "golden_ratio_alignment"),
+    )
+    assert options.needs_population
+    whole = _generate_chunks(chunk_rows=230)
+    chunks = _generate_chunks(chunk_rows=100)
+    executor = BatchRankingExecutor(max_workers=0, shard_rows=40)
+
+    async def run():
+        reference = await BatchRankingExecutor(max_workers=0, shard_rows=1000).rank(whole, options)
+        population = await build_population_features(chunks)
+        chunked = await executor.rank(chunks, options, population=population)
+        unpinned = await executor.rank(chunks, options)
+        return reference, chunked, unpinned
+
+    reference, chunked, unpinned = asyncio.run(run())
+    assert np.allclose(chunked["hybrid_score"], reference["hybrid_score"])
+    assert list(chunked["token_id"]) == list(reference["token_id"])
+    # Without the pre-pass each shard only sees its own rows
+    assert not np.allclose(unpinned["hybrid_score"], reference["hybrid_score"])
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_spooled_ranking_matches_in_memory(max_workers, tmp_path):
+    """Pages read back from the on-disk spool equal the in-memory ranking records."""
+    chunks = _generate_chunks()
+    options = RankingOptions(model=2.0, predict=_predict_length)
+    executor = BatchRankingExecutor(max_workers=max_workers, shard_rows=40)
+
+    async def run():
+        ranked = await executor.rank(chunks, options)
+        spool = await executor.rank_spooled(chunks, options, directory=str(tmp_path))
+        try:
+            pages = [page async for page in spool.aiter_pages(100)]
+            return ranked, pages, len(spool), spool.path
+        finally:
+            spool.close()
+
+    try:
+        ranked, pages, rows, path = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert [len(page) for page in pages] == [100, 100, 30] and rows == 230
+    assert [r for page in pages for r in page] == ranking_records(ranked)
+    assert not (tmp_path / path).exists()
+
+
+def test_score_frame_modes_and_records():
+    """Symbolic-only scoring leaves model_score empty in the API records."""
+    df = pd.DataFrame({"wallet": ["a", "b"], "token_id": ["1", "2"], "token_entropy": [1.0, 3.0]})
+    scored = score_frame(df, RankingOptions(include_ml=False))
+    assert list(scored["hybrid_score"]) == [1.0, 3.0]
+
+    ranked = scored.iloc[::-1].reset_index(drop=True).assign(rank=[1, 2])
+    records = ranking_records(ranked)
+    assert records[0] == {"wallet": "b", "token_id": "2", "hybrid_score": 3.0,
+                          "model_score": None, "symbolic_score": 3.0, "rank": 1}
+
+
+def test_empty_job_and_invalid_shard_size():
+    executor = BatchRankingExecutor(max_workers=0)
+    ranked = asyncio.run(executor.rank([], RankingOptions()))
+    assert ranked.empty and "rank" in ranked.columns
+    with pytest.raises(ValueError):
+        BatchRankingExecutor(shard_rows=0)
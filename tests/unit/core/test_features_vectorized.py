@@ -0,0 +1,107 @@
+"""
+Parity tests for the vectorized feature pipeline in core.features.
+"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.features import FEATURE_REGISTRY, classify_gas_tier, classify_mint_phase, extract_features
+from utils.address_symmetry import address_symmetry_features
+from utils.bitwise import bitwise_features
+from utils.entropy import digit_root, entropy, prime_factor_count
+from utils.temporal import GOLDEN_RATIO
+
+
+def _generate_drop(rows=600, seed=5):
+    """Synthetic drop with repeated wallets/tokens, large IDs and tz-aware timestamps."""
+    rng = random.Random(seed)
+    wallets = ["0x%040x" % rng.getrandbits(160) for _ in range(rows // 6)]
+    wallets += ["0x" + "ab" * 10 + "ba" * 10, "0x" + "0" * 40]
+    tokens = [rng.randint(0, 5000) for _ in range(rows // 3)] + [0, 1, 7, 999983, 2**64, 10**30]
+    start = pd.Timestamp("2023-01-01T00:00:00Z")
+    return pd.DataFrame({
+        "wallet": [rng.choice(wallets) for _ in range(rows)],
+        "token_id": [rng.choice(tokens) for _ in range(rows)],
+        "timestamp": [(start + pd.Timedelta(seconds=rng.randint(0, 86400 * 5))).isoformat()
+                      for _ in range(rows)],
+        "gas_price": [rng.choice([np.nan, rng.uniform(10, 120)]) for _ in range(rows)],
+    })
+
+
+def _legacy_features(df):
+    """The original per-row implementation of the symbolic and contextual columns."""
+    df = df.copy()
+    df["token_id"] = df["token_id"].astype(str)
+    df["token_mod9"] = df["token_id"].apply(lambda x: int(x) % 9 if x.isdigit() else np.nan)
+    df["token_root"] = df["token_id"].apply(lambda x: digit_root(int(x)) if x.isdigit() else np.nan)
+    df["token_entropy"] = df["token_id"].apply(lambda x: entropy(str(x)) if pd.notnull(x) else np.nan)
+    df["token_prime_factors"] = df["token_id"].apply(lambda x: prime_factor_count(int(x)) if x.isdigit() else np.nan)
+    df["wallet_entropy"] = df["wallet"].apply(lambda x: entropy(str(x)) if pd.notnull(x) else np.nan)
+    df["wallet_root"] = df["wallet"].apply(lambda x: digit_root(int(x, 16)) if pd.notnull(x) else np.nan)
+    df["wallet_palindrome"] = df["wallet"].apply(lambda w: address_symmetry_features(w)["is_palindrome"])
+    df["token_bit_entropy"] = df["token_id"].apply(lambda t: bitwise_features(int(t))["bit_entropy"])
+    df["mint_phase"] = df["timestamp"].apply(classify_mint_phase)
+    df["gas_tier"] = df["gas_price"].apply(classify_gas_tier)
+    return df
+
+
+def test_vectorized_features_match_legacy_rows():
+    """Every per-row symbolic column matches the original apply-based output."""
+    df = _generate_drop()
+    expected = _legacy_features(df)
+    result = extract_features(df)
+
+    assert list(result["token_id"]) == list(expected["token_id"])
+    for column in ["token_mod9", "token_root", "token_prime_factors", "wallet_root",
+                   "wallet_palindrome", "token_bit_entropy"]:
+        np.testing.assert_array_equal(result[column].to_numpy(dtype=float),
+                                      expected[column].to_numpy(dtype=float), err_msg=column)
+    for column in ["token_entropy", "wallet_entropy"]:
+        np.testing.assert_allclose(result[column], expected[column], rtol=0, atol=1e-12, err_msg=column)
+    for column in ["mint_phase", "gas_tier"]:
+        assert list(result[column]) == list(expected[column]), column
+
+
+def test_registry_computes_only_requested_features():
+    """Selecting features skips the rest and keeps the input columns."""
+    df = _generate_drop(rows=60)
+    result = extract_features(df, features=["token_mod9", "gas_tier"])
+
+    assert list(result.columns) == list(df.columns) + ["token_mod9", "gas_tier"]
+    assert list(extract_features(df).columns) == list(df.columns) + list(FEATURE_REGISTRY)
+
+
+def test_missing_columns():
+    """Contextual features fall back to NaN; symbolic ones fail loudly."""
+    df = _generate_drop(rows=30).drop(columns=["timestamp", "gas_price"])
+
+    result = extract_features(df, features=["mint_phase", "gas_tier"])
+    assert result["mint_phase"].isna().all() and result["gas_tier"].isna().all()
+
+    with pytest.raises(ValueError, match="timestamp"):
+        extract_features(df, features=["fibonacci_mint_ratio"])
+    with pytest.raises(ValueError, match="Unknown"):
+        extract_features(df, features=["no_such_feature"])
+
+
+def test_temporal_features_follow_mint_order():
+    """Interval features are per mint and follow timestamp order, not row order."""
+    gaps = [1, 2, 3, 5, 8, 13, 100]
+    seconds = np.cumsum([0] + gaps)
+    shuffled = [6, 0, 3, 7, 1, 5, 2, 4]
+    df = pd.DataFrame({
+        "wallet": ["0x" + "1" * 40] * len(seconds),
+        "token_id": range(len(seconds)),
+        "timestamp": pd.to_datetime(seconds[shuffled], unit="s"),
+    })
+
+    result = extract_features(df, features=["fibonacci_mint_ratio", "golden_ratio_alignment"])
+    fib = result["fibonacci_mint_ratio"].to_numpy()[np.argsort(shuffled)]
+    golden = result["golden_ratio_alignment"].to_numpy()[np.argsort(shuffled)]
+
+    np.testing.assert_array_equal(fib, [0, 1, 1, 1, 1, 1, 1, 0])
+    # 13 / 8 is within 1% of phi; 100 / 13 is far off
+    assert golden[6] == pytest.approx(1 - abs(1 - (13 / 8) / GOLDEN_RATIO) / 0.1)
+    assert golden[0] == golden[1] == golden[7] == 0.0
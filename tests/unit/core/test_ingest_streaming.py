@@ -0,0 +1,73 @@
+"""
+Tests for chunked drop ingest in core.ingest.
+"""
+import asyncio
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from core.ingest import count_drop_rows, iter_drop_chunks, read_drop_columns, spool_upload
+
+
+def _write_drop(path, rows=25):
+    lines = ["wallet,token_id,timestamp,gas_price,extra"]
+    for i in range(rows):
+        # Alternate Unix seconds and ISO-8601 timestamps; token IDs beyond int64
+        ts = str(1672531200 + i) if i % 2 else f"2023-01-01T00:00:{i:02d}Z"
+        lines.append(f"0x{i % 4:040x},{10**30 + i},{ts},{30 + i},x{i}")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_chunks_cover_file_with_dtypes(tmp_path):
+    """Chunks are bounded, keep global row numbers and normalize column types."""
+    path = tmp_path / "drop.csv"
+    _write_drop(path)
+
+    chunks = list(iter_drop_chunks(str(path), chunk_rows=10))
+    df = pd.concat(chunks)
+
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert list(df.index) == list(range(25)) == list(range(count_drop_rows(str(path))))
+    assert df["token_id"].iloc[3] == str(10**30 + 3)
+    assert str(df["timestamp"].dtype) == "datetime64[ns, UTC]"
+    assert (df["timestamp"] == pd.Timestamp("2023-01-01", tz="UTC") + pd.to_timedelta(range(25), unit="s")).all()
+    assert df["gas_price"].dtype == "float64"
+    assert list(df["extra"]) == [f"x{i}" for i in range(25)]
+
+
+def test_validation_errors(tmp_path):
+    """Missing columns fail before reading rows; bad values name their rows."""
+    path = tmp_path / "drop.csv"
+    path.write_text("wallet,token_id\n0x1,1\n")
+    with pytest.raises(ValueError, match="timestamp"):
+        next(iter_drop_chunks(str(path)))
+    assert read_drop_columns(str(path)) == ["wallet", "token_id"]
+
+    path.write_text("wallet,token_id,timestamp,gas_price\n0x1,1,1672531200,1\n0x2,2,not-a-date,1\n")
+    with pytest.raises(ValueError, match=r"rows \[1\]"):
+        list(iter_drop_chunks(str(path)))
+
+
+def test_spool_upload_copies_blocks(tmp_path):
+    """Uploads are copied to disk in blocks, keeping the original extension."""
+    payload = b"wallet,token_id,timestamp,gas_price\n" + b"0x1,1,1672531200,1\n" * 1000
+
+    class Upload:
+        filename = "mints.CSV"
+
+        def __init__(self):
+            self._buffer = io.BytesIO(payload)
+
+        async def read(self, size=-1):
+            return self._buffer.read(size)
+
+    path = asyncio.run(spool_upload(Upload(), directory=str(tmp_path), block_bytes=100))
+    try:
+        assert path.endswith(".csv") and os.path.dirname(path) == str(tmp_path)
+        with open(path, "rb") as f:
+            assert f.read() == payload
+        assert count_drop_rows(path) == 1000
+    finally:
+        os.remove(path)
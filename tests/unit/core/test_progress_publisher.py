@@ -0,0 +1,75 @@
+"""
+Tests for time-coalesced progress publishing in core.progress.
+"""
+import asyncio
+
+from core.progress import ProgressPublisher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingStore:
+    def __init__(self):
+        self.records = []
+
+    async def save_progress(self, job_id, record):
+        self.records.append((job_id, record["progress"]))
+
+
+def test_updates_are_coalesced_by_time():
+    """Only the first update of each interval is published; the rest wait for flush."""
+    async def run():
+        clock = FakeClock()
+        store = RecordingStore()
+        notified = []
+
+        async def notify(record):
+            notified.append(record["progress"])
+
+        publisher = ProgressPublisher("job", store=store, notify=notify, max_rate=2, clock=clock)
+        for i in range(1, 101):
+            clock.now = i * 0.01
+            await publisher.update(i, 100, "processing")
+        await publisher.close()
+        return store.records, notified, publisher
+
+    records, notified, publisher = asyncio.run(run())
+
+    # Publishes at t=0.01, t=0.51 and the final flush
+    assert [p for _, p in records] == notified == [1, 51, 100]
+    assert publisher.published == 3
+    assert publisher.latest["message"] == "Processed 100 of 100 items"
+
+
+def test_trailing_publish_after_interval():
+    """A coalesced update is published by the timer even without a flush."""
+    async def run():
+        store = RecordingStore()
+        publisher = ProgressPublisher("job", store=store, max_rate=50)
+        await publisher.update(1, 3, "processing")
+        await publisher.update(2, 3, "processing")
+        await asyncio.sleep(0.1)
+        await publisher.close()
+        return store.records
+
+    assert asyncio.run(run()) == [("job", 1), ("job", 2)]
+
+
+def test_publish_errors_do_not_fail_the_job():
+    class BrokenStore:
+        async def save_progress(self, job_id, record):
+            raise OSError("disk full")
+
+    async def run():
+        publisher = ProgressPublisher("job", store=BrokenStore(), max_rate=0)
+        await publisher.update(1, 1, "processing")
+        await publisher.close()
+        return publisher.published
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,109 @@
+"""
+Tests for the shared pooled JSON-RPC clients in core.rpc_client.
+"""
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.multi_chain_config import ChainType, NetworkConfig
+from core.rpc_client import (
+    AsyncJsonRpcClient,
+    close_rpc_clients,
+    get_network_client,
+    get_rpc_client,
+)
+from services.multi_chain_service import MultiChainService
+
+ADDRESS = "0x" + "ab" * 20
+
+
+def _answer(request):
+    method, params = request["method"], request.get("params", [])
+    result = {
+        "eth_chainId": "0x1",
+        "eth_blockNumber": "0x2a",
+        "eth_getBalance": hex(3 * 10 ** 18),
+        "eth_getTransactionByHash": {"from": ADDRESS, "to": None, "value": "0x10", "gas": "0x5208",
+                                     "gasPrice": "0x1", "nonce": "0x0", "blockNumber": "0x2a", "input": "0x"},
+    }.get(method)
+    return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+async def _serve(started):
+    async def handle(request):
+        started.append(time.monotonic())
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([_answer(item) for item in payload])
+        return web.json_response(_answer(payload))
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def _network(url, requests_per_second=10, batch_size=100):
+    return NetworkConfig(chain_id=1, name="Test", symbol="ETH", rpc_url=url, explorer_url="",
+                         native_currency="Ether", requests_per_second=requests_per_second,
+                         batch_size=batch_size)
+
+
+def test_shared_clients_take_limits_from_network_config():
+    async def run():
+        network = _network("http://node.invalid/", requests_per_second=4, batch_size=25)
+        client = get_network_client(network)
+        try:
+            assert get_network_client(network) is client
+            assert get_rpc_client(network.rpc_url) is client
+            assert (client.max_concurrency, client.batch_size) == (4, 25)
+        finally:
+            await close_rpc_clients()
+        assert get_rpc_client(network.rpc_url) is not client
+        await close_rpc_clients()
+
+    asyncio.run(run())
+
+
+def test_requests_per_second_spaces_request_starts():
+    async def run():
+        started = []
+        server = await _serve(started)
+        try:
+            async with AsyncJsonRpcClient(str(server.make_url("/")), max_concurrency=5,
+                                          requests_per_second=20) as client:
+                await asyncio.gather(*(client.call("eth_blockNumber") for _ in range(5)))
+        finally:
+            await server.close()
+        return started
+
+    started = asyncio.run(run())
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert len(started) == 5 and min(gaps) >= 0.04
+
+
+def test_multi_chain_service_reads_through_shared_client():
+    async def run():
+        server = await _serve([])
+        service = MultiChainService()
+        try:
+            network = _network(str(server.make_url("/")))
+            service.rpc_clients[ChainType.ETHEREUM] = get_network_client(network)
+            return (
+                await service._test_evm_connection(ChainType.ETHEREUM),
+                await service._get_evm_block_number(ChainType.ETHEREUM),
+                await service._get_evm_balance(ChainType.ETHEREUM, ADDRESS),
+                await service._get_evm_transaction(ChainType.ETHEREUM, "0x" + "00" * 32),
+            )
+        finally:
+            await close_rpc_clients()
+            await server.close()
+
+    connected, block, balance, tx = asyncio.run(run())
+    assert connected and block == 42
+    assert balance["balance_wei"] == 3 * 10 ** 18 and balance["balance_decimal"] == 3.0
+    assert (tx["value"], tx["gas"], tx["block_number"]) == (16, 21000, 42)
@@ -0,0 +1,107 @@
+"""
+Tests for the latency-aware provider router in core.rpc_router.
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.rpc_client import JsonRpcError, close_rpc_clients
+from core.rpc_router import NoHealthyProviderError, RpcRouter
+
+
+async def _serve(delay=0.0, status=200, hits=None):
+    """Node stand-in answering every call with its port after ``delay`` seconds."""
+    async def handle(request):
+        if hits is not None:
+            hits.append(request.url.port)
+        await asyncio.sleep(delay)
+        if status != 200:
+            return web.Response(status=status)
+        payload = await request.json()
+        if payload["method"] == "eth_call":
+            return web.json_response({"jsonrpc": "2.0", "id": payload["id"],
+                                      "error": {"code": 3, "message": "execution reverted"}})
+        return web.json_response({"jsonrpc": "2.0", "id": payload["id"], "result": request.url.port})
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def test_routes_to_fastest_provider():
+    async def run():
+        slow, fast = await _serve(delay=0.05), await _serve()
+        router = RpcRouter("test", [str(slow.make_url("/")), str(fast.make_url("/"))])
+        try:
+            answers = [await router.call("eth_blockNumber") for _ in range(6)]
+            return answers, fast.port, router.get_stats()
+        finally:
+            await close_rpc_clients()
+            await slow.close()
+            await fast.close()
+
+    answers, fast_port, stats = asyncio.run(run())
+    # Each endpoint is measured once, then every call goes to the fast one
+    assert answers[2:] == [fast_port] * 4
+    slow_stats, fast_stats = stats["endpoints"]
+    assert stats["best_provider"] == fast_stats["url"]
+    assert (slow_stats["requests"], fast_stats["requests"]) == (1, 5)
+    assert slow_stats["p50_ms"] >= 50 > fast_stats["p99_ms"]
+
+
+def test_hedged_request_wins_over_stalled_provider():
+    async def run():
+        stalled, spare = await _serve(delay=1.0), await _serve()
+        router = RpcRouter("test", [str(stalled.make_url("/")), str(spare.make_url("/"))], hedge_after=0.05)
+        loop = asyncio.get_running_loop()
+        try:
+            started = loop.time()
+            answer = await router.call("eth_blockNumber")
+            return answer, loop.time() - started, spare.port, router.get_stats()
+        finally:
+            await close_rpc_clients()
+            await stalled.close()
+            await spare.close()
+
+    answer, elapsed, spare_port, stats = asyncio.run(run())
+    assert answer == spare_port and elapsed < 0.5
+    stalled_stats, spare_stats = stats["endpoints"]
+    assert (spare_stats["hedges"], spare_stats["hedge_wins"]) == (1, 1)
+    # The cancelled primary request is neither a success nor a failure
+    assert stalled_stats["requests"] == 0
+
+
+def test_failover_opens_circuit_and_keeps_rpc_errors():
+    async def run():
+        hits = []
+        broken, healthy = await _serve(status=502, hits=hits), await _serve(hits=hits)
+        broken_url = str(broken.make_url("/"))
+        router = RpcRouter("test", [broken_url, str(healthy.make_url("/"))], failure_threshold=1)
+        solo = RpcRouter("solo", [broken_url], failure_threshold=1)
+        try:
+            answers = [await router.call("eth_blockNumber") for _ in range(3)]
+            with pytest.raises(JsonRpcError):
+                await router.call("eth_call", [{}, "latest"])
+
+            with pytest.raises(Exception):
+                await solo.call("eth_blockNumber")
+            with pytest.raises(NoHealthyProviderError):
+                await solo.call("eth_blockNumber")
+            return answers, healthy.port, hits.count(broken.port), router.get_stats()
+        finally:
+            await close_rpc_clients()
+            await broken.close()
+            await healthy.close()
+
+    answers, healthy_port, broken_hits, stats = asyncio.run(run())
+    assert answers == [healthy_port] * 3
+    broken_stats, healthy_stats = stats["endpoints"]
+    assert broken_stats["error_rate"] == 1.0 and broken_stats["circuit_state"] == "open"
+    # One failure from each router, then the open circuit keeps calls away
+    assert broken_hits == 2 and not broken_stats["available"]
+    # A JSON-RPC error is an answer, not a provider failure
+    assert (healthy_stats["requests"], healthy_stats["errors"]) == (4, 0)
@@ -0,0 +1,100 @@
+"""
+Tests for the scalable clustering modes of WalletClustering.
+"""
+import random
+
+import pytest
+
+from core.security.wallet_clustering import WalletClustering, WalletCluster
+
+
+def _generate_transactions(wallet_count, seed=3):
+    """Synthetic transactions with a farm of identically behaving wallets."""
+    rng = random.Random(seed)
+    wallets = ["0x%040x" % rng.getrandbits(160) for _ in range(wallet_count)]
+    contracts = ["0x" + "0" * 38 + "%02x" % i for i in range(20)]
+    transactions = []
+    for k, wallet in enumerate(wallets):
+        farm = k < wallet_count // 5
+        for _ in range(4 if farm else rng.randint(1, 20)):
+            to = rng.choice(contracts) if farm or rng.random() < 0.9 else rng.choice(wallets)
+            transactions.append({
+                "from": wallet,
+                "to": to,
+                "timestamp": 1700000000 + rng.randint(0, 86400 * 10),
+                "gas_price": 25 * 10**9 if farm else rng.randint(10, 200) * 10**9,
+                "token_address": rng.choice(contracts[:5]),
+                "to_is_contract": to in contracts,
+            })
+    return transactions
+
+
+def test_indexed_clustering_matches_exhaustive():
+    """Index-backed clustering produces the same clusters as the exhaustive scan."""
+    transactions = _generate_transactions(300)
+
+    results = []
+    for use_index in (False, True):
+        clustering = WalletClustering(use_simhash_index=use_index)
+        wallets = clustering.build_wallet_profiles(transactions)
+        clusters = clustering.cluster_wallets(wallets)
+        results.append(sorted(sorted(c.addresses) for c in clusters))
+
+    assert results[0] == results[1]
+    assert results[1]
+
+
+def _pairwise_components(clustering, wallets, min_size):
+    """Reference single-linkage clustering using the scalar similarity."""
+    wallet_list = list(wallets.values())
+    parent = list(range(len(wallet_list)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i in range(len(wallet_list)):
+        for j in range(i + 1, len(wallet_list)):
+            single = WalletCluster(wallet_list[j])
+            if clustering._calculate_similarity(wallet_list[i], single) >= clustering.hybrid_threshold:
+                parent[find(i)] = find(j)
+
+    groups = {}
+    for i, wallet in enumerate(wallet_list):
+        groups.setdefault(find(i), []).append(wallet.address)
+    return sorted(sorted(g) for g in groups.values() if len(g) >= min_size)
+
+
+@pytest.mark.parametrize("threshold", [0.6, 0.8])
+def test_vectorized_clustering_matches_pairwise_linkage(threshold):
+    """Blockwise union-find links exactly the pairs the scalar score accepts."""
+    transactions = _generate_transactions(200)
+    clustering = WalletClustering(
+        hybrid_similarity_threshold=threshold, vectorized=True, block_size=32
+    )
+    wallets = clustering.build_wallet_profiles(transactions)
+
+    clusters = clustering.cluster_wallets(wallets)
+
+    expected = _pairwise_components(clustering, wallets, clustering.min_cluster_size)
+    assert sorted(sorted(c.addresses) for c in clusters) == expected
+
+
+@pytest.mark.parametrize("threshold,block_size", [(0.65, 4), (0.7, 64)])
+def test_vectorized_index_mode_matches_tiles(threshold, block_size):
+    """Bulk neighbour linking equals the full tile scan when every passing pair is a simhash neighbour."""
+    transactions = _generate_transactions(300)
+    # Without an interaction a pair needs 0.4 * cosine + 0.3 * (1 - d / 32) >= threshold,
+    # so no pair beyond 5 bits can pass at either threshold
+    results = []
+    for use_index in (False, True):
+        clustering = WalletClustering(
+            simhash_threshold=6, hybrid_similarity_threshold=threshold,
+            vectorized=True, use_simhash_index=use_index, block_size=block_size
+        )
+        clusters = clustering.cluster_profiles(clustering.build_profile_table(transactions))
+        results.append(sorted(sorted(c.addresses) for c in clusters))
+
+    assert results[0] == results[1]
+    assert results[1]
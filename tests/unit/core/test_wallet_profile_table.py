@@ -0,0 +1,106 @@
+"""
+Tests for the columnar wallet profile builder.
+"""
+import random
+
+import numpy as np
+import pandas as pd
+
+from core.security.wallet_clustering import WalletClustering
+
+CONTRACTS = ["0x" + "0" * 38 + "%02x" % i for i in range(10)]
+
+
+def _generate_transactions(wallet_count=150, seed=9):
+    """Synthetic transactions mixing Unix and ISO timestamps and optional fields."""
+    rng = random.Random(seed)
+    wallets = ["0x%040x" % rng.getrandbits(160) for _ in range(wallet_count)]
+    transactions = []
+    for k, wallet in enumerate(wallets):
+        farm = k < wallet_count // 4
+        for n in range(3 if farm else rng.randint(1, 12)):
+            to = rng.choice(CONTRACTS) if farm or rng.random() < 0.8 else rng.choice(wallets)
+            tx = {
+                "from": wallet,
+                "to": to,
+                "timestamp": 1700000000 + rng.randint(0, 86400 * 10),
+                "gas_price": 30 * 10**9 if farm else rng.randint(10, 200) * 10**9,
+                "to_is_contract": to in CONTRACTS,
+            }
+            if n % 2 == 0:
+                tx["token_address"] = rng.choice(CONTRACTS[:4])
+            if rng.random() < 0.1:
+                tx["timestamp"] = "2024-02-%02dT12:00:00Z" % rng.randint(1, 28)
+            transactions.append(tx)
+    return transactions
+
+
+def test_profile_table_matches_wallet_objects():
+    """Columnar aggregates, fingerprints and vectors match build_wallet_profiles."""
+    transactions = _generate_transactions()
+    clustering = WalletClustering()
+
+    wallets = clustering.build_wallet_profiles(transactions)
+    profiles = clustering.build_profile_table(pd.DataFrame(transactions))
+
+    assert list(profiles.addresses) == list(wallets)
+    for i, address in enumerate(profiles.addresses):
+        wallet = wallets[address]
+        assert profiles.transaction_count[i] == wallet.transaction_count
+        assert profiles.active_day_count[i] == len(wallet.active_days)
+        assert profiles.contract_count[i] == len(wallet.interacted_contracts)
+        assert profiles.token_count[i] == len(wallet.interacted_tokens)
+        assert int(profiles.fingerprints[i]) == wallet.behavior_fingerprint
+        np.testing.assert_allclose(profiles.activity_vectors[i], wallet.activity_vector, atol=1e-6)
+
+
+def test_cluster_profiles_matches_cluster_wallets():
+    """Vectorized clustering of profiles matches clustering of Wallet objects."""
+    transactions = _generate_transactions()
+    clustering = WalletClustering(hybrid_similarity_threshold=0.6, vectorized=True, block_size=64)
+
+    expected = clustering.cluster_wallets(clustering.build_wallet_profiles(transactions))
+    clusters = clustering.cluster_profiles(clustering.build_profile_table(transactions))
+
+    assert sorted(sorted(c.addresses) for c in clusters) == sorted(sorted(c.addresses) for c in expected)
+    assert all(len(c.wallets) >= clustering.min_cluster_size for c in clusters)
+
+
+def test_materialize_only_requested_wallets():
+    """Materialization builds full Wallet objects for the requested addresses only."""
+    transactions = _generate_transactions()
+    clustering = WalletClustering()
+    profiles = clustering.build_profile_table(transactions)
+    reference = clustering.build_wallet_profiles(transactions)
+
+    requested = list(profiles.addresses[:5])
+    wallets = profiles.materialize(requested)
+
+    assert sorted(wallets) == sorted(requested)
+    for address in requested:
+        assert wallets[address].active_days == reference[address].active_days
+        assert wallets[address].interacted_contracts == reference[address].interacted_contracts
+
+
+def test_missing_timestamps_count_as_transactions_not_days():
+    """NaN/NaT timestamps are masked, not mapped onto another day; extra columns are not kept."""
+    transactions = _generate_transactions(wallet_count=40)
+    for tx in transactions[::7]:
+        tx["timestamp"] = None
+    df = pd.DataFrame(transactions).assign(payload=["x" * 100] * len(transactions))
+    clustering = WalletClustering()
+
+    wallets = clustering.build_wallet_profiles(transactions)
+    profiles = clustering.build_profile_table(df)
+
+    assert "payload" not in profiles.transactions.columns
+    for i, address in enumerate(profiles.addresses):
+        assert profiles.transaction_count[i] == wallets[address].transaction_count
+        assert profiles.active_day_count[i] == len(wallets[address].active_days)
+
+    # A wallet whose only transaction has no timestamp has no active days
+    undated = pd.DataFrame([{"from": "0xa", "to": CONTRACTS[0], "timestamp": pd.NaT},
+                            {"from": "0xb", "to": CONTRACTS[0], "timestamp": 1700000000}])
+    profiles = clustering.build_profile_table(undated)
+    assert list(profiles.transaction_count[:1]) == [1]
+    assert list(profiles.active_day_count[[0, 2]]) == [0, 1]
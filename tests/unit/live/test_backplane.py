@@ -0,0 +1,121 @@
+"""
+Tests for cross-worker broadcasting through live.backplane.
+"""
+import asyncio
+import json
+
+import pytest
+
+from live.backplane import InMemoryBackplane, RedisBackplane, create_backplane
+from live.ws_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+@pytest.fixture
+async def workers():
+    """Managers standing in for separate workers, sharing one in-memory backplane."""
+    peers = []
+    created = []
+
+    def make(**kwargs):
+        manager = ConnectionManager(backplane=InMemoryBackplane(peers), **kwargs)
+        created.append(manager)
+        return manager
+
+    yield make
+    for manager in created:
+        await manager.stop_backplane()
+        await manager.disconnect_all()
+
+
+async def _connect(manager, client_id, channels):
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, client_id)
+    await manager.subscribe(client_id, channels)
+    websocket.sent.clear()
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_clients_of_every_worker(workers):
+    publisher, other = workers(), workers()
+    for manager in (publisher, other):
+        await manager.start_backplane()
+    local = await _connect(publisher, "local", ["nft_transfer"])
+    remote = await _connect(other, "remote", ["collection:*"])
+    unrelated = await _connect(other, "unrelated", ["wallet:0x1"])
+
+    await publisher.broadcast_event("nft_transfer", {"token_id": "7"})
+    await publisher.broadcast_event("transfer", {"token_id": "8"}, channel="collection:0xabc")
+    await asyncio.sleep(0)
+
+    assert [json.loads(p)["data"]["token_id"] for p in local.sent] == ["7"]
+    assert [json.loads(p)["data"]["token_id"] for p in remote.sent] == ["8"]
+    assert unrelated.sent == []
+
+
+@pytest.mark.asyncio
+async def test_filtered_broadcast_stays_local(workers):
+    publisher, other = workers(), workers()
+    for manager in (publisher, other):
+        await manager.start_backplane()
+    local = await _connect(publisher, "local", ["alerts"])
+    remote = await _connect(other, "remote", ["alerts"])
+
+    await publisher.broadcast("alerts", {"type": "alert"}, condition=lambda connection: True)
+    await asyncio.sleep(0)
+
+    assert len(local.sent) == 1 and remote.sent == []
+
+
+class _FailingBackplane(InMemoryBackplane):
+    async def publish(self, channel, payload):
+        raise ConnectionError("backplane down")
+
+
+@pytest.mark.asyncio
+async def test_publish_failure_still_delivers_locally():
+    manager = ConnectionManager(backplane=_FailingBackplane())
+    await manager.start_backplane()
+    websocket = await _connect(manager, "c", ["nft_transfer"])
+    try:
+        await manager.broadcast_event("nft_transfer", {"n": 1})
+        await asyncio.sleep(0)
+        assert [json.loads(p)["data"] for p in websocket.sent] == [{"n": 1}]
+    finally:
+        await manager.stop_backplane()
+        await manager.disconnect_all()
+
+
+@pytest.mark.asyncio
+async def test_redis_backplane_round_trip():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    managers = [ConnectionManager(backplane=RedisBackplane(client, poll_timeout=0.01)) for _ in range(2)]
+    for manager in managers:
+        await manager.start_backplane()
+    remote = await _connect(managers[1], "remote", ["nft_transfer"])
+    try:
+        await managers[0].broadcast_event("nft_transfer", {"n": 1})
+        for _ in range(100):
+            if remote.sent:
+                break
+            await asyncio.sleep(0.01)
+        assert [json.loads(p)["data"] for p in remote.sent] == [{"n": 1}]
+    finally:
+        for manager in managers:
+            await manager.stop_backplane()
+            await manager.disconnect_all()
+
+
+def test_create_backplane():
+    assert create_backplane("local") is None
+    with pytest.raises(ValueError):
+        create_backplane("zeromq")
@@ -0,0 +1,195 @@
+"""
+Tests for checkpointing, reorg rollback and backfill of live.event_listener
+against a local stand-in JSON-RPC server whose chain can be reorganized.
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from live.event_listener import BlockchainEventListener
+from utils.ownership_graph import OwnershipGraphState
+
+BAYC = "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def _word(value):
+    return "0x%064x" % value
+
+
+class ForkableChain:
+    """Synthetic chain with one BAYC transfer per block; ``reorg`` replaces the tail."""
+
+    def __init__(self, head):
+        self.head = head
+        self.forks = {}  # block number -> fork id
+
+    def block_hash(self, number):
+        return _word(number * 100 + self.forks.get(number, 0)) if number >= 0 else _word(0)
+
+    def reorg(self, from_block, new_head):
+        for number in range(from_block, new_head + 1):
+            self.forks[number] = self.forks.get(number, 0) + 1
+        self.head = new_head
+
+    def answer(self, request):
+        method, params = request["method"], request.get("params", [])
+        if method == "eth_blockNumber":
+            result = hex(self.head)
+        elif method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            tx = {"hash": _word(number * 1000), "to": BAYC, "input": "0x23b872dd", "value": "0x0", "gasPrice": "0x1"}
+            result = {
+                "number": hex(number),
+                "hash": self.block_hash(number),
+                "parentHash": self.block_hash(number - 1),
+                "timestamp": hex(1672531200 + number),
+                "transactions": [tx] if params[1] else [tx["hash"]],
+            }
+        elif method == "eth_getTransactionReceipt":
+            number = int(params[0], 16) // 1000
+            result = {
+                "transactionHash": params[0],
+                "blockNumber": hex(number),
+                "gasUsed": "0x5208",
+                "logs": [{"address": BAYC, "topics": [TRANSFER_TOPIC, _word(1), _word(2), _word(number)],
+                          "data": "0x", "logIndex": "0x0"}],
+            }
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def handle(self, request):
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self.answer(item) for item in payload])
+        return web.json_response(self.answer(payload))
+
+
+@pytest.fixture
+async def chain():
+    node = ForkableChain(head=30)
+    app = web.Application()
+    app.router.add_post("/", node.handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield node, str(server.make_url("/"))
+    await server.close()
+
+
+def _listener(url, path, events, broadcasts=None):
+    listener = BlockchainEventListener(rpc_url=url, checkpoint_path=str(path), max_reorg_blocks=8)
+
+    async def collect(event, tx, block, receipt):
+        events.append(block.number)
+
+    async def broadcast(channel, data):
+        broadcasts.append((channel, data))
+
+    listener._process_transfer_event = collect
+    if broadcasts is not None:
+        listener._broadcast_event = broadcast
+    return listener
+
+
+@pytest.mark.asyncio
+async def test_restarted_listener_resumes_after_checkpoint(chain, tmp_path):
+    node, url = chain
+    path = tmp_path / "checkpoints.db"
+    events = []
+
+    listener = _listener(url, path, events)
+    listener.last_processed_block = 0
+    await listener._process_new_blocks()
+    await listener.stop()
+    assert events == list(range(1, 31))
+
+    node.head = 40
+    listener = _listener(url, path, events)
+    listener.poll_interval = 0.01
+    task = asyncio.create_task(listener.start())
+    for _ in range(200):
+        if listener.last_processed_block >= 40:
+            break
+        await asyncio.sleep(0.01)
+    await listener.stop()
+    await task
+
+    # Blocks 31-40 only, nothing re-processed
+    assert events == list(range(1, 41))
+
+
+@pytest.mark.asyncio
+async def test_restart_replays_blocks_after_ownership_snapshot(chain, tmp_path):
+    node, url = chain
+    path = tmp_path / "checkpoints.db"
+    events = []
+
+    listener = _listener(url, path, events)
+    listener.last_processed_block = 0
+    await listener._process_new_blocks()
+    await listener.stop()
+
+    # The last snapshot was taken during block 25, before the crash at block 30
+    state = OwnershipGraphState()
+    state.apply_transfer(BAYC, 1, _word(0), _word(1), block_number=25)
+    events.clear()
+    listener = _listener(url, path, events)
+    listener.ownership_state = state
+    listener.poll_interval = 0.01
+    task = asyncio.create_task(listener.start())
+    for _ in range(200):
+        if listener.last_processed_block >= 30:
+            break
+        await asyncio.sleep(0.01)
+    await listener.stop()
+    await task
+
+    assert events == list(range(25, 31))
+
+
+@pytest.mark.asyncio
+async def test_reorg_rolls_back_and_reemits(chain, tmp_path):
+    node, url = chain
+    events, broadcasts = [], []
+    listener = _listener(url, tmp_path / "checkpoints.db", events, broadcasts)
+    listener.last_processed_block = 0
+    try:
+        await listener._process_new_blocks()
+        node.reorg(27, new_head=32)
+
+        await listener._process_new_blocks()
+        assert listener.last_processed_block == 26
+        assert broadcasts == [("chain_reorg", {
+            "event": "chain_reorg", "timestamp": broadcasts[0][1]["timestamp"], "from_block": 27, "to_block": 30
+        })]
+        assert await listener.checkpoints.latest() == (26, node.block_hash(26), node.block_hash(25))
+
+        await listener._process_new_blocks()
+        assert listener.last_processed_block == 32
+        assert await listener.checkpoints.get_block_hash(30) == node.block_hash(30)
+    finally:
+        await listener.stop()
+
+    # Blocks from the orphaned fork are processed again on the new chain
+    assert events == list(range(1, 31)) + list(range(27, 33))
+
+
+@pytest.mark.asyncio
+async def test_backfill_skips_completed_chunks(chain, tmp_path):
+    _, url = chain
+    events = []
+    listener = _listener(url, tmp_path / "checkpoints.db", events)
+    try:
+        await listener.checkpoints.record_backfill_range(1, 10)
+        processed = await listener.backfill(1, 30, workers=3, chunk_blocks=10)
+        assert processed == 20
+        assert sorted(events) == list(range(11, 31))
+        assert await listener.checkpoints.completed_backfill_ranges(1, 30) == [(1, 10), (11, 20), (21, 30)]
+
+        # A second run finds nothing left to do
+        assert await listener.backfill(1, 30, workers=3, chunk_blocks=10) == 0
+    finally:
+        await listener.stop()
@@ -0,0 +1,127 @@
+"""
+Tests for the concurrent fetch stage of live.event_listener against a local
+stand-in JSON-RPC server.
+"""
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.rpc_client import AsyncJsonRpcClient, JsonRpcError
+from live.event_listener import BlockchainEventListener
+
+BAYC = "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+HEAD = 45
+
+
+def _tx_hash(block, index):
+    return "0x%064x" % (block * 1000 + index)
+
+
+def _word(value):
+    return "0x%064x" % value
+
+
+def _block(number):
+    """Each block holds one BAYC transfer and one plain ETH transfer."""
+    txs = [
+        {"hash": _tx_hash(number, 0), "to": BAYC, "input": "0x23b872dd", "value": "0x0", "gasPrice": "0x1"},
+        {"hash": _tx_hash(number, 1), "to": "0x" + "11" * 20, "input": "0x", "value": "0x1", "gasPrice": "0x1"},
+    ]
+    return {"number": hex(number), "hash": _word(number), "timestamp": hex(1672531200 + number), "transactions": txs}
+
+
+def _receipt(tx_hash):
+    block = int(tx_hash, 16) // 1000
+    return {
+        "transactionHash": tx_hash,
+        "blockNumber": hex(block),
+        "gasUsed": "0x5208",
+        "logs": [{
+            "address": BAYC,
+            "topics": [TRANSFER_TOPIC, _word(1), _word(2), _word(block)],
+            "data": "0x",
+            "logIndex": "0x0",
+        }],
+    }
+
+
+class StandInRpc:
+    """Minimal JSON-RPC node: single and batch requests over a synthetic chain."""
+
+    def __init__(self):
+        self.http_requests = 0
+        self.calls = 0
+
+    def answer(self, request):
+        self.calls += 1
+        method, params = request["method"], request.get("params", [])
+        if any(isinstance(param, str) and not param.startswith("0x") for param in params):
+            # Real nodes reject DATA and QUANTITY values without the 0x prefix
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32602, "message": "invalid argument"}}
+        if method == "eth_blockNumber":
+            result = hex(HEAD)
+        elif method == "eth_getBlockByNumber":
+            result = _block(int(params[0], 16))
+        elif method == "eth_getTransactionReceipt":
+            result = _receipt(params[0])
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def handle(self, request):
+        self.http_requests += 1
+        payload = await request.json()
+        if isinstance(payload, list):
+            # Answer out of order, as real nodes may
+            return web.json_response([self.answer(item) for item in reversed(payload)])
+        return web.json_response(self.answer(payload))
+
+
+@pytest.fixture
+async def rpc_server():
+    node = StandInRpc()
+    app = web.Application()
+    app.router.add_post("/", node.handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield node, str(server.make_url("/"))
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_client_orders_results_and_surfaces_errors(rpc_server):
+    node, url = rpc_server
+    async with AsyncJsonRpcClient(url, batch_size=4) as client:
+        blocks = await client.batch([("eth_getBlockByNumber", [hex(n), True]) for n in range(1, 11)])
+        assert [int(b["number"], 16) for b in blocks] == list(range(1, 11))
+        assert node.http_requests == 3
+
+        mixed = await client.batch([("eth_blockNumber", []), ("eth_nope", [])], return_exceptions=True)
+        assert mixed[0] == hex(HEAD) and isinstance(mixed[1], JsonRpcError)
+        with pytest.raises(JsonRpcError):
+            await client.call("eth_nope")
+
+
+@pytest.mark.asyncio
+async def test_listener_pipeline_fetches_range_in_batches(rpc_server):
+    node, url = rpc_server
+    listener = BlockchainEventListener(rpc_url=url, fetch_concurrency=3, rpc_batch_size=20, queue_size=5)
+    events = []
+
+    async def collect(event, tx, block, receipt):
+        events.append((block.number, event["tokenId"]))
+
+    listener._process_transfer_event = collect
+    try:
+        await listener._process_new_blocks()
+    finally:
+        await listener.stop()
+
+    # One transfer per block, parsed in block order
+    assert events == [(n, n) for n in range(1, HEAD + 1)]
+    assert listener.last_processed_block == HEAD
+    # eth_blockNumber + 3 block batches + 3 receipt batches, instead of 1 + 45 + 45 calls
+    assert node.http_requests == 7
+    assert node.calls == 1 + HEAD + HEAD
+    assert listener.blocks_fetched == HEAD and listener.blocks_per_second > 0
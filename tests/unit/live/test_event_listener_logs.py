@@ -0,0 +1,135 @@
+"""
+Tests for the eth_getLogs ingestion mode of live.event_listener against a
+local stand-in JSON-RPC server.
+"""
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from live.event_listener import TRANSFER_TOPIC, BlockchainEventListener
+
+BAYC = "0xbc4ca0eda7647a8ab7c2061c2e118a18a936f13d"
+OTHER_NFT = "0x" + "22" * 20
+ERC20 = "0x" + "33" * 20
+MARKETPLACE = "0x" + "44" * 20
+HEAD = 60
+MAX_NODE_RANGE = 16
+
+
+def _word(value):
+    return "0x%064x" % value
+
+
+def _tx_hash(block):
+    return _word(block * 1000)
+
+
+def _logs(block):
+    """Every block has one marketplace sale moving a BAYC, another NFT and an ERC-20."""
+    common = {"blockNumber": hex(block), "transactionHash": _tx_hash(block), "data": "0x"}
+    return [
+        {**common, "address": BAYC, "logIndex": "0x0", "topics": [TRANSFER_TOPIC, _word(1), _word(2), _word(block)]},
+        {**common, "address": OTHER_NFT, "logIndex": "0x1", "topics": [TRANSFER_TOPIC, _word(1), _word(2), _word(7)]},
+        {**common, "address": ERC20, "logIndex": "0x2", "topics": [TRANSFER_TOPIC, _word(2), _word(1)],
+         "data": _word(10**18)},
+    ]
+
+
+class StandInRpc:
+    """JSON-RPC node that rejects eth_getLogs ranges above MAX_NODE_RANGE blocks."""
+
+    def __init__(self):
+        self.http_requests = 0
+        self.get_logs_ranges = []
+
+    def answer(self, request):
+        method, params = request["method"], request.get("params", [])
+        if any(isinstance(param, str) and not param.startswith("0x") for param in params):
+            # Real nodes reject DATA and QUANTITY values without the 0x prefix
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32602, "message": "invalid argument"}}
+        if method == "eth_blockNumber":
+            result = hex(HEAD)
+        elif method == "eth_getLogs":
+            query = params[0]
+            first, last = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+            self.get_logs_ranges.append(last - first + 1)
+            if last - first + 1 > MAX_NODE_RANGE:
+                return {"jsonrpc": "2.0", "id": request["id"],
+                        "error": {"code": -32005, "message": "query returned more than 10000 results"}}
+            addresses = {a.lower() for a in query.get("address", [])}
+            result = [
+                log for block in range(first, last + 1) for log in _logs(block)
+                if not addresses or log["address"] in addresses
+            ]
+        elif method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            result = {"number": hex(number), "timestamp": hex(1672531200 + number), "transactions": [_tx_hash(number)]}
+        elif method == "eth_getTransactionByHash":
+            result = {"hash": params[0], "to": MARKETPLACE, "input": "0xab834bab", "value": hex(10**17), "gasPrice": "0x1"}
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def handle(self, request):
+        self.http_requests += 1
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self.answer(item) for item in payload])
+        return web.json_response(self.answer(payload))
+
+
+@pytest.fixture
+async def rpc_server():
+    node = StandInRpc()
+    app = web.Application()
+    app.router.add_post("/", node.handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield node, str(server.make_url("/"))
+    await server.close()
+
+
+async def _run(url, **kwargs):
+    listener = BlockchainEventListener(rpc_url=url, ingestion_mode="logs", max_log_range=64, **kwargs)
+    events = []
+
+    async def collect(event, tx, block, receipt):
+        assert receipt is None and tx.to == MARKETPLACE and block.number == event["blockNumber"]
+        events.append((event["contract"], event["blockNumber"], event["tokenId"]))
+
+    listener._process_transfer_event = collect
+    try:
+        await listener._process_new_blocks()
+    finally:
+        await listener.stop()
+    return listener, events
+
+
+@pytest.mark.asyncio
+async def test_logs_mode_catches_marketplace_transfers_with_few_calls(rpc_server):
+    node, url = rpc_server
+    listener, events = await _run(url, contract_addresses=[BAYC])
+
+    # Sales routed through a marketplace contract are found from their logs
+    assert events == [(BAYC, n, n) for n in range(1, HEAD + 1)]
+    assert listener.last_processed_block == HEAD
+    # Rejected ranges were halved until the node accepted them
+    assert node.get_logs_ranges[:3] == [60, 30, 15]
+    assert len(node.get_logs_ranges) <= 8
+    # eth_blockNumber, the eth_getLogs queries and 20-call batches for headers and transactions
+    assert node.http_requests == 1 + len(node.get_logs_ranges) + 2 * 3
+
+
+@pytest.mark.asyncio
+async def test_logs_mode_without_contract_filter_skips_erc20(rpc_server):
+    node, url = rpc_server
+    listener, events = await _run(url, filter_contracts=False)
+
+    contracts = {contract for contract, _, _ in events}
+    assert contracts == {BAYC, OTHER_NFT}
+    assert len(events) == 2 * HEAD
+
+
+def test_unknown_ingestion_mode():
+    with pytest.raises(ValueError):
+        BlockchainEventListener(rpc_url="http://localhost:8545", ingestion_mode="traces")
@@ -0,0 +1,155 @@
+"""
+Tests for the replayable per-channel event log in live.event_log.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from live.event_log import ChannelLog, EventLog, worker_directory
+from live.ws_manager import ConnectionManager
+
+
+def test_ring_overwrites_oldest_and_reports_truncation(tmp_path):
+    log = ChannelLog(str(tmp_path / "ring.log"), capacity=512, max_age=None)
+    offsets = [log.append(b"event-%03d" % n) for n in range(40)]
+    assert offsets == list(range(40))
+
+    events, truncated = log.read(-1)
+    assert truncated and 0 < len(events) < 40
+    assert [o for o, _ in events] == list(range(40 - len(events), 40))
+    assert events[-1] == (39, b"event-039")
+
+    events, truncated = log.read(37)
+    assert events == [(38, b"event-038"), (39, b"event-039")] and not truncated
+    assert log.read(39) == ([], False)
+
+
+def test_reopened_log_keeps_events_and_offsets(tmp_path):
+    path = str(tmp_path / "ring.log")
+    log = ChannelLog(path, capacity=512, max_age=None)
+    for n in range(25):
+        log.append(b"x" * (n % 7) + b"%d" % n)
+    before = log.read(-1)
+    log.close()
+
+    reopened = ChannelLog(path, capacity=512, max_age=None)
+    assert reopened.read(-1) == before
+    assert reopened.append(b"next") == 25
+
+
+def test_resized_log_keeps_offsets_monotonic(tmp_path):
+    path = str(tmp_path / "ring.log")
+    log = ChannelLog(path, capacity=512, max_age=None)
+    for n in range(10):
+        log.append(b"%d" % n)
+    log.close()
+
+    resized = ChannelLog(path, capacity=1024, max_age=None)
+    assert len(resized) == 0 and resized.next_offset == 10
+    assert resized.read(9) == ([], False)
+    assert resized.read(5) == ([], True)
+    # An offset this log never assigned is reported rather than silently ignored
+    assert resized.read(10) == ([], True)
+    assert resized.append(b"next") == 10
+    assert resized.read(5) == ([(10, b"next")], True)
+
+
+def test_age_retention(tmp_path):
+    log = ChannelLog(str(tmp_path / "ring.log"), capacity=4096, max_age=60)
+    log.append(b"old", timestamp=1000.0)
+    log.append(b"new", timestamp=1050.0)
+
+    events, truncated = log.read(-1, now=1070.0)
+    assert events == [(1, b"new")] and truncated
+    with pytest.raises(ValueError):
+        log.append(b"x" * 4096)
+
+
+def test_event_log_bounds_channel_count(tmp_path):
+    log = EventLog(str(tmp_path), channel_bytes=1024, max_channels=2)
+    for channel in ("a", "b", "c"):
+        log.append(channel, '{"type":"t"}')
+    assert log.read("a", -1) == ([], False)
+    assert log.read("c", -1) == ([(0, '{"type":"t"}')], False)
+    assert log.read("a", 3) == ([], True)
+    assert len(list(tmp_path.iterdir())) == 2
+    log.close()
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+@pytest.mark.asyncio
+async def test_resuming_client_gets_backlog_before_live_events(tmp_path):
+    manager = ConnectionManager(event_log=EventLog(str(tmp_path), channel_bytes=4096))
+    try:
+        for n in range(3):
+            await manager.broadcast_event("nft_transfer", {"n": n})
+
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "c")
+        await manager.handle_message("c", json.dumps({
+            "type": "subscribe", "channels": ["nft_transfer"], "since_offset": 0,
+        }))
+        await manager.broadcast_event("nft_transfer", {"n": 3})
+        await asyncio.sleep(0)
+
+        frames = [json.loads(p) for p in websocket.sent]
+        replay = next(f for f in frames if f["type"] == "replay")
+        live = [f for f in frames if f["type"] == "nft_transfer"]
+        assert replay["channel"] == "nft_transfer" and not replay["truncated"]
+        assert [(e["offset"], e["data"]["n"]) for e in replay["events"]] == [(1, 1), (2, 2)]
+        assert [(e["offset"], e["data"]["n"]) for e in live] == [(3, 3)]
+        assert frames.index(replay) < frames.index(live[0])
+
+        await manager.handle_message("c", json.dumps({
+            "type": "subscribe", "channels": ["other"], "since_offset": "latest",
+        }))
+        assert json.loads(websocket.sent[-1])["error"] == "invalid_request"
+    finally:
+        await manager.disconnect_all()
+        manager.event_log.close()
+
+
+def _append_from_worker(root, count, queue):
+    log = EventLog(worker_directory(root), channel_bytes=1 << 16)
+    offsets = [log.append("nft_transfer", '{"pid":%d,"n":%d}' % (os.getpid(), n)) for n in range(count)]
+    queue.put((log.directory, os.getpid(), offsets))
+    log.close()
+
+
+def test_worker_processes_keep_separate_logs(tmp_path):
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    workers = [context.Process(target=_append_from_worker, args=(str(tmp_path), 300, queue))
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert results[0][0] != results[1][0]
+    for directory, pid, offsets in results:
+        assert offsets == list(range(300))
+        log = EventLog(directory, channel_bytes=1 << 16)
+        events, truncated = log.read("nft_transfer", -1)
+        assert not truncated
+        assert [(o, json.loads(p)) for o, p in events] == [(n, {"pid": pid, "n": n}) for n in range(300)]
+        log.close()
+
+    # Logs of workers that are gone are removed when a new worker starts
+    own = worker_directory(str(tmp_path))
+    assert not any(os.path.exists(directory) for directory, _, _ in results)
+    log = EventLog(own)
+    log.append("a", "{}")
+    log.close(remove=True)
+    assert not os.path.exists(own)
@@ -0,0 +1,92 @@
+"""
+Tests for live.metadata_cache.TokenMetadataCache.
+"""
+import asyncio
+
+import pytest
+
+from live.metadata_cache import TokenMetadataCache
+
+BAYC = "0xBC4CA0EdA7647A8aB7C2061c2E118A18a936f13D"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetcher:
+    """Resolves token ids below 100 after a short delay; fails on id 13."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, contract, token_id):
+        self.calls.append((contract, token_id))
+        await asyncio.sleep(0.01)
+        if token_id == 13:
+            raise RuntimeError("execution reverted")
+        return {"token_uri": f"ipfs://meta/{token_id}"} if token_id < 100 else {}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch():
+    fetch = CountingFetcher()
+    cache = TokenMetadataCache(fetch)
+
+    results = await asyncio.gather(*(cache.get(BAYC, 7) for _ in range(20)))
+
+    assert results == [{"token_uri": "ipfs://meta/7"}] * 20
+    assert fetch.calls == [(BAYC.lower(), 7)]
+    assert await cache.get(BAYC.lower(), 7) == {"token_uri": "ipfs://meta/7"}
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 19, 1)
+    assert stats["hit_rate"] == pytest.approx(20 / 21)
+    assert stats["avg_fetch_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_failures_and_empty_results_are_negatively_cached():
+    clock = FakeClock()
+    fetch = CountingFetcher()
+    cache = TokenMetadataCache(fetch, ttl=3600, negative_ttl=60, clock=clock)
+
+    assert await cache.get(BAYC, 13) == {}
+    assert await cache.get(BAYC, 500) == {}
+    assert await cache.get(BAYC, 13) == {}
+    assert len(fetch.calls) == 2
+    assert cache.stats()["failures"] == 1 and cache.stats()["negative_hits"] == 1
+
+    # Misses expire sooner than found entries
+    await cache.get(BAYC, 1)
+    clock.now += 120
+    await cache.get(BAYC, 13)
+    await cache.get(BAYC, 1)
+    assert fetch.calls.count((BAYC.lower(), 13)) == 2
+    assert fetch.calls.count((BAYC.lower(), 1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_bound_and_disk_store(tmp_path):
+    path = str(tmp_path / "metadata.db")
+    fetch = CountingFetcher()
+    cache = TokenMetadataCache(fetch, max_entries=2, path=path)
+    for token_id in (1, 2, 3, 500):
+        await cache.get(BAYC, token_id)
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+    # A new instance reads found entries back from disk; misses are not persisted
+    fetch = CountingFetcher()
+    cache = TokenMetadataCache(fetch, path=path)
+    try:
+        assert await cache.get(BAYC, 1) == {"token_uri": "ipfs://meta/1"}
+        assert await cache.get(BAYC, 500) == {}
+        assert fetch.calls == [(BAYC.lower(), 500)]
+        assert cache.stats()["disk_hits"] == 1
+    finally:
+        cache.close()
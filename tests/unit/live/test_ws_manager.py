@@ -0,0 +1,223 @@
+"""
+Tests for broadcast fan-out in live.ws_manager.ConnectionManager.
+"""
+import asyncio
+import json
+
+import pytest
+
+from live.ws_manager import (
+    BatchOptions,
+    ConnectionManager,
+    SubscriptionTrie,
+    parse_batch_options,
+    topic_matches,
+)
+
+
+class FakeWebSocket:
+    """Records sent frames; after ``block()`` every send waits until released."""
+
+    def __init__(self):
+        self.sent = []
+        self.released = asyncio.Event()
+        self.released.set()
+
+    def block(self):
+        self.released.clear()
+
+    async def send_text(self, text):
+        await self.released.wait()
+        self.sent.append(text)
+
+
+@pytest.fixture
+async def managers():
+    created = []
+
+    def make(**kwargs):
+        created.append(ConnectionManager(**kwargs))
+        return created[-1]
+
+    yield make
+    for manager in created:
+        await manager.disconnect_all()
+
+
+async def _connect(manager, client_id, channels, block=False):
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, client_id)
+    await manager.subscribe(client_id, channels)
+    websocket.sent.clear()
+    if block:
+        websocket.block()
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_broadcast_event_shares_one_payload(managers):
+    manager = managers()
+    sockets = [await _connect(manager, f"c{i}", ["nft_transfer"]) for i in range(5)]
+    other = await _connect(manager, "other", ["collection:0xabc"])
+
+    await manager.broadcast_event("nft_transfer", {"token_id": "7"})
+    await asyncio.sleep(0)
+
+    payloads = [ws.sent[0] for ws in sockets]
+    assert all(payload is payloads[0] for payload in payloads)
+    assert json.loads(payloads[0])["data"] == {"token_id": "7"}
+    assert other.sent == []
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_broadcast(managers):
+    manager = managers(send_queue_size=2)
+    fast = await _connect(manager, "fast", ["nft_transfer"])
+    slow = await _connect(manager, "slow", ["nft_transfer"], block=True)
+
+    for n in range(5):
+        await asyncio.wait_for(manager.broadcast_event("nft_transfer", {"n": n}), timeout=1)
+        await asyncio.sleep(0)
+
+    assert [json.loads(p)["data"]["n"] for p in fast.sent] == [0, 1, 2, 3, 4]
+    # The slow client keeps its newest messages; the first one is stuck in send_text
+    slow.released.set()
+    await asyncio.sleep(0.01)
+    assert [json.loads(p)["data"]["n"] for p in slow.sent] == [0, 3, 4]
+    assert manager.connections["slow"].dropped_messages == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_removes_laggards(managers):
+    manager = managers(send_queue_size=1, slow_client_policy="disconnect")
+    await _connect(manager, "slow", ["nft_transfer"], block=True)
+    await _connect(manager, "fast", ["nft_transfer"])
+
+    for n in range(3):
+        await manager.broadcast_event("nft_transfer", {"n": n})
+        await asyncio.sleep(0)
+
+    assert set(manager.connections) == {"fast"}
+    assert manager.channel_subscribers.match("nft_transfer") == {"fast"}
+
+
+def test_unknown_slow_client_policy():
+    with pytest.raises(ValueError):
+        ConnectionManager(slow_client_policy="block")
+
+
+def test_subscription_trie_wildcards():
+    trie = SubscriptionTrie()
+    trie.add("collection:0xabc:trait:eyes", "exact")
+    trie.add("collection:*:trait:eyes", "any_collection_eyes")
+    trie.add("collection:0xabc:*", "whole_collection")
+    trie.add("collection:*", "all_collections")
+    trie.add("*", "everything")
+    trie.add("wallet:0x1", "wallet")
+
+    assert trie.match("collection:0xabc:trait:eyes") == {
+        "exact", "any_collection_eyes", "whole_collection", "all_collections", "everything"
+    }
+    assert trie.match("collection:0xdef:trait:eyes") == {"any_collection_eyes", "all_collections", "everything"}
+    # A trailing '*' needs at least one more segment
+    assert trie.match("collection:0xabc") == {"all_collections", "everything"}
+    assert trie.match("collection") == {"everything"}
+    assert trie.match("wallet:0x1") == {"wallet", "everything"}
+    assert len(trie) == 6
+
+    for pattern, channel in [("collection:*:trait:eyes", "collection:0xdef:trait:eyes"),
+                             ("collection:*", "collection:0xabc:trait:eyes"),
+                             ("wallet:0x1", "wallet:0x1")]:
+        assert topic_matches(pattern, channel)
+    assert not topic_matches("collection:*", "collection")
+    assert not topic_matches("collection:*:trait:eyes", "collection:0xabc:trait:fur")
+
+
+def test_subscription_trie_discard_prunes_nodes():
+    trie = SubscriptionTrie()
+    trie.add("collection:0xabc:trait:eyes", "a")
+    trie.add("collection:*", "b")
+    trie.discard("collection:0xabc:trait:eyes", "a")
+    trie.discard("collection:0xabc:trait:eyes", "a")
+    trie.discard("missing:channel", "a")
+    assert len(trie) == 1 and trie.match("collection:0xabc:trait:eyes") == {"b"}
+
+    trie.discard("collection:*", "b")
+    assert len(trie) == 0 and trie._root.children == {}
+
+
+@pytest.mark.asyncio
+async def test_nested_channels_route_through_wildcards(managers):
+    manager = managers()
+    eyes = await _connect(manager, "eyes", ["collection:*:trait:eyes"])
+    bayc = await _connect(manager, "bayc", ["collection:0xabc:*"])
+    other = await _connect(manager, "other", ["collection:0xdef:trait:eyes"])
+
+    await manager.broadcast("collection:0xabc:trait:eyes", {"type": "listing", "token_id": "1"})
+    await manager.broadcast_event("transfer", {"token_id": "2"}, channel="collection:0xabc:transfers")
+    await asyncio.sleep(0)
+
+    assert [json.loads(p)["type"] for p in eyes.sent] == ["listing"]
+    assert [json.loads(p)["type"] for p in bayc.sent] == ["listing", "transfer"]
+    assert other.sent == []
+    assert manager.connections["eyes"].is_subscribed("collection:0x123:trait:eyes")
+
+    await manager.disconnect("bayc")
+    assert manager.get_subscription_count() == 2
+
+
+@pytest.mark.asyncio
+async def test_batched_client_gets_array_frames(managers):
+    manager = managers()
+    plain = await _connect(manager, "plain", ["nft_transfer", "collection:*"])
+    batched = FakeWebSocket()
+    await manager.connect(batched, "batched")
+    await manager.handle_message("batched", json.dumps({
+        "type": "subscribe", "channels": ["nft_transfer", "collection:*"],
+        "batch": {"window_ms": 20, "max_events": 3},
+    }))
+    assert json.loads(batched.sent[-1])["batch"] == {"window_ms": 20, "max_events": 3}
+    batched.sent.clear()
+
+    for n in range(4):
+        await manager.broadcast_event("nft_transfer", {"n": n})
+    await manager.broadcast_event("collection:0xabc", {"n": 9})
+    await asyncio.sleep(0)
+
+    # Non-batched clients are unchanged: one frame per event
+    assert len(plain.sent) == 5
+    # max_events flushed the first three transfers immediately
+    assert [[e["data"]["n"] for e in json.loads(p)] for p in batched.sent] == [[0, 1, 2]]
+
+    await asyncio.sleep(0.05)
+    frames = [[e["data"]["n"] for e in json.loads(p)] for p in batched.sent]
+    assert frames[0] == [0, 1, 2] and sorted(frames[1:]) == [[3], [9]]
+
+
+@pytest.mark.asyncio
+async def test_disabling_batching_flushes_pending(managers):
+    manager = managers()
+    websocket = await _connect(manager, "c", [])
+    await manager.subscribe("c", ["nft_transfer"], batch=BatchOptions(window=10.0, max_events=100))
+
+    await manager.broadcast_event("nft_transfer", {"n": 0})
+    await manager.handle_message("c", json.dumps({"type": "subscribe", "channels": [], "batch": False}))
+    await manager.broadcast_event("nft_transfer", {"n": 1})
+    await asyncio.sleep(0)
+
+    frames = [json.loads(p) for p in websocket.sent]
+    # Replies are sent directly; broadcasts go through the writer queue in order
+    update = next(f for f in frames if isinstance(f, dict) and f["type"] == "subscription_update")
+    assert update["batch"] is None
+    events = [f for f in frames if f is not update]
+    assert [e["data"]["n"] for e in events[0]] == [0]
+    assert events[1]["data"] == {"n": 1}
+
+
+def test_parse_batch_options():
+    assert parse_batch_options(None) is None and parse_batch_options(False) is None
+    assert parse_batch_options(True) == BatchOptions(0.05, 100)
+    assert parse_batch_options({"window_ms": 10}) == BatchOptions(0.01, 100)
+    for spec in ({"window_ms": 0}, {"window_ms": 5000}, {"max_events": 0}, {"max_events": 2.5}, "fast"):
+        with pytest.raises(ValueError):
+            parse_batch_options(spec)
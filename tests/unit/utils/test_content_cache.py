@@ -0,0 +1,125 @@
+"""
+Unit tests for the content-addressed artifact cache and its use by
+SimilarityAnalyzer and the opcode profiles.
+"""
+import difflib
+import os
+
+import numpy as np
+import pytest
+
+from utils.content_cache import (
+    ByteLRUCache, ContentCache, configure_shared_cache, content_digest, shared_cache,
+)
+from utils.evm_opcodes import get_opcode_profile
+from utils.hybrid_similarity import SimilarityAnalyzer
+
+
+@pytest.fixture
+def restore_shared_cache():
+    yield
+    configure_shared_cache()
+
+
+def test_byte_lru_evicts_least_recently_used_by_size():
+    cache = ByteLRUCache(max_bytes=100, sizeof=len)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.get("a") == "x" * 40  # "a" is now the most recent
+    cache.put("c", "z" * 40)
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.bytes == 80 and cache.evictions == 1
+    # A value larger than the whole budget is not kept, and replaces nothing
+    assert not cache.put("d", "w" * 101)
+    assert len(cache) == 2
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_disk_store_is_shared_between_caches(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.arange(5)
+
+    # Two caches on one directory stand in for two worker processes
+    first = ContentCache(directory=str(tmp_path))
+    second = ContentCache(directory=str(tmp_path))
+    digest = content_digest("contract source")
+
+    assert first.get_or_compute("lines", digest, compute).tolist() == [0, 1, 2, 3, 4]
+    assert second.get_or_compute("lines", digest, compute).tolist() == [0, 1, 2, 3, 4]
+    assert len(calls) == 1
+    assert second.namespace("lines").get_stats()["entries"] == 1
+
+    # A corrupt file is discarded and recomputed
+    path = second.disk._path("lines", digest)
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+    third = ContentCache(directory=str(tmp_path))
+    assert third.get_or_compute("lines", digest, compute).tolist() == [0, 1, 2, 3, 4]
+    assert len(calls) == 2
+
+
+def test_disk_store_prunes_to_budget(tmp_path):
+    cache = ContentCache(directory=str(tmp_path), disk_max_bytes=4000)
+    cache.disk.prune_every = 1
+    for i in range(20):
+        cache.put("blobs", content_digest(str(i)), b"x" * 500)
+
+    sizes = [os.path.getsize(os.path.join(root, name))
+             for root, _, names in os.walk(tmp_path) for name in names]
+    assert sum(sizes) <= 4000 and len(sizes) >= 5
+
+
+def test_similarity_analyzer_memoizes_by_digest():
+    cache = ContentCache(max_bytes=1 << 20)
+    analyzer = SimilarityAnalyzer(cache=cache)
+    code1 = "contract A {\n  uint x;\n  function f() {}\n}"
+    code2 = "contract A {\n  uint y;\n  function f() {}\n}"
+
+    result = analyzer.compare(code1, code2, "6080604052", "6080604053")
+    again = analyzer.compare(code1, code2, "6080604052", "6080604053")
+
+    lines1 = [l.strip() for l in code1.splitlines() if l.strip()]
+    lines2 = [l.strip() for l in code2.splitlines() if l.strip()]
+    assert result.ast_similarity == difflib.SequenceMatcher(None, lines1, lines2).ratio()
+    assert result == again
+    stats = cache.get_stats()["namespaces"]
+    assert stats["ast_similarity"]["hits"] == 1 and stats["bytecode_similarity"]["hits"] == 1
+    assert stats["lines"]["entries"] == 2 and stats["simhash64"]["entries"] == 2
+    # Keys are digests, never the inputs themselves
+    assert cache.namespace("lines").get(content_digest(code1)) == tuple(lines1)
+    assert code1 not in cache.namespace("lines")
+
+
+def test_similarity_caches_stay_within_budget():
+    cache = ContentCache(max_bytes=20_000)
+    analyzer = SimilarityAnalyzer(cache=cache)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        code = "\n".join(f"line {n}" for n in rng.integers(0, 1000, 200))
+        analyzer.compare(code, code[::-1])
+
+    for stats in cache.get_stats()["namespaces"].values():
+        assert stats["bytes"] <= 20_000
+    assert cache.namespace("lines").evictions > 0
+
+
+def test_shared_cache_reconfiguration(tmp_path, restore_shared_cache):
+    analyzer = SimilarityAnalyzer()
+    configure_shared_cache(directory=str(tmp_path))
+    analyzer.compare("a = 1", "b = 2")
+    profile = get_opcode_profile("0x6001600201")
+
+    assert analyzer.cache is shared_cache()
+    assert shared_cache().get_stats()["namespaces"]["lines"]["entries"] == 2
+
+    # A fresh process (a new shared cache on the same directory) loads the profile from disk
+    configure_shared_cache(directory=str(tmp_path))
+    loaded = get_opcode_profile("0x6001600201")
+    assert loaded is not profile and loaded.code_hash == profile.code_hash
+    assert loaded.histogram.tolist() == profile.histogram.tolist()
+    with pytest.raises(ValueError):
+        loaded.histogram[0] = 1
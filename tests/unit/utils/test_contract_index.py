@@ -0,0 +1,114 @@
+"""
+Unit tests for the MinHash/LSH contract similarity index.
+"""
+import numpy as np
+import pytest
+
+from utils.contract_index import ContractSimilarityIndex, MinHasher, opcode_shingles, source_shingles
+
+# Opcodes without immediates used to build synthetic contracts
+PLAIN = np.array(list(range(0x01, 0x20)) + list(range(0x80, 0xa0)), dtype=np.uint8)
+
+
+def random_code(rng, instructions=600):
+    """Random instruction stream where every fifth instruction is a PUSH2."""
+    ops = rng.choice(PLAIN, instructions)
+    parts = []
+    for i, op in enumerate(ops):
+        parts.append(f"61{rng.integers(0, 1 << 16):04x}" if i % 5 == 0 else f"{op:02x}")
+    return "0x" + "".join(parts)
+
+
+def mutate(rng, bytecode, fraction=0.03):
+    """Replace a fraction of the single-byte instructions."""
+    body = bytearray.fromhex(bytecode[2:])
+    i = 0
+    while i < len(body):
+        if body[i] == 0x61:
+            i += 3
+            continue
+        if rng.random() < fraction:
+            body[i] = rng.choice(PLAIN)
+        i += 1
+    return "0x" + body.hex()
+
+
+def test_signature_estimates_jaccard():
+    rng = np.random.default_rng(0)
+    hasher = MinHasher(num_perm=256)
+    shared = rng.integers(0, 2 ** 63, 3000, dtype=np.uint64)
+    a = np.concatenate([shared, rng.integers(0, 2 ** 63, 1000, dtype=np.uint64)])
+    b = np.concatenate([shared, rng.integers(0, 2 ** 63, 1000, dtype=np.uint64)])
+
+    estimate = MinHasher.jaccard(hasher.signature(a), hasher.signature(b))
+
+    assert estimate == pytest.approx(3000 / 5000, abs=0.08)
+    assert MinHasher.jaccard(hasher.signature(a), hasher.signature(a[::-1])) == 1.0
+
+
+def test_shingles_ignore_push_immediates_and_layout():
+    assert np.array_equal(opcode_shingles("6101020156" * 3), opcode_shingles("61ffff0156" * 3))
+    assert not np.array_equal(opcode_shingles("6101020156" * 3), opcode_shingles("6101020157" * 3))
+    assert np.array_equal(source_shingles("a  = 1;\n\n  b = 2;"), source_shingles("b = 2;\na = 1;"))
+    assert len(opcode_shingles("0x")) == 0
+
+
+def test_top_k_finds_near_duplicates():
+    rng = np.random.default_rng(3)
+    index = ContractSimilarityIndex(store_artifacts=False)
+    families = [random_code(rng) for _ in range(20)]
+    for family, base in enumerate(families):
+        index.add(f"family{family}", bytecode=base)
+        for variant in range(3):
+            index.add(f"family{family}-{variant}", bytecode=mutate(rng, base))
+    for i in range(200):
+        index.add(f"noise{i}", bytecode=random_code(rng))
+
+    query = mutate(rng, families[7])
+    matches = index.query(bytecode=query, k=4)
+
+    assert {m.contract_id for m in matches} == {"family7", "family7-0", "family7-1", "family7-2"}
+    assert all(m.hybrid_score is None and m.jaccard > 0.5 for m in matches)
+    assert [m.jaccard for m in matches] == sorted((m.jaccard for m in matches), reverse=True)
+
+    # Excluding ids and removing entries both take contracts out of the results
+    excluded = index.query(bytecode=query, k=4, exclude={"family7"})
+    assert "family7" not in {m.contract_id for m in excluded}
+    assert index.remove("family7-0") and not index.remove("family7-0")
+    assert "family7-0" not in {m.contract_id for m in index.query(bytecode=query, k=10)}
+    assert len(index) == 20 * 4 + 200 - 1
+
+
+def test_rerank_with_hybrid_score():
+    source = "\n".join(f"uint256 value{i} = {i};" for i in range(40))
+    edited = source.replace("value3 = 3", "value3 = 4")
+    index = ContractSimilarityIndex()
+    index.add("original", source=source)
+    index.add("other", source="\n".join(f"address owner{i};" for i in range(40)))
+
+    matches = index.query(source=edited, k=2)
+
+    assert [m.contract_id for m in matches] == ["original"]
+    assert matches[0].hybrid_score == matches[0].similarity.hybrid_score > 0.6
+    assert matches[0].to_dict()["similarity"]["ast_similarity"] > 0.95
+
+    with pytest.raises(ValueError):
+        index.add("empty", source="\n \n")
+    assert index.query(source="") == []
+
+
+def test_bytecode_only_rerank_scores_bytecode_alone():
+    rng = np.random.default_rng(5)
+    base, unrelated = random_code(rng), random_code(rng)
+    # Single-opcode shingles make unrelated contracts candidates too
+    index = ContractSimilarityIndex(ngram=1)
+    index.add("base", bytecode=base)
+    index.add("unrelated", bytecode=unrelated)
+
+    matches = {m.contract_id: m for m in index.query(bytecode=base, k=2)}
+
+    assert matches.keys() == {"base", "unrelated"}
+    # Missing sources no longer count as identical and lift every score
+    assert matches["base"].hybrid_score == 1.0
+    assert matches["unrelated"].hybrid_score == index.analyzer.bytecode_similarity(base, unrelated) < 0.6
+    assert all(m.similarity is None for m in matches.values())
@@ -0,0 +1,105 @@
+"""
+Unit tests for the EVM disassembly and opcode profiles.
+"""
+import numpy as np
+import pytest
+
+from utils.bitwise import analyze_bytecode_patterns
+from utils.evm_opcodes import (
+    OpcodeProfile, clear_opcode_profile_cache, get_opcode_profile, instruction_offsets,
+    opcode_profile_cache_info,
+)
+
+# PUSH1 0x80 PUSH1 0x40 MSTORE CALLVALUE ... with a selector dispatcher:
+# PUSH1 0 CALLDATALOAD PUSH1 0xe0 SHR DUP1 PUSH4 a9059cbb EQ PUSH2 0040 JUMPI
+# DUP1 PUSH4 095ea7b3 DUP2 EQ ... STOP
+DISPATCHER = (
+    "6080604052" "34"
+    "600035" "60e01c" "80" "63a9059cbb" "14" "610040" "57"
+    "80" "63095ea7b3" "81" "14" "00"
+)
+
+
+def reference_offsets(code: bytes):
+    """Straightforward byte-by-byte disassembly."""
+    offsets, i = [], 0
+    while i < len(code):
+        offsets.append(i)
+        op = code[i]
+        i += 1 + (op - 0x5f if 0x60 <= op <= 0x7f else 0)
+    return offsets
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_instruction_offsets_match_sequential_walk(seed):
+    """The vectorised walk finds the same instructions on PUSH-heavy random code."""
+    rng = np.random.default_rng(seed)
+    # Bias towards PUSH opcodes so immediates overlap and chain
+    code = bytes(np.where(rng.random(5000) < 0.3, rng.integers(0x60, 0x80, 5000),
+                          rng.integers(0, 256, 5000)).astype(np.uint8))
+
+    assert instruction_offsets(code).tolist() == reference_offsets(code)
+    assert instruction_offsets(b"").tolist() == []
+    assert instruction_offsets(b"\x7f\x01").tolist() == [0]
+
+
+def test_push_immediates_are_not_opcodes():
+    """0xff, 0xf4 and 0x42 inside a PUSH20 constant are data, not instructions."""
+    constant = "ff" * 10 + "f4" * 5 + "42" * 5
+    result = analyze_bytecode_patterns("0x73" + constant + "3100")
+
+    assert not result["patterns"]["selfdestruct"]
+    assert not result["patterns"]["delegatecall"]
+    assert not result["patterns"]["timestamp_dependency"]
+    assert result["vulnerabilities"] == []
+    assert result["statistics"]["instruction_count"] == 3
+
+
+def test_patterns_use_correct_opcode_values():
+    """DELEGATECALL is 0xf4, SELFDESTRUCT 0xff, CALL 0xf1 and CALLCODE 0xf2."""
+    result = analyze_bytecode_patterns("34f4ff")
+    assert result["patterns"]["delegatecall"] and result["patterns"]["selfdestruct"]
+    assert result["patterns"]["reentrancy_risk"]
+    assert result["vulnerabilities"] == ["DELEGATECALL_WITH_VALUE", "SELFDESTRUCT_PRESENT"]
+
+    call_only = analyze_bytecode_patterns("f1")["patterns"]
+    assert not call_only["callcode"] and not call_only["delegatecall"]
+
+    assert analyze_bytecode_patterns("")["error"] == "Empty bytecode"
+    assert analyze_bytecode_patterns("0xzz")["vulnerabilities"] == ["INVALID_BYTECODE"]
+
+
+def test_profile_histogram_and_selectors():
+    profile = OpcodeProfile.from_bytecode(DISPATCHER)
+
+    assert profile.count("CALLVALUE") == 1 and profile.count(0x80) == 2
+    assert profile.count("EQ") == 2 and profile.histogram[0xa9] == 0
+    assert profile.instruction_count == int(profile.histogram.sum()) == 18
+    assert profile.selectors == {"0xa9059cbb", "0x095ea7b3"}
+    counts = profile.opcode_counts()
+    assert list(counts)[0] == "PUSH1" and counts["PUSH1"] == 4 and counts["DUP1"] == 2
+    assert not profile.truncated_push
+    assert OpcodeProfile.from_bytecode("6101").truncated_push
+
+
+def test_profile_similarity():
+    rng = np.random.default_rng(1)
+    base = bytes(rng.integers(0, 0x60, 4000).astype(np.uint8))
+    fork = base[:3600] + bytes(rng.integers(0, 0x60, 400).astype(np.uint8))
+    other = bytes(rng.integers(0, 0x60, 4000).astype(np.uint8)[::-1])
+    a, b, c = (OpcodeProfile.from_bytecode(code) for code in (base, fork, other))
+
+    assert a.similarity(a) == 1.0
+    assert a.similarity(b) > 0.85
+    assert a.similarity(b) > a.similarity(c)
+
+
+def test_profiles_are_cached_by_code_hash():
+    clear_opcode_profile_cache()
+    first = get_opcode_profile("0x" + DISPATCHER)
+    # Same code given as bytes or upper-case hex hits the same entry
+    assert get_opcode_profile(bytes.fromhex(DISPATCHER)) is first
+    assert get_opcode_profile(DISPATCHER.upper()) is first
+    assert opcode_profile_cache_info()["size"] == 1
+    with pytest.raises(ValueError):
+        first.histogram[0] = 1
@@ -0,0 +1,56 @@
+"""
+Tests for the sparse-matrix wallet graph analysis in utils.graph_entropy.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.graph_entropy import GraphAnalysis, compute_wallet_graph_entropy
+
+
+def _ownership(seed, wallets=60, tokens=50, rows=180):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "wallet": ["0x%02x" % w for w in rng.integers(0, wallets, rows)],
+        "token_id": rng.integers(0, tokens, rows),
+    })
+
+
+def test_entropy_of_wallet_degrees():
+    df = pd.DataFrame({"wallet": ["A", "A", "A", "B", "C", "C"], "token_id": [1, 2, 2, 1, 3, 4]})
+    # Repeated rows count once: degrees A=2, B=1, C=2
+    probs = np.array([2, 1, 2]) / 5
+    assert compute_wallet_graph_entropy(df) == pytest.approx(-np.sum(probs * np.log2(probs)), abs=1e-8)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_full_analysis_matches_networkx(seed):
+    nx = pytest.importorskip("networkx")
+    df = _ownership(seed)
+    analysis = compute_wallet_graph_entropy(df, return_full_analysis=True)
+
+    graph = nx.Graph()
+    graph.add_nodes_from(set(df["wallet"]), bipartite=0)
+    graph.add_edges_from(zip(df["wallet"], df["token_id"]))
+    wallet_graph = nx.bipartite.projected_graph(graph, set(df["wallet"]))
+    components = list(nx.connected_components(wallet_graph))
+
+    assert isinstance(analysis, GraphAnalysis)
+    assert analysis.degree_assortativity == pytest.approx(nx.degree_assortativity_coefficient(wallet_graph))
+    assert analysis.density == pytest.approx(nx.density(wallet_graph))
+    assert analysis.components == len(components)
+    assert analysis.largest_component_size == max(map(len, components))
+    assert analysis.clustering == pytest.approx(nx.average_clustering(wallet_graph))
+    assert analysis.degree_centrality == pytest.approx(nx.degree_centrality(wallet_graph))
+    # Fewer than 100 wallets, so betweenness uses every source and is exact
+    assert analysis.betweenness == pytest.approx(nx.betweenness_centrality(wallet_graph), abs=1e-12)
+    assert analysis.pagerank == pytest.approx(nx.pagerank(wallet_graph, max_iter=100), abs=1e-6)
+
+
+def test_full_analysis_of_disconnected_wallets():
+    df = pd.DataFrame({"wallet": ["A", "B", "C"], "token_id": [1, 2, 3]})
+    analysis = compute_wallet_graph_entropy(df, return_full_analysis=True)
+    assert (analysis.density, analysis.components, analysis.largest_component_size) == (0.0, 3, 1)
+    assert analysis.clustering == 0.0 and np.isnan(analysis.degree_assortativity)
+    assert analysis.pagerank == pytest.approx({"A": 1 / 3, "B": 1 / 3, "C": 1 / 3})
+    assert analysis.betweenness == {"A": 0.0, "B": 0.0, "C": 0.0}
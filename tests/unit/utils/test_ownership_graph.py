@@ -0,0 +1,142 @@
+"""
+Tests for the incremental ownership graph in utils.ownership_graph.
+"""
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from live.event_log import EventLog
+from utils.graph_entropy import compute_wallet_graph_entropy, detect_whales
+from utils.ownership_graph import ZERO_ADDRESS, OwnershipGraphState
+
+CONTRACT = "0x" + "c0" * 20
+
+
+def _transfers(seed, count=3000, wallets=120, tokens=400):
+    """Random mints, transfers and burns, as the listener's parsed Transfer logs."""
+    rng = np.random.default_rng(seed)
+    owners = {}
+    events = []
+    for block in range(count):
+        token = int(rng.integers(0, tokens))
+        sender = owners.get(token, ZERO_ADDRESS)
+        # A few whales receive a large share of transfers
+        pick = int(rng.integers(0, 5)) if rng.random() < 0.3 else int(rng.integers(0, wallets))
+        receiver = ZERO_ADDRESS if rng.random() < 0.02 else "0x%040x" % pick
+        owners[token] = receiver
+        events.append({"contract": CONTRACT, "tokenId": token, "from": sender, "to": receiver,
+                       "blockNumber": block})
+    return events
+
+
+def _holdings_frame(state):
+    return pd.DataFrame([(wallet, token) for (_, token), wallet in state.owners.items()],
+                        columns=["wallet", "token_id"])
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_matches_batch_computation(seed):
+    state = OwnershipGraphState()
+    assert state.replay(_transfers(seed)) == 3000
+    df = _holdings_frame(state)
+
+    # The batch function adds 1e-10 inside the logarithm, worth ~1e-8 bits here
+    assert state.entropy == pytest.approx(compute_wallet_graph_entropy(df), abs=1e-6)
+    counts = df["wallet"].value_counts()
+    assert state.degree_histogram == counts.value_counts().sort_index().to_dict()
+    assert (state.mean, state.std) == pytest.approx((counts.mean(), counts.std()))
+    whales, expected = state.whales(), detect_whales(df)
+    assert whales and whales.keys() == expected.keys()
+    for wallet, metrics in whales.items():
+        assert metrics == pytest.approx(expected[wallet])
+
+
+def test_snapshot_restore_resumes_without_recomputation(tmp_path):
+    events = _transfers(3)
+    uninterrupted = OwnershipGraphState()
+    uninterrupted.replay(events)
+
+    path = str(tmp_path / "ownership.json")
+    state = OwnershipGraphState(path=path, snapshot_every=1000)
+    state.replay(events[:2500])  # Last automatic snapshot after 2000 events
+
+    restored = OwnershipGraphState.open(path)
+    assert (restored.events_applied, restored.block_number) == (2000, 1999)
+    restored.replay(events[2000:])
+    assert restored.owners == uninterrupted.owners
+    assert restored.degree_histogram == uninterrupted.degree_histogram
+    assert restored.entropy == pytest.approx(uninterrupted.entropy, abs=1e-12)
+
+
+def test_replays_broadcasts_from_event_log(tmp_path):
+    log = EventLog(str(tmp_path / "log"), channel_bytes=1 << 20)
+    for event in _transfers(4, count=50):
+        data = {"event": "nft_transfer", "from_address": event["from"], "to_address": event["to"],
+                "contract_address": event["contract"], "token_id": str(event["tokenId"])}
+        log.append("nft_transfer", json.dumps({"type": "nft_transfer", "data": data}))
+    try:
+        state = OwnershipGraphState(contracts=[CONTRACT.upper()])
+        assert state.replay_event_log(log) == 50 and state.log_offset == 49
+        assert state.replay_event_log(log) == 0
+
+        reference = OwnershipGraphState()
+        reference.replay(_transfers(4, count=50))
+        assert state.owners == reference.owners
+    finally:
+        log.close()
+
+    assert not OwnershipGraphState(contracts=["0x1"]).apply_event(
+        {"contract": CONTRACT, "tokenId": 1, "from": ZERO_ADDRESS, "to": "0x2"}
+    )
+
+
+def test_out_of_order_history_does_not_overwrite_newer_owners(tmp_path):
+    events = _transfers(5)
+    for event in events:
+        event["logIndex"] = 0
+    reference = OwnershipGraphState()
+    reference.replay(events)
+
+    # The tip is followed first, then a backfill replays history in shuffled chunks
+    state = OwnershipGraphState()
+    state.replay(events[2000:])
+    chunks = [events[start:start + 100] for start in range(0, 2000, 100)]
+    np.random.default_rng(0).shuffle(chunks)
+    for chunk in chunks:
+        state.replay(chunk)
+    state.replay(events[2990:])  # Re-applying the latest transfers is harmless
+
+    assert state.owners == reference.owners
+    assert state.degree_histogram == reference.degree_histogram
+    assert state.stale_events > 0
+
+    # Positions survive a snapshot, so history replayed after a restart is still ignored
+    restored = OwnershipGraphState.restore(state.snapshot(str(tmp_path / "ownership.json")))
+    restored.replay(events[:2000])
+    assert restored.owners == reference.owners
+    assert not restored.apply_transfer(CONTRACT, events[-1]["tokenId"], ZERO_ADDRESS, "0x1", 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_async_snapshot_copies_state_before_writing(tmp_path):
+    events = _transfers(6)
+    path = str(tmp_path / "ownership.json")
+    state = OwnershipGraphState(path=path, snapshot_every=1000)
+    for event in events[:1000]:
+        state.apply_event(event)
+    assert state.snapshot_due
+    expected = dict(state.owners)
+
+    writing = asyncio.create_task(state.snapshot_async())
+    await asyncio.sleep(0)
+    assert not state.snapshot_due
+    # Transfers applied while the snapshot is written do not leak into it
+    for event in events[1000:1500]:
+        state.apply_event(event)
+    await writing
+
+    restored = OwnershipGraphState.restore(path)
+    assert restored.owners == expected and restored.events_applied == 1000
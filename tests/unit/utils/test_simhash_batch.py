@@ -0,0 +1,57 @@
+"""
+Unit tests for the batched SimHash engine.
+"""
+import numpy as np
+import pytest
+
+from utils.simhash import SimHasher, SimHashConfig, simhash, simhash_many
+
+TEST_TEXTS = [
+    "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6",
+    "0x1234567890123456789012345678901234567890",
+    "The quick brown fox jumps over the lazy dog",
+    "a a a b b c",
+    "",
+    "   ",
+    "5 3 2 1 250000000.0",
+]
+
+
+def test_simhash_many_matches_scalar():
+    """Batch fingerprints are identical to the scalar implementation."""
+    hasher = SimHasher()
+    result = hasher.simhash_many(TEST_TEXTS)
+
+    assert result.dtype == np.uint64
+    assert [int(h) for h in result] == [hasher.simhash(t) for t in TEST_TEXTS]
+
+
+def test_simhash_many_random_addresses():
+    """Parity holds on a larger batch of random addresses."""
+    rng = np.random.default_rng(42)
+    addresses = ["0x" + rng.bytes(20).hex() for _ in range(500)]
+
+    result = simhash_many(addresses)
+
+    assert [int(h) for h in result] == [simhash(a) for a in addresses]
+
+
+@pytest.mark.parametrize("config", [
+    SimHashConfig(weighted=False),
+    SimHashConfig(token_weights={"fox": 3.0, "dog": -2.0}),
+    SimHashConfig(hash_bits=128),
+])
+def test_simhash_many_custom_configs(config):
+    """Unweighted, custom-weighted and 128-bit configs keep scalar parity."""
+    hasher = SimHasher(config)
+    result = hasher.simhash_many(TEST_TEXTS)
+
+    assert [int(h) for h in result] == [hasher.simhash(t) for t in TEST_TEXTS]
+
+
+def test_simhash_many_empty_input():
+    """An empty batch returns an empty array."""
+    result = SimHasher().simhash_many([])
+
+    assert result.dtype == np.uint64
+    assert len(result) == 0
@@ -0,0 +1,95 @@
+"""
+Unit tests for the multi-index SimHash nearest-neighbour table.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from utils.simhash import SimHashIndex
+
+
+def _random_fingerprints(count, seed=11, bits=32):
+    """Random fingerprints plus near-duplicates within a few bits."""
+    rng = random.Random(seed)
+    fingerprints = [rng.getrandbits(bits) for _ in range(count)]
+    for i in range(count // 4):
+        fp = fingerprints[i]
+        for bit in rng.sample(range(bits), rng.randint(0, 4)):
+            fp ^= 1 << bit
+        fingerprints.append(fp)
+    return fingerprints
+
+
+def _brute_force_pairs(fingerprints, max_distance):
+    pairs = set()
+    for i in range(len(fingerprints)):
+        for j in range(i + 1, len(fingerprints)):
+            distance = (fingerprints[i] ^ fingerprints[j]).bit_count()
+            if distance <= max_distance:
+                pairs.add((i, j, distance))
+    return pairs
+
+
+@pytest.mark.parametrize("hash_bits", [64, 128])
+def test_all_pairs_matches_brute_force(hash_bits):
+    """Bulk pair search finds exactly the pairs within the distance."""
+    fingerprints = _random_fingerprints(800)
+    index = SimHashIndex(max_distance=3, hash_bits=hash_bits)
+    index.add_many(range(len(fingerprints)), fingerprints)
+
+    found = {(min(a, b), max(a, b), d) for a, b, d in index.all_pairs()}
+
+    assert found == _brute_force_pairs(fingerprints, 3)
+
+
+def test_streamed_array_pairs_are_unique_and_complete():
+    """Chunked pairs from the array self-join are each reported exactly once."""
+    fingerprints = _random_fingerprints(600, seed=3, bits=64)
+    fps = np.array(fingerprints, dtype=np.uint64)
+    index = SimHashIndex(max_distance=3)
+
+    streamed = [
+        (int(a), int(b), int(d))
+        for left, right, distance in index.iter_array_pairs(fps, chunk_pairs=7)
+        for a, b, d in zip(left, right, distance)
+    ]
+    left, right, distance = index.array_pairs(fps)
+
+    assert len(streamed) == len(set(streamed))
+    assert set(streamed) == _brute_force_pairs(fingerprints, 3)
+    assert sorted(streamed) == list(zip(left.tolist(), right.tolist(), distance.tolist()))
+
+
+def test_query_matches_brute_force():
+    """Point queries return every item within the requested distance."""
+    fingerprints = _random_fingerprints(400, seed=5)
+    index = SimHashIndex(max_distance=3)
+    for i, fp in enumerate(fingerprints):
+        index.add(i, fp)
+
+    found = set()
+    for i, fp in enumerate(fingerprints):
+        for j, distance in index.query(fp, max_distance=2):
+            if j != i:
+                found.add((min(i, j), max(i, j), distance))
+
+    assert found == _brute_force_pairs(fingerprints, 2)
+
+
+def test_add_after_query_updates_tables():
+    """Items added after the tables are built are still found."""
+    index = SimHashIndex(max_distance=2)
+    index.add("a", 0b1011)
+    assert index.query(0b1011) == [("a", 0)]
+
+    index.add("b", 0b1000)
+    assert index.query(0b1011) == [("a", 0), ("b", 2)]
+    assert len(index) == 2
+
+
+def test_query_distance_above_index_limit():
+    """Queries cannot exceed the distance the tables were built for."""
+    index = SimHashIndex(max_distance=1)
+    with pytest.raises(ValueError):
+        index.query(0, max_distance=2)
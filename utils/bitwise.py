@@ -5,14 +5,31 @@ This module provides functions to analyze integer values at the bit level.
 Particularly useful for analyzing token IDs, transaction values, and other
 numeric blockchain data to find interesting patterns and properties.
 """
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, List, Tuple, Any
 from functools import lru_cache
 import math
 import numpy as np
 
+from utils.evm_opcodes import get_opcode_profile
+
 # Pre-compute powers of 2 for faster bit manipulation
 POWERS_OF_2 = [1 << i for i in range(256)]
 
+# Opcode whose presence marks each bytecode pattern
+_PATTERN_OPCODES = {
+    'delegatecall': 0xf4,
+    'selfdestruct': 0xff,
+    'create2': 0xf5,
+    'staticcall': 0xfa,
+    'callcode': 0xf2,
+    'extcodesize': 0x3b,
+    'extcodecopy': 0x3c,
+    'callvalue': 0x34,
+    'sstore': 0x55,
+    'sload': 0x54,
+    'timestamp_dependency': 0x42
+}
+
 def bitwise_features(n: int) -> Dict[str, float]:
     """
     Calculate various bit-level features for an integer.
@@ -77,6 +94,38 @@ def bitwise_features(n: int) -> Dict[str, float]:
         "bit_density": round(ones_count / bit_len, 4) if bit_len > 0 else 0.0
     }
 
+def bit_entropy_many(values: Iterable[int]) -> np.ndarray:
+    """
+    Calculate the ``bit_entropy`` feature of :func:`bitwise_features` for a batch.
+    
+    The entropy only depends on the bit length and the number of set bits, so
+    it is evaluated once per distinct (length, ones) pair and broadcast back,
+    using the same formula and rounding as the scalar version.
+    
+    Args:
+        values: Iterable of non-negative integers
+        
+    Returns:
+        np.ndarray: float64 bit entropy (0-1) of each value
+    """
+    values = list(values)
+    if any(not isinstance(n, int) or n < 0 for n in values):
+        raise ValueError("Input must be a non-negative integer")
+    
+    pairs = np.array([(n.bit_length(), n.bit_count()) for n in values], dtype=np.int64).reshape(-1, 2)
+    unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    
+    table = np.zeros(len(unique_pairs), dtype=np.float64)
+    for i, (bit_len, ones_count) in enumerate(unique_pairs.tolist()):
+        if bit_len == 0:
+            continue
+        p1 = ones_count / bit_len
+        p0 = 1 - p1
+        if p0 > 0 and p1 > 0:
+            table[i] = round(-(p0 * math.log2(p0) + p1 * math.log2(p1)), 6)
+    
+    return table[inverse.reshape(-1)]
+
 def is_power_of_two(n: int) -> bool:
     """Check if a number is a power of two."""
     return n > 0 and (n & (n - 1)) == 0
@@ -112,13 +161,17 @@ def analyze_bytecode_patterns(bytecode: str) -> Dict[str, Any]:
     """
     Analyze EVM bytecode for common patterns and potential vulnerabilities.
     
+    Opcodes are read from the disassembled instruction stream of the cached
+    opcode profile (see ``utils.evm_opcodes``), so bytes inside PUSH
+    immediates are not mistaken for instructions.
+    
     Args:
         bytecode: The EVM bytecode as a hex string (with or without 0x prefix)
         
     Returns:
         dict: Analysis results including patterns, vulnerabilities, and statistics
     """
-    if not bytecode:
+    if not bytecode or bytecode in ('0x', '0X'):
         return {
             'error': 'Empty bytecode',
             'patterns': {},
@@ -126,13 +179,8 @@ def analyze_bytecode_patterns(bytecode: str) -> Dict[str, Any]:
             'statistics': {}
         }
     
-    # Remove 0x prefix if present
-    if bytecode.startswith('0x'):
-        bytecode = bytecode[2:]
-    
-    # Convert to bytes for analysis
     try:
-        byte_array = bytes.fromhex(bytecode)
+        profile = get_opcode_profile(bytecode)
     except ValueError:
         return {
             'error': 'Invalid hex string',
@@ -141,10 +189,6 @@ def analyze_bytecode_patterns(bytecode: str) -> Dict[str, Any]:
             'statistics': {}
         }
     
-    # Basic statistics
-    byte_count = len(byte_array)
-    unique_bytes = len(set(byte_array))
-    
     # Common patterns to detect
     patterns = {
         'delegatecall': False,
@@ -167,29 +211,10 @@ def analyze_bytecode_patterns(bytecode: str) -> Dict[str, Any]:
     # Vulnerabilities found
     vulnerabilities = []
     
-    # Check for common opcodes (simplified)
-    opcode_map = {
-        b'\xf4': 'selfdestruct',
-        b'\xf1': 'callcode',
-        b'\x5a': 'gas',
-        b'\x54': 'sload',
-        b'\x55': 'sstore',
-        b'\x34': 'callvalue',
-        b'\x3d': 'returndatasize',
-        b'\xf2': 'delegatecall',
-        b'\xf5': 'create2',
-        b'\xfa': 'staticcall',
-        b'\x3b': 'extcodesize',
-        b'\x3c': 'extcodecopy'
-    }
-    
-    # Scan for opcodes
-    for i in range(len(byte_array)):
-        opcode = bytes([byte_array[i]])
-        if opcode in opcode_map:
-            op_name = opcode_map[opcode]
-            if op_name in patterns:
-                patterns[op_name] = True
+    # Patterns marked by the presence of a single opcode
+    for pattern, opcode in _PATTERN_OPCODES.items():
+        if profile.histogram[opcode]:
+            patterns[pattern] = True
     
     # Check for common vulnerability patterns
     if patterns['delegatecall'] and patterns['callvalue']:
@@ -204,10 +229,12 @@ def analyze_bytecode_patterns(bytecode: str) -> Dict[str, Any]:
     
     # Calculate statistics
     statistics = {
-        'byte_count': byte_count,
-        'unique_bytes': unique_bytes,
-        'entropy': len(set(byte_array)) / 256.0 if byte_count > 0 else 0,
-        'vulnerability_count': len(vulnerabilities)
+        'byte_count': profile.byte_count,
+        'unique_bytes': profile.unique_bytes,
+        'entropy': profile.unique_bytes / 256.0 if profile.byte_count > 0 else 0,
+        'vulnerability_count': len(vulnerabilities),
+        'instruction_count': profile.instruction_count,
+        'code_hash': profile.code_hash
     }
     
     return {
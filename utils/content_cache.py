@@ -0,0 +1,343 @@
+"""
+Content-Addressed Artifact Cache
+
+Memoizes values derived from large inputs (contract sources, bytecode) under
+the SHA-256 digest of the input instead of the input itself, so a lookup
+costs one digest rather than hashing and comparing megabyte strings, and the
+cache never keeps the inputs alive.
+
+Each kind of artifact (tokenized lines, simhash, opcode profile, pairwise
+scores) lives in its own namespace with an LRU bounded by the estimated size
+of its values in bytes. A ``DiskStore`` can back the memory tiers: values are
+written as one file per digest with atomic renames, so worker processes
+sharing the directory reuse each other's results.
+
+The shared default cache (``shared_cache``) is memory-only; deployments with
+several workers can point it at a common directory with
+``configure_shared_cache``.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+_MISSING = object()
+
+
+def content_digest(data: Union[str, bytes]) -> str:
+    """SHA-256 hex digest of a string (UTF-8) or bytes."""
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    return hashlib.sha256(data).hexdigest()
+
+
+def combined_digest(*digests: str) -> str:
+    """Digest of an ordered combination of digests (e.g. a pair of inputs)."""
+    return content_digest(':'.join(digests))
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU map bounded by the total estimated size of its values.
+
+    Args:
+        max_bytes: Size budget; least recently used entries are evicted
+            beyond it (a single value larger than the budget is not kept)
+        sizeof: Size estimate of a value
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, sizeof: Callable[[Any], int] = estimate_size):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Store a value, evicting least recently used entries to fit it.
+
+        Returns:
+            False if the value alone exceeds the budget and was not stored
+        """
+        size = self.sizeof(value) if size is None else size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class DiskStore:
+    """
+    Pickled values in a directory, one file per namespace and digest.
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent processes never read partial values. Only share the directory
+    between trusted processes: values are unpickled on load.
+
+    Args:
+        directory: Root directory (created if missing)
+        max_bytes: Size budget; when exceeded, the least recently read or
+            written files are deleted (checked every ``prune_every`` writes)
+        prune_every: Writes between size checks
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None, prune_every: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace: str, digest: str) -> str:
+        return os.path.join(self.directory, namespace, digest[:2], f"{digest}.pkl")
+
+    def get(self, namespace: str, digest: str, default: Any = None) -> Any:
+        path = self._path(namespace, digest)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return default
+        try:
+            os.utime(path)  # Mark as recently used for pruning
+        except OSError:
+            pass
+        return value
+
+    def put(self, namespace: str, digest: str, value: Any):
+        path = self._path(namespace, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache file {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._writes += 1
+        if self.max_bytes is not None and self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete least recently used files until the store fits its budget; returns files deleted."""
+        if self.max_bytes is None:
+            return 0
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+        return deleted
+
+    def clear(self, namespace: Optional[str] = None):
+        """Delete the stored files of one namespace (all namespaces when None)."""
+        root = os.path.join(self.directory, namespace) if namespace else self.directory
+        for path, _, names in os.walk(root, topdown=False):
+            for name in names:
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    pass
+
+
+class ContentCache:
+    """
+    Per-namespace byte-bounded memory caches, optionally backed by a ``DiskStore``.
+
+    Args:
+        max_bytes: Memory budget of each namespace
+        namespace_bytes: Budgets overriding ``max_bytes`` for some namespaces
+        directory: Directory of the shared disk store (memory-only when None)
+        disk_max_bytes: Size budget of the disk store (unbounded when None)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 namespace_bytes: Optional[Dict[str, int]] = None,
+                 directory: Optional[str] = None, disk_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.namespace_bytes = dict(namespace_bytes or {})
+        self.disk = DiskStore(directory, disk_max_bytes) if directory else None
+        self._namespaces: Dict[str, ByteLRUCache] = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str) -> ByteLRUCache:
+        """Memory cache of one artifact kind (created on first use)."""
+        cache = self._namespaces.get(name)
+        if cache is None:
+            with self._lock:
+                cache = self._namespaces.get(name)
+                if cache is None:
+                    cache = self._namespaces[name] = ByteLRUCache(self.namespace_bytes.get(name, self.max_bytes))
+        return cache
+
+    def get(self, name: str, digest: str, default: Any = None) -> Any:
+        """Cached value from memory, then from disk (promoted to memory)."""
+        cache = self.namespace(name)
+        value = cache.get(digest, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(name, digest, _MISSING)
+            if value is not _MISSING:
+                cache.put(digest, value)
+                return value
+        return default
+
+    def put(self, name: str, digest: str, value: Any):
+        """Store a value in memory and on disk."""
+        self.namespace(name).put(digest, value)
+        if self.disk is not None:
+            self.disk.put(name, digest, value)
+
+    def get_or_compute(self, name: str, digest: str, compute: Callable[[], Any]) -> Any:
+        """Cached value, or the result of ``compute()`` which is then cached."""
+        value = self.get(name, digest, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(name, digest, value)
+        return value
+
+    def clear(self, name: Optional[str] = None, disk: bool = False):
+        """Empty one namespace (all when None) in memory, and on disk if ``disk``."""
+        for cache_name, cache in list(self._namespaces.items()):
+            if name is None or cache_name == name:
+                cache.clear()
+        if disk and self.disk is not None:
+            self.disk.clear(name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Memory statistics by namespace and the disk store location."""
+        return {
+            'namespaces': {name: cache.get_stats() for name, cache in self._namespaces.items()},
+            'directory': self.disk.directory if self.disk is not None else None,
+        }
+
+
+_shared_cache: Optional[ContentCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> ContentCache:
+    """Process-wide cache used by default (memory-only until configured)."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = ContentCache()
+    return _shared_cache
+
+
+def configure_shared_cache(max_bytes: int = DEFAULT_MAX_BYTES, directory: Optional[str] = None,
+                           **kwargs) -> ContentCache:
+    """
+    Replace the shared cache, e.g. to back it with a directory shared by workers.
+
+    Args:
+        max_bytes: Memory budget per namespace
+        directory: Disk store directory (memory-only when None)
+        kwargs: Further ``ContentCache`` options
+    """
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = ContentCache(max_bytes=max_bytes, directory=directory, **kwargs)
+    return _shared_cache
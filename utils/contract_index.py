@@ -0,0 +1,402 @@
+"""
+Contract Similarity Index
+
+``SimilarityAnalyzer.compare`` scores one pair of contracts at a time with
+``difflib`` matching, which is quadratic in the code length. This module
+finds the contracts worth comparing: each contract is reduced to a set of
+shingles (opcode n-grams of its bytecode and normalized lines of its source),
+the set is summarised by a MinHash signature, and signatures are bucketed with
+banded locality-sensitive hashing (LSH).
+
+With ``b`` bands of ``r`` rows, two contracts whose shingle sets have Jaccard
+similarity ``s`` share at least one bucket with probability
+``1 - (1 - s**r)**b``, so near-duplicates are found from a handful of
+dictionary lookups however many contracts are indexed. Candidates are ranked
+by the Jaccard similarity estimated from their signatures, and the best ones
+can be re-ranked with the pairwise hybrid score of ``SimilarityAnalyzer``.
+
+Example usage:
+    >>> index = ContractSimilarityIndex()
+    >>> index.add("0xabc...", bytecode=known_bytecode)
+    >>> matches = index.query(bytecode=new_bytecode, k=5)
+"""
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import mmh3
+import numpy as np
+
+from utils.evm_opcodes import opcode_sequence
+from utils.hybrid_similarity import SimilarityAnalyzer, SimilarityResult, default_analyzer
+
+# Salts keeping opcode and source shingles in separate hash domains
+_OPCODE_SALT = np.uint64(0x6f70636f64657321)
+_SOURCE_SEED = 0x736f7572
+
+# Shingles hashed per block when computing signatures (bounds temporary memory)
+_SIGNATURE_BLOCK = 1024
+
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: spreads packed n-grams over all 64 bits."""
+    z = values.astype(np.uint64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def opcode_shingles(bytecode: str, ngram: int = 5) -> np.ndarray:
+    """
+    Distinct hashed opcode n-grams of bytecode (PUSH immediates skipped).
+
+    Args:
+        bytecode: EVM bytecode as hex (with or without 0x prefix)
+        ngram: Opcodes per shingle (1-8); shorter code forms a single shingle
+
+    Returns:
+        Sorted ``uint64`` array of shingle hashes
+    """
+    if not 1 <= ngram <= 8:
+        raise ValueError("ngram must be between 1 and 8")
+    opcodes = opcode_sequence(bytecode).astype(np.uint64)
+    if len(opcodes) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ngram = min(ngram, len(opcodes))
+    windows = len(opcodes) - ngram + 1
+    keys = np.zeros(windows, dtype=np.uint64)
+    for j in range(ngram):
+        keys = (keys << np.uint64(8)) | opcodes[j:j + windows]
+    # The length marker keeps short code from colliding with a single n-gram
+    keys ^= np.uint64(ngram) << np.uint64(61)
+    return np.unique(_mix64(keys ^ _OPCODE_SALT))
+
+
+def source_shingles(source: str) -> np.ndarray:
+    """
+    Distinct hashed source lines, with whitespace collapsed and blank lines
+    dropped (the line normalization of ``SimilarityAnalyzer``).
+
+    Returns:
+        Sorted ``uint64`` array of shingle hashes
+    """
+    lines = {' '.join(line.split()) for line in source.splitlines()}
+    lines.discard('')
+    hashes = [mmh3.hash64(line, _SOURCE_SEED, signed=False)[0] for line in lines]
+    return np.unique(np.array(hashes, dtype=np.uint64))
+
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets.
+
+    Each of the ``num_perm`` hash functions is a multiply-shift hash
+    ``((a * x + b) mod 2**64) >> 32`` with random odd ``a``; the signature
+    holds the minimum of each over the set, and the fraction of equal
+    positions in two signatures estimates the sets' Jaccard similarity.
+
+    Args:
+        num_perm: Number of hash functions (signature length)
+        seed: Seed of the hash functions; signatures are only comparable
+            between hashers with equal ``num_perm`` and ``seed``
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        if num_perm < 1:
+            raise ValueError("num_perm must be positive")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self._a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        """
+        Signature of a set of ``uint64`` shingle hashes.
+
+        Returns:
+            ``uint32`` array of length ``num_perm`` (all ones for an empty set)
+        """
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        shingles = np.asarray(shingles, dtype=np.uint64)
+        buffer = np.empty((self.num_perm, min(len(shingles), _SIGNATURE_BLOCK)), dtype=np.uint64)
+        for start in range(0, len(shingles), _SIGNATURE_BLOCK):
+            block = shingles[start:start + _SIGNATURE_BLOCK]
+            hashed = buffer[:, :len(block)]
+            np.multiply(self._a[:, None], block[None, :], out=hashed)
+            hashed += self._b[:, None]
+            hashed >>= np.uint64(32)
+            np.minimum(signature, hashed.min(axis=1), out=signature, casting='unsafe')
+        return signature
+
+    @staticmethod
+    def jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+        """Jaccard similarity estimated from two signatures."""
+        return float(np.mean(signature1 == signature2))
+
+
+@dataclass
+class ContractMatch:
+    """An indexed contract similar to a query."""
+    contract_id: Hashable
+    jaccard: float                                # Estimated Jaccard similarity of the shingle sets
+    hybrid_score: Optional[float] = None          # Pairwise hybrid score when re-ranked
+    similarity: Optional[SimilarityResult] = None  # All pairwise metrics when re-ranked on source
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization."""
+        result = {
+            'contract_id': self.contract_id,
+            'jaccard': round(self.jaccard, 4),
+            'hybrid_score': self.hybrid_score,
+        }
+        if self.similarity is not None:
+            result['similarity'] = self.similarity.to_dict()
+        return result
+
+
+class ContractSimilarityIndex:
+    """
+    MinHash/LSH index answering "most similar known contracts" queries.
+
+    Contracts are added with their source, bytecode or both; queries should
+    provide the same kinds of artifact as the indexed contracts, since the
+    shingles of both are pooled into one set.
+
+    Args:
+        num_perm: MinHash signature length
+        bands: LSH bands (must divide ``num_perm``); more bands find less
+            similar contracts at the cost of more candidates
+        ngram: Opcodes per bytecode shingle
+        seed: MinHash seed
+        store_artifacts: Keep each contract's source and bytecode for
+            re-ranking; without them queries rank by estimated Jaccard only
+        analyzer: Pairwise analyzer used for re-ranking (the module default
+            behind ``hybrid_similarity_score`` when None)
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 32,
+        ngram: int = 5,
+        seed: int = 1,
+        store_artifacts: bool = True,
+        analyzer: Optional[SimilarityAnalyzer] = None,
+    ):
+        if bands < 1 or num_perm % bands:
+            raise ValueError("bands must be a positive divisor of num_perm")
+        self.minhasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.store_artifacts = store_artifacts
+        self.analyzer = analyzer or default_analyzer
+
+        self._buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(bands)]
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._ids: List[Optional[Hashable]] = []  # Slot -> contract id (None once removed)
+        self._slots: Dict[Hashable, int] = {}
+        self._artifacts: Dict[Hashable, Tuple[Optional[str], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, contract_id: Hashable) -> bool:
+        return contract_id in self._slots
+
+    @property
+    def threshold(self) -> float:
+        """Jaccard similarity at which a pair becomes a candidate with probability ~50%."""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def shingles(self, source: Optional[str] = None, bytecode: Optional[str] = None) -> np.ndarray:
+        """Pooled shingle hashes of a contract's source and bytecode."""
+        parts = []
+        if source:
+            parts.append(source_shingles(source))
+        if bytecode and bytecode not in ('0x', '0X'):
+            parts.append(opcode_shingles(bytecode, self.ngram))
+        if not parts:
+            return np.zeros(0, dtype=np.uint64)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def signature(self, source: Optional[str] = None, bytecode: Optional[str] = None) -> np.ndarray:
+        """
+        MinHash signature of a contract.
+
+        Raises:
+            ValueError: If neither artifact yields any shingles
+        """
+        shingles = self.shingles(source, bytecode)
+        if len(shingles) == 0:
+            raise ValueError("Contract has no source lines or opcodes to index")
+        return self.minhasher.signature(shingles)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, contract_id: Hashable, source: Optional[str] = None, bytecode: Optional[str] = None) -> None:
+        """
+        Index a contract, replacing any earlier entry with the same id.
+
+        Args:
+            contract_id: Identifier returned by queries (e.g. the address)
+            source: Source code
+            bytecode: Bytecode as hex
+
+        Raises:
+            ValueError: If neither artifact yields any shingles
+        """
+        self.add_signature(contract_id, self.signature(source, bytecode), source, bytecode)
+
+    def add_signature(self, contract_id: Hashable, signature: np.ndarray,
+                      source: Optional[str] = None, bytecode: Optional[str] = None) -> None:
+        """Index a precomputed signature (e.g. one loaded from storage)."""
+        signature = np.asarray(signature, dtype=np.uint32)
+        if signature.shape != (self.minhasher.num_perm,):
+            raise ValueError(f"Signature must have {self.minhasher.num_perm} entries")
+        if contract_id in self._slots:
+            self.remove(contract_id)
+
+        slot = len(self._ids)
+        if slot == len(self._signatures):
+            grown = np.zeros((max(64, 2 * slot), self.minhasher.num_perm), dtype=np.uint32)
+            grown[:slot] = self._signatures
+            self._signatures = grown
+        self._signatures[slot] = signature
+        self._ids.append(contract_id)
+        self._slots[contract_id] = slot
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            buckets[key].add(slot)
+        if self.store_artifacts:
+            self._artifacts[contract_id] = (source, bytecode)
+
+    def add_many(self, contracts: Iterable[Tuple[Hashable, Optional[str], Optional[str]]]) -> int:
+        """
+        Index several ``(contract_id, source, bytecode)`` entries.
+
+        Returns:
+            Number of contracts indexed
+        """
+        count = 0
+        for contract_id, source, bytecode in contracts:
+            self.add(contract_id, source, bytecode)
+            count += 1
+        return count
+
+    def remove(self, contract_id: Hashable) -> bool:
+        """Drop a contract from the index; returns False if it was not indexed."""
+        slot = self._slots.pop(contract_id, None)
+        if slot is None:
+            return False
+        for buckets, key in zip(self._buckets, self._band_keys(self._signatures[slot])):
+            members = buckets.get(key)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    del buckets[key]
+        self._ids[slot] = None
+        self._artifacts.pop(contract_id, None)
+        return True
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Slots sharing at least one LSH bucket with a signature."""
+        slots: Set[int] = set()
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            members = buckets.get(key)
+            if members:
+                slots |= members
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def query(
+        self,
+        source: Optional[str] = None,
+        bytecode: Optional[str] = None,
+        k: int = 10,
+        rerank: bool = True,
+        rerank_candidates: Optional[int] = None,
+        min_jaccard: float = 0.0,
+        exclude: Iterable[Hashable] = (),
+    ) -> List[ContractMatch]:
+        """
+        Find the ``k`` indexed contracts most similar to the given one.
+
+        LSH candidates are ranked by estimated Jaccard similarity. With
+        ``rerank`` (and stored artifacts), the best ``rerank_candidates``
+        (default ``2 * k``) are scored with ``SimilarityAnalyzer.compare`` and
+        ordered by hybrid score.
+
+        Args:
+            source: Source code of the query contract
+            bytecode: Bytecode of the query contract as hex
+            k: Number of matches to return
+            rerank: Re-rank candidates with the pairwise hybrid score
+            rerank_candidates: Candidates re-ranked (at least ``k``)
+            min_jaccard: Drop candidates estimated below this similarity
+            exclude: Contract ids to leave out (e.g. the query itself)
+
+        Returns:
+            Matches, most similar first
+        """
+        if k <= 0 or not self._slots:
+            return []
+        try:
+            signature = self.signature(source, bytecode)
+        except ValueError:
+            return []
+
+        slots = self.candidates(signature)
+        if len(slots) == 0:
+            return []
+        estimates = (self._signatures[slots] == signature).mean(axis=1)
+        excluded = set(exclude)
+        order = np.argsort(-estimates, kind='stable')
+        pool = max(k, rerank_candidates or 2 * k) if rerank and self.store_artifacts else k
+
+        matches = []
+        for i in order:
+            if estimates[i] < min_jaccard or len(matches) == pool:
+                break
+            contract_id = self._ids[slots[i]]
+            if contract_id not in excluded:
+                matches.append(ContractMatch(contract_id, float(estimates[i])))
+
+        if rerank and self.store_artifacts:
+            for match in matches:
+                self._rerank(match, source, bytecode, *self._artifacts[match.contract_id])
+            matches.sort(key=lambda m: (m.hybrid_score, m.jaccard), reverse=True)
+        return matches[:k]
+
+    def _rerank(self, match: ContractMatch, source: Optional[str], bytecode: Optional[str],
+                other_source: Optional[str], other_bytecode: Optional[str]):
+        """
+        Score a candidate over the metrics both contracts have inputs for.
+
+        Embeddings are not indexed, so they never count; without source on
+        either side only the bytecode metric does.
+        """
+        with_bytecode = bytecode is not None and other_bytecode is not None
+        if not source or not other_source:
+            match.hybrid_score = self.analyzer.bytecode_similarity(bytecode, other_bytecode) if with_bytecode else 0.0
+            return
+        result = self.analyzer.compare(
+            source, other_source,
+            bytecode if with_bytecode else None,
+            other_bytecode if with_bytecode else None,
+        )
+        metrics = ('simhash', 'ast', 'bytecode') if with_bytecode else ('simhash', 'ast')
+        match.hybrid_score = self.analyzer.partial_score(result, metrics)
+        match.similarity = replace(result, hybrid_score=match.hybrid_score)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size and LSH parameters of the index."""
+        return {
+            'contracts': len(self),
+            'num_perm': self.minhasher.num_perm,
+            'bands': self.bands,
+            'rows': self.rows,
+            'threshold': round(self.threshold, 4),
+        }
@@ -5,7 +5,7 @@ This module provides functions to analyze randomness, patterns, and numerical pr
 in strings and numbers. Particularly useful for analyzing token IDs, traits, and other
 categorical data in the NFT space.
 """
-from typing import Dict, List, Union, Tuple
+from typing import Dict, Iterable, List, Union, Tuple
 from collections import Counter, defaultdict
 import math
 import numpy as np
@@ -51,6 +51,56 @@ def entropy(data: Union[str, List], normalize: bool = False) -> float:
     
     return entropy_val
 
+def entropy_many(strings: Iterable[str], chunk_size: int = 65536) -> np.ndarray:
+    """
+    Calculate the Shannon entropy of every string in a batch.
+    
+    Characters of each string are sorted in a fixed-width NumPy array, and
+    per-character counts are recovered from run lengths, so no Python-level
+    loop runs per string. Results match :func:`entropy` up to floating-point
+    summation order.
+    
+    Args:
+        strings: Iterable of strings
+        chunk_size: Number of strings processed per NumPy block (bounds memory)
+        
+    Returns:
+        np.ndarray: float64 entropy (in bits) of each string
+    """
+    strings = list(strings)
+    result = np.zeros(len(strings), dtype=np.float64)
+    
+    for start in range(0, len(strings), chunk_size):
+        chunk = strings[start:start + chunk_size]
+        chars = np.array(chunk, dtype=str)
+        if chars.itemsize == 0:
+            continue
+        # One uint32 code point per column, zero-padded on the right
+        codes = chars.view(np.uint32).reshape(len(chunk), -1)
+        lengths = (codes != 0).sum(axis=1)
+        codes = np.sort(codes, axis=1)
+        
+        # Position of each character within its run of equal characters
+        width = codes.shape[1]
+        columns = np.arange(width)
+        new_run = np.ones(codes.shape, dtype=bool)
+        new_run[:, 1:] = codes[:, 1:] != codes[:, :-1]
+        run_start = np.maximum.accumulate(np.where(new_run, columns, 0), axis=1)
+        rank = (columns - run_start + 1).astype(np.float64)
+        
+        # sum(c * log2(c)) over runs telescopes into a sum over run positions
+        contribution = rank * np.log2(rank) - (rank - 1) * np.log2(np.maximum(rank - 1, 1))
+        contribution[codes == 0] = 0.0
+        count_log_count = contribution.sum(axis=1)
+        
+        runs = (new_run & (codes != 0)).sum(axis=1)
+        safe_lengths = np.maximum(lengths, 1)
+        values = np.log2(safe_lengths) - count_log_count / safe_lengths
+        values[runs <= 1] = 0.0
+        result[start:start + len(chunk)] = values
+    
+    return result
+
 @lru_cache(maxsize=1024)
 def digit_root(n: int) -> int:
     """
@@ -129,6 +179,66 @@ def prime_factor_count(n: int) -> int:
         return 0
     return sum(prime_factors(n).values())
 
+def prime_factor_count_many(values: Iterable[int], max_vectorized: int = 10**12) -> np.ndarray:
+    """
+    Count prime factors with multiplicity for a batch of integers.
+    
+    Values up to ``max_vectorized`` are factorized together by vectorized
+    trial division; rows drop out as soon as the next prime exceeds the square
+    root of what is left of them. Larger values fall back to
+    :func:`prime_factor_count`.
+    
+    Args:
+        values: Iterable of integers
+        max_vectorized: Largest value handled by the vectorized path
+        
+    Returns:
+        np.ndarray: int64 prime factor count of each value
+    """
+    values = list(values)
+    counts = np.zeros(len(values), dtype=np.int64)
+    small = np.array([2 <= v <= max_vectorized for v in values], dtype=bool)
+    
+    for i in np.flatnonzero(~small):
+        counts[i] = prime_factor_count(values[i])
+    
+    if not small.any():
+        return counts
+    
+    rows = np.flatnonzero(small)
+    remaining = np.array([values[i] for i in rows], dtype=np.int64)
+    limit = math.isqrt(int(remaining.max()))
+    
+    # Sieve of Eratosthenes up to the largest square root needed
+    sieve = np.ones(limit + 1, dtype=bool)
+    sieve[:2] = False
+    for p in range(2, math.isqrt(limit) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = False
+    
+    for p in np.flatnonzero(sieve):
+        # Rows whose remainder has no factor <= sqrt are done (remainder is 1 or prime)
+        active = remaining >= p * p
+        if not active.any():
+            break
+        if not active.all():
+            done = ~active
+            counts[rows[done]] += (remaining[done] > 1)
+            rows, remaining = rows[active], remaining[active]
+        # A handful of stragglers (large primes) is cheaper to finish one by one
+        if len(rows) <= 16:
+            for row, rest in zip(rows, remaining):
+                counts[row] += prime_factor_count(int(rest))
+            return counts
+        divisible = remaining % p == 0
+        while divisible.any():
+            counts[rows[divisible]] += 1
+            remaining[divisible] //= p
+            divisible = divisible & (remaining % p == 0)
+    
+    counts[rows] += (remaining > 1)
+    return counts
+
 def unique_prime_factors(n: int) -> int:
     """Count the number of unique prime factors."""
     if n < 2:
@@ -0,0 +1,302 @@
+"""
+EVM Opcode Profiles
+
+Disassembles EVM bytecode into its instruction stream and summarises it as an
+opcode profile: an opcode histogram, a hashed opcode n-gram vector and the
+function selectors of the dispatcher.
+
+The bytes following PUSH1..PUSH32 are immediate data, not instructions, so a
+plain byte scan reports opcodes that only occur inside constants (an address
+containing 0xff looks like SELFDESTRUCT). Which bytes are instructions depends
+on every PUSH before them, so the walk is inherently sequential; it is done
+with NumPy by pointer doubling over the PUSH bytes (see
+``instruction_offsets``), in O(n log n) vectorised work instead of a Python
+loop per byte.
+
+Profiles are cached by code digest in the shared content cache
+(``utils.content_cache``), so the contract analysis and comparison endpoints
+disassemble each contract once.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Union
+
+import numpy as np
+from eth_utils import keccak
+
+from utils.content_cache import ContentCache, combined_digest, content_digest, shared_cache
+
+# Immediate bytes following each opcode (PUSH1..PUSH32 take 1..32)
+PUSH_LENGTHS = np.zeros(256, dtype=np.int64)
+PUSH_LENGTHS[0x60:0x80] = np.arange(1, 33)
+
+OPCODES: Dict[int, str] = {
+    0x00: 'STOP', 0x01: 'ADD', 0x02: 'MUL', 0x03: 'SUB', 0x04: 'DIV', 0x05: 'SDIV',
+    0x06: 'MOD', 0x07: 'SMOD', 0x08: 'ADDMOD', 0x09: 'MULMOD', 0x0a: 'EXP', 0x0b: 'SIGNEXTEND',
+    0x10: 'LT', 0x11: 'GT', 0x12: 'SLT', 0x13: 'SGT', 0x14: 'EQ', 0x15: 'ISZERO',
+    0x16: 'AND', 0x17: 'OR', 0x18: 'XOR', 0x19: 'NOT', 0x1a: 'BYTE', 0x1b: 'SHL',
+    0x1c: 'SHR', 0x1d: 'SAR', 0x20: 'KECCAK256',
+    0x30: 'ADDRESS', 0x31: 'BALANCE', 0x32: 'ORIGIN', 0x33: 'CALLER', 0x34: 'CALLVALUE',
+    0x35: 'CALLDATALOAD', 0x36: 'CALLDATASIZE', 0x37: 'CALLDATACOPY', 0x38: 'CODESIZE',
+    0x39: 'CODECOPY', 0x3a: 'GASPRICE', 0x3b: 'EXTCODESIZE', 0x3c: 'EXTCODECOPY',
+    0x3d: 'RETURNDATASIZE', 0x3e: 'RETURNDATACOPY', 0x3f: 'EXTCODEHASH',
+    0x40: 'BLOCKHASH', 0x41: 'COINBASE', 0x42: 'TIMESTAMP', 0x43: 'NUMBER',
+    0x44: 'PREVRANDAO', 0x45: 'GASLIMIT', 0x46: 'CHAINID', 0x47: 'SELFBALANCE',
+    0x48: 'BASEFEE', 0x49: 'BLOBHASH', 0x4a: 'BLOBBASEFEE',
+    0x50: 'POP', 0x51: 'MLOAD', 0x52: 'MSTORE', 0x53: 'MSTORE8', 0x54: 'SLOAD',
+    0x55: 'SSTORE', 0x56: 'JUMP', 0x57: 'JUMPI', 0x58: 'PC', 0x59: 'MSIZE', 0x5a: 'GAS',
+    0x5b: 'JUMPDEST', 0x5c: 'TLOAD', 0x5d: 'TSTORE', 0x5e: 'MCOPY', 0x5f: 'PUSH0',
+    **{0x60 + i: f'PUSH{i + 1}' for i in range(32)},
+    **{0x80 + i: f'DUP{i + 1}' for i in range(16)},
+    **{0x90 + i: f'SWAP{i + 1}' for i in range(16)},
+    **{0xa0 + i: f'LOG{i}' for i in range(5)},
+    0xf0: 'CREATE', 0xf1: 'CALL', 0xf2: 'CALLCODE', 0xf3: 'RETURN', 0xf4: 'DELEGATECALL',
+    0xf5: 'CREATE2', 0xfa: 'STATICCALL', 0xfd: 'REVERT', 0xfe: 'INVALID', 0xff: 'SELFDESTRUCT',
+}
+OPCODE_VALUES: Dict[str, int] = {name: value for value, name in OPCODES.items()}
+
+_PUSH4, _EQ, _DUP2 = 0x63, 0x14, 0x81
+
+# Fibonacci hashing constant for bucketing n-grams
+_NGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+DEFAULT_NGRAM = 3
+DEFAULT_NGRAM_BITS = 12
+
+
+def opcode_name(opcode: int) -> str:
+    """Mnemonic of an opcode (``0x..`` for unassigned values)."""
+    return OPCODES.get(opcode, f'0x{opcode:02x}')
+
+
+def to_code_bytes(bytecode: Union[str, bytes]) -> bytes:
+    """
+    Bytecode as bytes.
+
+    Raises:
+        ValueError: If a hex string is not valid hex
+    """
+    if isinstance(bytecode, (bytes, bytearray, memoryview)):
+        return bytes(bytecode)
+    if bytecode.startswith(('0x', '0X')):
+        bytecode = bytecode[2:]
+    return bytes.fromhex(bytecode)
+
+
+def instruction_offsets(code: bytes) -> np.ndarray:
+    """
+    Offsets of the instructions of ``code`` in order, skipping PUSH immediates.
+
+    Only PUSH bytes can hide other bytes, so the walk runs over them alone:
+    a PUSH that is an instruction is followed by the first PUSH byte after its
+    immediate. Pointer doubling over that successor table (each round extends
+    the reached PUSHes by twice as many steps and squares the table) finds the
+    PUSHes that execute, and every byte outside their immediates is an
+    instruction.
+    """
+    n = len(code)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    data = np.frombuffer(code, dtype=np.uint8)
+    # PUSHn is 0x5f + n; the uint8 subtraction wraps everything below PUSH1 high
+    push_size = data - np.uint8(0x5f)
+    is_push = (push_size - np.uint8(1)) < 32
+    pushes = np.flatnonzero(is_push)
+    m = len(pushes)
+    if m == 0:
+        return np.arange(n)
+
+    ends = np.minimum(pushes + 1 + push_size[pushes], n)
+    # Successor PUSH of each PUSH (the number of PUSH bytes before its
+    # immediate ends); index m is a sink past the last one
+    pushes_before = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(is_push, out=pushes_before[1:])
+    jump = np.append(pushes_before[ends], m)
+    # The first PUSH byte is always an instruction: nothing before it is an immediate
+    reached = np.zeros(m + 1, dtype=bool)
+    reached[0] = True
+    steps = 1
+    while steps < m:
+        reached[jump[reached]] = True
+        jump = jump[jump]
+        steps *= 2
+    executed = reached[:m]
+
+    # Bytes covered by the immediates of executed PUSHes are data (executed
+    # immediates never overlap, so the indices below are distinct)
+    cover = np.zeros(n + 1, dtype=np.int8)
+    cover[pushes[executed] + 1] += 1
+    cover[ends[executed]] -= 1
+    return np.flatnonzero(np.cumsum(cover[:n], dtype=np.int8) == 0)
+
+
+def opcode_sequence(bytecode: Union[str, bytes]) -> np.ndarray:
+    """
+    Opcodes of the instructions of ``bytecode`` in order (``uint8``), without
+    PUSH immediates.
+
+    Raises:
+        ValueError: If a hex string is not valid hex
+    """
+    code = to_code_bytes(bytecode)
+    return np.frombuffer(code, dtype=np.uint8)[instruction_offsets(code)]
+
+
+def _ngram_vector(opcodes: np.ndarray, ngram: int, bits: int) -> np.ndarray:
+    """Counts of opcode n-grams hashed into ``2 ** bits`` buckets."""
+    if len(opcodes) < ngram:
+        return np.zeros(1 << bits, dtype=np.uint32)
+    windows = len(opcodes) - ngram + 1
+    keys = np.zeros(windows, dtype=np.uint64)
+    for j in range(ngram):
+        keys = (keys << np.uint64(8)) | opcodes[j:j + windows].astype(np.uint64)
+    buckets = (keys * _NGRAM_MULTIPLIER) >> np.uint64(64 - bits)
+    return np.bincount(buckets.astype(np.intp), minlength=1 << bits).astype(np.uint32)
+
+
+def _dispatcher_selectors(code: bytes, offsets: np.ndarray, opcodes: np.ndarray) -> FrozenSet[str]:
+    """
+    Function selectors compared against in the dispatcher.
+
+    Solidity and Vyper dispatchers push each selector with PUSH4 and compare
+    it with EQ, either directly or after a DUP2.
+    """
+    padded = np.append(opcodes.astype(np.int16), [-1, -1])
+    following, after_next = padded[1:-1], padded[2:]
+    is_selector = (opcodes == _PUSH4) & (
+        (following == _EQ) | ((following == _DUP2) & (after_next == _EQ))
+    )
+    return frozenset(
+        '0x' + code[offset + 1:offset + 5].hex()
+        for offset in offsets[is_selector].tolist()
+        if offset + 5 <= len(code)
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class OpcodeProfile:
+    """
+    Instruction-level summary of one contract's bytecode.
+
+    Attributes:
+        code_hash: keccak256 of the bytecode (``0x``-prefixed hex)
+        byte_count: Bytecode length
+        unique_bytes: Distinct byte values, immediates included
+        instruction_count: Instructions after skipping PUSH immediates
+        histogram: Count of every opcode value (256 entries)
+        ngrams: Hashed opcode n-gram counts
+        selectors: Function selectors found in the dispatcher
+        truncated_push: True if the final PUSH runs past the end of the code
+    """
+    code_hash: str
+    byte_count: int
+    unique_bytes: int
+    instruction_count: int
+    histogram: np.ndarray = field(repr=False)
+    ngrams: np.ndarray = field(repr=False)
+    selectors: FrozenSet[str] = field(repr=False)
+    truncated_push: bool = False
+
+    def __setstate__(self, state):
+        # Profiles loaded from a disk cache are shared too; keep their arrays read-only
+        self.__dict__.update(state)
+        self.histogram.flags.writeable = False
+        self.ngrams.flags.writeable = False
+
+    @classmethod
+    def from_bytecode(cls, bytecode: Union[str, bytes], ngram: int = DEFAULT_NGRAM,
+                      ngram_bits: int = DEFAULT_NGRAM_BITS) -> 'OpcodeProfile':
+        """Disassemble bytecode into a profile (uncached; see ``get_opcode_profile``)."""
+        code = to_code_bytes(bytecode)
+        return cls._build(code, '0x' + keccak(code).hex(), ngram, ngram_bits)
+
+    @classmethod
+    def _build(cls, code: bytes, code_hash: str, ngram: int, ngram_bits: int) -> 'OpcodeProfile':
+        data = np.frombuffer(code, dtype=np.uint8)
+        offsets = instruction_offsets(code)
+        opcodes = data[offsets]
+        histogram = np.bincount(opcodes, minlength=256)
+        ngrams = _ngram_vector(opcodes, ngram, ngram_bits)
+        # Profiles are shared through the cache, so their arrays are read-only
+        histogram.flags.writeable = False
+        ngrams.flags.writeable = False
+        return cls(
+            code_hash=code_hash,
+            byte_count=len(code),
+            unique_bytes=int(np.count_nonzero(np.bincount(data, minlength=256))),
+            instruction_count=len(offsets),
+            histogram=histogram,
+            ngrams=ngrams,
+            selectors=_dispatcher_selectors(code, offsets, opcodes),
+            truncated_push=bool(len(offsets) and offsets[-1] + 1 + PUSH_LENGTHS[opcodes[-1]] > len(code)),
+        )
+
+    def count(self, opcode: Union[int, str]) -> int:
+        """Occurrences of an opcode, given by value or mnemonic."""
+        if isinstance(opcode, str):
+            opcode = OPCODE_VALUES[opcode.upper()]
+        return int(self.histogram[opcode])
+
+    def opcode_counts(self) -> Dict[str, int]:
+        """Counts of the opcodes that occur, by mnemonic, most frequent first."""
+        present = np.flatnonzero(self.histogram)
+        order = present[np.argsort(-self.histogram[present], kind='stable')]
+        return {opcode_name(int(op)): int(self.histogram[op]) for op in order}
+
+    def similarity(self, other: 'OpcodeProfile') -> float:
+        """Cosine similarity (0-1) of the two profiles' n-gram vectors."""
+        if self.code_hash == other.code_hash:
+            return 1.0
+        a = self.ngrams.astype(np.float64)
+        b = other.ngrams.astype(np.float64)
+        norm = np.linalg.norm(a) * np.linalg.norm(b)
+        return float(a @ b / norm) if norm else 0.0
+
+    def summary(self, top: int = 10) -> Dict[str, object]:
+        """JSON-serialisable overview for API responses."""
+        counts = self.opcode_counts()
+        return {
+            'code_hash': self.code_hash,
+            'byte_count': self.byte_count,
+            'instruction_count': self.instruction_count,
+            'distinct_opcodes': len(counts),
+            'top_opcodes': dict(list(counts.items())[:top]),
+            'function_selectors': sorted(self.selectors),
+            'truncated_push': self.truncated_push,
+        }
+
+
+PROFILE_NAMESPACE = 'opcode_profile'
+
+
+def get_opcode_profile(bytecode: Union[str, bytes], ngram: int = DEFAULT_NGRAM,
+                       ngram_bits: int = DEFAULT_NGRAM_BITS,
+                       cache: Optional[ContentCache] = None) -> OpcodeProfile:
+    """
+    Opcode profile of bytecode, cached by the SHA-256 digest of the code.
+
+    Profiles live in the ``opcode_profile`` namespace of the content cache
+    (the shared one by default), so the same contract, or identical code
+    deployed at another address, is only disassembled once per process, or
+    once per deployment when the cache has a disk store.
+
+    Raises:
+        ValueError: If a hex string is not valid hex
+    """
+    code = to_code_bytes(bytecode)
+    cache = cache or shared_cache()
+    key = combined_digest(content_digest(code), f'{ngram}:{ngram_bits}')
+    return cache.get_or_compute(
+        PROFILE_NAMESPACE, key,
+        lambda: OpcodeProfile._build(code, '0x' + keccak(code).hex(), ngram, ngram_bits)
+    )
+
+
+def clear_opcode_profile_cache():
+    """Drop every profile cached in memory by the shared cache."""
+    shared_cache().clear(PROFILE_NAMESPACE)
+
+
+def opcode_profile_cache_info() -> Dict[str, int]:
+    """Memory statistics of the shared cache's profile namespace."""
+    stats = shared_cache().namespace(PROFILE_NAMESPACE).get_stats()
+    return {'size': stats['entries'], **stats}
@@ -4,13 +4,20 @@ Graph Entropy Analysis Module
 This module provides functions to analyze the structure and patterns in NFT ownership
 networks using graph theory and information theory concepts. It's particularly useful
 for understanding the distribution of NFTs across wallets and detecting unusual patterns.
+
+Graphs are held as SciPy sparse matrices: the wallet x token incidence matrix
+(CSR), the wallet co-ownership projection as its sparse product with its
+transpose, connected components from ``scipy.sparse.csgraph``, and PageRank
+and sampled betweenness computed with sparse matrix products, so collections
+with hundreds of thousands of holders fit in memory and finish in seconds.
 """
 from typing import Dict, List, Tuple, Set, Optional, Union
 import pandas as pd
-import networkx as nx
 import numpy as np
 from collections import defaultdict
 from dataclasses import dataclass
+from scipy import sparse
+from scipy.sparse import csgraph
 
 @dataclass
 class GraphAnalysis:
@@ -25,6 +32,193 @@ class GraphAnalysis:
     betweenness: Dict[str, float]  # Betweenness centrality for each node
     pagerank: Dict[str, float]     # PageRank scores for each node
 
+
+def wallet_incidence_matrix(
+    df: pd.DataFrame,
+    wallet_col: str = "wallet",
+    token_col: str = "token_id"
+) -> Tuple[sparse.csr_matrix, list]:
+    """
+    Build the binary wallet x token incidence matrix.
+    
+    Repeated wallet-token rows count once, as in an ownership graph.
+    
+    Returns:
+        Tuple of (CSR matrix with one row per wallet, list of wallets in row order)
+    """
+    wallet_codes, wallets = pd.factorize(df[wallet_col])
+    token_codes, tokens = pd.factorize(df[token_col])
+    keep = (wallet_codes >= 0) & (token_codes >= 0)
+    wallet_codes, token_codes = wallet_codes[keep], token_codes[keep]
+    
+    incidence = sparse.csr_matrix(
+        (np.ones(len(wallet_codes), dtype=np.float64), (wallet_codes, token_codes)),
+        shape=(len(wallets), len(tokens))
+    )
+    incidence.data[:] = 1.0  # Duplicate rows were summed
+    return incidence, wallets.tolist()
+
+
+def co_ownership_matrix(incidence: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Binary wallet adjacency of wallets sharing at least one token (no self-loops)."""
+    adjacency = (incidence @ incidence.T).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    adjacency.data[:] = 1.0
+    return adjacency
+
+
+def _degree_entropy(degrees: np.ndarray) -> float:
+    """Shannon entropy (bits) of the degree distribution."""
+    total = degrees.sum()
+    if total == 0:
+        return 0.0
+    probs = degrees / total
+    return -np.sum(probs * np.log2(probs + 1e-10))  # Add small epsilon to avoid log(0)
+
+
+def _degree_assortativity(adjacency: sparse.csr_matrix, degrees: np.ndarray) -> float:
+    """Pearson correlation of the degrees at either end of every edge (NaN when undefined)."""
+    rows, cols = adjacency.nonzero()
+    x, y = degrees[rows], degrees[cols]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if len(x) == 0:
+            return float('nan')
+        x, y = x - x.mean(), y - y.mean()
+        return float(np.sum(x * y) / np.sqrt(np.sum(x * x) * np.sum(y * y)))
+
+
+def _average_clustering(
+    adjacency: sparse.csr_matrix,
+    degrees: np.ndarray,
+    block_work: int = 1 << 24
+) -> float:
+    """
+    Mean local clustering coefficient; nodes of degree < 2 count as 0.
+    
+    Row i of (A @ A) * A sums, over i's neighbours, their common neighbours
+    with i. A @ A is far denser than A, so it is built for a block of rows at
+    a time, with blocks sized so each holds about ``block_work`` entries.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return 0.0
+    # Row i of A @ A has at most the sum of its neighbours' degrees entries
+    cumulative = np.cumsum(adjacency @ degrees)
+    closed = np.zeros(n)
+    start = 0
+    while start < n:
+        done = cumulative[start - 1] if start else 0.0
+        stop = max(start + 1, int(np.searchsorted(cumulative, done + block_work, side='right')))
+        rows = adjacency[start:stop]
+        closed[start:stop] = np.asarray((rows @ adjacency).multiply(rows).sum(axis=1)).ravel()
+        start = stop
+    possible = degrees * (degrees - 1)
+    local = np.divide(closed, possible, out=np.zeros(n), where=possible > 0)
+    return float(local.mean())
+
+
+def _pagerank(
+    adjacency: sparse.csr_matrix,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1e-06
+) -> np.ndarray:
+    """
+    PageRank by power iteration, with the rank of dangling nodes spread uniformly.
+    
+    Raises:
+        RuntimeError: If the iteration does not converge within ``max_iter``
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out_degree, out=np.zeros(n), where=out_degree > 0)
+    transition = sparse.diags(inverse) @ adjacency
+    dangling = out_degree == 0
+    
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        last = x
+        x = alpha * (transition.T @ last + last[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(x - last).sum() < n * tol:
+            return x
+    raise RuntimeError(f"PageRank failed to converge in {max_iter} iterations")
+
+
+def _betweenness(
+    adjacency: sparse.csr_matrix,
+    k: Optional[int] = None,
+    batch_size: int = 32,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    Normalized betweenness centrality by Brandes' algorithm over ``k`` sampled sources.
+    
+    Sources are processed ``batch_size`` at a time as columns of dense
+    matrices: each BFS level is one sparse-dense product counting shortest
+    paths, and dependencies are accumulated back level by level the same way.
+    Products only read the rows of the current level, which keeps the small
+    levels near the sources and at the fringe cheap.
+    
+    Scaling follows networkx, including its adjustment for sampled sources.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    k = n if k is None else min(k, n)
+    sources = (np.arange(n) if k == n
+               else np.random.default_rng(seed).choice(n, size=k, replace=False))
+    
+    def spread(values: np.ndarray, active: np.ndarray) -> np.ndarray:
+        """adjacency @ values, reading only the rows active in some column."""
+        rows = np.flatnonzero(active.any(axis=1))
+        if len(rows) * 2 > n:
+            return adjacency @ values
+        # The adjacency is symmetric, so its columns for ``rows`` are its rows transposed
+        return adjacency[rows].T @ values[rows]
+    
+    centrality = np.zeros(n)
+    for start in range(0, k, batch_size):
+        batch = sources[start:start + batch_size]
+        columns = np.arange(len(batch))
+        sigma = np.zeros((n, len(batch)))
+        distance = np.full((n, len(batch)), -1, dtype=np.int64)
+        sigma[batch, columns] = 1.0
+        distance[batch, columns] = 0
+        
+        # Forward: shortest path counts, one BFS level per product
+        level = 0
+        frontier = distance == 0
+        while frontier.any():
+            reached = spread(np.where(frontier, sigma, 0.0), frontier)
+            level += 1
+            frontier = (distance < 0) & (reached > 0)
+            sigma[frontier] = reached[frontier]
+            distance[frontier] = level
+        
+        # Backward: dependencies flow from each level to its predecessors
+        delta = np.zeros_like(sigma)
+        for depth in range(level - 1, 0, -1):
+            below = distance == depth
+            coefficient = np.where(below, (1.0 + delta) / np.where(below, sigma, 1.0), 0.0)
+            above = distance == depth - 1
+            delta[above] += sigma[above] * spread(coefficient, below)[above]
+        delta[batch, columns] = 0.0
+        centrality += delta.sum(axis=1)
+    
+    # Same rescaling as networkx for normalized, endpoint-free betweenness
+    pairs = n - 1
+    if pairs < 2:
+        return centrality
+    if k == n:
+        return centrality / (pairs * (pairs - 1))
+    scale = np.full(n, 1.0 / (k * (pairs - 1)))
+    scale[sources] = 1.0 / ((k - 1) * (pairs - 1)) if k > 1 else np.nan
+    return centrality * scale
+
+
 def compute_wallet_graph_entropy(
     df: pd.DataFrame,
     wallet_col: str = "wallet",
@@ -51,31 +245,11 @@ def compute_wallet_graph_entropy(
         >>> entropy = compute_wallet_graph_entropy(df)
         >>> print(f"Graph entropy: {entropy:.4f}")
     """
-    # Create bipartite graph
-    B = nx.Graph()
-    
-    # Add nodes with bipartite attribute
-    wallets = set(df[wallet_col])
-    tokens = set(df[token_col])
-    
-    B.add_nodes_from(wallets, bipartite=0)  # Wallet nodes (type 0)
-    B.add_nodes_from(tokens, bipartite=1)   # Token nodes (type 1)
+    # Bipartite graph as a wallet x token incidence matrix
+    incidence, wallets = wallet_incidence_matrix(df, wallet_col, token_col)
     
-    # Add edges
-    edges = list(zip(df[wallet_col], df[token_col]))
-    B.add_edges_from(edges)
-    
-    # Get wallet nodes and their degrees
-    wallet_nodes = {n for n, d in B.nodes(data=True) if d['bipartite'] == 0}
-    degrees = [B.degree(n) for n in wallet_nodes]
-    
-    # Calculate entropy of degree distribution
-    total = sum(degrees)
-    if total == 0:
-        entropy_val = 0.0
-    else:
-        probs = np.array(degrees) / total
-        entropy_val = -np.sum(probs * np.log2(probs + 1e-10))  # Add small epsilon to avoid log(0)
+    # Calculate entropy of the wallet degree distribution
+    entropy_val = _degree_entropy(np.asarray(incidence.sum(axis=1)).ravel())
     
     if not return_full_analysis:
         return entropy_val
@@ -83,35 +257,35 @@ def compute_wallet_graph_entropy(
     # Calculate additional graph metrics if full analysis requested
     try:
         # Project to wallet graph (co-ownership network)
-        wallet_graph = nx.bipartite.projected_graph(B, wallet_nodes)
+        wallet_graph = co_ownership_matrix(incidence)
+        n = wallet_graph.shape[0]
+        degrees = np.asarray(wallet_graph.sum(axis=1)).ravel()
         
         # Calculate metrics
-        degree_assortativity = nx.degree_assortativity_coefficient(wallet_graph) if len(wallet_graph) > 1 else 0.0
-        density = nx.density(wallet_graph)
-        components = list(nx.connected_components(wallet_graph))
-        largest_component = max(components, key=len) if components else set()
-        clustering = nx.average_clustering(wallet_graph) if wallet_graph else 0.0
-        
-        # Centrality measures (compute only for a sample if graph is large)
-        max_nodes = 1000  # Limit for performance
-        sample_nodes = (list(wallet_graph.nodes())[:max_nodes] 
-                       if len(wallet_graph) > max_nodes 
-                       else list(wallet_graph.nodes()))
+        degree_assortativity = _degree_assortativity(wallet_graph, degrees) if n > 1 else 0.0
+        density = wallet_graph.nnz / (n * (n - 1)) if n > 1 else 0.0
+        if n:
+            components, labels = csgraph.connected_components(wallet_graph, directed=False)
+            largest_component_size = int(np.bincount(labels).max())
+        else:
+            components, largest_component_size = 0, 0
+        clustering = _average_clustering(wallet_graph, degrees)
         
-        degree_centrality = nx.degree_centrality(wallet_graph)
-        betweenness = nx.betweenness_centrality(wallet_graph, k=min(100, len(wallet_graph)))
-        pagerank = nx.pagerank(wallet_graph, max_iter=100)
+        # Centrality measures (betweenness is sampled from 100 sources on large graphs)
+        degree_centrality = degrees / (n - 1) if n > 1 else np.ones(n)
+        betweenness = _betweenness(wallet_graph, k=min(100, n))
+        pagerank = _pagerank(wallet_graph, max_iter=100)
         
         return GraphAnalysis(
             entropy=entropy_val,
             degree_assortativity=degree_assortativity,
             density=density,
-            components=len(components),
-            largest_component_size=len(largest_component),
+            components=int(components),
+            largest_component_size=largest_component_size,
             clustering=clustering,
-            degree_centrality=degree_centrality,
-            betweenness=betweenness,
-            pagerank=pagerank
+            degree_centrality=dict(zip(wallets, degree_centrality.tolist())),
+            betweenness=dict(zip(wallets, betweenness.tolist())),
+            pagerank=dict(zip(wallets, pagerank.tolist()))
         )
     except Exception as e:
         print(f"Warning: Could not compute full graph analysis: {str(e)}")
@@ -5,14 +5,14 @@ This module provides multiple approaches to measure similarity between smart con
 combining techniques like SimHash, AST analysis, bytecode comparison, and embeddings.
 Useful for detecting contract clones, verifying authenticity, and finding similar contracts.
 """
-from typing import Dict, Optional, Tuple, Union, List
+from typing import Dict, Iterable, Optional, Tuple, Union, List
 import difflib
 import numpy as np
 from dataclasses import dataclass
-from functools import lru_cache
 
 # Local imports
 from utils.simhash import simhash
+from utils.content_cache import ContentCache, combined_digest, content_digest, shared_cache
 
 @dataclass
 class SimilarityResult:
@@ -37,17 +37,24 @@ class SimilarityAnalyzer:
     """
     A configurable similarity analyzer for smart contracts.
     
+    Intermediate artifacts (normalized lines and simhashes of each input) and
+    pairwise scores are memoized in a content-addressed cache keyed by the
+    SHA-256 digests of the inputs, so analyzers never keep the compared code
+    alive and caches stay within their byte budgets.
+    
     Args:
         weights: Dictionary of weights for each similarity metric
         simhash_bits: Number of bits for SimHash (64 or 128)
-        cache_size: Maximum number of results to cache
+        cache_size: Unused; kept for compatibility (caches are bounded by bytes)
+        cache: Content cache to memoize into (the shared cache when None)
     """
     
     def __init__(
         self,
         weights: Optional[Dict[str, float]] = None,
         simhash_bits: int = 64,
-        cache_size: int = 1000
+        cache_size: int = 1000,
+        cache: Optional[ContentCache] = None
     ):
         self.weights = weights or {
             'simhash': 0.3,
@@ -57,44 +64,72 @@ class SimilarityAnalyzer:
         }
         self.simhash_bits = simhash_bits
         self._simhash_fn = simhash  # Assuming simhash supports bit length
-        
-        # Initialize caches
-        self._simhash_cache = {}
-        self._ast_cache = {}
-        
-        # Set up LRU caches for expensive operations
-        self._cached_ast_similarity = lru_cache(maxsize=cache_size)(self._ast_similarity_impl)
-        self._cached_bytecode_similarity = lru_cache(maxsize=cache_size)(self._bytecode_similarity_impl)
+        self._cache = cache
+    
+    @property
+    def cache(self) -> ContentCache:
+        """Cache in use (resolved on each access so the shared cache can be reconfigured)."""
+        return self._cache or shared_cache()
     
     def _normalize_simhash_distance(self, distance: int) -> float:
         """Convert Hamming distance to similarity score (0-1)."""
         return 1.0 - (distance / self.simhash_bits)
     
-    def _simhash_similarity(self, code1: str, code2: str) -> Tuple[int, float]:
+    def _simhash(self, code: str, digest: Optional[str] = None) -> int:
+        """SimHash of one input, cached by content digest."""
+        digest = digest or content_digest(code)
+        return self.cache.get_or_compute(
+            f'simhash{self.simhash_bits}', digest,
+            lambda: self._simhash_fn(code, self.simhash_bits)
+        )
+    
+    def _lines(self, code: str, digest: Optional[str] = None) -> Tuple[str, ...]:
+        """Stripped non-empty lines of one input, cached by content digest."""
+        digest = digest or content_digest(code)
+        return self.cache.get_or_compute(
+            'lines', digest,
+            lambda: tuple(l.strip() for l in code.splitlines() if l.strip())
+        )
+    
+    def _simhash_similarity(self, code1: str, code2: str,
+                            digest1: Optional[str] = None, digest2: Optional[str] = None) -> Tuple[int, float]:
         """
         Calculate SimHash distance and normalized similarity.
         
         Returns:
             Tuple of (hamming_distance, normalized_similarity)
         """
-        # Cache SimHashes for individual codes
-        if code1 not in self._simhash_cache:
-            self._simhash_cache[code1] = self._simhash_fn(code1, self.simhash_bits)
-        if code2 not in self._simhash_cache:
-            self._simhash_cache[code2] = self._simhash_fn(code2, self.simhash_bits)
-            
-        h1 = self._simhash_cache[code1]
-        h2 = self._simhash_cache[code2]
+        h1 = self._simhash(code1, digest1)
+        h2 = self._simhash(code2, digest2)
         
         # Calculate Hamming distance
         distance = bin(h1 ^ h2).count('1')
         return distance, self._normalize_simhash_distance(distance)
     
-    def _ast_similarity_impl(self, code1: str, code2: str) -> float:
+    def _cached_ast_similarity(self, code1: str, code2: str,
+                               digest1: Optional[str] = None, digest2: Optional[str] = None) -> float:
+        """AST similarity of a pair, cached by the pair of content digests."""
+        digest1 = digest1 or content_digest(code1)
+        digest2 = digest2 or content_digest(code2)
+        return self.cache.get_or_compute(
+            'ast_similarity', combined_digest(digest1, digest2),
+            lambda: self._ast_similarity_impl(code1, code2, digest1, digest2)
+        )
+    
+    def _cached_bytecode_similarity(self, bytecode1: str, bytecode2: str) -> float:
+        """Bytecode similarity of a pair, cached by the pair of content digests."""
+        key = combined_digest(content_digest(bytecode1), content_digest(bytecode2))
+        return self.cache.get_or_compute(
+            'bytecode_similarity', key,
+            lambda: self._bytecode_similarity_impl(bytecode1, bytecode2)
+        )
+    
+    def _ast_similarity_impl(self, code1: str, code2: str,
+                             digest1: Optional[str] = None, digest2: Optional[str] = None) -> float:
         """Internal implementation of AST similarity with basic line matching."""
         # Simple line-based similarity as fallback
-        lines1 = [l.strip() for l in code1.splitlines() if l.strip()]
-        lines2 = [l.strip() for l in code2.splitlines() if l.strip()]
+        lines1 = self._lines(code1, digest1)
+        lines2 = self._lines(code2, digest2)
         
         if not lines1 and not lines2:
             return 1.0  # Both empty
@@ -129,6 +164,32 @@ class SimilarityAnalyzer:
             
         return float(np.dot(emb1, emb2) / (norm1 * norm2))
     
+    def bytecode_similarity(self, bytecode1: str, bytecode2: str) -> float:
+        """Bytecode metric of ``compare`` on its own, for contracts without source."""
+        return self._cached_bytecode_similarity(bytecode1, bytecode2)
+    
+    def partial_score(self, result: SimilarityResult, metrics: Iterable[str]) -> float:
+        """
+        Hybrid score of a comparison with the weights renormalised over the
+        metrics that had inputs (``compare`` scores a missing metric as 0,
+        or two missing sources as identical).
+        
+        Args:
+            result: Result of ``compare``
+            metrics: Names of the metrics to combine (keys of ``weights``)
+        """
+        values = {
+            'simhash': self._normalize_simhash_distance(result.simhash_distance),
+            'ast': result.ast_similarity,
+            'bytecode': result.bytecode_similarity,
+            'embedding': result.embedding_similarity * 0.5 + 0.5,
+        }
+        metrics = list(metrics)
+        total_weight = sum(self.weights[m] for m in metrics)
+        if not total_weight:
+            return 0.0
+        return sum(self.weights[m] * values[m] for m in metrics) / total_weight
+    
     def compare(
         self,
         code1: str,
@@ -149,9 +210,10 @@ class SimilarityAnalyzer:
         Returns:
             SimilarityResult with all metrics and a combined score
         """
-        # Calculate all similarity metrics
-        simhash_dist, simhash_sim = self._simhash_similarity(code1, code2)
-        ast_sim = self._cached_ast_similarity(code1, code2)
+        # Calculate all similarity metrics (each input is digested once)
+        digest1, digest2 = content_digest(code1), content_digest(code2)
+        simhash_dist, simhash_sim = self._simhash_similarity(code1, code2, digest1, digest2)
+        ast_sim = self._cached_ast_similarity(code1, code2, digest1, digest2)
         
         bytecode_sim = 0.0
         if bytecode1 is not None and bytecode2 is not None:
@@ -0,0 +1,389 @@
+"""
+Incremental Ownership Graph
+
+``compute_wallet_graph_entropy`` and ``detect_whales`` analyse a full
+wallet-token DataFrame. ``OwnershipGraphState`` keeps the same statistics up
+to date one Transfer at a time instead: it tracks the owner of every token,
+each wallet's holding count, the histogram of holding counts, and the sums
+behind the running entropy, mean and standard deviation, so each event is
+O(1) work.
+
+With holdings c_i and total T, the degree entropy is
+
+    H = -sum (c_i / T) log2(c_i / T) = log2(T) - sum(c_i log2 c_i) / T
+
+so only T and sum(c_i log2 c_i) need updating when one wallet's count changes.
+
+Events come from ``BlockchainEventListener`` (see its ``ownership_state``
+argument), a replay log (``live.event_log.EventLog``) or a JSON-lines file. The
+state can be snapshotted to disk and restored, so a restart resumes from the
+snapshot and only replays what happened after it.
+
+Events may arrive out of chain order (a backfill replays history while the
+chain tip is followed), so the chain position of the last transfer applied to
+each token is kept and older transfers of that token are ignored.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ZERO_ADDRESS = '0x' + '0' * 40
+
+_SNAPSHOT_VERSION = 2
+# Snapshots without chain positions are still restored
+_SUPPORTED_SNAPSHOT_VERSIONS = (1, 2)
+
+
+def _xlog2x(count: int) -> float:
+    return count * math.log2(count) if count > 0 else 0.0
+
+
+def _address(value: Optional[str]) -> Optional[str]:
+    """Lower-cased address, or None for a missing or zero address (mint/burn side)."""
+    if not value:
+        return None
+    value = str(value).lower()
+    return None if value == ZERO_ADDRESS else value
+
+
+class OwnershipGraphState:
+    """
+    Wallet holdings and degree statistics maintained from Transfer events.
+
+    A token's owner is tracked from the first transfer seen for it; a wallet
+    only loses a token it was seen receiving, so starting mid-history never
+    drives counts negative. Transfers with a block number are ordered by
+    ``(block_number, log_index)``: one older than the token's last applied
+    transfer is ignored. Transfers from reorganized blocks are not undone,
+    but the next transfer of the same token corrects its owner.
+
+    Args:
+        contracts: Only follow these contracts (all contracts when None)
+        path: Snapshot file used by ``snapshot`` and ``OwnershipGraphState.open``
+        snapshot_every: Events applied between snapshots to ``path``; ``replay``
+            takes them itself, other callers check ``snapshot_due``
+    """
+
+    def __init__(self, contracts: Optional[Iterable[str]] = None,
+                 path: Optional[str] = None, snapshot_every: Optional[int] = None):
+        self.contracts = {c.lower() for c in contracts} if contracts else None
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.owners: Dict[Tuple[str, str], str] = {}
+        # (block_number, log_index) of the last transfer applied to each token, burned ones included
+        self.positions: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self.holdings: Dict[str, int] = {}
+        self._by_count: Dict[int, Set[str]] = defaultdict(set)
+        self.total = 0
+        self._sum_squares = 0
+        self._sum_xlogx = 0.0
+        self.events_applied = 0
+        self.stale_events = 0  # Transfers ignored as older than the token's last applied one
+        self.block_number: Optional[int] = None
+        self.log_offset = -1  # Last replay-log offset applied
+        self._unsaved = 0
+
+    def _adjust(self, wallet: str, delta: int):
+        """Change one wallet's holding count and every aggregate that depends on it."""
+        count = self.holdings.get(wallet, 0)
+        new = count + delta
+        if count:
+            members = self._by_count[count]
+            members.discard(wallet)
+            if not members:
+                del self._by_count[count]
+        if new:
+            self.holdings[wallet] = new
+            self._by_count[new].add(wallet)
+        else:
+            self.holdings.pop(wallet, None)
+        self.total += delta
+        self._sum_squares += new * new - count * count
+        self._sum_xlogx += _xlog2x(new) - _xlog2x(count)
+
+    def apply_transfer(self, contract: str, token_id: Any, from_address: Optional[str],
+                       to_address: Optional[str], block_number: Optional[int] = None,
+                       log_index: Optional[int] = None) -> bool:
+        """
+        Move a token to its new owner.
+
+        Args:
+            block_number: Block of the transfer; enables ordering against
+                transfers of the same token applied earlier
+            log_index: Position of the Transfer log within its block
+
+        Returns:
+            False if the contract is not followed or the transfer is older than
+            the token's last applied transfer, True otherwise
+        """
+        contract = str(contract).lower()
+        if self.contracts is not None and contract not in self.contracts:
+            return False
+
+        key = (contract, str(token_id))
+        if block_number is not None:
+            position = (int(block_number), -1 if log_index is None else int(log_index))
+            last = self.positions.get(key)
+            if last is not None and position < last:
+                self.stale_events += 1
+                return False
+            self.positions[key] = position
+        previous = self.owners.get(key)
+        if previous is None and _address(from_address) is not None:
+            logger.debug(f"First transfer seen for token {key}; previous holdings unknown")
+        receiver = _address(to_address)
+        if previous != receiver:
+            if previous is not None:
+                self._adjust(previous, -1)
+            if receiver is None:
+                self.owners.pop(key, None)  # Burned
+            else:
+                self.owners[key] = receiver
+                self._adjust(receiver, 1)
+
+        self.events_applied += 1
+        if block_number is not None:
+            self.block_number = max(block_number, self.block_number or 0)
+        self._unsaved += 1
+        return True
+
+    @property
+    def snapshot_due(self) -> bool:
+        """Whether ``snapshot_every`` events were applied since the last snapshot to ``path``."""
+        return bool(self.snapshot_every and self.path and self._unsaved >= self.snapshot_every)
+
+    def apply_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply a transfer in any of the listener's formats.
+
+        Accepts a broadcast message (``{"type": ..., "data": {...}}``), its
+        ``data`` (``from_address``/``to_address``/``contract_address``/``token_id``)
+        or a parsed Transfer log (``from``/``to``/``contract``/``tokenId``).
+        Events without a contract and token id are ignored.
+        """
+        if isinstance(event.get('data'), dict):
+            event = event['data']
+        contract = event.get('contract_address', event.get('contract'))
+        token_id = event.get('token_id', event.get('tokenId'))
+        if contract is None or token_id is None:
+            return False
+        return self.apply_transfer(
+            contract, token_id,
+            event.get('from_address', event.get('from')),
+            event.get('to_address', event.get('to')),
+            event.get('block_number', event.get('blockNumber')),
+            event.get('log_index', event.get('logIndex'))
+        )
+
+    def replay(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Apply events in order, snapshotting when due, and return how many were applied."""
+        applied = 0
+        for event in events:
+            applied += self.apply_event(event)
+            if self.snapshot_due:
+                self.snapshot()
+        return applied
+
+    def replay_file(self, path: str) -> int:
+        """Apply the events of a JSON-lines file (one event per line)."""
+        with open(path) as f:
+            return self.replay(json.loads(line) for line in f if line.strip())
+
+    def replay_event_log(self, event_log: Any, channel: str = 'nft_transfer') -> int:
+        """
+        Apply the events logged on a replay-log channel after ``log_offset``.
+
+        Args:
+            event_log: Log with ``read(channel, since_offset)`` returning
+                ``([(offset, payload), ...], truncated)``, e.g. ``live.event_log.EventLog``
+            channel: Channel the transfers were broadcast on
+        """
+        events, truncated = event_log.read(channel, self.log_offset)
+        if truncated:
+            logger.warning(f"Replay log of {channel} no longer holds every event after offset "
+                           f"{self.log_offset}; ownership state may miss transfers")
+        applied = 0
+        for offset, payload in events:
+            self.log_offset = offset
+            applied += self.apply_event(json.loads(payload))
+            if self.snapshot_due:
+                self.snapshot()
+        return applied
+
+    @property
+    def wallet_count(self) -> int:
+        """Wallets holding at least one token."""
+        return len(self.holdings)
+
+    @property
+    def degree_histogram(self) -> Dict[int, int]:
+        """Number of wallets by holding count."""
+        return {count: len(wallets) for count, wallets in sorted(self._by_count.items())}
+
+    @property
+    def entropy(self) -> float:
+        """
+        Shannon entropy (bits) of the holding distribution.
+
+        Matches ``compute_wallet_graph_entropy`` up to that function's 1e-10
+        guard inside the logarithm.
+        """
+        if self.total == 0:
+            return 0.0
+        return max(0.0, math.log2(self.total) - self._sum_xlogx / self.total)
+
+    @property
+    def mean(self) -> float:
+        """Mean holding count of wallets holding tokens."""
+        return self.total / self.wallet_count if self.wallet_count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of holding counts (NaN below two wallets, as pandas)."""
+        n = self.wallet_count
+        if n < 2:
+            return float('nan')
+        variance = (self._sum_squares - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(0.0, variance))
+
+    def whales(self, threshold_std: float = 2.0) -> Dict[str, Dict]:
+        """
+        Wallets holding more than ``threshold_std`` standard deviations above
+        the mean, in the format of ``detect_whales``.
+
+        Only the histogram buckets above the threshold are visited.
+        """
+        mean, std = self.mean, self.std
+        if not std or math.isnan(std):
+            return {}
+        threshold = mean + threshold_std * std
+
+        whale_data = {}
+        for count in sorted(self._by_count, reverse=True):
+            if count <= threshold:
+                break
+            for wallet in self._by_count[count]:
+                whale_data[wallet] = {
+                    'nft_count': count,
+                    'percentile': float((count - mean) / std),
+                    'threshold_exceeded': float(count - threshold),
+                    'is_whale': True
+                }
+        return whale_data
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary of the current state."""
+        return {
+            'tokens': len(self.owners),
+            'wallets': self.wallet_count,
+            'entropy': self.entropy,
+            'mean_holding': self.mean,
+            'std_holding': self.std,
+            'events_applied': self.events_applied,
+            'stale_events': self.stale_events,
+            'block_number': self.block_number,
+            'log_offset': self.log_offset,
+        }
+
+    def _resum(self):
+        """Recompute the running sums from the histogram, discarding float drift."""
+        self.total = sum(count * len(wallets) for count, wallets in self._by_count.items())
+        self._sum_squares = sum(count * count * len(wallets) for count, wallets in self._by_count.items())
+        self._sum_xlogx = sum(_xlog2x(count) * len(wallets) for count, wallets in self._by_count.items())
+
+    def snapshot(self, path: Optional[str] = None) -> str:
+        """
+        Write the state to ``path`` (default: the state's path) atomically.
+
+        Returns:
+            The snapshot path
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No snapshot path configured")
+        self._write_snapshot(path, self._snapshot_data())
+        return path
+
+    async def snapshot_async(self, path: Optional[str] = None) -> str:
+        """
+        ``snapshot`` without blocking the event loop: the state is copied on
+        the loop and encoded and written in a worker thread, so transfers can
+        keep being applied meanwhile.
+
+        Returns:
+            The snapshot path
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No snapshot path configured")
+        await asyncio.to_thread(self._write_snapshot, path, self._snapshot_data())
+        return path
+
+    def _snapshot_data(self) -> Dict[str, Any]:
+        """Shallow copy of the state to snapshot (keys and owners are immutable)."""
+        self._resum()
+        self._unsaved = 0
+        return {
+            'version': _SNAPSHOT_VERSION,
+            'contracts': sorted(self.contracts) if self.contracts is not None else None,
+            'events_applied': self.events_applied,
+            'block_number': self.block_number,
+            'log_offset': self.log_offset,
+            'owners': list(self.owners.items()),
+            'positions': list(self.positions.items()),
+        }
+
+    @staticmethod
+    def _write_snapshot(path: str, data: Dict[str, Any]):
+        data['owners'] = [[contract, token_id, wallet] for (contract, token_id), wallet in data['owners']]
+        data['positions'] = [[contract, token_id, block, index]
+                             for (contract, token_id), (block, index) in data['positions']]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path: str, **kwargs) -> 'OwnershipGraphState':
+        """
+        Load a snapshot written by ``snapshot``.
+
+        Raises:
+            ValueError: If the file is not a supported snapshot
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') not in _SUPPORTED_SNAPSHOT_VERSIONS:
+            raise ValueError(f"Unsupported ownership snapshot version: {data.get('version')}")
+
+        kwargs.setdefault('contracts', data.get('contracts'))
+        kwargs.setdefault('path', path)
+        state = cls(**kwargs)
+        for contract, token_id, wallet in data['owners']:
+            state.owners[(contract, token_id)] = wallet
+            state.holdings[wallet] = state.holdings.get(wallet, 0) + 1
+        for contract, token_id, block, index in data.get('positions', ()):
+            state.positions[(contract, token_id)] = (block, index)
+        for wallet, count in state.holdings.items():
+            state._by_count[count].add(wallet)
+        state._resum()
+        state.events_applied = data.get('events_applied', 0)
+        state.block_number = data.get('block_number')
+        state.log_offset = data.get('log_offset', -1)
+        return state
+
+    @classmethod
+    def open(cls, path: str, **kwargs) -> 'OwnershipGraphState':
+        """Restore the snapshot at ``path`` if there is one, else start an empty state saved there."""
+        if os.path.exists(path):
+            return cls.restore(path, **kwargs)
+        return cls(path=path, **kwargs)
@@ -16,8 +16,10 @@ Example usage:
 
 import hashlib
 import numpy as np
-from typing import List, Dict, Set, Tuple, Optional, Union, Callable
+from typing import Any, List, Dict, Set, Tuple, Optional, Union, Callable, Iterable, Iterator, Hashable
+from collections import defaultdict
 from dataclasses import dataclass
+from itertools import combinations
 from functools import lru_cache
 import mmh3  # MurmurHash3 for faster hashing
 
@@ -132,7 +134,81 @@ class SimHasher:
                 fingerprint |= 1 << i
                 
         return fingerprint
-    
+
+    def simhash_many(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Generate SimHash fingerprints for a batch of texts in one pass.
+
+        Tokens are hashed once per distinct value, their hash bits are unpacked
+        with NumPy and the signed weights are accumulated per text with
+        ``np.bincount``. Accumulation follows the same token order as
+        :meth:`simhash`, so the results are bit-for-bit identical to calling
+        the scalar method on every text.
+
+        Args:
+            texts: Iterable of input texts (e.g. a pandas Series of addresses)
+
+        Returns:
+            ``np.uint64`` array of fingerprints for 64-bit configs, or an object
+            array of Python ints for 128-bit configs
+        """
+        texts = list(texts)
+        hash_bits = self.config.hash_bits
+
+        # Fingerprint each distinct text once (wallet columns repeat heavily)
+        text_rows: Dict[str, int] = {}
+        inverse = np.empty(len(texts), dtype=np.intp)
+        for i, text in enumerate(texts):
+            inverse[i] = text_rows.setdefault(text, len(text_rows))
+        unique_texts = list(text_rows)
+        n_texts = len(unique_texts)
+
+        # Flatten all (text, token, weight) triples, preserving token order
+        rows: List[int] = []
+        hashes: List[int] = []
+        weights: List[float] = []
+        token_hashes: Dict[str, int] = {}
+        for row, text in enumerate(unique_texts):
+            if not text:
+                continue
+            for token, weight in self._tokenize(text):
+                h = token_hashes.get(token)
+                if h is None:
+                    h = token_hashes[token] = self._compute_token_hash(token)
+                rows.append(row)
+                hashes.append(h)
+                weights.append(weight)
+
+        if not rows:
+            if hash_bits == 64:
+                return np.zeros(len(texts), dtype=np.uint64)
+            return np.array([0] * len(texts), dtype=object)
+
+        row_idx = np.asarray(rows, dtype=np.intp)
+        weight_arr = np.asarray(weights, dtype=np.float64)
+
+        # Unpack the 32-bit token hashes into a (n_tokens, 32) bit matrix, LSB first
+        hash_arr = np.asarray(hashes, dtype='<u4')
+        bits = np.unpackbits(hash_arr.view(np.uint8).reshape(-1, 4), axis=1, bitorder='little')
+        hash_width = bits.shape[1]
+
+        # bincount sums sequentially in input order, matching the scalar loop exactly
+        vector = np.empty((n_texts, hash_bits), dtype=np.float64)
+        for i in range(hash_width):
+            signed = np.where(bits[:, i], weight_arr, -weight_arr)
+            vector[:, i] = np.bincount(row_idx, weights=signed, minlength=n_texts)
+        if hash_bits > hash_width:
+            # Bits beyond the token hash width are always unset, so every token votes -weight
+            vector[:, hash_width:] = np.bincount(row_idx, weights=-weight_arr, minlength=n_texts)[:, None]
+
+        set_bits = (vector > 0).astype(np.uint8)
+        packed = np.packbits(set_bits, axis=1, bitorder='little')
+        if hash_bits == 64:
+            return packed.view('<u8').ravel().astype(np.uint64)[inverse]
+        fingerprints = np.empty(n_texts, dtype=object)
+        fingerprints[:] = [int.from_bytes(row.tobytes(), 'little') for row in packed]
+        return fingerprints[inverse]
+
     @classmethod
     def simhash_distance(cls, hash1: int, hash2: int, hash_bits: int = 64) -> int:
         """
@@ -166,6 +242,301 @@ class SimHasher:
         distance = cls.simhash_distance(hash1, hash2, hash_bits)
         return 1.0 - (distance / hash_bits)
 
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Count set bits in each element of a ``uint64`` array (any shape), as ``uint8``."""
+    values = np.asarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: sum a per-byte lookup table
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    counts = table[np.ascontiguousarray(values).view(np.uint8)].reshape(values.shape + (8,))
+    return counts.sum(axis=-1, dtype=np.uint8)
+
+
+class SimHashIndex:
+    """
+    Multi-index hashing table for Hamming-space nearest neighbour search.
+    
+    Fingerprint bits are dealt round-robin into ``num_blocks`` blocks. Two
+    fingerprints within ``max_distance`` bits of each other differ in at most
+    ``max_distance`` blocks, so they agree exactly on every key built from
+    ``num_blocks - max_distance`` blocks (pigeonhole principle). One hash table
+    is kept per such block combination and only fingerprints that share a key
+    with the query are compared bit by bit.
+    
+    Interleaving the bits keeps every block informative even when the upper
+    bits of the fingerprints are constant (as with 32-bit token hashes).
+    
+    Args:
+        max_distance: Largest Hamming distance the index can answer
+        hash_bits: Number of bits in the indexed fingerprints (64 or 128)
+        num_blocks: Number of bit blocks (defaults to ``2 * max_distance``);
+            more blocks mean longer keys and smaller buckets but more tables
+    """
+    
+    def __init__(self, max_distance: int = 3, hash_bits: int = 64,
+                 num_blocks: Optional[int] = None):
+        if hash_bits not in (64, 128):
+            raise ValueError("hash_bits must be either 64 or 128")
+        if max_distance < 0 or max_distance >= hash_bits:
+            raise ValueError("max_distance must be between 0 and hash_bits - 1")
+        if num_blocks is None:
+            num_blocks = max(max_distance + 1, 2 * max_distance)
+        if not max_distance < num_blocks <= hash_bits:
+            raise ValueError("num_blocks must be greater than max_distance and at most hash_bits")
+        
+        self.max_distance = max_distance
+        self.hash_bits = hash_bits
+        self.num_blocks = num_blocks
+        
+        block_masks = [0] * num_blocks
+        for bit in range(hash_bits):
+            block_masks[bit % num_blocks] |= 1 << bit
+        
+        # One table per combination of blocks that must match exactly
+        self._masks: List[int] = []
+        for combo in combinations(range(num_blocks), num_blocks - max_distance):
+            mask = 0
+            for block in combo:
+                mask |= block_masks[block]
+            self._masks.append(mask)
+        
+        # Hash tables are built on the first query; bulk pair search does not need them
+        self._tables: Optional[List[Dict[int, Set[int]]]] = None
+        self._ids: Dict[int, List[Hashable]] = defaultdict(list)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, item_id: Hashable, fingerprint: int) -> None:
+        """
+        Add an item to the index.
+        
+        Args:
+            item_id: Identifier returned by queries (e.g. a wallet address)
+            fingerprint: SimHash fingerprint of the item
+        """
+        fingerprint = int(fingerprint)
+        if self._tables is not None and fingerprint not in self._ids:
+            for mask, table in zip(self._masks, self._tables):
+                table[fingerprint & mask].add(fingerprint)
+        self._ids[fingerprint].append(item_id)
+        self._size += 1
+    
+    def add_many(self, item_ids: Iterable[Hashable], fingerprints: Iterable[int]) -> None:
+        """Add several items at once (see :meth:`add`)."""
+        for item_id, fingerprint in zip(item_ids, fingerprints):
+            self.add(item_id, fingerprint)
+    
+    def _build_tables(self) -> List[Dict[int, Set[int]]]:
+        tables = [defaultdict(set) for _ in self._masks]
+        for mask, table in zip(self._masks, tables):
+            for fingerprint in self._ids:
+                table[fingerprint & mask].add(fingerprint)
+        self._tables = tables
+        return tables
+    
+    def ids_for(self, fingerprint: int) -> List[Hashable]:
+        """Return the ids stored under an exact fingerprint."""
+        return list(self._ids.get(int(fingerprint), ()))
+    
+    def _check_distance(self, max_distance: Optional[int]) -> int:
+        if max_distance is None:
+            return self.max_distance
+        if max_distance < 0 or max_distance > self.max_distance:
+            raise ValueError(f"max_distance must be between 0 and {self.max_distance}")
+        return max_distance
+    
+    def query_fingerprints(self, fingerprint: int,
+                           max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Find distinct indexed fingerprints near the query.
+        
+        Args:
+            fingerprint: Query fingerprint
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            
+        Returns:
+            List of (fingerprint, distance) tuples sorted by distance
+        """
+        max_distance = self._check_distance(max_distance)
+        fingerprint = int(fingerprint)
+        
+        tables = self._tables if self._tables is not None else self._build_tables()
+        candidates: Set[int] = set()
+        for mask, table in zip(self._masks, tables):
+            bucket = table.get(fingerprint & mask)
+            if bucket:
+                candidates |= bucket
+        
+        matches = []
+        for candidate in candidates:
+            distance = (candidate ^ fingerprint).bit_count()
+            if distance <= max_distance:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda m: m[1])
+        return matches
+    
+    def query(self, fingerprint: int, max_distance: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """
+        Find indexed items within ``max_distance`` bits of the query.
+        
+        Args:
+            fingerprint: Query fingerprint
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            
+        Returns:
+            List of (item_id, distance) tuples sorted by distance
+        """
+        return [
+            (item_id, distance)
+            for candidate, distance in self.query_fingerprints(fingerprint, max_distance)
+            for item_id in self._ids[candidate]
+        ]
+    
+    def fingerprint_pairs(self, max_distance: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find all pairs of distinct indexed fingerprints within ``max_distance``.
+        
+        For 64-bit indexes every table is processed in bulk with NumPy: keys are
+        sorted, pairs are generated inside each run of equal keys and verified
+        with a vectorized popcount.
+        
+        Args:
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            
+        Returns:
+            Tuple of (left, right, distance) arrays with ``left < right``
+        """
+        max_distance = self._check_distance(max_distance)
+        fingerprints = list(self._ids)
+        
+        if self.hash_bits != 64:
+            pairs = {}
+            for fp in fingerprints:
+                for other, distance in self.query_fingerprints(fp, max_distance):
+                    if other > fp:
+                        pairs[(fp, other)] = distance
+            left = np.array([p[0] for p in pairs], dtype=object)
+            right = np.array([p[1] for p in pairs], dtype=object)
+            return left, right, np.fromiter(pairs.values(), dtype=np.int64, count=len(pairs))
+        
+        fps = np.array(fingerprints, dtype=np.uint64)
+        left, right, distance = self.array_pairs(fps, max_distance)
+        return fps[left], fps[right], distance
+    
+    def array_pairs(self, fingerprints: np.ndarray,
+                    max_distance: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find all position pairs of a 64-bit fingerprint array within ``max_distance``.
+        
+        Collects :meth:`iter_array_pairs` into arrays sorted by position.
+        
+        Args:
+            fingerprints: ``uint64`` fingerprints
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            
+        Returns:
+            Tuple of (left, right, distance) arrays of positions with ``left < right``
+        """
+        chunks = list(self.iter_array_pairs(fingerprints, max_distance))
+        if not chunks:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.uint8)
+        
+        left, right, distance = (np.concatenate(parts) for parts in zip(*chunks))
+        order = np.lexsort((right, left))
+        return left[order], right[order], distance[order]
+    
+    def iter_array_pairs(self, fingerprints: np.ndarray, max_distance: Optional[int] = None,
+                         chunk_pairs: int = 1 << 22) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Yield the position pairs of a 64-bit fingerprint array within ``max_distance``.
+        
+        Uses this index's band masks but not its contents: for every table the
+        keys are sorted, pairs are generated inside each run of equal keys and
+        verified with a vectorized popcount, with no Python loop over items.
+        A pair is reported only by the first table that keys it together, so
+        every pair is yielded once and nothing has to be collected to remove
+        duplicates. Candidates are expanded about ``chunk_pairs`` at a time,
+        which bounds memory however large the buckets get. Pass distinct
+        fingerprints; duplicates pair with each other in every table.
+        
+        Args:
+            fingerprints: ``uint64`` fingerprints
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            chunk_pairs: Approximate number of candidate pairs verified at once
+            
+        Yields:
+            Tuples of (left, right, distance) arrays of positions with ``left < right``
+        """
+        if self.hash_bits != 64:
+            raise ValueError("array_pairs requires a 64-bit index")
+        max_distance = self._check_distance(max_distance)
+        fps = np.asarray(fingerprints, dtype=np.uint64)
+        n = len(fps)
+        for table, mask in enumerate(self._masks):
+            keys = fps & np.uint64(mask)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            
+            # End position of the run of equal keys that each position belongs to
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            run_ends = np.repeat(np.r_[starts[1:], n], np.diff(np.r_[starts, n]))
+            followers = run_ends - np.arange(n) - 1
+            if not followers.any():
+                continue
+            
+            chunk = np.cumsum(followers) // chunk_pairs
+            for positions in np.split(np.arange(n), np.flatnonzero(np.diff(chunk)) + 1):
+                counts = followers[positions]
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                left_pos = np.repeat(positions, counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                right_pos = left_pos + 1 + offsets
+                
+                a = order[left_pos]
+                b = order[right_pos]
+                xor = fps[a] ^ fps[b]
+                keep = popcount64(xor) <= max_distance
+                for earlier in self._masks[:table]:
+                    keep &= (xor & np.uint64(earlier)) != 0
+                if not keep.any():
+                    continue
+                a, b = a[keep], b[keep]
+                yield (np.minimum(a, b).astype(np.int64), np.maximum(a, b).astype(np.int64),
+                       popcount64(xor[keep]))
+    
+    def all_pairs(self, max_distance: Optional[int] = None) -> List[Tuple[Hashable, Hashable, int]]:
+        """
+        Find all pairs of indexed items within ``max_distance`` bits.
+        
+        Items sharing an identical fingerprint are reported with distance 0,
+        so heavily duplicated fingerprints can produce large outputs; use
+        :meth:`fingerprint_pairs` with :meth:`ids_for` to work per fingerprint.
+        
+        Args:
+            max_distance: Maximum Hamming distance (defaults to the index maximum)
+            
+        Returns:
+            List of (id_a, id_b, distance) tuples
+        """
+        pairs = []
+        for ids in self._ids.values():
+            for i in range(len(ids)):
+                for j in range(i + 1, len(ids)):
+                    pairs.append((ids[i], ids[j], 0))
+        
+        left, right, distances = self.fingerprint_pairs(max_distance)
+        for fp_a, fp_b, distance in zip(left, right, distances):
+            for id_a in self._ids[int(fp_a)]:
+                for id_b in self._ids[int(fp_b)]:
+                    pairs.append((id_a, id_b, int(distance)))
+        return pairs
+
 # Default instance with standard configuration
 default_hasher = SimHasher()
 
@@ -186,6 +557,21 @@ def simhash(text: str, hash_bits: int = 64) -> int:
     config = SimHashConfig(hash_bits=hash_bits)
     return SimHasher(config).simhash(text)
 
+def simhash_many(texts: Iterable[str], hash_bits: int = 64) -> np.ndarray:
+    """
+    Generate SimHash fingerprints for a batch of texts using default settings.
+
+    Args:
+        texts: Iterable of input texts
+        hash_bits: Number of bits in the hash (64 or 128)
+
+    Returns:
+        Array of fingerprints (``np.uint64`` for 64-bit hashes)
+    """
+    if hash_bits == 64:
+        return default_hasher.simhash_many(texts)
+    return SimHasher(SimHashConfig(hash_bits=hash_bits)).simhash_many(texts)
+
 def simhash_distance(hash1: int, hash2: int, hash_bits: int = 64) -> int:
     """
     Calculate the Hamming distance between two SimHash values.
@@ -420,6 +420,57 @@ def golden_ratio_proximity(value: float, tolerance: float = 0.1) -> float:
         return 1.0 - (abs(1 - ratio) / tolerance)
     return 0.0
 
+def golden_ratio_proximity_many(values: np.ndarray, tolerance: float = 0.1) -> np.ndarray:
+    """
+    Vectorized :func:`golden_ratio_proximity` over an array of values.
+    
+    Non-positive and NaN values score 0, as in the scalar version.
+    
+    Args:
+        values: Values to check
+        tolerance: Tolerance for the proximity check (default: 0.1)
+        
+    Returns:
+        Array of scores between 0 and 1
+    """
+    values = np.asarray(values, dtype=np.float64)
+    deviation = np.abs(1 - values / GOLDEN_RATIO)
+    scores = 1.0 - deviation / tolerance
+    return np.where((values > 0) & (deviation <= tolerance), scores, 0.0)
+
+def fibonacci_interval_matches(intervals: np.ndarray, tolerance: float = 0.1) -> np.ndarray:
+    """
+    Flag intervals lying within a relative tolerance of a Fibonacci number.
+    
+    Uses the same matching rule as :meth:`TemporalAnalyzer.fibonacci_pattern_score`,
+    whose score is the mean of these flags.
+    
+    Args:
+        intervals: Time intervals in seconds (NaN entries never match)
+        tolerance: Maximum relative distance to the closest Fibonacci number
+        
+    Returns:
+        Array of 1.0 (match) / 0.0 (no match) flags
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    valid = np.isfinite(intervals)
+    if not valid.any():
+        return np.zeros(len(intervals), dtype=np.float64)
+    
+    fibs = [1, 2]
+    while fibs[-1] <= np.max(intervals[valid]) * 1.5:
+        fibs.append(fibs[-1] + fibs[-2])
+    fibs = np.array(fibs, dtype=np.float64)
+    
+    # The closest Fibonacci number is one of the two around the insertion point
+    d = np.where(valid, intervals, 0.0)
+    upper = np.clip(np.searchsorted(fibs, d), 0, len(fibs) - 1)
+    lower = np.clip(upper - 1, 0, len(fibs) - 1)
+    closest = np.minimum(np.abs(fibs[upper] - d), np.abs(fibs[lower] - d))
+    
+    matches = valid & (closest / (d + 1e-9) <= tolerance)
+    return matches.astype(np.float64)
+
 # Convenience functions
 def fibonacci_pattern_score(timestamps: TimeSeries) -> float:
     """